@@ -12,12 +12,12 @@ central_dashboard.py — стабильная сборка v8.0  (02 Aug 2025)
 """
 
 from __future__ import annotations
-import os, sys, json, time, base64, ctypes, logging, subprocess, threading
+import os, sys, json, time, base64, ctypes, logging, threading
 from dataclasses import dataclass, asdict, field
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, TypedDict
-from urllib.parse import quote
+from typing import Any, Dict, List, Optional, Tuple, TypedDict
+from urllib.parse import quote, urlsplit
 
 import requests
 from flask import (
@@ -26,6 +26,8 @@ from flask import (
 )
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from reachability import ReachabilityProber
+
 # Общая загрузка /.env из корня репозитория (без перезаписи системных env).
 def _load_root_env() -> None:
     current_file = Path(__file__).resolve()
@@ -220,11 +222,16 @@ _last_manual  : float = 0.0                # защита от спама refres
 _lock         = threading.Lock()
 
 # ========== Утилиты ==========
-def ping(ip: str) -> bool:
-    param = "-n" if os.name == "nt" else "-c"
-    cmd   = f"ping {param} 1 -w 800 {ip}".split()
-    return subprocess.call(cmd, stdout=subprocess.DEVNULL,
-                           stderr=subprocess.DEVNULL) == 0
+def probe_target(srv: ServerCfg) -> Tuple[str, int]:
+    """Хост и порт API сервера для TCP-пробы (из url, иначе ip:5001 RssCounter)."""
+    parts = urlsplit(srv.url)
+    if parts.hostname:
+        try:
+            port = parts.port
+        except ValueError:
+            port = None
+        return parts.hostname, port or (443 if parts.scheme == "https" else 80)
+    return srv.ip, 5001
 
 def http_json(url: str, timeout: int = REQUEST_TIMEOUT) -> Any | None:
     try:
@@ -240,15 +247,30 @@ def map_ldconfig(srv: ServerCfg, cfg_name: str) -> str:
     return mapping.get(cfg_name, cfg_name)
 
 # ========== Сбор метрик ==========
-def collect_one(srv: ServerCfg) -> Dict[str, Any]:
+def fetch_task_states(srv: ServerCfg) -> Dict[str, Optional[bool]]:
+    """Состояния TASKS одним /api/taskStates; у старого RSSv7 без него — по задаче."""
+    ordered: Dict[str, Optional[bool]] = {}
+    batch = (http_json(f"{srv.url}/api/taskStates?names={quote(','.join(TASKS))}") or {}).get("tasks")
+    for t in TASKS:
+        if isinstance(batch, dict):
+            raw = batch.get(t)
+        else:  # старый RSSv7 без /api/taskStates
+            raw = (http_json(f"{srv.url}/api/taskState?name={quote(t)}") or {}).get("enabled")
+        ordered[t] = None if raw is None else bool(raw)
+    return ordered
+
+def collect_one(srv: ServerCfg, reachable: Optional[bool] = None) -> Dict[str, Any]:
     """Основная тяжёлая функция: собираем всё, что можем с конкретного сервера."""
     now_iso = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    if reachable is None:
+        reachable = PROBER.check_all({srv.name: probe_target(srv)})[srv.name]
 
     out: Dict[str, Any] = {
         "name": srv.name,
         "url":  srv.url,
         "ts":   now_iso,
-        "ping": ping(srv.ip),
+        "ping": reachable,
+        "reach": PROBER.state(srv.name),
         "updated_iso": now_iso,
         "includeAcc": srv.include_acc
     }
@@ -262,9 +284,20 @@ def collect_one(srv: ServerCfg) -> Dict[str, Any]:
     st_raw = st_resp.get("status", st_resp).get(srv.name, {})
     out["gnOk"]    = st_raw.get("gnOk") or st_raw.get("gn") or st_raw.get("gn_running") or True
     out["dnOk"]    = st_raw.get("dnOk") or st_raw.get("dn") or st_raw.get("dn_running") or True
+    # --- MONITOR_onlyLD: статусы скриптов и dnCount одним запросом ---------
+    mon_batch = None
+    if srv.mon_url:
+        names = ",".join(srv.monitor_scripts)
+        mon_batch = http_json(f"{srv.mon_url}/api/scriptStatuses?scripts={quote(names)}")
+    if not isinstance(mon_batch, dict) or not isinstance(mon_batch.get("scripts"), dict):
+        mon_batch = None  # старый MONITOR_onlyLD без /api/scriptStatuses
+
     # --- dnCount (окна LDPlayer) -----------------------------------------
-    dn_json = http_json(f"{srv.mon_url}/api/dnCount") if srv.mon_url else None
-    out["dnCount"] = dn_json.get("dnCount") if dn_json else 0
+    if mon_batch is not None:
+        out["dnCount"] = mon_batch.get("dnCount", 0)
+    else:
+        dn_json = http_json(f"{srv.mon_url}/api/dnCount") if srv.mon_url else None
+        out["dnCount"] = dn_json.get("dnCount") if dn_json else 0
 
 
     # --- аккаунты / доход ---
@@ -279,8 +312,11 @@ def collect_one(srv: ServerCfg) -> Dict[str, Any]:
     # --- scriptStatus (RssV7 / CLO и др.) ---------------------------------
     script_states: dict[str, bool] = {}
     for internal, disp in srv.monitor_scripts.items():
+        if mon_batch is not None:
+            script_states[disp] = bool(mon_batch["scripts"].get(internal, False))
+            continue
         api = f"{srv.mon_url}/api/scriptStatus?script={quote(internal)}" if srv.mon_url else ""
-        st  = http_json(api) if api else {}
+        st  = (http_json(api) if api else None) or {}
         script_states[disp] = bool(st.get("running", False))
     out["scripts"] = script_states
 
@@ -294,11 +330,7 @@ def collect_one(srv: ServerCfg) -> Dict[str, Any]:
         out["no_logs"] = True
 
     # --- Tasks-scheduler ---
-    ordered: Dict[str, Optional[bool]] = {}
-    for t in TASKS:
-        raw = (http_json(f"{srv.url}/api/taskState?name={quote(t)}") or {}).get("enabled")
-        ordered[t] = None if raw is None else bool(raw)
-    out["tasks"] = ordered
+    out["tasks"] = fetch_task_states(srv)
 
     # --- Fix-счётчик ---
     lg = http_json(f"{srv.url}/api/logstatus") or {}
@@ -367,19 +399,37 @@ def check_alerts(prev: Dict[str, Any] | None, cur: Dict[str, Any]) -> None:
         _alerted.pop(n, None)
 
 # ========== Главный цикл ==========
+def _store(name: str, cur: Dict[str, Any]) -> None:
+    with _lock:
+        check_alerts(_cache.get(name), cur)
+        _cache[name] = cur
+
 def collect_all() -> None:
-    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(CFG.servers))) as ex:
-        fut = {ex.submit(collect_one, s): s.name for s in CFG.servers}
+    servers = list(CFG.servers)
+    if not servers:
+        return
+    # доступность — одним параллельным набором TCP-проб; down-серверы не ждём
+    reach = PROBER.check_all({s.name: probe_target(s) for s in servers})
+    PROBER.retain(reach)
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(servers))) as ex:
+        fut = {ex.submit(collect_one, s, reach[s.name]): s.name for s in servers}
         for f in as_completed(fut):
             name = fut[f]
             try:
-                cur = f.result()
-                with _lock:
-                    check_alerts(_cache.get(name), cur)
-                    _cache[name] = cur
+                _store(name, f.result())
             except Exception as e:
                 LOG.error("collect %s: %s", name, e)
 
+def collect_recovered(name: str) -> None:
+    """Сервер ответил на фоновой пробе — обновляем его, не дожидаясь тика."""
+    srv = next((s for s in CFG.servers if s.name == name), None)
+    if srv is None:
+        return
+    LOG.info("сервер %s снова доступен", name)
+    threading.Thread(target=lambda: _store(name, collect_one(srv, True)), daemon=True).start()
+
+PROBER = ReachabilityProber(on_recover=collect_recovered)
+
 def loop() -> None:
     while True:
         collect_all()
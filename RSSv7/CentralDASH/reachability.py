@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# ░░░  reachability.py  ░░░
+"""
+Проверка доступности серверов CentralDASH без запуска ping.
+
+— Вместо system ping на каждый сервер — TCP connect к порту API (из url),
+  все пробы тика идут параллельно в одном пуле потоков с коротким таймаутом:
+  никаких порождений процессов, тик ждёт не дольше одного таймаута.
+— У каждого сервера своё состояние: up → suspect (одна неудача) → down
+  (CDASH_PROBE_DOWN_AFTER неудач подряд) и история RTT последних проб.
+— Сервер в состоянии down в тике не проверяется: тик сразу считает его
+  недоступным, а фоновый поток перепроверяет его с растущей паузой
+  (CDASH_PROBE_RETRY … CDASH_PROBE_RETRY_MAX). Когда сервер ответил,
+  вызывается on_recover — дашборд собирает его метрики, не дожидаясь тика.
+"""
+
+from __future__ import annotations
+
+import os
+import socket
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+PROBE_TIMEOUT   = float(os.getenv("CDASH_PROBE_TIMEOUT", 0.8))
+PROBE_WORKERS   = int(os.getenv("CDASH_PROBE_WORKERS", 64))
+DOWN_AFTER      = int(os.getenv("CDASH_PROBE_DOWN_AFTER", 2))
+RETRY_BASE      = float(os.getenv("CDASH_PROBE_RETRY", 30))
+RETRY_MAX       = float(os.getenv("CDASH_PROBE_RETRY_MAX", 600))
+RTT_HISTORY     = int(os.getenv("CDASH_PROBE_HISTORY", 20))
+
+UP, SUSPECT, DOWN = "up", "suspect", "down"
+
+Target = Tuple[str, int]
+
+
+def probe_tcp(host: str, port: int, timeout: float = PROBE_TIMEOUT) -> Optional[float]:
+    """RTT установки TCP-соединения в мс или None, если порт не ответил."""
+    t0 = time.perf_counter()
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return (time.perf_counter() - t0) * 1000
+    except OSError:
+        return None
+
+
+@dataclass
+class HostHealth:
+    target: Target
+    state: str = UP
+    fails: int = 0
+    rtt: Deque[float] = field(default_factory=lambda: deque(maxlen=RTT_HISTORY))
+    checked: float = 0.0          # monotonic последней пробы
+    next_probe: float = 0.0       # monotonic следующей фоновой пробы (для down)
+    retry: float = RETRY_BASE
+    probing: bool = False         # фоновая проба уже в пуле
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "state": self.state,
+            "fails": self.fails,
+            "rtt_ms": round(self.rtt[-1], 1) if self.rtt else None,
+            "rtt_avg_ms": round(statistics.fmean(self.rtt), 1) if self.rtt else None,
+        }
+
+
+class ReachabilityProber:
+    """Параллельные TCP-пробы с состоянием здоровья и фоновой перепроверкой down."""
+
+    def __init__(self,
+                 probe: Callable[[str, int, float], Optional[float]] = probe_tcp,
+                 timeout: float = PROBE_TIMEOUT,
+                 workers: int = PROBE_WORKERS,
+                 down_after: int = DOWN_AFTER,
+                 retry_base: float = RETRY_BASE,
+                 retry_max: float = RETRY_MAX,
+                 on_recover: Optional[Callable[[str], None]] = None):
+        self._probe = probe
+        self.timeout = timeout
+        self.down_after = max(1, down_after)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.on_recover = on_recover
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="probe")
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, HostHealth] = {}
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- состояние ----------
+    def _host(self, name: str, target: Target) -> HostHealth:
+        h = self._hosts.get(name)
+        if h is None or h.target != target:       # новый сервер или сменился адрес
+            h = self._hosts[name] = HostHealth(target)
+        return h
+
+    def _record(self, name: str, h: HostHealth, rtt: Optional[float]) -> bool:
+        """Переход состояния по результату пробы; True — сервер вернулся из down."""
+        now = time.monotonic()
+        with self._lock:
+            if self._hosts.get(name) is not h:     # сервер убрали из конфига
+                return False
+            h.checked = now
+            h.probing = False
+            if rtt is not None:
+                recovered = h.state == DOWN
+                h.state, h.fails, h.retry = UP, 0, self.retry_base
+                h.rtt.append(rtt)
+                return recovered
+            h.fails += 1
+            if h.state == DOWN:
+                h.retry = min(h.retry * 2, self.retry_max)
+            elif h.fails >= self.down_after:
+                h.state, h.retry = DOWN, self.retry_base
+            else:
+                h.state = SUSPECT
+            if h.state == DOWN:
+                h.next_probe = now + h.retry
+                self._wake.set()
+            return False
+
+    def _run_probe(self, name: str, h: HostHealth) -> bool:
+        host, port = h.target
+        rtt = self._probe(host, port, self.timeout)
+        if self._record(name, h, rtt) and self.on_recover:
+            try:
+                self.on_recover(name)
+            except Exception:
+                pass
+        return rtt is not None
+
+    # ---------- тик ----------
+    def check_all(self, targets: Dict[str, Target]) -> Dict[str, bool]:
+        """Доступность серверов для тика: up/suspect пробуются параллельно, down — нет."""
+        inline = {}
+        result: Dict[str, bool] = {}
+        with self._lock:
+            for name, target in targets.items():
+                h = self._host(name, target)
+                if h.state == DOWN:
+                    result[name] = False
+                else:
+                    inline[name] = h
+        futures = {name: self._pool.submit(self._run_probe, name, h) for name, h in inline.items()}
+        for name, fut in futures.items():
+            result[name] = fut.result()
+        if len(result) > len(inline):
+            self._ensure_background()
+        return result
+
+    def retain(self, names) -> None:
+        """Забывает серверы, которых больше нет в конфиге."""
+        keep = set(names)
+        with self._lock:
+            for name in [n for n in self._hosts if n not in keep]:
+                del self._hosts[name]
+
+    def state(self, name: str) -> Optional[Dict[str, object]]:
+        with self._lock:
+            h = self._hosts.get(name)
+            return h.as_dict() if h else None
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            return {name: h.as_dict() for name, h in self._hosts.items()}
+
+    # ---------- фоновая перепроверка down ----------
+    def _ensure_background(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._background, name="probe-down", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _background(self) -> None:
+        while True:
+            now = time.monotonic()
+            wait = self.retry_max
+            with self._lock:
+                for name, h in self._hosts.items():
+                    if h.state != DOWN or h.probing:
+                        continue
+                    if h.next_probe <= now:
+                        h.probing = True
+                        self._pool.submit(self._run_probe, name, h)
+                    else:
+                        wait = min(wait, h.next_probe - now)
+                self._wake.clear()
+            self._wake.wait(wait)
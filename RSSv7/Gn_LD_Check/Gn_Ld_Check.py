@@ -23,10 +23,9 @@ import time
 import ctypes
 import asyncio
 import sqlite3
-import re
 from dataclasses import dataclass, field
 from typing import List, Optional, Tuple
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
 
 # telegram v20+
 from telegram import Bot
@@ -35,6 +34,8 @@ from telegram.error import (
 )
 from telegram.request import HTTPXRequest  # для настраиваемых таймаутов/пула
 
+from log_scanner import LogMatcher, scan_range
+
 # Общая загрузка /.env из корня репозитория (без перезаписи системных env).
 def _load_root_env() -> None:
     from pathlib import Path
@@ -451,54 +452,19 @@ def db_set_kv(con: sqlite3.Connection, key: str, value: str) -> None:
 def now_ts() -> float:
     return time.time()
 
-# ------------------------------ Log parsing utils ---------------------------
-TIMESTAMP_PREFIX_RE = re.compile(
-    r"^\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}\.\d+\s+\+\d{2}:\d{2}\s+\[[A-Z]+\]\s+"
-)
-TS_PARSE_RE = re.compile(
-    r"^(?P<y>\d{4})-(?P<m>\d{2})-(?P<d>\d{2})\s+"
-    r"(?P<h>\d{2}):(?P<mi>\d{2}):(?P<s>\d{2})\.(?P<ms>\d+)\s+\+"
-    r"(?P<tz_h>\d{2}):(?P<tz_m>\d{2})"
-)
-
-def parse_line_timestamp_epoch(line: str) -> Optional[float]:
-    m = TS_PARSE_RE.match(line)
-    if not m:
-        return None
-    try:
-        y = int(m.group("y")); mo = int(m.group("m")); d = int(m.group("d"))
-        h = int(m.group("h")); mi = int(m.group("mi")); s = int(m.group("s"))
-        ms = int(m.group("ms"))
-        tz_h = int(m.group("tz_h")); tz_m = int(m.group("tz_m"))
-        tz = timezone(timedelta(hours=tz_h, minutes=tz_m))
-        dt = datetime(y, mo, d, h, mi, s, ms*1000, tzinfo=tz)
-        return dt.timestamp()
-    except Exception:
-        return None
-
-def normalize_line(line: str) -> str:
-    return TIMESTAMP_PREFIX_RE.sub("", line).strip()
-
-def compile_regex_list(patterns: List[str]) -> List[re.Pattern]:
-    out: List[re.Pattern] = []
-    for p in patterns:
-        try:
-            out.append(re.compile(p, flags=re.IGNORECASE))
-        except re.error as e:
-            print(f"[WARN] Некорректный регэксп '{p}': {e}")
-    return out
-
 # ------------------------------ Incremental scan ----------------------------
 def scan_logs_incremental(cfg: Settings, con: sqlite3.Connection) -> Tuple[Optional[float], dict]:
     """
     Возвращает (max_last_live_ts, details).
     details[filepath] = {
         'last_live_min_ago', 'last_idle_min_ago', 'last_activity_min_ago',
-        'read_bytes', 'read_from', 'init_read', 'size', 'mtime_min_ago'
+        'read_bytes', 'read_from', 'init_read', 'size', 'mtime_min_ago', 'backward'
     }
+    Новые байты просматривает log_scanner.scan_range (буферами, одним общим
+    регэкспом; большой кусок — от конца файла назад). log_state читается одним
+    SELECT и пишется одной транзакцией на цикл.
     """
-    live_re = compile_regex_list(cfg.live_patterns)
-    idle_re = compile_regex_list(cfg.idle_patterns)
+    matcher = LogMatcher(cfg.live_patterns, cfg.idle_patterns)
 
     masks = build_log_patterns(cfg)
     files = _expand_masks(masks)
@@ -509,6 +475,15 @@ def scan_logs_incremental(cfg: Settings, con: sqlite3.Connection) -> Tuple[Optio
     cur_ts = now_ts()
     max_live_ts: Optional[float] = None
 
+    state = {
+        row[0]: row[1:] for row in con.execute(
+            "SELECT file_path, last_seen_mtime, last_seen_size, last_offset, last_activity_ts, "
+            "last_live_ts, last_idle_ts FROM log_state;"
+        )
+    }
+    failed_rows: list = []
+    scanned_rows: list = []
+
     for path in files:
         try:
             st = os.stat(path)
@@ -518,10 +493,7 @@ def scan_logs_incremental(cfg: Settings, con: sqlite3.Connection) -> Tuple[Optio
             details[path] = {"error": f"stat_failed: {e}"}
             continue
 
-        row = con.execute(
-            "SELECT last_seen_mtime, last_seen_size, last_offset, last_activity_ts, last_live_ts, last_idle_ts "
-            "FROM log_state WHERE file_path = ?;", (path,)
-        ).fetchone()
+        row = state.get(path)
 
         if row is None:
             read_from = max(0, size - cfg.tail_init_bytes)
@@ -529,8 +501,6 @@ def scan_logs_incremental(cfg: Settings, con: sqlite3.Connection) -> Tuple[Optio
             prev_activity_ts = 0.0
             prev_live_ts = 0.0
             prev_idle_ts = 0.0
-            last_seen_mtime_old = 0.0
-            last_offset_old = 0
         else:
             last_seen_mtime_old, last_seen_size_old, last_offset_old, prev_activity_ts, prev_live_ts, prev_idle_ts = row
             rotated_or_truncated = size < int(last_offset_old) or mtime < float(last_seen_mtime_old)
@@ -538,43 +508,20 @@ def scan_logs_incremental(cfg: Settings, con: sqlite3.Connection) -> Tuple[Optio
             init_read = rotated_or_truncated
 
         new_bytes = 0
+        read_bytes = 0
+        backward = False
         live_ts_candidate: Optional[float] = None
         idle_ts_candidate: Optional[float] = None
 
         if size > read_from:
             try:
-                with open(path, "rb") as f:
-                    f.seek(read_from, os.SEEK_SET)
-                    chunk = f.read(size - read_from)
-                    new_bytes = len(chunk)
-
-                text = chunk.decode("utf-8", errors="ignore")
-                for raw_line in text.splitlines():
-                    if not raw_line.strip():
-                        continue
-                    line_ts = parse_line_timestamp_epoch(raw_line) or cur_ts
-                    body = normalize_line(raw_line)
-
-                    if any(r.search(body) for r in live_re):
-                        if (live_ts_candidate is None) or (line_ts > live_ts_candidate):
-                            live_ts_candidate = line_ts
-                        continue
-                    if any(r.search(body) for r in idle_re):
-                        if (idle_ts_candidate is None) or (line_ts > idle_ts_candidate):
-                            idle_ts_candidate = line_ts
-                        continue
+                res = scan_range(path, read_from, size, matcher, cur_ts)
+                live_ts_candidate, idle_ts_candidate = res.live_ts, res.idle_ts
+                read_bytes, backward = res.bytes_read, res.backward
+                new_bytes = size - read_from
             except Exception as e:
                 details[path] = {"error": f"read_failed: {e}"}
-                con.execute(
-                    "INSERT INTO log_state(file_path,last_seen_mtime,last_seen_size,last_offset,"
-                    " last_activity_ts,last_update_ts,last_live_ts,last_idle_ts) "
-                    "VALUES(?,?,?,?,?,?,?,?) "
-                    "ON CONFLICT(file_path) DO UPDATE SET "
-                    "last_seen_mtime=excluded.last_seen_mtime, "
-                    "last_seen_size=excluded.last_seen_size, "
-                    "last_update_ts=excluded.last_update_ts;",
-                    (path, mtime, size, read_from, prev_activity_ts, cur_ts, prev_live_ts, prev_idle_ts)
-                )
+                failed_rows.append((path, mtime, size, read_from, prev_activity_ts, cur_ts, prev_live_ts, prev_idle_ts))
                 continue
 
         activity_ts = prev_activity_ts
@@ -584,7 +531,36 @@ def scan_logs_incremental(cfg: Settings, con: sqlite3.Connection) -> Tuple[Optio
         new_live_ts = max(prev_live_ts, live_ts_candidate or 0.0)
         new_idle_ts = max(prev_idle_ts, idle_ts_candidate or 0.0)
 
-        con.execute(
+        scanned_rows.append((path, mtime, size, size, activity_ts, cur_ts, new_live_ts, new_idle_ts))
+
+        details[path] = {
+            "size": size,
+            "mtime_min_ago": (cur_ts - mtime) / 60.0,
+            "read_from": read_from,
+            "read_bytes": read_bytes,
+            "backward": backward,
+            "init_read": init_read,
+            "last_activity_min_ago": (cur_ts - activity_ts) / 60.0,
+            "last_live_min_ago": (cur_ts - new_live_ts) / 60.0 if new_live_ts > 0 else None,
+            "last_idle_min_ago": (cur_ts - new_idle_ts) / 60.0 if new_idle_ts > 0 else None
+        }
+
+        if new_live_ts > 0 and ((max_live_ts is None) or (new_live_ts > max_live_ts)):
+            max_live_ts = new_live_ts
+
+    con.execute("BEGIN;")
+    try:
+        con.executemany(
+            "INSERT INTO log_state(file_path,last_seen_mtime,last_seen_size,last_offset,"
+            " last_activity_ts,last_update_ts,last_live_ts,last_idle_ts) "
+            "VALUES(?,?,?,?,?,?,?,?) "
+            "ON CONFLICT(file_path) DO UPDATE SET "
+            "last_seen_mtime=excluded.last_seen_mtime, "
+            "last_seen_size=excluded.last_seen_size, "
+            "last_update_ts=excluded.last_update_ts;",
+            failed_rows
+        )
+        con.executemany(
             "INSERT INTO log_state(file_path,last_seen_mtime,last_seen_size,last_offset,"
             " last_activity_ts,last_update_ts,last_live_ts,last_idle_ts) "
             "VALUES(?,?,?,?,?,?,?,?) "
@@ -598,22 +574,12 @@ def scan_logs_incremental(cfg: Settings, con: sqlite3.Connection) -> Tuple[Optio
             "                  THEN excluded.last_live_ts ELSE log_state.last_live_ts END, "
             "last_idle_ts=CASE WHEN excluded.last_idle_ts > log_state.last_idle_ts "
             "                  THEN excluded.last_idle_ts ELSE log_state.last_idle_ts END;",
-            (path, mtime, size, size, activity_ts, cur_ts, new_live_ts, new_idle_ts)
+            scanned_rows
         )
-
-        details[path] = {
-            "size": size,
-            "mtime_min_ago": (cur_ts - mtime) / 60.0,
-            "read_from": read_from,
-            "read_bytes": new_bytes,
-            "init_read": init_read,
-            "last_activity_min_ago": (cur_ts - activity_ts) / 60.0,
-            "last_live_min_ago": (cur_ts - new_live_ts) / 60.0 if new_live_ts > 0 else None,
-            "last_idle_min_ago": (cur_ts - new_idle_ts) / 60.0 if new_idle_ts > 0 else None
-        }
-
-        if new_live_ts > 0 and ((max_live_ts is None) or (new_live_ts > max_live_ts)):
-            max_live_ts = new_live_ts
+        con.execute("COMMIT;")
+    except Exception:
+        con.execute("ROLLBACK;")
+        raise
 
     return max_live_ts, details
 
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# ░░░  log_scanner.py  ░░░
+"""
+Потоковый поиск живой/«шумной» активности в логах GnBots для Gn_Ld_Check.
+
+— Новый кусок лога читается буферами по GN_SCAN_BUFFER байт (по границе
+  строки), а не целиком; буфер декодируется один раз.
+— live_patterns и idle_patterns собраны в один скомпилированный регэксп:
+  он пробегает буфер в C и останавливается только на строках-кандидатах,
+  остальные строки в Python не попадают. Кандидат проверяется как раньше —
+  по телу строки без префикса времени, сначала live, потом idle.
+— Если кусок больше GN_SCAN_BACKWARD_MIN байт (первый запуск после простоя,
+  догон после ротации), буферы идут от конца файла назад и чтение
+  останавливается, как только найдены последние live и idle: строки GnBots
+  пишутся по возрастанию времени, поэтому более ранние буферы их не перебьют.
+— Метка времени строки разбирается один раз на секунду лога (кеш по
+  «дата-время-пояс»), миллисекунды добавляются арифметикой.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional
+
+BUF_SIZE = int(os.getenv("GN_SCAN_BUFFER", 1 << 20))
+BACKWARD_MIN = int(os.getenv("GN_SCAN_BACKWARD_MIN", 4 << 20))
+
+# ------------------------------ Log parsing utils ---------------------------
+TIMESTAMP_PREFIX_RE = re.compile(
+    r"^\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}\.\d+\s+\+\d{2}:\d{2}\s+\[[A-Z]+\]\s+"
+)
+TS_PARSE_RE = re.compile(
+    r"^(?P<y>\d{4})-(?P<m>\d{2})-(?P<d>\d{2})\s+"
+    r"(?P<h>\d{2}):(?P<mi>\d{2}):(?P<s>\d{2})\.(?P<ms>\d+)\s+\+"
+    r"(?P<tz_h>\d{2}):(?P<tz_m>\d{2})"
+)
+
+def parse_line_timestamp_epoch(line: str) -> Optional[float]:
+    m = TS_PARSE_RE.match(line)
+    if not m:
+        return None
+    try:
+        y = int(m.group("y")); mo = int(m.group("m")); d = int(m.group("d"))
+        h = int(m.group("h")); mi = int(m.group("mi")); s = int(m.group("s"))
+        ms = int(m.group("ms"))
+        tz_h = int(m.group("tz_h")); tz_m = int(m.group("tz_m"))
+        tz = timezone(timedelta(hours=tz_h, minutes=tz_m))
+        dt = datetime(y, mo, d, h, mi, s, ms*1000, tzinfo=tz)
+        return dt.timestamp()
+    except Exception:
+        return None
+
+def normalize_line(line: str) -> str:
+    return TIMESTAMP_PREFIX_RE.sub("", line).strip()
+
+def compile_regex_list(patterns: List[str]) -> List[re.Pattern]:
+    out: List[re.Pattern] = []
+    for p in patterns:
+        try:
+            out.append(re.compile(p, flags=re.IGNORECASE))
+        except re.error as e:
+            print(f"[WARN] Некорректный регэксп '{p}': {e}")
+    return out
+
+class _TimestampCache:
+    """parse_line_timestamp_epoch с разбором datetime один раз на секунду лога."""
+
+    def __init__(self):
+        self._base: Dict[tuple, Optional[float]] = {}
+
+    def __call__(self, line: str) -> Optional[float]:
+        m = TS_PARSE_RE.match(line)
+        if not m:
+            return None
+        key = m.group("y", "m", "d", "h", "mi", "s", "tz_h", "tz_m")
+        base = self._base.get(key, -1.0)
+        if base == -1.0:
+            if len(self._base) > 100_000:
+                self._base.clear()
+            base = parse_line_timestamp_epoch(line[:m.start("ms")] + "0" + line[m.end("ms"):m.end()])
+            self._base[key] = base
+        if base is None:
+            return None
+        micro = int(m.group("ms")) * 1000
+        if micro >= 1_000_000:          # как datetime(): больше 3 цифр долей — метки нет
+            return None
+        return base + micro / 1_000_000
+
+# ------------------------------ Matcher -------------------------------------
+try:
+    from re import _parser as _sre      # Python 3.11+
+except ImportError:                     # pragma: no cover
+    import sre_parse as _sre            # type: ignore
+
+MIN_LITERAL = 3
+# символы, которые IGNORECASE сопоставляет с ASCII-буквами (İ ı ſ K): в таком
+# буфере поиск по lower() может промахнуться — проверяем его построчно
+_FOLD_EXOTIC = re.compile("[\u0130\u0131\u017f\u212a]")
+# конструкции, при которых совпадение по сырой строке может не совпасть с
+# совпадением по телу (без префикса времени и пробелов по краям)
+_PREFILTER_UNSAFE = re.compile(r"\^|\$|\\[AZB]|\(\?<?[=!]|\\[1-9]|\(\?P=|\(\?[aiLmsux-]+\)")
+_REPEATS = tuple(op for op in (getattr(_sre, n, None) for n in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT"))
+                 if op is not None)
+
+
+def _literal_score(lits: set) -> tuple:
+    return min(len(x) for x in lits), -len(lits)
+
+
+def _required(items) -> Optional[set]:
+    """Набор строк (lower), одна из которых обязательно входит в любое совпадение."""
+    best: Optional[set] = None
+    run: List[str] = []
+
+    def consider(cand: Optional[set]) -> None:
+        nonlocal best
+        if cand and (best is None or _literal_score(cand) > _literal_score(best)):
+            best = cand
+
+    def flush() -> None:
+        if run:
+            consider({"".join(run)})
+            run.clear()
+
+    for op, av in items:
+        if op == _sre.LITERAL and av < 128:
+            run.append(chr(av).lower())
+            continue
+        flush()
+        if op == _sre.SUBPATTERN:
+            consider(_required(list(av[-1])))
+        elif op == _sre.BRANCH:
+            alts = [_required(list(b)) for b in av[1]]
+            if all(alts):
+                consider(set().union(*alts))
+        elif op in _REPEATS and av[0] >= 1:
+            consider(_required(list(av[2])))
+        elif op == getattr(_sre, "ATOMIC_GROUP", None):
+            consider(_required(list(av)))
+    flush()
+    return best
+
+
+def required_literals(pattern: str) -> Optional[frozenset]:
+    """Обязательные подстроки регэкспа (без учёта регистра) или None, если их нет."""
+    try:
+        found = _required(list(_sre.parse(pattern, re.IGNORECASE)))
+    except Exception:
+        return None
+    if not found or min(len(x) for x in found) < MIN_LITERAL:
+        return None
+    return frozenset(found)
+
+
+class _AnyOf:
+    """search(text) — совпал ли хоть один регэксп; одним шаблоном, если это возможно."""
+
+    def __init__(self, patterns: List[str]):
+        compiled = compile_regex_list(patterns)
+        self.sources = [r.pattern for r in compiled]
+        self.combined: Optional[re.Pattern] = None
+        self._each = compiled
+        if compiled and not any(re.search(r"\\[1-9]|\(\?P=", p) for p in self.sources):
+            try:
+                self.combined = re.compile("|".join(f"(?:{p})" for p in self.sources), re.IGNORECASE)
+            except re.error:        # например, глобальные флаги (?i) не в начале
+                self.combined = None
+
+    def search(self, text: str) -> bool:
+        if self.combined is not None:
+            return self.combined.search(text) is not None
+        return any(r.search(text) for r in self._each)
+
+
+class _Prefilter:
+    """Начала строк, где может быть совпадение: поиск подстрок + регэкспы без подстрок."""
+
+    def __init__(self, sources: List[str]):
+        self.literals: List[str] = []
+        self.regexes: List[re.Pattern] = []
+        self.ok = bool(sources)
+        for p in sources:
+            lits = required_literals(p)
+            if lits:
+                self.literals.extend(sorted(lits))
+            elif _PREFILTER_UNSAFE.search(p):
+                self.ok = False
+            else:
+                self.regexes.append(re.compile(p, re.IGNORECASE))
+
+    def line_starts(self, text: str) -> Optional[List[int]]:
+        """Отсортированные начала строк-кандидатов; None — буфер нужно пройти построчно."""
+        if not self.ok:
+            return None
+        starts = set()
+        if self.literals:
+            low = text.lower()
+            if len(low) != len(text) or _FOLD_EXOTIC.search(text):
+                return None
+            for lit in self.literals:
+                i = low.find(lit)
+                while i >= 0:
+                    starts.add(low.rfind("\n", 0, i) + 1)
+                    eol = low.find("\n", i)
+                    if eol < 0:
+                        break
+                    i = low.find(lit, eol + 1)
+        for rx in self.regexes:
+            pos, n = 0, len(text)
+            while pos < n:
+                m = rx.search(text, pos)
+                if m is None:
+                    break
+                starts.add(text.rfind("\n", 0, m.start()) + 1)
+                eol = text.find("\n", m.start())
+                pos = n if eol < 0 else eol + 1
+        return sorted(starts)
+
+
+class LogMatcher:
+    """Классификация строки live/idle (как прежний цикл) и общий префильтр строк."""
+
+    def __init__(self, live_patterns: List[str], idle_patterns: List[str]):
+        self.live = _AnyOf(live_patterns)
+        self.idle = _AnyOf(idle_patterns)
+        self.prefilter = _Prefilter(self.live.sources + self.idle.sources)
+        self.empty = not (self.live.sources or self.idle.sources)
+
+    def classify(self, line: str) -> Optional[str]:
+        if not line.strip():
+            return None
+        body = normalize_line(line)
+        if self.live.search(body):
+            return "live"
+        if self.idle.search(body):
+            return "idle"
+        return None
+
+
+class ScanResult(NamedTuple):
+    live_ts: Optional[float]
+    idle_ts: Optional[float]
+    bytes_read: int
+    backward: bool
+
+
+def _scan_text(text: str, matcher: LogMatcher, cur_ts: float, ts_of: _TimestampCache,
+               best: Dict[str, Optional[float]]) -> None:
+    """Максимальные метки live/idle по строкам text (best обновляется на месте)."""
+    def hit(line: str) -> None:
+        kind = matcher.classify(line)
+        if kind is None:
+            return
+        line_ts = ts_of(line) or cur_ts
+        if best[kind] is None or line_ts > best[kind]:
+            best[kind] = line_ts
+
+    starts = matcher.prefilter.line_starts(text)
+    if starts is None:
+        for line in text.split("\n"):
+            hit(line)
+        return
+    n = len(text)
+    for start in starts:
+        end = text.find("\n", start)
+        hit(text[start:n if end < 0 else end])
+
+
+def scan_range(path: str, start: int, end: int, matcher: LogMatcher, cur_ts: float,
+               buf_size: int = BUF_SIZE, backward_min: int = BACKWARD_MIN) -> ScanResult:
+    """Последние метки live/idle в байтах [start, end) файла."""
+    best: Dict[str, Optional[float]] = {"live": None, "idle": None}
+    if end <= start or matcher.empty:
+        return ScanResult(None, None, 0, False)
+    ts_of = _TimestampCache()
+    read = 0
+    backward = end - start > backward_min
+    with open(path, "rb") as f:
+        if not backward:
+            f.seek(start, os.SEEK_SET)
+            pos, carry = start, b""
+            while pos < end:
+                data = f.read(min(buf_size, end - pos))
+                if not data:
+                    break
+                pos += len(data)
+                read += len(data)
+                data = carry + data
+                if pos < end:
+                    cut = data.rfind(b"\n")
+                    if cut < 0:
+                        carry = data
+                        continue
+                    data, carry = data[:cut + 1], data[cut + 1:]
+                else:
+                    carry = b""
+                _scan_text(data.decode("utf-8", errors="ignore"), matcher, cur_ts, ts_of, best)
+            if carry:
+                _scan_text(carry.decode("utf-8", errors="ignore"), matcher, cur_ts, ts_of, best)
+        else:
+            hi, carry = end, b""
+            while hi > start and (best["live"] is None or best["idle"] is None):
+                lo = max(start, hi - buf_size)
+                f.seek(lo, os.SEEK_SET)
+                data = f.read(hi - lo)
+                read += len(data)
+                hi = lo
+                data = data + carry
+                if lo > start:
+                    cut = data.find(b"\n")
+                    if cut < 0:
+                        carry = data
+                        continue
+                    data, carry = data[cut + 1:], data[:cut]
+                else:
+                    carry = b""
+                _scan_text(data.decode("utf-8", errors="ignore"), matcher, cur_ts, ts_of, best)
+            if carry and (best["live"] is None or best["idle"] is None):
+                _scan_text(carry.decode("utf-8", errors="ignore"), matcher, cur_ts, ts_of, best)
+    return ScanResult(best["live"], best["idle"], read, backward)
@@ -1,17 +1,17 @@
 #!/usr/bin/env python3
 import os
-import re
 import json
 from datetime import datetime
 
+from igg_id_index import IggIdIndex
+
 # --- Параметры ---
 LOG_FOLDER       = r"C:\Program Files\GnBots\logs"            # основная папка с логами
 EXTRA_LOG_FOLDER = r"C:\Program Files\GnBots\logs"                        # если не нужна — оставьте "" или None
 PROFILE_FILE     = r"C:/Program Files/GnBots/profiles/FRESH_NOX.json"
 OUTPUT_FILE      = r"C:\LDPlayer\ldChecker\list_ids.json"
-
-# регулярка для поиска "|account_id| … List IDs: … : list_id"
-pattern = re.compile(r"\|([0-9a-f]{8,32})\|.*List IDs:.*:\s*(\d+)", re.IGNORECASE)
+# отметки разобранных логов и накопленные пары account_id → list_id; "" — без индекса, полный разбор
+INDEX_FILE       = os.getenv("IGG_INDEX_DB", os.path.join(os.path.dirname(OUTPUT_FILE), "igg_id_index.db"))
 
 def load_account_mapping(path: str) -> dict[str, str]:
     """Загружает из FRESH_NOX.json mapping account_id → nickname."""  
@@ -26,56 +26,47 @@ def load_account_mapping(path: str) -> dict[str, str]:
             mapping[str(acct_id).lower()] = str(name)
     return mapping  # :contentReference[oaicite:0]{index=0}&#8203;:contentReference[oaicite:1]{index=1}
 
-def scan_file(path: str, id2name: dict, seen: set, results: list):
-    """Сканирует один файл и дописывает найденные записи в results."""
-    try:
-        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-            for line in f:
-                if "List IDs" not in line:
-                    continue
-                m = pattern.search(line)
-                if not m:
-                    continue
-                acct_id = m.group(1).lower()
-                list_id = m.group(2)
-                key = (acct_id, list_id)
-                if key in seen:
-                    continue
-                seen.add(key)
-                results.append({
-                    "nickname":   id2name.get(acct_id, acct_id),
-                    "account_id": acct_id,
-                    "list_id":    list_id
-                })
-    except Exception as e:
-        print(f"Ошибка при чтении {path}: {e}")
-
-def main():
-    id2name    = load_account_mapping(PROFILE_FILE)
-    today_pref = "bot" + datetime.now().strftime("%Y%m%d")  # e.g. "bot20250420"
-
-    results = []
-    seen    = set()
-
-    # 1) Сканируем логи сегодняшнего дня в LOG_FOLDER
+def collect_log_paths(today_pref: str) -> list[str]:
+    """Логи сегодняшнего дня из LOG_FOLDER и все .txt из EXTRA_LOG_FOLDER (без повторов)."""
+    paths = []
+    # 1) Логи сегодняшнего дня в LOG_FOLDER
     for root, _, files in os.walk(LOG_FOLDER):
         for fname in files:
             if not fname.startswith(today_pref) or not fname.lower().endswith(".txt"):
                 continue
-            scan_file(os.path.join(root, fname), id2name, seen, results)
+            paths.append(os.path.join(root, fname))
 
-    # 2) Если указана EXTRA_LOG_FOLDER, сканируем там все .txt
+    # 2) Если указана EXTRA_LOG_FOLDER, берём там все .txt
     if EXTRA_LOG_FOLDER:
         extra_folder = os.path.abspath(EXTRA_LOG_FOLDER)
         if os.path.isdir(extra_folder):
             for root, _, files in os.walk(extra_folder):
                 for fname in files:
                     if fname.lower().endswith(".txt"):
-                        scan_file(os.path.join(root, fname), id2name, seen, results)
+                        paths.append(os.path.join(root, fname))
         else:
             print(f"Внимание: папка не найдена — {extra_folder}")
+    return list(dict.fromkeys(os.path.abspath(p) for p in paths))
+
+def main():
+    id2name    = load_account_mapping(PROFILE_FILE)
+    today_pref = "bot" + datetime.now().strftime("%Y%m%d")  # e.g. "bot20250420"
+
+    # разбираются только дописанные с прошлого запуска байты (см. igg_id_index.py)
+    index = IggIdIndex(INDEX_FILE or None)
+    try:
+        index.update(collect_log_paths(today_pref))
+        results = [
+            {"nickname": id2name.get(acct_id, acct_id), "account_id": acct_id, "list_id": list_id}
+            for acct_id, list_id in index.pairs()
+        ]
+    finally:
+        index.close()
+    st = index.stats
+    print(f"Логи: разобрано {st['files']}, без изменений {st['skipped']}, ротаций {st['reset']}, "
+          f"прочитано {st['bytes'] / 2**20:.1f} МБ")
 
-    # 3) Сохраняем результаты
+    # 3) Сохраняем результаты (все известные пары, ник — по текущему профилю)
     with open(OUTPUT_FILE, 'w', encoding='utf-8') as out:
         json.dump(results, out, ensure_ascii=False, indent=2)
 
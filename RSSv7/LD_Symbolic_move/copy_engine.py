@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+# ░░░  copy_engine.py  ░░░
+"""
+Копирование папки эмулятора (leidianN) для ld_emul_symbolic_fix.
+
+— Дерево обходится один раз (scandir): список файлов с размерами и mtime даёт
+  и общий объём для прогресса, и план копирования.
+— Большие файлы (data.vmdk и т.п.) копируются в вызывающем потоке: буфер
+  подбирается на лету (растёт, пока чанк пишется быстрее LDMOVE_CHUNK_FAST_MS,
+  и уменьшается на медленном диске). Без проверки хешем используется
+  copy_file_range/sendfile ОС, если они есть.
+— Мелкие файлы параллельно копирует пул из LDMOVE_WORKERS потоков
+  (очередь ограничена), пока идёт большой файл.
+— Проверка: хеш blake2b считается потоком при копировании и сверяется с
+  повторным чтением копии (LDMOVE_VERIFY=hash|size|none).
+— Журнал .ldmove.journal в папке назначения (создаётся раньше первого
+  скопированного байта): готовые файлы и отметки
+  прогресса больших файлов каждые LDMOVE_CHECKPOINT_MB. После прерывания
+  готовые файлы пропускаются, большой файл докачивается с отметки.
+  При успехе журнал удаляется.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+LDMOVE_WORKERS = int(os.getenv("LDMOVE_WORKERS", "8"))
+LDMOVE_SMALL_MAX = int(float(os.getenv("LDMOVE_SMALL_MAX_MB", "8")) * 1024 * 1024)
+LDMOVE_VERIFY = os.getenv("LDMOVE_VERIFY", "hash")
+LDMOVE_CHECKPOINT = int(float(os.getenv("LDMOVE_CHECKPOINT_MB", "256")) * 1024 * 1024)
+LDMOVE_CHUNK_FAST_MS = float(os.getenv("LDMOVE_CHUNK_FAST_MS", "15"))
+
+JOURNAL_NAME = ".ldmove.journal"
+MIN_CHUNK = 256 * 1024
+MAX_CHUNK = 32 * 1024 * 1024
+_SLOW_CHUNK_MS = 250.0
+
+
+class CopyError(Exception):
+    """Копия не совпала с источником или копирование прервано."""
+
+
+@dataclass
+class FileItem:
+    rel: str
+    size: int
+    mtime_ns: int
+
+
+@dataclass
+class CopyPlan:
+    files: List[FileItem]
+    dirs: List[str]
+    total: int
+
+
+@dataclass
+class CopyStats:
+    files: int = 0
+    bytes: int = 0
+    skipped_files: int = 0          # взяты из журнала прошлого запуска
+    skipped_bytes: int = 0
+    resumed_bytes: int = 0          # докачка большого файла с отметки
+    zero_copy_files: int = 0
+    verified: int = 0
+    elapsed: float = 0.0
+    chunks: Dict[int, int] = field(default_factory=dict)   # размер буфера → сколько раз
+
+
+def plan_tree(src: str) -> CopyPlan:
+    """Один обход: файлы (с размером/mtime) и все подпапки, включая пустые."""
+    files: List[FileItem] = []
+    dirs: List[str] = []
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        with os.scandir(os.path.join(src, rel_dir) if rel_dir else src) as it:
+            for entry in it:
+                rel = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(rel)
+                    stack.append(rel)
+                elif entry.is_file():
+                    st = entry.stat()
+                    files.append(FileItem(rel, st.st_size, st.st_mtime_ns))
+    return CopyPlan(files, dirs, sum(f.size for f in files))
+
+
+def _hash_file(path: str, upto: Optional[int] = None, chunk: int = 8 * 1024 * 1024):
+    h = hashlib.blake2b()
+    left = upto
+    chunk = max(64 * 1024, min(chunk, upto if upto is not None else os.path.getsize(path)))
+    buf = bytearray(chunk)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while left is None or left > 0:
+            n = f.readinto(view if left is None or left >= chunk else view[:left])
+            if not n:
+                break
+            h.update(view[:n])
+            if left is not None:
+                left -= n
+    return h
+
+
+class _AdaptiveChunk:
+    """Буфер растёт ×2, пока чанк идёт быстро, и уменьшается, если диск тормозит."""
+
+    def __init__(self, size_hint: int):
+        self.size = max(MIN_CHUNK, min(MAX_CHUNK, 1 << max(0, (size_hint // 64).bit_length() - 1)))
+
+    def feed(self, seconds: float) -> None:
+        ms = seconds * 1000
+        if ms < LDMOVE_CHUNK_FAST_MS and self.size < MAX_CHUNK:
+            self.size *= 2
+        elif ms > _SLOW_CHUNK_MS and self.size > MIN_CHUNK:
+            self.size //= 2
+
+
+# ─────────────────────────── Журнал ───────────────────────────
+class _Journal:
+    """Дописываемый построчно JSON-журнал; битая последняя строка (падение) игнорируется."""
+
+    def __init__(self, path: str, flush_every: float = 1.0):
+        self.path = path
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._fh = None
+        self._flushed = 0.0
+
+    def load(self) -> Tuple[Dict[str, dict], Dict[str, dict]]:
+        done: Dict[str, dict] = {}
+        partial: Dict[str, dict] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue
+                    if "f" in rec:
+                        done[rec["f"]] = rec
+                        partial.pop(rec["f"], None)
+                    elif "p" in rec:
+                        partial[rec["p"]] = rec
+        except OSError:
+            pass
+        return done, partial
+
+    def write(self, rec: dict, flush: bool = False) -> None:
+        # не сброшенные строки при падении просто теряются — эти файлы скопируются заново
+        line = json.dumps(rec, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._fh is None:
+                self._fh = open(self.path, "a", encoding="utf-8")
+            self._fh.write(line)
+            now = time.monotonic()
+            if flush or now - self._flushed >= self.flush_every:
+                self._fh.flush()
+                self._flushed = now
+
+    def close(self, remove: bool = False) -> None:
+        with self._lock:
+            if self._fh:
+                self._fh.close()
+                self._fh = None
+        if remove:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+# ─────────────────────────── Движок ───────────────────────────
+class CopyEngine:
+    """Копирует дерево src → dst. progress(done_bytes, total_bytes, rel) зовётся не чаще progress_interval."""
+
+    def __init__(
+        self,
+        workers: int = LDMOVE_WORKERS,
+        small_max: int = LDMOVE_SMALL_MAX,
+        verify: str = LDMOVE_VERIFY,
+        zero_copy: bool = True,
+        checkpoint: int = LDMOVE_CHECKPOINT,
+        progress: Optional[Callable[[int, int, str], None]] = None,
+        progress_interval: float = 0.2,
+    ):
+        if verify not in ("hash", "size", "none"):
+            raise ValueError(f"verify: hash|size|none, а не {verify!r}")
+        self.workers = max(1, workers)
+        self.small_max = small_max
+        self.verify = verify
+        self.zero_copy = zero_copy and verify != "hash" and (hasattr(os, "copy_file_range") or hasattr(os, "sendfile"))
+        self.checkpoint = checkpoint
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.stats = CopyStats()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._done = 0
+        self._total = 0
+        self._last_tick = 0.0
+        self._reported = 0
+        self._progress_lock = threading.Lock()
+
+    def cancel(self) -> None:
+        self._stop.set()
+
+    def _advance(self, n: int, rel: str, force: bool = False) -> None:
+        with self._lock:
+            self._done += n
+            now = time.monotonic()
+            if not (force or now - self._last_tick >= self.progress_interval):
+                return
+            self._last_tick = now
+            done = self._done
+        if self.progress:
+            # потоки могут прийти не по порядку — наружу отдаём только рост
+            with self._progress_lock:
+                if done < self._reported:
+                    return
+                self._reported = done
+                self.progress(done, self._total, rel)
+
+    def _check_stop(self) -> None:
+        if self._stop.is_set():
+            raise CopyError("копирование прервано")
+
+    def _verify(self, item: FileItem, dp: str, digest: Optional[str]) -> None:
+        size = os.path.getsize(dp)
+        if size != item.size:
+            raise CopyError(f"{item.rel}: размер копии {size} ≠ {item.size}")
+        if self.verify == "hash" and digest is not None:
+            if item.size <= self.small_max:
+                with open(dp, "rb") as f:
+                    copy_digest = hashlib.blake2b(f.read()).hexdigest()
+            else:
+                copy_digest = _hash_file(dp).hexdigest()
+            if copy_digest != digest:
+                raise CopyError(f"{item.rel}: хеш копии не совпал")
+        with self._lock:
+            self.stats.verified += 1
+
+    # ── мелкие файлы (пул) ──
+    def _copy_small(self, src: str, dst: str, item: FileItem, journal: _Journal) -> None:
+        self._check_stop()
+        sp, dp = os.path.join(src, item.rel), os.path.join(dst, item.rel)
+        with open(sp, "rb") as rf:
+            data = rf.read()
+        digest = hashlib.blake2b(data).hexdigest() if self.verify == "hash" else None
+        with open(dp, "wb") as wf:
+            wf.write(data)
+        if self.verify != "none":
+            self._verify(item, dp, digest)
+        journal.write({"f": item.rel, "size": item.size, "mtime": item.mtime_ns, "hash": digest})
+        with self._lock:
+            self.stats.files += 1
+            self.stats.bytes += len(data)
+        self._advance(len(data), item.rel)
+
+    # ── большие файлы (вызывающий поток) ──
+    def _copy_large(self, src: str, dst: str, item: FileItem, journal: _Journal, resume_at: int) -> None:
+        sp, dp = os.path.join(src, item.rel), os.path.join(dst, item.rel)
+        h = hashlib.blake2b() if self.verify == "hash" else None
+        offset = 0
+        if resume_at and os.path.exists(dp) and os.path.getsize(dp) >= resume_at:
+            # состояние хеша восстанавливается чтением уже скопированной части
+            if h is not None:
+                h = _hash_file(dp, upto=resume_at)
+            offset = resume_at
+            with self._lock:
+                self.stats.resumed_bytes += offset
+            self._advance(offset, item.rel)
+        mode = "r+b" if offset else "wb"
+        next_mark = offset + self.checkpoint
+        with open(sp, "rb", buffering=0) as rf, open(dp, mode, buffering=0) as wf:
+            rf.seek(offset)
+            wf.seek(offset)
+            if self.zero_copy:
+                with self._lock:
+                    self.stats.zero_copy_files += 1
+                while offset < item.size:
+                    self._check_stop()
+                    step = min(64 * 1024 * 1024, item.size - offset)
+                    if hasattr(os, "copy_file_range"):
+                        n = os.copy_file_range(rf.fileno(), wf.fileno(), step)
+                    else:
+                        n = os.sendfile(wf.fileno(), rf.fileno(), offset, step)
+                        rf.seek(offset + n)
+                    if n <= 0:
+                        break
+                    offset += n
+                    self._advance(n, item.rel)
+                    if offset >= next_mark:
+                        journal.write({"p": item.rel, "size": item.size, "mtime": item.mtime_ns, "off": offset}, flush=True)
+                        next_mark = offset + self.checkpoint
+            else:
+                chunk = _AdaptiveChunk(item.size)
+                buf = bytearray(MAX_CHUNK)
+                view = memoryview(buf)
+                while True:
+                    self._check_stop()
+                    t0 = time.perf_counter()
+                    n = rf.readinto(view[:chunk.size])
+                    if not n:
+                        break
+                    part = view[:n]
+                    if h is not None:
+                        h.update(part)
+                    written = 0
+                    while written < n:
+                        written += wf.write(part[written:])
+                    with self._lock:
+                        self.stats.chunks[chunk.size] = self.stats.chunks.get(chunk.size, 0) + 1
+                    chunk.feed(time.perf_counter() - t0)
+                    offset += n
+                    self._advance(n, item.rel)
+                    if offset >= next_mark:
+                        journal.write({"p": item.rel, "size": item.size, "mtime": item.mtime_ns, "off": offset}, flush=True)
+                        next_mark = offset + self.checkpoint
+            wf.truncate(offset)
+        digest = h.hexdigest() if h is not None else None
+        if self.verify != "none":
+            self._verify(item, dp, digest)
+        journal.write({"f": item.rel, "size": item.size, "mtime": item.mtime_ns, "hash": digest}, flush=True)
+        with self._lock:
+            self.stats.files += 1
+            self.stats.bytes += item.size
+
+    def copy_tree(self, src: str, dst: str, plan: Optional[CopyPlan] = None) -> CopyStats:
+        t0 = time.perf_counter()
+        plan = plan or plan_tree(src)
+        self._total = plan.total
+        os.makedirs(dst, exist_ok=True)
+        journal = _Journal(os.path.join(dst, JOURNAL_NAME))
+        done, partial = journal.load()
+        # журнал появляется до первого байта копии: dst без журнала вызывающий
+        # считает уже перенесённой папкой, даже если копирование сразу оборвалось
+        journal.write({"start": time.time(), "src": src}, flush=True)
+        for rel in plan.dirs:
+            os.makedirs(os.path.join(dst, rel), exist_ok=True)
+        todo: List[FileItem] = []
+        for item in plan.files:
+            rec = done.get(item.rel)
+            dp = os.path.join(dst, item.rel)
+            if (rec and rec.get("size") == item.size and rec.get("mtime") == item.mtime_ns
+                    and os.path.isfile(dp) and os.path.getsize(dp) == item.size):
+                self.stats.skipped_files += 1
+                self.stats.skipped_bytes += item.size
+                self._done += item.size
+                continue
+            todo.append(item)
+
+        small = [f for f in todo if f.size <= self.small_max]
+        large = sorted((f for f in todo if f.size > self.small_max), key=lambda f: -f.size)
+        ok = False
+        errors: List[BaseException] = []
+        # не больше workers×4 мелких файлов в очереди пула; подаёт их отдельный поток,
+        # чтобы вызывающий тем временем копировал большие
+        slots = threading.BoundedSemaphore(self.workers * 4)
+
+        def done_small(fut) -> None:
+            slots.release()
+            exc = fut.exception()
+            if exc is not None:
+                errors.append(exc)
+                self._stop.set()
+
+        def copy_large_all() -> None:
+            for item in large:
+                self._check_stop()
+                rec = partial.get(item.rel)
+                resume_at = rec["off"] if rec and rec.get("size") == item.size and \
+                    rec.get("mtime") == item.mtime_ns else 0
+                self._copy_large(src, dst, item, journal, resume_at)
+
+        def copy_pooled() -> None:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ldmove") as pool:
+                def feed() -> None:
+                    for item in small:
+                        slots.acquire()
+                        if self._stop.is_set():
+                            slots.release()
+                            return
+                        pool.submit(self._copy_small, src, dst, item, journal).add_done_callback(done_small)
+
+                feeder = threading.Thread(target=feed, daemon=True, name="ldmove-feed")
+                feeder.start()
+                try:
+                    copy_large_all()
+                    while feeder.is_alive():
+                        feeder.join(self.progress_interval)
+                        self._advance(0, "")
+                finally:
+                    if feeder.is_alive():
+                        self._stop.set()
+                        feeder.join()
+
+        try:
+            if self.workers > 1:
+                copy_pooled()
+            else:
+                # на одном потоке очередь и колбэки пула только добавляют накладные расходы
+                copy_large_all()
+                for item in small:
+                    self._copy_small(src, dst, item, journal)
+            if errors:
+                raise errors[0]
+            self._check_stop()
+            ok = True
+        except BaseException:
+            self._stop.set()
+            raise
+        finally:
+            journal.close(remove=ok)
+            self.stats.elapsed = time.perf_counter() - t0
+        self._advance(0, "", force=True)
+        return self.stats
+
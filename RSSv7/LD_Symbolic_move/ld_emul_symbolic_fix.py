@@ -8,6 +8,8 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog
 from typing import List, Dict, Optional
 
+from copy_engine import JOURNAL_NAME, CopyEngine, CopyError
+
 # ---------- DEFAULT PATHS (editable via GUI) ----------
 LD_PATH  = r"C:\LDPlayer\LDPlayer9"
 SRC_ROOT = r"E:\vmss"
@@ -15,8 +17,6 @@ CFG_ROOT = r"E:\vmss\config"
 DST_ROOT = os.path.join(LD_PATH, "vms")
 # ------------------------------------------------------
 
-CHUNK = 2 * 1024 * 1024  # 2 MB
-
 class App(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -207,8 +207,8 @@ class App(tk.Tk):
         dst = os.path.join(DST_ROOT, folder)
         idx = int(folder[7:])
 
-        # already linked?
-        if os.path.lexists(dst):
+        # already linked? (папка с журналом — недокопированная, её продолжаем)
+        if os.path.lexists(dst) and not os.path.exists(os.path.join(dst, JOURNAL_NAME)):
             self._after_linked(skip=True)
             return
 
@@ -216,27 +216,19 @@ class App(tk.Tk):
         self.log_msg(f"=== START {inst['name']} (id {idx}) ===")
 
         # -------- перемещение с прогрессом ----------
-        total = sum(os.path.getsize(os.path.join(r, f))
-                    for r, _, fs in os.walk(src) for f in fs)
-        transferred = 0
-        os.makedirs(dst, exist_ok=True)
+        # один обход, мелкие файлы пулом, большие — адаптивным буфером;
+        # журнал в dst позволяет продолжить после обрыва (см. copy_engine.py)
         self.progress_set(0)
-
-        for root, _, files in os.walk(src):
-            for f in files:
-                sp = os.path.join(root, f)
-                rp = os.path.relpath(sp, src)
-                dp = os.path.join(dst, rp)
-                os.makedirs(os.path.dirname(dp), exist_ok=True)
-
-                with open(sp, "rb") as rf, open(dp, "wb") as wf:
-                    while True:
-                        buf = rf.read(CHUNK)
-                        if not buf:
-                            break
-                        wf.write(buf)
-                        transferred += len(buf)
-                        self.progress_set(transferred / total * 100)
+        engine = CopyEngine(progress=lambda done, total, _rel:
+                            self.progress_set(done / total * 100 if total else 100))
+        try:
+            st = engine.copy_tree(src, dst)
+        except (CopyError, OSError) as e:
+            self.log_msg(f"[copy] {folder}: {e} — исходник не тронут, повторный Start продолжит")
+            self.progress_set(0)
+            self.start_btn.config(state="normal")
+            return
+        self.log_msg(f"Copied {st.files} files, {st.bytes / 2**20:.0f} MB in {st.elapsed:.1f} s")
 
         shutil.rmtree(src)
         self.log_msg("Move complete")
@@ -17,6 +17,8 @@ from typing import Dict, Tuple, Optional, List
 from telegram import Bot
 from telegram.error import TelegramError
 
+from ld_config_index import LdConfigIndex
+
 # Общая загрузка /.env из корня репозитория (без перезаписи системных env).
 def _load_root_env() -> None:
     from pathlib import Path
@@ -84,6 +86,8 @@ CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
 DEFAULT_CONFIG_FOLDER = r'C:\LDPlayer\LDPlayer9\vms\config'
 DEFAULT_PROFILE_FILE = r'C:/Program Files/GnBots/profiles/FRESH_NOX.json'
 crashed_file = r'C:\LDPlayer\ldChecker\crashed.json'  # для UI (цвет кнопок)
+# индекс (size, mtime) → playerName конфигов: между запусками перечитываются только изменённые
+config_index_path = os.getenv("LDCHECK_INDEX_PATH") or os.path.join(BASE_DIR, "settings", "ld_config_index.db")
 
 
 def _load_rss_config(path: str) -> Dict[str, str]:
@@ -202,23 +206,6 @@ def build_maps(profiles) -> Tuple[Dict[str, str], set, Dict[str, str]]:
 
     return inst2name, active_ids, inst2acc
 
-def find_key_recursive(d, target_key):
-    """Ищет ключ target_key в глубине JSON-структуры (точное имя)."""
-    if isinstance(d, dict):
-        for k, v in d.items():
-            if k == target_key:
-                return v
-            if isinstance(v, (dict, list)):
-                res = find_key_recursive(v, target_key)
-                if res is not None:
-                    return res
-    elif isinstance(d, list):
-        for item in d:
-            res = find_key_recursive(item, target_key)
-            if res is not None:
-                return res
-    return None
-
 def extract_instance_id(fname: str) -> Optional[str]:
     """Из «leidian36.config» вернёт «36», иначе None."""
     m = re.search(r"leidian(\d+)\.config", fname, re.IGNORECASE)
@@ -280,6 +267,15 @@ def health_check(verbose: bool=False) -> None:
 # ─────────────────────────────────────────────────────────────
 # Сканер конфигов (общий для обычного и «тихого» прохода)
 # ─────────────────────────────────────────────────────────────
+_config_index: Optional[LdConfigIndex] = None
+
+def get_config_index() -> LdConfigIndex:
+    global _config_index
+    if _config_index is None:
+        os.makedirs(os.path.dirname(config_index_path), exist_ok=True)
+        _config_index = LdConfigIndex(config_folder, config_index_path)
+    return _config_index
+
 def collect_crashed(inst2name: Dict[str, str], active_inst_ids: set) -> Tuple[List[str], List[str]]:
     """
     Возвращает:
@@ -289,33 +285,26 @@ def collect_crashed(inst2name: Dict[str, str], active_inst_ids: set) -> Tuple[Li
     crashed_files: List[str] = []
     crashed_names: List[str] = []
 
-    for root, _, files in os.walk(config_folder):
-        for fname in files:
-            if not fname.endswith('.config'):
-                continue
-            if fname.lower() == 'leidians.config':
-                continue
-
-            inst_id = extract_instance_id(fname)
-            if not inst_id or inst_id not in active_inst_ids:
-                continue
+    def wanted(fname: str) -> bool:
+        if not fname.endswith('.config') or fname.lower() == 'leidians.config':
+            return False
+        inst_id = extract_instance_id(fname)
+        return bool(inst_id) and inst_id in active_inst_ids
 
-            fpath = os.path.join(root, fname)
-            try:
-                with open(fpath, 'r', encoding='utf-8') as f:
-                    cfg = json.load(f)
-            except Exception as e:
-                print(f"[ERR] Ошибка чтения {fpath}: {e}")
-                continue
-
-            player_name = find_key_recursive(cfg, 'statusSettings.playerName') or ''
-            player_name = str(player_name).strip()
-            is_bad = (not player_name) or (player_name.lower() == 'ldplayer')
+    index = get_config_index()
+    for root, fname, player_name, err in index.scan(wanted):
+        if err is not None:
+            print(f"[ERR] Ошибка чтения {os.path.join(root, fname)}: {err}")
+            continue
 
-            if is_bad:
-                crashed_files.append(fname)
-                crashed_names.append(inst2name.get(inst_id, f'inst{inst_id}'))
+        is_bad = (not player_name) or (player_name.lower() == 'ldplayer')
+        if is_bad:
+            inst_id = extract_instance_id(fname)
+            crashed_files.append(fname)
+            crashed_names.append(inst2name.get(inst_id, f'inst{inst_id}'))
 
+    st = index.stats
+    print(f"[SCAN] конфигов прочитано {st['read']} из {st['stat']}, каталогов перечитано {st['listed']}")
     return crashed_files, crashed_names
 
 def write_crashed_file(files: List[str]) -> None:
@@ -1,15 +1,20 @@
 import os
 import json
-import subprocess
+import queue
+import random
 import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext
 from datetime import datetime
 
+from update_scheduler import (LDUPD_CONCURRENCY, UpdateJob, UpdateQueue, UpdateScheduler,
+                              dry_run_command, format_event)
+
 # Файлы настроек и логов в папке скрипта
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
 SETTINGS_PATH = os.path.join(APP_DIR, 'settings.json')
 HISTORY_LOG = os.path.join(APP_DIR, 'installed_history.log')
+QUEUE_PATH = os.path.join(APP_DIR, 'update_queue.json')
 
 # Загружаем или инициализируем настройки
 default_settings = {'config_dir': '', 'xapk_file': '', 'ldconsole': 'ldconsole.exe'}
@@ -56,11 +61,18 @@ class App(tk.Tk):
         self.config_dir = tk.StringVar(value=settings.get('config_dir', ''))
         self.xapk_file = tk.StringVar(value=settings.get('xapk_file', ''))
         self.ldconsole = tk.StringVar(value=settings.get('ldconsole', 'ldconsole.exe'))
+        self.concurrency = tk.IntVar(value=settings.get('concurrency', LDUPD_CONCURRENCY))
+        self.dry_run = tk.BooleanVar(value=False)
+        self.scheduler = None
+        self.events = queue.Queue()
         self.emu_names = []
         self.check_vars = []
         self.check_widgets = []
 
         self._build_ui()
+        pending = UpdateQueue.load(QUEUE_PATH)
+        if pending and pending.unfinished():
+            self._log(f"Незавершённая очередь: {len(pending.unfinished())} эмуляторов — нажмите Resume")
 
     def _build_ui(self):
         frm = tk.Frame(self)
@@ -98,6 +110,11 @@ class App(tk.Tk):
         tk.Button(ctrl, text="Select All",   command=lambda:self._toggle_all(True)).pack(side='left')
         tk.Button(ctrl, text="Deselect All", command=lambda:self._toggle_all(False)).pack(side='left')
         tk.Button(ctrl, text="Install",      command=self.start_install).pack(side='right')
+        tk.Button(ctrl, text="Resume",       command=self.resume_install).pack(side='right', padx=(0,5))
+        tk.Button(ctrl, text="Stop",         command=self.stop_install).pack(side='right', padx=(0,5))
+        tk.Checkbutton(ctrl, text="Dry run", variable=self.dry_run).pack(side='right', padx=(0,10))
+        tk.Spinbox(ctrl, from_=1, to=16, width=3, textvariable=self.concurrency).pack(side='right')
+        tk.Label(ctrl, text="Parallel:").pack(side='right', padx=(10,2))
 
         # Лог
         self.log = scrolledtext.ScrolledText(self, height=8)
@@ -162,7 +179,7 @@ class App(tk.Tk):
     def start_install(self):
         xapk = self.xapk_file.get()
         ld = self.ldconsole.get()
-        if not os.path.isfile(xapk) or not os.path.isfile(ld):
+        if not self.dry_run.get() and (not os.path.isfile(xapk) or not os.path.isfile(ld)):
             messagebox.showerror("Error", "XAPK or ldconsole.exe not found")
             return
         selected = [n for n,v in self.check_vars if v.get()]
@@ -170,30 +187,92 @@ class App(tk.Tk):
             messagebox.showwarning("No targets", "No emulators selected")
             return
 
-        threading.Thread(target=self._do_install, args=(selected, ld, xapk), daemon=True).start()
-
-    def _do_install(self, targets, ldpath, xapk):
-        for name in targets:
-            self._log(f"\n>>> Installing on: {name}")
-            cmd = [ldpath, 'installapp', '--name', name, '--filename', xapk]
-            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-            for line in proc.stdout:
-                self._log(f"[{name}] {line.strip()}")
-            proc.wait()
-            if proc.returncode == 0:
-                self._mark_installed(name)
-                log_history(name)
-        self._log("\n=== All done ===")
+        self._do_install(selected, ld, xapk)
+
+    def _do_install(self, targets, *files):
+        # очередь идущей установки не перезаписываем: проверка до UpdateQueue.create
+        if self._busy():
+            return
+        # dry-run: вместо ldconsole — заглушка, которая «ставит» 5–15 с
+        if self.dry_run.get():
+            jobs = [UpdateJob(name, dry_run_command(name, random.uniform(5, 15))) for name in targets]
+        else:
+            jobs = [UpdateJob(name, self._install_cmd(name, *files)) for name in targets]
+        self._run_queue(UpdateQueue.create(QUEUE_PATH, jobs))
+
+    def _install_cmd(self, name, ldpath, xapk):
+        return [ldpath, 'installapp', '--name', name, '--filename', xapk]
+
+    def resume_install(self):
+        if self._busy():
+            return
+        pending = UpdateQueue.load(QUEUE_PATH)
+        if not pending or not pending.unfinished():
+            messagebox.showinfo("Resume", "Нет незавершённой очереди")
+            return
+        self._run_queue(pending)
+
+    def stop_install(self):
+        if self.scheduler:
+            self.scheduler.stop()
+            self._log("Stop: новые установки не запускаются, идущие доделываются")
+
+    def _busy(self):
+        if self.scheduler:
+            messagebox.showwarning("Busy", "Установка уже идёт")
+            return True
+        return False
+
+    def _run_queue(self, update_queue):
+        if self._busy():
+            return
+        try:
+            concurrency = max(1, int(self.concurrency.get()))
+        except (tk.TclError, ValueError):
+            concurrency = LDUPD_CONCURRENCY
+        settings['concurrency'] = concurrency
+        save_settings()
+        events = self.events
+        scheduler = UpdateScheduler(
+            update_queue, concurrency=concurrency,
+            on_event=lambda kind, job, text: events.put((kind, job, format_event(kind, job, text))),
+        )
+        self.scheduler = scheduler
+        todo = len(update_queue.unfinished())
+        self._log(f"\n=== {todo} эмуляторов, параллельно {concurrency} ===")
+        threading.Thread(target=lambda: events.put(("finished", None, scheduler.run())), daemon=True).start()
+        self.after(100, self._drain_events)
+
+    def _drain_events(self):
+        # события планировщика приходят из рабочих потоков — Tk трогаем только здесь
+        while True:
+            try:
+                kind, job, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "finished":
+                self.scheduler = None
+                self._log(f"\n=== All done === готово {payload['done']}, ошибок {payload['failed']}, "
+                          f"повторов {payload['retries']}, за {payload['makespan'] / 60:.1f} мин")
+                return
+            self._log(payload)
+            if kind == "done":
+                self._mark_installed(job.name)
+                if "--fake-console" not in job.cmd:
+                    log_history(job.name)
+            elif kind == "failed":
+                self._mark_installed(job.name, ok=False)
+        self.after(100, self._drain_events)
 
     def _log(self, text):
         self.log.insert('end', text + "\n")
         self.log.see('end')
 
-    def _mark_installed(self, name):
+    def _mark_installed(self, name, ok=True):
         # Покрасить в зеленый соответствующий чекбокс
         for nm, widget in self.check_widgets:
             if nm == name:
-                widget.config(fg='green')
+                widget.config(fg='green' if ok else 'red')
                 break
 
 
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# ░░░  update_scheduler.py  ░░░
+"""
+Параллельная установка обновлений на эмуляторы для LdUPD / LD_UPD_sPlit.
+
+— Очередь заданий (эмулятор + команда ldconsole) хранится в JSON рядом со
+  скриптом и переписывается атомарно при каждой смене состояния: после
+  закрытия окна или падения незавершённые задания можно продолжить (Resume),
+  прерванные «running» возвращаются в очередь.
+— Одновременно идёт до LDUPD_CONCURRENCY установок. Новая установка не
+  стартует, пока загрузка CPU выше LDUPD_MAX_CPU % или диск занят больше
+  LDUPD_MAX_IO_MBPS МБ/с (одна установка идёт всегда, чтобы не встать).
+— По каждому эмулятору пишутся попытки, время старта/конца и длительность;
+  неудача повторяется до LDUPD_RETRIES раз с паузой LDUPD_RETRY_BASE·2ⁿ
+  (не больше LDUPD_RETRY_MAX), зависшая команда снимается через LDUPD_JOB_TIMEOUT.
+— События (start/line/retry/done/failed/throttle) уходят в on_event из рабочих
+  потоков; Tk забирает их через очередь и after().
+— Dry-run: вместо ldconsole запускается этот же файл с --fake-console,
+  который печатает прогресс и «ставит» обновление заданное время.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+LDUPD_CONCURRENCY = int(os.getenv("LDUPD_CONCURRENCY", "4"))
+LDUPD_MAX_CPU = float(os.getenv("LDUPD_MAX_CPU", "85"))
+LDUPD_MAX_IO_MBPS = float(os.getenv("LDUPD_MAX_IO_MBPS", "200"))
+LDUPD_RETRIES = int(os.getenv("LDUPD_RETRIES", "2"))
+LDUPD_RETRY_BASE = float(os.getenv("LDUPD_RETRY_BASE", "15"))
+LDUPD_RETRY_MAX = float(os.getenv("LDUPD_RETRY_MAX", "300"))
+LDUPD_JOB_TIMEOUT = float(os.getenv("LDUPD_JOB_TIMEOUT", "1800"))
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+
+@dataclass
+class UpdateJob:
+    name: str
+    cmd: List[str]
+    state: str = PENDING
+    attempts: int = 0
+    next_try: float = 0.0
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    duration: Optional[float] = None
+    returncode: Optional[int] = None
+    last_line: str = ""
+    history: List[Dict] = field(default_factory=list)   # [{attempt, started, duration, returncode}]
+
+
+# ─────────────────────────── Очередь ───────────────────────────
+class UpdateQueue:
+    """Задания установки с сохранением в JSON (tmp + os.replace)."""
+
+    def __init__(self, path: Optional[str], jobs: List[UpdateJob]):
+        self.path = path
+        self.jobs = jobs
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, path: Optional[str], jobs: List[UpdateJob]) -> "UpdateQueue":
+        queue = cls(path, jobs)
+        queue.save()
+        return queue
+
+    @classmethod
+    def load(cls, path: str) -> Optional["UpdateQueue"]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return None
+        jobs = []
+        for item in raw.get("jobs", []):
+            try:
+                job = UpdateJob(**item)
+            except TypeError:
+                continue
+            if job.state == RUNNING:          # окно закрыли посреди установки
+                job.state = PENDING
+            job.next_try = 0.0
+            jobs.append(job)
+        return cls(path, jobs)
+
+    def unfinished(self) -> List[UpdateJob]:
+        return [j for j in self.jobs if j.state in (PENDING, RUNNING)]
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            payload = {"saved": datetime.now().isoformat(timespec="seconds"),
+                       "jobs": [asdict(j) for j in self.jobs]}
+            tmp = f"{self.path}.tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(payload, f, ensure_ascii=False, indent=1)
+                os.replace(tmp, self.path)
+            except OSError as exc:
+                print(f"[LdUPD] Не удалось сохранить очередь: {exc}")
+
+
+# ─────────────────────────── Источники нагрузки ───────────────────────────
+class PsutilPressureSource:
+    """CPU % и скорость диска (МБ/с) через psutil; дельты между вызовами, без ожидания."""
+
+    def __init__(self):
+        import psutil
+
+        self.psutil = psutil
+        psutil.cpu_percent(interval=None)  # первый вызов задаёт точку отсчёта дельты
+        self._io = self._io_bytes()
+        self._ts = time.monotonic()
+
+    def _io_bytes(self) -> int:
+        io = self.psutil.disk_io_counters()
+        return (io.read_bytes + io.write_bytes) if io else 0
+
+    def sample(self) -> Dict[str, float]:
+        now, io = time.monotonic(), self._io_bytes()
+        mbps = (io - self._io) / max(now - self._ts, 1e-3) / 1e6
+        self._io, self._ts = io, now
+        return {"cpu": self.psutil.cpu_percent(interval=None), "io_mbps": mbps}
+
+
+def _default_pressure():
+    try:
+        return PsutilPressureSource()
+    except ImportError:
+        return None
+
+
+# ─────────────────────────── Запуск команды ───────────────────────────
+def run_command(job: UpdateJob, on_line: Callable[[str], None], timeout: float) -> int:
+    """Popen с построчным выводом; по таймауту процесс снимается, код -9."""
+    flags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+    proc = subprocess.Popen(job.cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                            errors="replace", creationflags=flags)
+    killed = threading.Event()
+
+    def _kill():
+        killed.set()
+        proc.kill()
+
+    watchdog = threading.Timer(timeout, _kill) if timeout else None
+    if watchdog:
+        watchdog.daemon = True
+        watchdog.start()
+    try:
+        for line in proc.stdout:
+            line = line.strip()
+            if line:
+                on_line(line)
+        proc.wait()
+    finally:
+        if watchdog:
+            watchdog.cancel()
+    return -9 if killed.is_set() else proc.returncode
+
+
+def dry_run_command(name: str, duration: float, fail_rate: float = 0.0) -> List[str]:
+    """Команда-заглушка вместо ldconsole: этот же файл с --fake-console."""
+    return [sys.executable, os.path.abspath(__file__), "--fake-console", "--name", name,
+            "--duration", f"{duration:.3f}", "--fail-rate", f"{fail_rate:g}"]
+
+
+def _fake_console(name: str, duration: float, fail_rate: float) -> int:
+    steps = 5
+    for i in range(1, steps + 1):
+        time.sleep(duration / steps)
+        print(f"installing {name}… {i * 100 // steps}%", flush=True)
+    if random.random() < fail_rate:
+        print("Failure [INSTALL_FAILED_INSUFFICIENT_STORAGE]", flush=True)
+        return 1
+    print("Success", flush=True)
+    return 0
+
+
+# ─────────────────────────── Планировщик ───────────────────────────
+class UpdateScheduler:
+    """Гоняет очередь до конца: run() блокирует вызывающий поток и возвращает сводку."""
+
+    def __init__(
+        self,
+        queue: UpdateQueue,
+        concurrency: int = LDUPD_CONCURRENCY,
+        runner: Callable[[UpdateJob, Callable[[str], None], float], int] = run_command,
+        pressure=None,
+        max_cpu: float = LDUPD_MAX_CPU,
+        max_io_mbps: float = LDUPD_MAX_IO_MBPS,
+        retries: int = LDUPD_RETRIES,
+        retry_base: float = LDUPD_RETRY_BASE,
+        retry_max: float = LDUPD_RETRY_MAX,
+        timeout: float = LDUPD_JOB_TIMEOUT,
+        on_event: Optional[Callable[[str, UpdateJob, str], None]] = None,
+        poll: float = 1.0,
+    ):
+        self.queue = queue
+        self.concurrency = max(1, concurrency)
+        self.runner = runner
+        self.pressure = _default_pressure() if pressure is None else pressure
+        self.max_cpu, self.max_io_mbps = max_cpu, max_io_mbps
+        self.retries, self.retry_base, self.retry_max = retries, retry_base, retry_max
+        self.timeout = timeout
+        self.on_event = on_event
+        self.poll = poll
+        self.running = 0
+        self.peak = 0
+        self.throttled = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Новые установки не запускаются; идущие доделываются."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _emit(self, kind: str, job: Optional[UpdateJob], text: str = "") -> None:
+        if self.on_event:
+            try:
+                self.on_event(kind, job, text)
+            except Exception as exc:
+                print(f"[LdUPD] on_event: {exc}")
+
+    def _overloaded(self) -> Optional[str]:
+        if self.pressure is None or self.running == 0:
+            return None
+        try:
+            load = self.pressure.sample()
+        except Exception:
+            return None
+        if load["cpu"] > self.max_cpu or load["io_mbps"] > self.max_io_mbps:
+            return f"CPU {load['cpu']:.0f}%, диск {load['io_mbps']:.0f} МБ/с"
+        return None
+
+    def _execute(self, job: UpdateJob) -> None:
+        job.attempts += 1
+        t0 = time.time()
+        job.started = t0
+        self.queue.save()
+        self._emit("start", job, f"попытка {job.attempts}")
+
+        def on_line(line: str) -> None:
+            job.last_line = line
+            self._emit("line", job, line)
+
+        try:
+            rc = self.runner(job, on_line, self.timeout)
+        except Exception as exc:
+            rc = -1
+            job.last_line = str(exc)
+        job.finished = time.time()
+        job.duration = round(job.finished - t0, 3)
+        job.returncode = rc
+        job.history.append({"attempt": job.attempts, "started": round(t0, 3), "duration": job.duration,
+                            "returncode": rc})
+        with self._cond:
+            if rc == 0:
+                job.state = DONE
+                kind, text = "done", f"{job.duration:.1f} с"
+            elif job.attempts <= self.retries and not self._stop.is_set():
+                delay = min(self.retry_base * 2 ** (job.attempts - 1), self.retry_max)
+                job.state, job.next_try = PENDING, time.monotonic() + delay
+                kind, text = "retry", f"код {rc}, повтор через {delay:.0f} с"
+            else:
+                job.state = FAILED
+                kind, text = "failed", f"код {rc}: {job.last_line}"
+        self.queue.save()
+        self._emit(kind, job, text)
+        # слот освобождается после события — run() не вернётся раньше последнего done/failed
+        with self._cond:
+            self.running -= 1
+            self._cond.notify_all()
+
+    def run(self) -> Dict:
+        t0 = time.monotonic()
+        throttle_note = None
+        with self._cond:
+            while True:
+                pending = [j for j in self.queue.jobs if j.state == PENDING]
+                if self._stop.is_set() or not pending:
+                    if self.running == 0:
+                        break
+                    self._cond.wait(self.poll)
+                    continue
+                now = time.monotonic()
+                ready = [j for j in pending if j.next_try <= now]
+                wait = self.poll
+                if ready and self.running < self.concurrency:
+                    reason = self._overloaded()
+                    if reason is None:
+                        job = ready[0]
+                        job.state = RUNNING
+                        self.running += 1
+                        self.peak = max(self.peak, self.running)
+                        throttle_note = None
+                        threading.Thread(target=self._execute, args=(job,), daemon=True,
+                                         name=f"ldupd-{job.name}").start()
+                        continue
+                    self.throttled += 1
+                    if reason != throttle_note:
+                        throttle_note = reason
+                        self._emit("throttle", None, reason)
+                elif not ready:
+                    wait = min(self.poll, max(0.0, min(j.next_try for j in pending) - now))
+                self._cond.wait(wait)
+        jobs = self.queue.jobs
+        return {
+            "makespan": time.monotonic() - t0,
+            "done": sum(j.state == DONE for j in jobs),
+            "failed": sum(j.state == FAILED for j in jobs),
+            "pending": sum(j.state == PENDING for j in jobs),
+            "retries": sum(max(0, j.attempts - 1) for j in jobs),
+            "peak": self.peak,
+            "throttled": self.throttled,
+        }
+
+
+def format_event(kind: str, job: Optional[UpdateJob], text: str) -> str:
+    """Строка лога для окна установщика."""
+    name = job.name if job else ""
+    if kind == "start":
+        return f"\n>>> Installing on: {name} ({text})"
+    if kind == "line":
+        return f"[{name}] {text}"
+    if kind == "done":
+        return f"✓ {name}: готово за {text}"
+    if kind == "retry":
+        return f"↻ {name}: {text}"
+    if kind == "failed":
+        return f"✗ {name}: {text}"
+    if kind == "throttle":
+        return f"⏸ Нагрузка ({text}) — новые установки ждут"
+    return f"{kind} {name} {text}".strip()
+
+
+# ─────────────────────────── CLI ───────────────────────────
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Заглушка ldconsole для dry-run установщика")
+    parser.add_argument("--fake-console", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--name", default="LDPlayer")
+    parser.add_argument("--duration", type=float, default=1.0, help="сколько «ставить», с")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    sys.exit(_fake_console(args.name, args.duration, args.fail_rate))
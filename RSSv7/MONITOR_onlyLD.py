@@ -28,13 +28,12 @@ REFRESH_MSEC   = 1000
 WINDOW_W, WINDOW_H = 260, 130
 
 ###############################################################################
-import sys, ctypes, psutil, argparse, platform, importlib.util
+import sys, ctypes, argparse, platform, importlib.util
 from flask import Flask, jsonify, request                    # ← НОВОЕ
 import threading                                             # ← НОВОЕ
 CONSOLE_TITLE = "MonitorLD"           # ← любое имя, что хотите видеть
 if sys.platform == "win32":
     ctypes.windll.kernel32.SetConsoleTitleW(CONSOLE_TITLE)
-from pathlib import Path
 def _mod_ok(name): return importlib.util.find_spec(name) is not None
 if platform.system().lower() != "windows" or not all(_mod_ok(p) for p in ("PyQt6","psutil")):
     sys.exit("Требуется Windows + PyQt6 + psutil")
@@ -44,27 +43,21 @@ from PyQt6.QtWidgets import (QApplication, QWidget, QLabel, QVBoxLayout,
 from PyQt6.QtCore    import Qt, QTimer, QSettings, QPoint
 from PyQt6.QtGui     import QFont, QColor, QPainter, QMouseEvent, QGuiApplication
 
+from process_snapshot import ProcessSnapshotSampler
+
 ORG, APP = "F99Tools", "LdCounter"
 _INTERESTING = ("dnplayer.exe",)
 
+# один снимок таблицы процессов на плашку и HTTP-API (обновляется в фоне)
+PROCESSES = ProcessSnapshotSampler()
+
 ###############################################################################
 # ------------------------------- helpers ----------------------------------- #
 def is_script_running(pattern: str) -> bool:
-    base, stem = pattern.lower(), Path(pattern).stem.lower()
-    keys = {base, stem, f"{stem}.py", f"{stem}.exe", f"{base}.py", f"{base}.exe"}
-    for p in psutil.process_iter(['name','exe','cmdline']):
-        try:
-            blob = " ".join(filter(None, [p.info.get('name',''), p.info.get('exe',''),
-                                          " ".join(p.info.get('cmdline') or [])])
-                            ).lower().replace("\\","/")
-            if any(k in blob for k in keys): return True
-        except (psutil.AccessDenied, psutil.ZombieProcess):
-            continue
-    return False
+    return PROCESSES.snapshot().script_running(pattern)
 
 def is_exe_running(name: str) -> bool:
-    nm = name.lower()
-    return any((p.info['name'] or '').lower()==nm for p in psutil.process_iter(['name']))
+    return PROCESSES.snapshot().exe_running(name)
 
 def window_exists(title: str) -> bool:
     if not title or sys.platform!="win32": return False
@@ -151,8 +144,9 @@ class Overlay(QWidget):
 
     # --------------------------- ядро обновления -------------------- #
     @staticmethod
-    def _cnt(names): return sum(1 for p in psutil.process_iter(['name'])
-                                if p.info['name'] in names)
+    def _cnt(names):
+        snap = PROCESSES.snapshot()
+        return sum(snap.count(n) for n in names)
 
     def refresh(self):
         data=[
@@ -237,9 +231,22 @@ def api_dn_count():
     GET /api/dnCount
     ➜ {"dnCount": <кол-во-окон>}
     """
-    cnt = sum(1 for p in psutil.process_iter(['name'])
-              if (p.info.get('name') or '').lower() == 'dnplayer.exe')
-    return jsonify({"dnCount": cnt})
+    return jsonify({"dnCount": PROCESSES.snapshot().count("dnplayer.exe")})
+
+
+@app_api.route('/api/scriptStatuses')
+def api_script_statuses():
+    """
+    GET /api/scriptStatuses?scripts=RssCounterWebV7,clo.exe
+    ➜ {"scripts": {"RssCounterWebV7": true, "clo.exe": false}, "dnCount": <кол-во-окон>}
+    Все статусы тика CentralDASH одним запросом из общего снимка процессов.
+    """
+    snap = PROCESSES.snapshot()
+    names = [s for s in request.args.get('scripts', '').split(',') if s]
+    return jsonify({
+        "scripts": {name: snap.script_running(name) for name in names},
+        "dnCount": snap.count("dnplayer.exe"),
+    })
 
 
 
@@ -249,6 +256,7 @@ if __name__ == "__main__":
     p.add_argument("--reset", action="store_true")
     args = p.parse_args()
 
+    PROCESSES.start()
     app = QApplication(sys.argv)
     ol = Overlay(reset=args.reset)
     ol.show()
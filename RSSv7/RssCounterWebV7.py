@@ -25,12 +25,18 @@ import csv
 import threading
 import uuid
 import inactive_monitor
+from profile_cache import ProfileCache
+from finance_totals import FinanceTotals
+from account_meta_sync import AccountMetaSync
+import logs_schema
+from template_gaps import TemplateShapeIndex
+from resources_view import IngestGeneration, VersionedResponseCache, build_resources_payload
 from copy import deepcopy
 from icmplib import ping as icmp_ping
 from pathlib import Path
 from flask import jsonify, request
 from datetime import datetime, timezone, date, timedelta
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, Response, jsonify, render_template, request
 from flask_cors import CORS
 
 # Установка всего: python -m pip install -U psutil paramiko requests Pillow pywin32 WMI icmplib Flask Flask-Cors
@@ -105,6 +111,7 @@ TEMPLATES_BACKUP_DIR = os.path.join(TEMPLATES_DIR, "_backup")
 TEMPLATE_ALIASES_PATH = os.path.join(SETTINGS_DIR, "template_aliases.json")
 SCHEMA_CACHE_PATH = os.path.join(SETTINGS_DIR, "schema_cache.json")  # авто-накапливаемая «схема»
 TEMPLATE_GAPS_CACHE_PATH = os.path.join(SETTINGS_DIR, "template_schema_gaps.json")
+TEMPLATE_SHAPES_CACHE_PATH = os.path.join(SETTINGS_DIR, "template_shapes_cache.db")  # формы шаблонов для сверки
 SERVER_LINKS_PATH = os.path.join(SETTINGS_DIR, "server_links.enc")
 SERVER_LINKS_KEY_PATH = os.path.join(SETTINGS_DIR, "server_links.key")
 
@@ -156,6 +163,23 @@ GNBOTS_PROFILES_PATH = PROFILE_PATH
 PROFILE_FILE_LOCK = threading.RLock()
 PARSE_LOGS_LOCK = threading.RLock()
 
+# Общий разобранный profiles.json: перечитывается только при смене (size, mtime),
+# MenuData.Config (Email/Password/Custom) разобран заранее. Только для чтения.
+PROFILE_DOCUMENTS = ProfileCache(lambda: PROFILE_PATH)
+
+# Доход/расходы: SQL-агрегаты по account_meta/expenses, кеш сверяется с
+# finance_version (его увеличивают триггеры на любую запись в эти таблицы).
+FINANCE_TOTALS = FinanceTotals(lambda: open_db(RESOURCES_DB))
+
+# account_meta ↔ активные Id профиля: сверка через временную таблицу,
+# пропускается, если множество Id не менялось.
+ACCOUNT_META_SYNC = AccountMetaSync(lambda: open_db(RESOURCES_DB))
+
+# Поколение данных ресурсов: растёт после parse_logs и записи profiles.json.
+# Вместе с finance_version (account_meta) — ключ готового ответа /api/resources.
+INGEST_GENERATION = IngestGeneration()
+RESOURCES_RESPONSE = VersionedResponseCache()
+
 
 def _read_profiles_locked() -> list:
     """Читает profiles.json; вызывать только внутри PROFILE_FILE_LOCK."""
@@ -182,6 +206,8 @@ def _write_profiles_locked(profiles: list, *, indent: int = 2) -> None:
             f.flush()
             os.fsync(f.fileno())
         os.replace(tmp_name, PROFILE_PATH)
+        PROFILE_DOCUMENTS.invalidate()
+        INGEST_GENERATION.bump()
     except Exception:
         try:
             os.unlink(tmp_name)
@@ -440,6 +466,11 @@ def save_template_gap_cache(payload: dict) -> None:
     safe_write_json(TEMPLATE_GAPS_CACHE_PATH, payload)
 
 
+# Формы шаблонов (ScriptId + ключи Config) с кешем по (size, mtime, sha256):
+# при сверке перечитываются только изменённые файлы.
+TEMPLATE_SHAPES = TemplateShapeIndex(TEMPLATES_DIR, TEMPLATE_SHAPES_CACHE_PATH)
+
+
 def collect_templates_schema_gaps(schema: dict | None = None) -> list[dict]:
     """Проверяет все шаблоны на наличие обязательных ключей по схеме."""
 
@@ -452,30 +483,7 @@ def collect_templates_schema_gaps(schema: dict | None = None) -> list[dict]:
     for alias, target in aliases.items():
         alias_targets.setdefault(target, []).append(alias)
 
-    results: list[dict] = []
-    for name in sorted(os.listdir(TEMPLATES_DIR)):
-        if not name.lower().endswith(".json"):
-            continue
-
-        full = os.path.join(TEMPLATES_DIR, name)
-        steps = _json_read_or(full, [])
-        if not isinstance(steps, list):
-            continue
-
-        gaps = find_template_schema_gaps(steps, schema)
-        if not gaps:
-            continue
-
-        results.append(
-            {
-                "template": name,
-                "label": os.path.splitext(name)[0],
-                "aliases": alias_targets.get(name, []),
-                "gaps": gaps,
-            }
-        )
-
-    return results
+    return TEMPLATE_SHAPES.collect_gaps(schema, alias_targets)
 
 
 def run_templates_schema_audit(schema: dict | None = None) -> dict:
@@ -1322,124 +1330,15 @@ def init_logs_db():
       - cached_logs: кэшированные строки (с индексами)
       - resource_snapshots: снапшоты ресурсов с индексами
       - устойчивый source_id и UNIQUE-индекс для идемпотентного перечтения
-    """
-    import hashlib
 
+    Шаги — версионированные миграции logs_schema.LOGS_MIGRATIONS: каждая
+    выполняется один раз (учёт в schema_version), обычный старт их пропускает.
+    """
     conn = open_db(LOGS_DB)
     try:
-        c = conn.cursor()
-
-        # 1) Таблица смещений
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS files_offset (
-                filename TEXT PRIMARY KEY,
-                last_pos INTEGER NOT NULL,
-                last_size INTEGER,
-                last_mtime REAL,
-                head_hash TEXT,
-                generation_id TEXT
-            )
-        """)
-        offset_columns = {row[1] for row in c.execute("PRAGMA table_info(files_offset)").fetchall()}
-        for column_name, column_ddl in (
-            ("last_size", "INTEGER"),
-            ("last_mtime", "REAL"),
-            ("head_hash", "TEXT"),
-            ("generation_id", "TEXT"),
-        ):
-            if column_name not in offset_columns:
-                c.execute(f"ALTER TABLE files_offset ADD COLUMN {column_name} {column_ddl}")
-
-        # 2) Кэш логов по аккаунтам
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS cached_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                acc_id TEXT,
-                nickname TEXT,
-                dt TEXT,         -- 'YYYY-MM-DD HH:MM:SS.mmm +HH:MM'
-                raw_line TEXT,
-                source_id TEXT,
-                source_file TEXT,
-                source_offset INTEGER
-            )
-        """)
-        log_columns = {row[1] for row in c.execute("PRAGMA table_info(cached_logs)").fetchall()}
-        for column_name, column_ddl in (
-            ("source_id", "TEXT"),
-            ("source_file", "TEXT"),
-            ("source_offset", "INTEGER"),
-        ):
-            if column_name not in log_columns:
-                c.execute(f"ALTER TABLE cached_logs ADD COLUMN {column_name} {column_ddl}")
-
-        # Старый hard refresh мог многократно сохранить одну и ту же строку. До включения
-        # уникального source_id оставляем одну запись каждого исходного события.
-        c.execute("""
-            DELETE FROM cached_logs
-            WHERE id NOT IN (
-                SELECT MIN(id)
-                FROM cached_logs
-                GROUP BY acc_id, dt, raw_line
-            )
-        """)
-        legacy_rows = c.execute("""
-            SELECT id, acc_id, dt, raw_line
-            FROM cached_logs
-            WHERE source_id IS NULL OR source_id = ''
-        """).fetchall()
-        for row in legacy_rows:
-            source_material = "\x1f".join(
-                str(value or "") for value in (row["acc_id"], row["dt"], row["raw_line"])
-            )
-            source_id = "legacy:" + hashlib.sha256(source_material.encode("utf-8")).hexdigest()
-            c.execute("UPDATE cached_logs SET source_id=? WHERE id=?", (source_id, row["id"]))
-
-        c.execute("CREATE INDEX IF NOT EXISTS idx_cached_logs_acc ON cached_logs(acc_id)")
-        c.execute("CREATE INDEX IF NOT EXISTS idx_cached_logs_id ON cached_logs(id DESC)")
-        c.execute("CREATE INDEX IF NOT EXISTS idx_cached_logs_acc_id ON cached_logs(acc_id, id)")
-        c.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_cached_logs_source_id ON cached_logs(source_id)")
-        # Fallback защищает legacy-строки первого развёртывания: их source_id
-        # ещё не был привязан к file offset, но hard refresh не должен их удвоить.
-        c.execute("""
-            CREATE UNIQUE INDEX IF NOT EXISTS ux_cached_logs_event_fallback
-            ON cached_logs(acc_id, dt, raw_line)
-        """)
-
-        # 3) Снапшоты ресурсов
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS resource_snapshots (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                acc_id TEXT NOT NULL,
-                dt TEXT NOT NULL,   -- 'YYYY-MM-DD HH:MM:SS.mmm +HH:MM'
-                food INTEGER,
-                wood INTEGER,
-                stone INTEGER,
-                gold INTEGER
-            )
-        """)
-        c.execute("CREATE INDEX IF NOT EXISTS idx_rs_acc_dt ON resource_snapshots(acc_id, dt)")
-
-        # 4) Дедупликация по (acc_id, dt) перед созданием уникального индекса
-        #    Оставляем запись с максимальным id
-        try:
-            c.execute("""
-                DELETE FROM resource_snapshots
-                WHERE id NOT IN (
-                    SELECT MAX(id) FROM resource_snapshots
-                    GROUP BY acc_id, dt
-                )
-            """)
-        except Exception as e:
-            print("[init_logs_db] dedup resource_snapshots warn:", e)
-
-        # 5) Уникальный индекс по (acc_id, dt), чтобы не плодить дублей при перечтении логов
-        try:
-            c.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_rs_acc_dt ON resource_snapshots(acc_id, dt)")
-        except Exception as e:
-            # Если здесь ошибка, значит в таблице всё ещё остались дубликаты.
-            # Можно повторно попробовать более агрессивную чистку, но, как правило, блока выше хватает.
-            print("[init_logs_db] create unique index warn:", e)
-
+        applied = logs_schema.migrate(conn, progress=lambda msg: print("[init_logs_db]", msg))
+        if applied:
+            print("[init_logs_db] applied migrations:", applied)
         conn.commit()
         print("[init_logs_db] OK: schema ensured, indexes present")
     except Exception as e:
@@ -1479,6 +1378,7 @@ def init_accounts_db():
     if "tg_tag" not in existing_cols:
         c.execute("ALTER TABLE account_meta ADD COLUMN tg_tag TEXT")
     conn.commit(); conn.close()
+    FINANCE_TOTALS.ensure_schema()   # expenses, pay_until_iso, триггеры finance_version
 
 
 ##############################
@@ -1493,29 +1393,7 @@ def sync_account_meta():
         return
 
     active_ids = {str(p["Id"]) for p in profiles if p.get("Id") is not None}
-
-    conn = open_db(RESOURCES_DB)
-    c    = conn.cursor()
-
-    # ── удалить лишние ──
-    if active_ids:
-        marks = ",".join("?"*len(active_ids))
-        c.execute(f"DELETE FROM account_meta WHERE id NOT IN ({marks})",
-                  tuple(active_ids))
-    else:                         # если активных вообще нет
-        c.execute("DELETE FROM account_meta")
-
-    # ── вставить недостающие ──
-    if active_ids:
-        placeholders = ",".join("(?, '', '', '', '', NULL, '', '')"
-                                for _ in active_ids)
-        c.execute(f"""
-            INSERT OR IGNORE INTO account_meta
-            (id,email,passwd,igg,pay_until,tariff_rub,server,tg_tag)
-            VALUES {placeholders}
-        """, tuple(active_ids))
-
-    conn.commit(); conn.close()
+    ACCOUNT_META_SYNC.sync(active_ids)
 
 
 
@@ -1523,43 +1401,17 @@ def sync_account_meta():
 # Работа с профилями
 ##############################
 
-PROFILE_CACHE: list[dict[str, t.Any]] | None = None
-
-
 def load_profiles(*, return_status: bool = False):
     """
-    Возвращает список активных аккаунтов из PROFILE_PATH.
+    Возвращает список активных аккаунтов из PROFILE_PATH (общий кеш, не изменять).
 
     :param return_status: True → вернуть (profiles, ok),
                           False → вернуть только profiles.
     """
 
-    def _result(profiles: list[dict[str, t.Any]], ok: bool):
-        return (profiles, ok) if return_status else profiles
-
-    global PROFILE_CACHE
-
-    if not os.path.exists(PROFILE_PATH):
-        print(f"PROFILE not found: {PROFILE_PATH}")
-        return _result(PROFILE_CACHE or [], False)
-    try:
-        with open(PROFILE_PATH, "r", encoding="utf-8") as f:
-            raw = f.read().strip()
-            if not raw:
-                print(f"PROFILE is empty: {PROFILE_PATH}")
-                return _result(PROFILE_CACHE or [], False)
-            data = json.loads(raw)
-    except json.JSONDecodeError as exc:
-        print(f"PROFILE has invalid JSON: {exc}")
-        return _result(PROFILE_CACHE or [], False)
-
-    if not isinstance(data, list):
-        print(f"PROFILE data is not a list: type={type(data)}")
-        return _result(PROFILE_CACHE or [], False)
-
-    active_profiles = [acc for acc in data if acc.get("Active")]
-    PROFILE_CACHE = active_profiles
-    return _result(active_profiles, True)
+    doc = PROFILE_DOCUMENTS.get()
+    profiles = list(doc.active)
+    return (profiles, doc.ok) if return_status else profiles
 
 # вверху, рядом с load_profiles()
 def load_active_names():
@@ -1598,6 +1450,7 @@ def parse_logs():
         acc_map = {a["Id"]: a["Name"] for a in acts}
 
         do_resources_update(acc_map)
+        INGEST_GENERATION.bump()
         LAST_UPDATE_TIME = datetime.now(timezone.utc)
         print("parse_logs done. LAST_UPDATE_TIME =", LAST_UPDATE_TIME.isoformat())
 
@@ -1797,16 +1650,18 @@ def do_resources_update(acc_map):
                                 )
                                 source_id = hashlib.sha256(source_material.encode("utf-8")).hexdigest()
 
-                                # кешируем строку
-                                c_log.execute("""
+                                # кешируем строку вместе с полями разбора (один раз при записи)
+                                c_log.execute(f"""
                                   INSERT OR IGNORE INTO cached_logs(
                                       acc_id, nickname, dt, raw_line,
-                                      source_id, source_file, source_offset
+                                      source_id, source_file, source_offset,
+                                      {", ".join(LOG_STORED_COLUMNS)}
                                   )
-                                  VALUES(?,?,?,?,?,?,?)
+                                  VALUES({",".join("?" * (7 + len(LOG_STORED_COLUMNS)))})
                                 """, (
                                     acid, nick, dt_part, line_str,
                                     source_id, fname, line_start,
+                                    *stored_log_fields(dt_part, line_str, acid),
                                 ))
 
                                 # если это CityResourcesAmount — пишем снапшот (для inactive/графиков)
@@ -1856,8 +1711,13 @@ def do_resources_update(acc_map):
 # Helpers
 ##############################
 
-# ─── robust scheduled-task checker ───────────────────────────────────────────
+# ─── scheduled-task checker ──────────────────────────────────────────────────
+# Все задачи перечисляются одним `schtasks /Query /FO CSV /V` и кешируются в
+# task_state.TaskStateService (TTL = TASK_STATE_TTL, по умолчанию 10 с).
 import subprocess
+from task_state import TaskStateService
+
+TASK_STATES = TaskStateService()
 
 def _task_enabled(task_name: str) -> bool | None:
     """
@@ -1866,54 +1726,7 @@ def _task_enabled(task_name: str) -> bool | None:
         False  – задача существует и отключена
         None   – задача не найдена / schtasks вернул ошибку
     """
-    try:
-        raw = subprocess.check_output(
-            ["schtasks", "/Query", "/TN", task_name, "/FO", "LIST", "/V"],
-            stderr=subprocess.STDOUT, timeout=5
-        )
-    except subprocess.CalledProcessError:
-        # задача не существует
-        return None
-
-    # пытаемся декодировать вывод
-    for enc in ("cp866", "cp437", "utf-8"):
-        try:
-            text = raw.decode(enc, errors="ignore").lower()
-            break
-        except UnicodeDecodeError:
-            continue
-    else:
-        return None
-
-    state_val = None
-    for line in text.splitlines():
-        if ":" not in line:
-            continue
-        left, right = [p.strip() for p in line.split(":", 1)]
-        left = left.lower(); right = right.lower()
-
-        # английские локали
-        if left.startswith("scheduled task state") or left.startswith("enabled"):
-            state_val = right
-            break
-        # русские локали
-        if ("состояние задачи" in left) or ("запланированной задачи" in left):
-            state_val = right
-            break
-
-    # общий fallback — ищем ключевые слова в сыром тексте
-    if state_val is None:
-        if any(w in text for w in ("enabled", "включено", "да", "yes")):
-            state_val = "enabled"
-        elif any(w in text for w in ("disabled", "отключено", "нет", "no")):
-            state_val = "disabled"
-
-    # нормализуем к булю / None
-    if state_val in ("enabled", "yes", "true", "да", "1"):
-        return True
-    if state_val in ("disabled", "no", "false", "нет", "0"):
-        return False
-    return None
+    return TASK_STATES.get(task_name)
 # ─────────────────────────────────────────────────────────────────────────────
 
 
@@ -1944,215 +1757,10 @@ def transformLogLine(dt_part, line_str):
     return f"{short} {rest}"
 
 
-_LOG_LEVEL_RE = re.compile(r"\[(DBG|INF|WRN|ERR)\]", re.IGNORECASE)
-_LOG_INFO_PREFIX_RE = re.compile(r"^(INFO|WARN|WARNING|ERROR|ERR|DEBUG)\|", re.IGNORECASE)
-_LOG_SESSION_PREFIX_RE = re.compile(r"^[0-9a-f]{8,64}\|", re.IGNORECASE)
-_LOG_SAWMILL_LEVEL_RE = re.compile(r"^Gather:\s*Sawmill\s+Level\s+(\d+)\s*$", re.IGNORECASE)
-_LOG_MARCHES_PROGRESS_RE = re.compile(r"^Marches:\s*(\d+)\s*/\s*(\d+)\s*$", re.IGNORECASE)
-_LOG_TIMESTAMP_PREFIX_RE = re.compile(
-    r"^\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:\s+[+-]\d{2}:\d{2})?\s*"
-)
-_HUMAN_LOG_EXACT_MAP = {
-    "Gather: Open Vip Menu": ("gather", "Сбор", "open_vip_menu", "Открыто VIP-меню"),
-    "Gather: Select Sawmill": ("gather", "Сбор", "select_sawmill", "Выбрана лесопилка"),
-    "March: Create March Troop": ("march", "Марш", "create_march_troop", "Собран марш"),
-    "March: Send Troops": ("march", "Марш", "send_troops", "Отряд отправлен"),
-    "Marches: Reached Maximum of Marches": (
-        "warning",
-        "Предупреждение",
-        "reached_max_marches",
-        "Достигнут лимит маршей",
-    ),
-    "gathervip Finished": ("finished", "Готово", "gathervip_finished", "Сценарий сбора завершён"),
-}
-
-
-def _format_log_time(dt_part: str) -> str:
-    """Возвращает время HH:MM:SS для строкового dt; при ошибке — исходное значение."""
-
-    value = (dt_part or "").strip()
-    if not value:
-        return ""
-
-    for fmt in ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S"):
-        try:
-            return datetime.strptime(value, fmt).strftime("%H:%M:%S")
-        except Exception:
-            continue
-
-    hms_match = re.search(r"(\d{2}:\d{2}:\d{2})", value)
-    return hms_match.group(1) if hms_match else value
-
-
-def _format_log_event_at(dt_part: str) -> str:
-    """Возвращает полный ISO 8601 timestamp с исходным часовым поясом."""
-
-    value = (dt_part or "").strip()
-    if not value:
-        return ""
-
-    for fmt in (
-        "%Y-%m-%d %H:%M:%S.%f %z",
-        "%Y-%m-%d %H:%M:%S %z",
-        "%Y-%m-%d %H:%M:%S.%f",
-        "%Y-%m-%d %H:%M:%S",
-    ):
-        try:
-            parsed = datetime.strptime(value, fmt)
-            return parsed.isoformat(timespec="milliseconds")
-        except (TypeError, ValueError):
-            continue
-
-    return value
-
-
-def _extract_log_level(raw_line: str) -> str:
-    """Определяет уровень логирования, если он явно указан в raw_line."""
-
-    marker = _LOG_LEVEL_RE.search(raw_line or "")
-    level_map = {
-        "DBG": "debug",
-        "DEBUG": "debug",
-        "INF": "info",
-        "INFO": "info",
-        "WRN": "warning",
-        "WARN": "warning",
-        "WARNING": "warning",
-        "ERR": "error",
-        "ERROR": "error",
-    }
-    if marker:
-        return level_map.get(marker.group(1).upper(), "info")
-
-    without_timestamp = _LOG_TIMESTAMP_PREFIX_RE.sub("", raw_line or "", count=1).strip()
-    pipe_marker = _LOG_INFO_PREFIX_RE.match(without_timestamp)
-    return level_map.get(pipe_marker.group(1).upper(), "info") if pipe_marker else "info"
-
-
-def _is_debug_log(raw_line: str) -> bool:
-    """Проверяет, является ли строка debug-сообщением."""
-
-    return _extract_log_level(raw_line) == "debug"
-
-
-def _clean_log_message(raw_line: str, account_id: str = "") -> str:
-    """Убирает служебный префикс ([INF], INFO|session|...) и оставляет только текст события."""
-
-    if not raw_line:
-        return ""
-
-    text = (raw_line or "").strip()
-
-    if _LOG_TIMESTAMP_PREFIX_RE.match(text):
-        text = _LOG_TIMESTAMP_PREFIX_RE.sub("", text, count=1).strip()
-
-    text = _LOG_LEVEL_RE.sub("", text).strip()
-    text = _LOG_INFO_PREFIX_RE.sub("", text).strip()
-    normalized_account_id = str(account_id or "").strip()
-    if normalized_account_id and text.startswith(normalized_account_id + "|"):
-        text = text[len(normalized_account_id) + 1:].strip()
-    else:
-        text = _LOG_SESSION_PREFIX_RE.sub("", text).strip()
-    return text
-
-
-def parse_human_log_line(
-    dt_part: str,
-    raw_line: str,
-    account_name: t.Optional[str] = None,
-    include_debug: bool = False,
-    account_id: str = "",
-):
-    """Нормализует строку лога в человекочитаемый объект для UI/API."""
-
-    if not raw_line:
-        return None
-
-    level = _extract_log_level(raw_line)
-    if level == "debug" and not include_debug:
-        return None
-
-    cleaned = _clean_log_message(raw_line, account_id=account_id)
-    if not cleaned:
-        return None
-
-    item = {
-        "time": _format_log_time(dt_part),
-        "event_at": _format_log_event_at(dt_part),
-        "level": level,
-        "group": "system",
-        "group_label": "Система",
-        "event_code": "system_message",
-        "event_text": cleaned,
-        "raw_text": raw_line,
-    }
-    if account_name:
-        item["account_name"] = account_name
-
-    preset = _HUMAN_LOG_EXACT_MAP.get(cleaned)
-    if preset:
-        item["group"], item["group_label"], item["event_code"], item["event_text"] = preset
-        if item["group"] == "warning" and item["level"] == "info":
-            item["level"] = "warning"
-        return item
-
-    sawmill_match = _LOG_SAWMILL_LEVEL_RE.match(cleaned)
-    if sawmill_match:
-        level_num = sawmill_match.group(1)
-        item.update(
-            {
-                "group": "gather",
-                "group_label": "Сбор",
-                "event_code": "sawmill_level",
-                "event_text": f"Выбрана лесопилка уровня {level_num}",
-            }
-        )
-        return item
-
-    marches_match = _LOG_MARCHES_PROGRESS_RE.match(cleaned)
-    if marches_match:
-        used, total = marches_match.groups()
-        item.update(
-            {
-                "group": "march",
-                "group_label": "Марш",
-                "event_code": "marches_progress",
-                "event_text": f"Маршей занято: {used} из {total}",
-            }
-        )
-        return item
-
-    lower_cleaned = cleaned.lower()
-    if "finished" in lower_cleaned:
-        item.update(
-            {
-                "group": "finished",
-                "group_label": "Готово",
-                "event_code": "finished",
-                "event_text": "Сценарий завершён",
-            }
-        )
-    elif any(token in lower_cleaned for token in ("error", "exception", "failed", "traceback")):
-        item.update(
-            {
-                "group": "system",
-                "group_label": "Система",
-                "event_code": "error",
-                "level": "error",
-            }
-        )
-    elif "update the game" in lower_cleaned:
-        item.update(
-            {
-                "group": "warning",
-                "group_label": "Предупреждение",
-                "event_code": "update_game_required",
-                "event_text": "Требуется обновление игры",
-                "level": "warning",
-            }
-        )
-
-    return item
+# Разбор строк логов (parse_human_log_line и помощники) вынесен в log_fields.py:
+# поля разбора считаются при записи в cached_logs, просмотрщики читают их из колонок.
+from log_fields import STORED_COLUMNS as LOG_STORED_COLUMNS
+from log_fields import item_from_stored, stored_log_fields
 
 
 def build_human_logs_summary(items):
@@ -2530,6 +2138,9 @@ def _schedule_inactive_checker(interval_min: int = 60):
 # FIX
 ##############################
 
+from config_repair import RepairJobRunner, copy_if_changed
+
+
 def remove_readonly(folder_path):
     if os.path.exists(folder_path):
         for root, dirs, files in os.walk(folder_path):
@@ -2552,20 +2163,25 @@ def remove_readonly(folder_path):
 
 def do_fix_logic(acc_id: str,
                  *, only_config: bool = False,
-                 cfg_src_override: str | None = None) -> list[str]:
+                 cfg_src_override: str | None = None,
+                 profiles: list | None = None,
+                 stats: dict | None = None) -> list[str]:
     """
     Выполняет «FIX» для указанного аккаунта.
 
     :param acc_id:   ID аккаунта (GUID).
     :param only_config: True → копируется только файл leidianXX.config;
                         False → полный Fix (папка эмулятора + config).
+    :param profiles: уже загруженный профиль (пакетная починка читает его один раз).
+    :param stats:    если передан, в stats["bytes"] пишется объём скопированного config.
     :return: список строк‑логов.
     """
     logs: list[str] = []
     logs.append(f"─── FIX start (only_config={only_config}) — acc_id={acc_id}")
 
     # ───────────────────── поиск InstanceId в профиле ─────────────────────
-    profiles = load_profiles()
+    if profiles is None:
+        profiles = load_profiles()
     inst_id, nickname = None, "???"
     for p in profiles:
         if p.get("Id") == acc_id:
@@ -2600,13 +2216,12 @@ def do_fix_logic(acc_id: str,
 
 
     try:
-        if os.path.exists(dst_cfg):
-            os.chmod(dst_cfg, stat.S_IWRITE)        # снимаем Read‑only
-            os.remove(dst_cfg)
-        shutil.copy2(src_cfg, dst_cfg)
-        logs.append("✅ Config скопирован.")
+        copied, written = copy_if_changed(src_cfg, dst_cfg)
+        if stats is not None:
+            stats["bytes"] = written
+        logs.append("✅ Config скопирован." if copied else "✅ Config уже совпадает с эталоном.")
     except Exception as e:
-        logs.append(f"❗ Ошибка копирования config: {e}")
+        logs.append(f"❗ Ошибка копирования config: {e}")
 
     # ───────────────────── если нужен только config – выходим ─────────────
     if only_config:
@@ -2652,64 +2267,35 @@ def do_fix_logic(acc_id: str,
 # SERVER STATUS (детальная)
 ###########################################
 
-LOCAL_STATUS_LOCK = threading.Lock()
-LOCAL_STATUS_CACHE: dict[str, t.Any] = {}
-
+from host_metrics import HostMetricsSampler, PsutilHostSource
+from server_status import FleetStatusAggregator
 
-def check_local_processes() -> tuple[bool, bool, int]:
-    """Проверяем локальные процессы GnBots и dnplayer без SSH/WMI."""
-
-    gn, dn, dn_count = False, False, 0
-    for proc in psutil.process_iter(['name']):
-        name = (proc.info.get('name') or '').lower()
-        if 'gnbots.exe' in name:
-            gn = True
-        if 'dnplayer.exe' in name:
-            dn = True
-            dn_count += 1
-    return gn, dn, dn_count
+# CPU/RAM/диск и процессы GnBots/dnplayer снимает фоновый сэмплер (раз в
+# HOST_METRICS_INTERVAL секунд, окно HOST_METRICS_WINDOW замеров); статус
+# только читает готовый снимок с min/avg/max по окну.
+HOST_METRICS = HostMetricsSampler(
+    PsutilHostSource(BASE_DIR),     # диск — том, где лежит RSSv7
+    server_name=SERVER_NAME,
+)
 
 
 def collect_local_status() -> dict[str, t.Any]:
-    """Собираем срез по текущей машине."""
+    """Снимаем срез по текущей машине (неблокирующий замер в окно сэмплера)."""
 
-    gn, dn, dn_count = check_local_processes()
-    return {
-        'server': SERVER_NAME,
-        'pingOk': True,
-        'gnOk': gn,
-        'dnOk': dn,
-        'dnCount': dn_count,
-        'cpu': psutil.cpu_percent(interval=0.5),
-        'ram': psutil.virtual_memory().percent,
-        'checked_at': datetime.utcnow().isoformat() + 'Z',
-    }
+    HOST_METRICS.sample()
+    return HOST_METRICS.snapshot()
 
 
 def get_local_status(force: bool = False) -> dict[str, t.Any]:
-    """Достаём кешированный статус (обновляется раз в минуту)."""
-
-    with LOCAL_STATUS_LOCK:
-        ts = LOCAL_STATUS_CACHE.get('ts')
-        needs_refresh = force or not LOCAL_STATUS_CACHE or not ts or (time.time() - ts > 55)
-        if needs_refresh:
-            LOCAL_STATUS_CACHE['data'] = collect_local_status()
-            LOCAL_STATUS_CACHE['ts'] = time.time()
-        return deepcopy(LOCAL_STATUS_CACHE.get('data', {}))
+    """Достаём готовый снимок сэмплера; force — внеочередной замер."""
 
-
-def _server_status_updater(interval: int = 60):
-    while True:
-        try:
-            get_local_status(force=True)
-        except Exception as exc:
-            print(f"[server_status] Ошибка обновления: {exc}")
-        time.sleep(interval)
+    if force:
+        return collect_local_status()
+    return HOST_METRICS.snapshot()
 
 
 def start_server_status_thread():
-    th = threading.Thread(target=_server_status_updater, args=(60,), daemon=True)
-    th.start()
+    HOST_METRICS.start()
 
 
 def _build_self_status_url(base_url: str) -> str:
@@ -2739,16 +2325,21 @@ def fetch_remote_server(server: dict) -> dict[str, t.Any]:
     return {'server': server.get('name'), 'pingOk': False, 'gnOk': False, 'dnOk': False}
 
 
+# Соседи опрашиваются параллельно в фоне (интервал SERVER_STATUS_INTERVAL,
+# пул SERVER_STATUS_WORKERS); /api/serverStatus отдаёт снимок из памяти.
+FLEET_STATUS = FleetStatusAggregator(
+    get_configured_servers,
+    fetch_remote_server,
+    local_name=SERVER_NAME,
+    local_status=get_local_status,
+)
+
+
 def check_all_servers():
-    """Возвращаем статусы по всем серверам на основе self-status."""
+    """Возвращаем статусы по всем серверам на основе self-status (последний снимок)."""
 
-    results = {}
-    for srv in get_configured_servers():
-        if srv.get('name') == SERVER_NAME:
-            results[srv['name']] = get_local_status()
-        else:
-            results[srv['name']] = fetch_remote_server(srv)
-    return results
+    FLEET_STATUS.start()
+    return FLEET_STATUS.snapshot()
 
 
 @app.route("/api/server/self_status")
@@ -2761,23 +2352,9 @@ def api_serverStatus():
     data = check_all_servers()
     return jsonify({'servers': get_configured_servers(), 'status': data})
 
-# Запускаем фоновые замеры self_status
+# Запускаем фоновые замеры self_status и опрос соседей
 start_server_status_thread()
-
-# ───── Вставьте после @app.route("/api/serverStatus") ─────
-
-def _query_task_enabled(task_name: str) -> bool | None:
-    """True/False если задача существует, None если schtasks вернул ошибку."""
-    import subprocess, shlex
-    try:
-        out = subprocess.check_output(
-            ["schtasks", "/Query", "/TN", task_name, "/FO", "LIST", "/V"],
-            stderr=subprocess.STDOUT, timeout=3
-        ).decode("cp866", "ignore").lower()
-        return ("enabled" in out) or ("включена" in out) or ("yes" in out)
-    except subprocess.CalledProcessError:
-        return None                # задачи нет → None
-
+FLEET_STATUS.start()
 
 # ───── crashed.json alias ─────
 @app.route("/api/crashed")
@@ -3139,6 +2716,8 @@ def api_apply_template(acc_id):
 
         with open(PROFILE_PATH, "w", encoding="utf-8") as f:
             json.dump(prof, f, ensure_ascii=False, indent=2)
+        PROFILE_DOCUMENTS.invalidate()
+        INGEST_GENERATION.bump()
 
         try:
             if "sync_account_meta" in globals():
@@ -3179,38 +2758,24 @@ def _normalize_date_str(value: str) -> str:
 
 def load_accounts_meta_full(ids: set[str] | None = None) -> list[dict]:
     """Возвращает список аккаунтов c мета-данными так же, как api_accounts_meta_full."""
-    # 1) читаем профиль (только активные)
+    # 1) профиль из общего кеша (только активные, MenuData уже разобран)
+    doc = PROFILE_DOCUMENTS.get()
     profile = []
-    if os.path.exists(PROFILE_PATH):
-        with open(PROFILE_PATH, "r", encoding="utf-8") as f:
-            for a in json.load(f):
-                if not a.get("Active"):
-                    continue
-                pid = a.get("Id")
-                if pid is None:
-                    continue
-                if ids and str(pid) not in ids:
-                    continue
-
-                # --- E-mail / Pass / IGG из профиля ---
-                email = passwd = igg = ""
-                try:
-                    md = json.loads(a.get("MenuData", "{}"))
-                    cfg = md.get("Config", {})
-                    email  = cfg.get("Email", "") or ""
-                    passwd = cfg.get("Password", "") or ""
-                    igg    = cfg.get("Custom", "") or ""
-                except Exception:
-                    pass
-
-                profile.append({
-                    "id": str(pid),
-                    "name": a.get("Name", ""),
-                    "email": email,
-                    "passwd": passwd,
-                    "igg": igg,
-                    "server": SERVER,
-                })
+    for a in doc.active:
+        pid = a.get("Id")
+        if pid is None:
+            continue
+        if ids and str(pid) not in ids:
+            continue
+        cred = doc.credentials.get(str(pid), {})
+        profile.append({
+            "id": str(pid),
+            "name": a.get("Name", ""),
+            "email": cred.get("email", ""),
+            "passwd": cred.get("passwd", ""),
+            "igg": cred.get("igg", ""),
+            "server": SERVER,
+        })
 
     # 2) account_meta: берём ВСЕ поля, чтобы был фолбэк для учёток
     conn = open_db(RESOURCES_DB)
@@ -3643,55 +3208,16 @@ def api_acc_meta_put():
 
 @app.route("/api/income")
 def api_income():
-    today = date.today()
-
-    # последний день текущего месяца
-    month_end = (today.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
-
-    conn = open_db(RESOURCES_DB)
-    c    = conn.cursor()
-
-    rows = c.execute("SELECT pay_until, tariff_rub FROM account_meta").fetchall()
-
-    # есть ли таблица expenses → рассчитываем общую сумму расходов
-    c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='expenses'")
-    if c.fetchone():
-        exp = c.execute("SELECT COALESCE(SUM(amount),0) FROM expenses").fetchone()[0] or 0
-    else:
-        exp = 0
-
-    conn.close()
-
-    # общий доход (с учётом возможных NULL)
-    total = sum((r[1] or 0) for r in rows)
-
-    # доход, ещё оставшийся до конца текущего месяца
-    left = 0
-    for pay_until, tariff in rows:
-        if not tariff:               # тариф может быть NULL
-            continue
-        try:
-            if pay_until:
-                pu_date = datetime.strptime(pay_until, "%Y-%m-%d").date()
-                if today <= pu_date <= month_end:
-                    left += tariff
-        except ValueError:
-            # неверный формат даты — игнорируем
-            pass
-
-    # вычитаем расходы из обеих сумм
-    return jsonify({"total": total - exp, "left": left})
+    # total — сумма тарифов минус расходы, left — тарифы с оплатой до конца месяца
+    return jsonify(FINANCE_TOTALS.income())
 
 @app.route("/api/expenses", methods=["GET","POST","PUT"])
 def api_expenses():
-    conn = open_db(RESOURCES_DB)
-
-    # гарантируем, что таблица есть ──────────────▼
-    conn.execute("""CREATE TABLE IF NOT EXISTS expenses(
-                      id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      amount INTEGER NOT NULL,
-                      dt TEXT NOT NULL)""")
+    if request.method == "GET":
+        return jsonify({"total": FINANCE_TOTALS.expenses()})
 
+    FINANCE_TOTALS.ensure_schema()   # таблица expenses создаётся один раз
+    conn = open_db(RESOURCES_DB)
     if request.method == "POST":
         amt = int(request.json.get("amount",0))
         if amt <= 0:
@@ -3722,6 +3248,14 @@ def api_task_state():
     return jsonify({"name": tn, "enabled": val})
 
 
+@app.route("/api/taskStates")
+def api_task_states():
+    """Состояния нескольких задач за один запрос: ?names=\\A,\\B (без names — все)."""
+    names = [n for n in (request.args.get("names") or "").split(",") if n.strip()]
+    states = TASK_STATES.get_many(names) if names else TASK_STATES.all_states()
+    return jsonify({"tasks": states, "error": TASK_STATES.last_error})
+
+
 
 # === ДО ВСТАВКИ НАЙДИ БЛОК С ДРУГИМИ @app.route("/api/…") И ВСТАВЬ РЯДОМ ===
 from datetime import datetime, timedelta, timezone
@@ -4475,8 +4009,7 @@ def api_manage_accounts():
     """Возвращаем список всех аккаунтов из PROFILE_PATH"""
     if not os.path.exists(PROFILE_PATH):
         return jsonify([])
-    with open(PROFILE_PATH, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = PROFILE_DOCUMENTS.get().accounts
     # data — массив: [{ "Name":"...", "Id":"...", "Active":..., ...}, ...]
     # Возвращаем как есть
     return jsonify(data)
@@ -4810,11 +4343,9 @@ def api_manage_account_settings(acc_id):
     # Читаем общий JSON
     if not os.path.exists(PROFILE_PATH):
         return jsonify({"error": "profile not found"}), 404
-    with open(PROFILE_PATH, "r", encoding="utf-8") as f:
-        data = json.load(f)
 
     # Находим аккаунт
-    acc = next((a for a in data if a.get("Id") == acc_id), None)
+    acc = PROFILE_DOCUMENTS.get().by_id.get(acc_id)
     if not acc:
         return jsonify({"error": "acc not found"}), 404
 
@@ -5074,6 +4605,7 @@ def api_put_paths():
     # Обновляем адреса серверов (шифруем перед записью)
     global SERVERS
     SERVERS = save_server_links(servers)
+    FLEET_STATUS.refresh_now()
 
     return jsonify({"status": "ok", "paths": CONFIG, "servers": SERVERS})
 
@@ -5210,98 +4742,31 @@ def api_manage_account_update(acc_id):
 
 @app.route("/api/resources")
 def api_resources():
-    acts= load_profiles()
-    active_ids= {a["Id"] for a in acts}
-    inst_map= {a["Id"]: a.get("InstanceId",-1) for a in acts}
-
-    conn= open_db(RESOURCES_DB)
-    c= conn.cursor()
-    rows= c.execute("SELECT id,nickname,food,wood,stone,gold,gems,last_updated FROM resources").fetchall()
-    conn.close()
-
-    today_str= datetime.now().strftime("%Y-%m-%d")
-    conn= open_db(RESOURCES_DB)
-    c= conn.cursor()
-    base_rows= c.execute("""
-      SELECT id,food,wood,stone,gold,gems
-      FROM daily_baseline
-      WHERE baseline_date=?
-    """,(today_str,)).fetchall()
-    base_map={}
-    for br in base_rows:
-        base_map[br[0]]= (br[1],br[2],br[3],br[4],br[5])
-    conn.close()
-
-    totf=0; totw=0; tots=0; totg=0; totm=0
-    accounts=[]
-    for (acc_id,nick,f,w,s,g,m,lastupd) in rows:
-        if acc_id not in active_ids:
-            continue
-        totf+=f; totw+=w; tots+=s; totg+=g; totm+=m
-        bf=bw=bs=bg=bgems=0
-        if acc_id in base_map:
-            bf,bw,bs,bg,bgems= base_map[acc_id]
-        gf= f-bf; gw= w-bw; gs= s-bs; gg= g-bg
-        dayGain= gf+gw+gs+gg
-
-        # Формируем food_view...
-        def format_view(curVal,diffVal):
-            base= shorten_number(curVal)
-            if diffVal==0: 
-                return base
-            sign="+" if diffVal>0 else "-"
-            dif= shorten_number(abs(diffVal))
-            return f"{base}<span class='gainValue'>{sign}{dif}</span>"
-
-        fv= format_view(f, gf)
-        wv= format_view(w, gw)
-        sv= format_view(s, gs)
-        gv= format_view(g, gg)
-        mv= shorten_number(m)
-        #   —‑ тариф из account_meta
-        if 'meta_map' not in globals():
-            connT = open_db(RESOURCES_DB)
-            meta_map = dict(connT.execute("SELECT id, tariff_rub FROM account_meta").fetchall())
-            connT.close()
-        tariff = meta_map.get(acc_id, 0)
-        tariff_view = "0₽" if tariff is None else f"{tariff:,}₽".replace(",", " ")
-
-
-        accounts.append({
-          "id": acc_id,
-          "nickname": nick,
-          "instanceId": inst_map.get(acc_id,-1),
-
-          "food_raw": f,
-          "wood_raw": w,
-          "stone_raw": s,
-          "gold_raw": g,
-        #   "gems_raw": m,
-
-          "food_view": fv,
-          "wood_view": wv,
-          "stone_view": sv,
-          "gold_view": gv,
-        #   "gems_view": mv,
-          "tariff_raw": tariff,
-          "tariff_view": tariff_view,
-
+    """
+    Ресурсы активных аккаунтов. Ответ собирается заново только при смене данных
+    (поколение parse_logs/profiles.json, finance_version, дата); иначе отдаются
+    готовые байты, If-None-Match с тем же ETag → 304.
+    """
+    doc = PROFILE_DOCUMENTS.get()
+    today_str = datetime.now().strftime("%Y-%m-%d")
+    key = (INGEST_GENERATION.value, FINANCE_TOTALS.version(), doc.stamp, doc.ok, today_str)
 
-          "today_gain": shorten_number(dayGain),
-          "last_updated": lastupd
-        })
+    def build() -> bytes:
+        conn = open_db(RESOURCES_DB)
+        try:
+            payload = build_resources_payload(list(doc.active), conn, today_str, shorten_number)
+        finally:
+            conn.close()
+        return app.json.response(payload).get_data()
 
-    return jsonify({
-      "accounts": accounts,
-      "account_count": len(accounts),
-      "totals":{
-        "food": shorten_number(totf),
-        "wood": shorten_number(totw),
-        "stone": shorten_number(tots),
-        "gold": shorten_number(totg),
-        "gems": shorten_number(totm)
-      }
-    })
+    etag, body = RESOURCES_RESPONSE.get(key, build)
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(body, mimetype="application/json")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
 
 @app.route("/api/stop", methods=["POST"])
 def api_stop():
@@ -5524,8 +4989,19 @@ def api_fix_do():
     return jsonify({"ok": True, "logs": logs})
 
 
+# Пакетная починка конфигов: аккаунты параллельно (CONFIG_REPAIR_WORKERS),
+# совпадающие с эталоном файлы не переписываются, ход — через /api/fix/jobs/<id>.
+CONFIG_REPAIR = RepairJobRunner()
+
+
 @app.route("/api/fix/config_batch", methods=["POST"])
 def api_fix_config_batch():
+    """
+    {"acc_ids": [...], "backup_dir"?: "...", "async"?: true}
+
+    async=true → сразу {"job_id"}, прогресс через GET /api/fix/jobs/<job_id>;
+    иначе ждём окончания задачи и отдаём логи в порядке acc_ids (как раньше).
+    """
     data       = request.get_json() or {}
     ids        = data.get("acc_ids", [])
     backup_dir = (data.get("backup_dir") or "").strip()
@@ -5537,14 +5013,42 @@ def api_fix_config_batch():
     if not ids:
         return jsonify({"error": "acc_ids missing or empty"}), 400
 
-    out = []
-    for acc_id in ids:
-        out += do_fix_logic(
+    profiles = load_profiles()
+
+    def _repair(acc_id: str) -> tuple[list[str], int]:
+        stats: dict = {}
+        logs = do_fix_logic(
             acc_id,
             only_config=True,
-            cfg_src_override=cfg_override
+            cfg_src_override=cfg_override,
+            profiles=profiles,
+            stats=stats,
         )
-    return jsonify({"ok": True, "logs": out})
+        return logs, stats.get("bytes", 0)
+
+    job = CONFIG_REPAIR.submit(ids, _repair)
+    if data.get("async"):
+        return jsonify({"ok": True, "job_id": job.id}), 202
+
+    CONFIG_REPAIR.wait(job)
+    return jsonify({"ok": True, "job_id": job.id, "logs": job.logs_in_order()})
+
+
+@app.route("/api/fix/jobs/<job_id>")
+def api_fix_job_status(job_id):
+    """Ход пакетной починки; ?since=N — только новые строки логов начиная с N."""
+    job = CONFIG_REPAIR.get(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    since = request.args.get("since", 0, type=int)
+    return jsonify(job.status(since=max(0, since)))
+
+
+@app.route("/api/fix/jobs/<job_id>/cancel", methods=["POST"])
+def api_fix_job_cancel(job_id):
+    if not CONFIG_REPAIR.cancel(job_id):
+        return jsonify({"error": "job not found"}), 404
+    return jsonify({"ok": True})
 
 
 @app.route("/api/logs")
@@ -5554,20 +5058,20 @@ def api_logs():
         return {"error":"no acc_id"},400
     conn= open_db(LOGS_DB)
     c= conn.cursor()
+    # debug_marker посчитан при записи строки (индекс acc_id, debug_marker, id)
     rows= c.execute("""
-      SELECT dt, raw_line
+      SELECT dt, raw_line, log_level
       FROM cached_logs
       WHERE acc_id=?
-        AND instr(upper(raw_line), '[DBG]') = 0
-        AND instr(upper(raw_line), 'DEBUG|') = 0
+        AND debug_marker = 0
       ORDER BY id DESC
       LIMIT 300
     """,(acc_id,)).fetchall()
     conn.close()
 
     lines=[]
-    for (dt_part, ls) in rows:
-        if _is_debug_log(ls or ""):
+    for (dt_part, ls, level) in rows:
+        if level == "debug":
             continue
         lines.append(transformLogLine(dt_part, ls))
     lines.reverse()
@@ -5607,13 +5111,10 @@ def api_logs_view():
         if not exists:
             return jsonify({"ok": False, "error": "acc_id not found"}), 404
 
-        debug_filter = "" if include_debug else """
-            AND instr(upper(raw_line), '[DBG]') = 0
-            AND instr(upper(raw_line), 'DEBUG|') = 0
-        """
+        debug_filter = "" if include_debug else "AND debug_marker = 0"
         rows = c.execute(
             f"""
-            SELECT dt, raw_line
+            SELECT dt, raw_line, {", ".join(LOG_STORED_COLUMNS)}
             FROM cached_logs
             WHERE acc_id=?
               {debug_filter}
@@ -5634,10 +5135,11 @@ def api_logs_view():
 
     account_name = _resolve_account_name_for_logs(acc_id)
     items = []
-    for dt_part, raw_line in rows:
-        normalized = parse_human_log_line(
-            dt_part or "",
-            raw_line or "",
+    for row in rows:
+        normalized = item_from_stored(
+            row["dt"] or "",
+            row["raw_line"] or "",
+            row,
             account_name=account_name,
             include_debug=include_debug,
             account_id=acc_id,
@@ -5689,8 +5191,7 @@ def api_logs_v2():
             max_where_parts.append("acc_id = ?")
             max_params.append(account_filter)
         if not include_debug:
-            where_parts.append("instr(upper(raw_line), '[DBG]') = 0")
-            where_parts.append("instr(upper(raw_line), 'DEBUG|') = 0")
+            where_parts.append("debug_marker = 0")
 
         max_where = f" WHERE {' AND '.join(max_where_parts)}" if max_where_parts else ""
         max_row = c.execute(
@@ -5715,7 +5216,8 @@ def api_logs_v2():
         params.append(limit)
         rows = c.execute(
             f"""
-            SELECT id, acc_id, nickname, dt, raw_line, source_id, source_file, source_offset
+            SELECT id, acc_id, nickname, dt, raw_line, source_id, source_file, source_offset,
+                   {", ".join(LOG_STORED_COLUMNS)}
             FROM cached_logs
             WHERE {' AND '.join(where_parts)}
             ORDER BY id ASC
@@ -5737,9 +5239,10 @@ def api_logs_v2():
         account_name = str(row["nickname"] or "")
         if not account_name:
             account_name = account_names.setdefault(acc_id, _resolve_account_name_for_logs(acc_id))
-        normalized = parse_human_log_line(
+        normalized = item_from_stored(
             row["dt"] or "",
             row["raw_line"] or "",
+            row,
             account_name=account_name,
             include_debug=include_debug,
             account_id=acc_id,
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# ░░░  account_meta_sync.py  ░░░
+"""
+Сверка account_meta с множеством активных Id профиля (sync_account_meta).
+
+— Активные Id кладутся во временную таблицу одним подготовленным executemany,
+  лишние строки удаляются и недостающие добавляются соединением с ней в одной
+  транзакции: число параметров не зависит от размера фермы (нет упора в лимит
+  переменных SQLite) и текст запросов не меняется — они не перекомпилируются.
+— Если хеш множества Id не изменился с прошлой сверки и число строк в
+  account_meta совпадает, работа пропускается целиком.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from typing import Iterable, Optional, Tuple
+
+_STAGE_DDL = "CREATE TEMP TABLE IF NOT EXISTS sync_active_ids(id TEXT PRIMARY KEY) WITHOUT ROWID"
+_DELETE_STALE = "DELETE FROM account_meta WHERE id NOT IN (SELECT id FROM temp.sync_active_ids)"
+_INSERT_MISSING = """
+    INSERT OR IGNORE INTO account_meta
+    (id,email,passwd,igg,pay_until,tariff_rub,server,tg_tag)
+    SELECT id, '', '', '', '', NULL, '', '' FROM temp.sync_active_ids
+"""
+
+
+def ids_digest(ids: Iterable[str]) -> int:
+    """Хеш множества Id без сортировки; живёт только в памяти процесса."""
+    return hash(frozenset(ids))
+
+
+def reconcile(conn: sqlite3.Connection, active_ids: Iterable[str]) -> Tuple[int, int]:
+    """Приводит account_meta к множеству active_ids. Возвращает (удалено, добавлено)."""
+    with conn:   # одна транзакция: commit / rollback
+        conn.execute(_STAGE_DDL)
+        conn.execute("DELETE FROM temp.sync_active_ids")
+        conn.executemany(
+            "INSERT OR IGNORE INTO temp.sync_active_ids(id) VALUES (?)",
+            ((acc_id,) for acc_id in active_ids),
+        )
+        deleted = conn.execute(_DELETE_STALE).rowcount
+        inserted = conn.execute(_INSERT_MISSING).rowcount
+        conn.execute("DELETE FROM temp.sync_active_ids")
+    return deleted, inserted
+
+
+class AccountMetaSync:
+    """Сверка с пропуском, если множество Id не менялось."""
+
+    def __init__(self, connect):
+        self._connect = connect
+        self._lock = threading.Lock()
+        self._last: Optional[Tuple[int, int]] = None   # (хеш Id, число Id)
+        self.runs = 0
+        self.skips = 0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._last = None
+
+    def sync(self, active_ids: Iterable[str]) -> Optional[Tuple[int, int]]:
+        """(удалено, добавлено) или None, если сверка не понадобилась."""
+        ids = set(active_ids)
+        digest = ids_digest(ids)
+        with self._lock:
+            conn = self._connect()
+            try:
+                if self._last == (digest, len(ids)):
+                    # страховка от записей в обход sync (PUT /api/accounts_meta и т.п.)
+                    rows = conn.execute("SELECT COUNT(*) FROM account_meta").fetchone()[0]
+                    if rows == len(ids):
+                        self.skips += 1
+                        return None
+                result = reconcile(conn, ids)
+            finally:
+                conn.close()
+            self._last = (digest, len(ids))
+            self.runs += 1
+            return result
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# ░░░  config_repair.py  ░░░
+"""
+Пакетная починка конфигов LDPlayer (/api/fix/config_batch) фоновыми задачами.
+
+— Аккаунты пачки обрабатываются параллельно, но не больше CONFIG_REPAIR_WORKERS
+  копирований одновременно (диск не забивается сотней потоков).
+— copy_if_changed не переписывает файл, если его содержимое уже совпадает с
+  источником (сначала размер, затем побайтно), а пишет через tmp + os.replace.
+— Ход задачи (по аккаунтам и строки логов) отдаётся через /api/fix/jobs/<id>,
+  задачу можно отменить: ещё не начатые аккаунты помечаются cancelled.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import stat
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+CONFIG_REPAIR_WORKERS = int(os.getenv("CONFIG_REPAIR_WORKERS", "4"))
+JOB_KEEP_SECONDS = 3600
+_CHUNK = 1024 * 1024
+
+
+def _same_content(a: str, b: str) -> bool:
+    """Побайтное сравнение кусками по 1 МБ с выходом на первом отличии."""
+    with open(a, "rb") as fa, open(b, "rb") as fb:
+        while True:
+            ca, cb = fa.read(_CHUNK), fb.read(_CHUNK)
+            if ca != cb:
+                return False
+            if not ca:
+                return True
+
+
+def copy_if_changed(src: str, dst: str) -> Tuple[bool, int]:
+    """
+    Копирует src → dst, только если содержимое отличается (размер, затем байты).
+    Возвращает (скопирован ли файл, записано байт). Read-only на dst снимается,
+    запись атомарная: временный файл рядом и os.replace.
+    """
+    src_size = os.path.getsize(src)
+    if os.path.isfile(dst) and os.path.getsize(dst) == src_size:
+        if _same_content(src, dst):
+            return False, 0
+
+    os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+    tmp = f"{dst}.tmp-{uuid.uuid4().hex[:8]}"
+    try:
+        shutil.copy2(src, tmp)
+        if os.path.exists(dst):
+            os.chmod(dst, stat.S_IWRITE)        # снимаем Read-only
+        os.replace(tmp, dst)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return True, src_size
+
+
+# ─────────────────────────── Задачи ───────────────────────────
+# repair(acc_id) → (логи, записано байт)
+RepairFn = Callable[[str], Tuple[List[str], int]]
+
+
+class RepairJob:
+    def __init__(self, acc_ids: List[str]):
+        self.id = uuid.uuid4().hex[:12]
+        self.created = time.time()
+        self.finished_at: Optional[float] = None
+        self.finished = threading.Event()
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+        self.accounts: Dict[str, Dict[str, Any]] = {
+            acc_id: {"state": "queued", "logs": [], "bytes": 0} for acc_id in acc_ids
+        }
+        self.order = list(self.accounts)
+        self.log: List[str] = []      # общий поток строк в порядке завершения аккаунтов
+        self.bytes_written = 0
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    def status(self, since: int = 0) -> Dict[str, Any]:
+        with self.lock:
+            counts: Dict[str, int] = {}
+            for item in self.accounts.values():
+                counts[item["state"]] = counts.get(item["state"], 0) + 1
+            return {
+                "job_id": self.id,
+                "done": self.done,
+                "cancelled": self.cancel_event.is_set(),
+                "total": len(self.order),
+                "counts": counts,
+                "accounts": {k: v["state"] for k, v in self.accounts.items()},
+                "bytes_written": self.bytes_written,
+                "elapsed": round((self.finished_at or time.time()) - self.created, 2),
+                "logs": self.log[since:],
+                "next": len(self.log),
+            }
+
+    def logs_in_order(self) -> List[str]:
+        with self.lock:
+            out: List[str] = []
+            for acc_id in self.order:
+                out += self.accounts[acc_id]["logs"]
+            return out
+
+
+class RepairJobRunner:
+    """Общий ограниченный пул для всех пакетных починок и реестр задач."""
+
+    def __init__(self, workers: int = CONFIG_REPAIR_WORKERS):
+        self.workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cfg-repair")
+        self._jobs: Dict[str, RepairJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, acc_ids: List[str], repair: RepairFn) -> RepairJob:
+        job = RepairJob(list(dict.fromkeys(acc_ids)))   # дубликаты id не чиним дважды
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        remaining = [len(job.order)]
+
+        def _run(acc_id: str) -> None:
+            item = job.accounts[acc_id]
+            try:
+                with job.lock:
+                    item["state"] = "cancelled" if job.cancel_event.is_set() else "running"
+                if item["state"] == "cancelled":
+                    return
+                try:
+                    logs, written = repair(acc_id)
+                    state = "done"
+                except Exception as exc:
+                    logs, written, state = [f"❗ {acc_id}: {exc}"], 0, "error"
+                with job.lock:
+                    item.update(logs=logs, bytes=written, state=state)
+                    job.bytes_written += written
+                    job.log.extend(logs)
+            finally:
+                with job.lock:
+                    remaining[0] -= 1
+                    if remaining[0] == 0:
+                        job.finished_at = time.time()
+                        job.finished.set()
+
+        if not job.order:
+            job.finished_at = time.time()
+            job.finished.set()
+        for acc_id in job.order:
+            self._executor.submit(_run, acc_id)
+        return job
+
+    def get(self, job_id: str) -> Optional[RepairJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        if job is None:
+            return False
+        job.cancel_event.set()
+        return True
+
+    def wait(self, job: RepairJob, timeout: Optional[float] = None) -> bool:
+        return job.finished.wait(timeout)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - JOB_KEEP_SECONDS
+        for job_id in [j for j, job in self._jobs.items() if job.done and job.finished_at < cutoff]:
+            del self._jobs[job_id]
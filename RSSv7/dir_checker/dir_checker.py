@@ -5,10 +5,14 @@ import json
 import shutil
 import datetime
 import subprocess
+import queue
+import threading
 from pathlib import Path
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
+from empty_dir_scanner import EmptyDirScanner, FingerprintCache
+
 # ---- корзина (безопаснее)
 try:
     from send2trash import send2trash
@@ -149,52 +153,13 @@ def backup_dirs_empty(dirs: list[tuple[Path, Path | None]], backup_root: Path) -
 
 # ====================== Обход с учётом симлинков ======================
 
-def find_empty_dirs_following_symlinks(root: Path) -> list[Path]:
+def find_empty_dirs_following_symlinks(root: Path, use_cache: bool = False) -> list[Path]:
     """
-    Пост-ордер обход (bottom-up) с переходом по симлинкам и защитой от циклов.
-    Возвращает список реально пустых папок (включая симлинки на пустые папки).
+    Обход с переходом по симлинкам и защитой от циклов (см. empty_dir_scanner).
+    Возвращает список реально пустых папок (включая симлинки на пустые папки),
+    дочерние раньше родительских.
     """
-    empty: list[Path] = []
-    stack: list[tuple[Path, bool]] = []
-    seen_real: set[str] = set()
-
-    if not root.exists() or not root.is_dir():
-        return empty
-
-    stack.append((root, False))
-    while stack:
-        node, visited = stack.pop()
-        try:
-            real = os.path.realpath(node)
-        except Exception:
-            real = str(node)
-
-        if not visited:
-            # защита от циклов (A -> B -> A через симлинки)
-            if real in seen_real:
-                # уже обошли эту реальную директорию
-                continue
-            seen_real.add(real)
-            stack.append((node, True))
-            try:
-                with os.scandir(node) as it:
-                    for entry in it:
-                        # интересуют только директории/симлинки к директориям
-                        try:
-                            if entry.is_dir(follow_symlinks=True):
-                                stack.append((Path(entry.path), False))
-                        except PermissionError:
-                            continue
-            except (PermissionError, FileNotFoundError):
-                continue
-        else:
-            # после детей — проверяем пустоту
-            if is_dir_really_empty(node):
-                empty.append(node)
-
-    # дочерние раньше родительских
-    empty.sort(key=lambda p: len(p.as_posix()), reverse=True)
-    return empty
+    return EmptyDirScanner(cache=FingerprintCache() if use_cache else None).run(root)
 
 # ====================== Вкладка 1: Пустые папки ======================
 
@@ -214,12 +179,18 @@ class TabEmptyDirs(ttk.Frame):
         self.current_root: Path | None = None
         self.all_empty: list[Path] = []
         self.filtered_indices: list[int] = []
+        self.scanner: EmptyDirScanner | None = None
+        self.scan_results: queue.Queue = queue.Queue()
 
         # Верхняя панель
         top = ttk.Frame(self); top.pack(fill="x")
         self.root_label = ttk.Label(top, text="Корневая папка: не выбрана")
         self.root_label.pack(side="left", padx=(0,10))
         ttk.Button(top, text="Сканировать…", command=self.pick_and_scan).pack(side="right")
+        ttk.Button(top, text="Стоп", command=self.stop_scan).pack(side="right", padx=(0,6))
+        self.cache_var = tk.BooleanVar(value=bool(self.settings.get("fingerprint_cache", True)))
+        ttk.Checkbutton(top, text="Кеш отпечатков", variable=self.cache_var,
+                        command=self.toggle_cache).pack(side="right", padx=(0,10))
 
         # Поиск
         search_bar = ttk.Frame(self); search_bar.pack(fill="x", pady=(8,0))
@@ -260,13 +231,67 @@ class TabEmptyDirs(ttk.Frame):
         self.root_label.config(text=f"Корневая папка: {self.current_root}")
         self.scan()
 
+    def toggle_cache(self):
+        self.settings["fingerprint_cache"] = bool(self.cache_var.get())
+        save_settings(self.settings)
+
     def scan(self):
         if not self.current_root or not self.current_root.exists():
             messagebox.showinfo("Сканирование", "Сначала выберите корректную папку.")
             return
-        self.all_empty = find_empty_dirs_following_symlinks(self.current_root)
+        if self.scanner:
+            self.scanner.cancel()
+        # обход в фоне: найденные пачки приходят через очередь и забираются в _poll_scan
+        results: queue.Queue = queue.Queue()
+        scanner = EmptyDirScanner(cache=FingerprintCache() if self.cache_var.get() else None,
+                                  on_found=lambda batch: results.put(("batch", batch)))
+        self.scanner, self.scan_results = scanner, results
+        self.all_empty = []
         self.apply_filter()
-        self.update_selection_count()
+        root = self.current_root
+
+        def worker():
+            try:
+                results.put(("done", scanner.run(root)))
+            except Exception as e:
+                results.put(("error", e))
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.after(100, self._poll_scan, scanner)
+
+    def stop_scan(self):
+        if self.scanner:
+            self.scanner.cancel()
+
+    def _poll_scan(self, scanner: EmptyDirScanner):
+        if scanner is not self.scanner:
+            return  # запущен новый скан
+        query = self.search_var.get().strip().lower()
+        while True:
+            try:
+                kind, payload = self.scan_results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "batch":
+                for p in payload:
+                    self.all_empty.append(p)
+                    s = format_path_with_symlink_mark(p, self.current_root)
+                    if query in s.lower():
+                        self.listbox.insert(tk.END, s)
+                        self.filtered_indices.append(len(self.all_empty) - 1)
+                continue
+            self.scanner = None
+            if kind == "error":
+                messagebox.showerror("Сканирование", str(payload))
+            else:
+                self.all_empty = payload
+                self.apply_filter()
+            return
+        st = scanner.stats
+        self.count_label.config(text=f"Найдено пустых папок: {len(self.filtered_indices)} | "
+                                     f"Выбрано: {len(self.listbox.curselection())} | "
+                                     f"Сканирование… папок: {st.dirs} (из кеша {st.cached})")
+        self.after(100, self._poll_scan, scanner)
 
     def apply_filter(self):
         query = self.search_var.get().strip().lower()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# ░░░  empty_dir_scanner.py  ░░░
+"""
+Поиск пустых папок для dir_checker без подвисания Tk-интерфейса.
+
+— Обход идёт в фоне пулом из DIRCHECK_WORKERS потоков (scandir/stat отпускают
+  GIL). Пустота берётся из числа записей, посчитанных при листинге самой папки,
+  без повторного scandir на каждого кандидата.
+— realpath вызывается только для симлинков/junction: реальный путь обычной
+  подпапки — реальный путь родителя + имя. Ссылки обходятся после прямого
+  дерева, поэтому папка, доступная и напрямую, и по ссылке, попадает в список
+  по прямому пути; циклы отсекаются по реальному пути, как раньше.
+— Необязательный кеш отпечатков (реальный путь, mtime_ns) в SQLite: у папки с
+  тем же mtime не перечитывается листинг, берутся сохранённые число записей и
+  подпапки. Папки, изменённые за DIRCHECK_RACY_SEC до прошлой проверки,
+  перечитываются (mtime мог не успеть смениться).
+— Найденные папки отдаются пачками в on_found прямо во время обхода.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import sqlite3
+import stat
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+DIRCHECK_WORKERS = int(os.getenv("DIRCHECK_WORKERS", "8"))
+DIRCHECK_RACY_SEC = float(os.getenv("DIRCHECK_RACY_SEC", "2"))
+DIRCHECK_CACHE_PATH = Path(os.getenv("DIRCHECK_CACHE_PATH", str(Path.home() / ".clean_empty_dirs_cache.db")))
+
+_REPARSE_POINT = getattr(stat, "FILE_ATTRIBUTE_REPARSE_POINT", 0x400)
+
+# (mtime_ns, checked_ns, число записей, подпапки "D<имя>\0L<имя>…")
+Fingerprint = Tuple[int, int, int, str]
+
+
+def _is_link(entry: os.DirEntry) -> bool:
+    """Симлинк или (на Windows) любая reparse-точка, включая junction."""
+    if entry.is_symlink():
+        return True
+    if os.name == "nt":
+        # на Windows атрибуты уже есть в данных листинга — без лишнего системного вызова
+        return bool(getattr(entry.stat(follow_symlinks=False), "st_file_attributes", 0) & _REPARSE_POINT)
+    return False
+
+
+def _key(real: str) -> str:
+    return os.path.normcase(real)
+
+
+# ─────────────────────────── Кеш отпечатков ───────────────────────────
+class FingerprintCache:
+    """Отпечатки папок в SQLite: грузятся одним запросом на корень, пишутся одной транзакцией."""
+
+    def __init__(self, path: Path = DIRCHECK_CACHE_PATH):
+        self.path = Path(path)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS dir_fingerprints (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                checked_ns INTEGER NOT NULL,
+                entries INTEGER NOT NULL,
+                subdirs TEXT NOT NULL
+            )
+        """)
+        return conn
+
+    @staticmethod
+    def _range(root_key: str) -> Tuple[str, str, str]:
+        sep = os.sep
+        return root_key, root_key.rstrip(sep) + sep, root_key.rstrip(sep) + chr(ord(sep) + 1)
+
+    def load(self, root_key: str) -> Dict[str, Fingerprint]:
+        try:
+            conn = self._connect()
+        except (OSError, sqlite3.Error) as exc:
+            print(f"[dir_checker] Кеш отпечатков недоступен: {exc}")
+            return {}
+        try:
+            rows = conn.execute(
+                "SELECT path, mtime_ns, checked_ns, entries, subdirs FROM dir_fingerprints "
+                "WHERE path = ? OR (path >= ? AND path < ?)", self._range(root_key)
+            ).fetchall()
+        finally:
+            conn.close()
+        return {path: (mtime_ns, checked_ns, entries, subdirs) for path, mtime_ns, checked_ns, entries, subdirs in rows}
+
+    def save(self, root_key: str, changed: Dict[str, Fingerprint], stale: List[str]) -> None:
+        try:
+            conn = self._connect()
+        except (OSError, sqlite3.Error) as exc:
+            print(f"[dir_checker] Кеш отпечатков недоступен: {exc}")
+            return
+        try:
+            with conn:
+                conn.executemany("DELETE FROM dir_fingerprints WHERE path = ?", [(k,) for k in stale])
+                conn.executemany(
+                    "INSERT OR REPLACE INTO dir_fingerprints(path, mtime_ns, checked_ns, entries, subdirs) "
+                    "VALUES(?, ?, ?, ?, ?)",
+                    [(k, *fp) for k, fp in changed.items()],
+                )
+        except sqlite3.Error as exc:
+            print(f"[dir_checker] Не удалось сохранить кеш отпечатков: {exc}")
+        finally:
+            conn.close()
+
+
+# ─────────────────────────── Сканер ───────────────────────────
+@dataclass
+class ScanStats:
+    dirs: int = 0          # обработано папок
+    listed: int = 0        # прочитано через scandir
+    cached: int = 0        # взято из кеша отпечатков
+    links: int = 0         # ссылок на папки (realpath)
+    errors: int = 0        # нет доступа / исчезла во время обхода
+    found: int = 0
+    elapsed: float = 0.0
+    cancelled: bool = False
+
+
+class EmptyDirScanner:
+    """
+    Один проход поиска пустых папок. on_found(list[Path]) вызывается из рабочих
+    потоков — UI должен сам переложить пачку в свой поток (queue + after).
+    """
+
+    def __init__(
+        self,
+        workers: int = DIRCHECK_WORKERS,
+        cache: Optional[FingerprintCache] = None,
+        on_found: Optional[Callable[[List[Path]], None]] = None,
+        batch: int = 200,
+        racy_sec: float = DIRCHECK_RACY_SEC,
+    ):
+        self.workers = max(1, workers)
+        self.cache = cache
+        self.on_found = on_found
+        self.batch = max(1, batch)
+        self.racy_ns = int(racy_sec * 1e9)
+        self.stats = ScanStats()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        # LIFO — обход в глубину: листья (и первые результаты) появляются сразу, очередь не разрастается
+        self._queue: "queue.LifoQueue[Optional[Tuple[str, str, Optional[int]]]]" = queue.LifoQueue()
+        self._seen: set = set()
+        self._links: List[str] = []
+        self._found: List[str] = []
+        self._pending: List[str] = []
+        self._cached: Dict[str, Fingerprint] = {}
+        self._fresh: Dict[str, Fingerprint] = {}
+        self._visited: set = set()
+
+    def cancel(self) -> None:
+        self._stop.set()
+
+    # ── обход ──
+    def _claim(self, real: str) -> bool:
+        key = _key(real)
+        with self._lock:
+            if key in self._seen:
+                return False
+            self._seen.add(key)
+            return True
+
+    def _emit(self, path: Optional[str]) -> None:
+        with self._lock:
+            if path is not None:
+                self._found.append(path)
+                self._pending.append(path)
+                if len(self._pending) < self.batch:
+                    return
+            batch, self._pending = self._pending, []
+        if batch and self.on_found:
+            self.on_found([Path(p) for p in batch])
+
+    def _list(self, path: str, with_mtime: bool) -> Tuple[int, List[Tuple[str, bool, Optional[int]]]]:
+        count = 0
+        subdirs: List[Tuple[str, bool, Optional[int]]] = []
+        with os.scandir(path) as it:
+            for entry in it:
+                count += 1
+                try:
+                    if not entry.is_dir(follow_symlinks=True):
+                        continue
+                    link = _is_link(entry)
+                    # на Windows stat() обычной подпапки берётся из листинга бесплатно
+                    mtime = entry.stat().st_mtime_ns if with_mtime else None
+                except OSError:
+                    continue
+                subdirs.append((entry.name, link, mtime))
+        return count, subdirs
+
+    def _visit(self, path: str, real: str, mtime_ns: Optional[int]) -> None:
+        key = _key(real)
+        subdirs = None
+        use_cache = self.cache is not None
+        try:
+            if use_cache:
+                if mtime_ns is None:
+                    mtime_ns = os.stat(path).st_mtime_ns
+                hit = self._cached.get(key)
+                if hit and hit[0] == mtime_ns and hit[1] - mtime_ns > self.racy_ns:
+                    count, packed = hit[2], hit[3]
+                    subdirs = [(n[1:], n[0] == "L", None) for n in packed.split("\0")] if packed else []
+                    with self._lock:
+                        self.stats.cached += 1
+                        self._visited.add(key)
+            if subdirs is None:
+                checked_ns = time.time_ns()
+                count, subdirs = self._list(path, use_cache)
+                with self._lock:
+                    self.stats.listed += 1
+                    if use_cache:
+                        packed = "\0".join(("L" if link else "D") + name for name, link, _m in subdirs)
+                        self._fresh[key] = (mtime_ns, checked_ns, count, packed)
+                        self._visited.add(key)
+        except OSError:
+            with self._lock:
+                self.stats.errors += 1
+            return
+        finally:
+            with self._lock:
+                self.stats.dirs += 1
+
+        if count == 0:
+            self._emit(path)
+        for name, link, child_mtime in subdirs:
+            child = os.path.join(path, name)
+            if link:
+                with self._lock:
+                    self._links.append(child)
+                continue
+            child_real = os.path.join(real, name)
+            if self._claim(child_real):
+                self._queue.put((child, child_real, child_mtime))
+
+    def _worker(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if not self._stop.is_set():
+                    self._visit(*item)
+            except Exception as exc:
+                print(f"[dir_checker] Ошибка обхода {item[0] if item else ''}: {exc}")
+            finally:
+                self._queue.task_done()
+
+    def run(self, root: Path) -> List[Path]:
+        """Пустые папки под root (дочерние раньше родительских), включая ссылки на пустые папки."""
+        t0 = time.perf_counter()
+        root_s = os.fspath(root)
+        if not os.path.isdir(root_s):
+            return []
+        root_real = os.path.realpath(root_s)
+        root_key = _key(root_real)
+        if self.cache is not None:
+            self._cached = self.cache.load(root_key)
+
+        threads = [threading.Thread(target=self._worker, daemon=True, name=f"empty-dirs-{i}")
+                   for i in range(self.workers)]
+        for t in threads:
+            t.start()
+        self._claim(root_real)
+        self._queue.put((root_s, root_real, None))
+        while True:
+            self._queue.join()
+            with self._lock:
+                links, self._links = sorted(self._links), []
+            if not links or self._stop.is_set():
+                break
+            # ссылки — после прямого дерева, чтобы папка попала в список по прямому пути
+            for link in links:
+                try:
+                    real = os.path.realpath(link)
+                except OSError:
+                    real = link
+                self.stats.links += 1
+                if self._claim(real):
+                    self._queue.put((link, real, None))
+        for _ in threads:
+            self._queue.put(None)
+        for t in threads:
+            t.join()
+        self._emit(None)
+
+        self.stats.cancelled = self._stop.is_set()
+        if self.cache is not None and not self.stats.cancelled:
+            _root, lo, hi = FingerprintCache._range(root_key)
+            stale = [k for k in self._cached if k not in self._visited and (k == root_key or lo <= k < hi)]
+            self.cache.save(root_key, self._fresh, stale)
+
+        empty = [Path(p) for p in self._found]
+        empty.sort(key=lambda p: len(p.as_posix()), reverse=True)
+        self.stats.found = len(empty)
+        self.stats.elapsed = time.perf_counter() - t0
+        return empty
+
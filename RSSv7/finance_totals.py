@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# ░░░  finance_totals.py  ░░░
+"""
+Доход (/api/income) и расходы (/api/expenses) агрегатами SQLite с кешем.
+
+— account_meta.pay_until_iso — нормализованная дата оплаты: триггеры кладут туда
+  pay_until, если это корректная дата ровно в виде YYYY-MM-DD, иначе NULL.
+  «Осталось до конца месяца» считается SUM по индексу (pay_until_iso, tariff_rub).
+  Редкие непустые даты в другом виде (например 2025-6-1) досчитываются в Python
+  тем же strptime, что и раньше, так что результат совпадает с прежней логикой.
+— finance_version.v увеличивается триггерами на любую запись в account_meta и
+  expenses (из любого процесса); кеш сверяется с ним и с текущей датой.
+— Схема (expenses, колонка, индекс, триггеры) создаётся один раз при старте.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+_ISO_OK = "(date({v}) = {v})"
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS expenses(
+         id INTEGER PRIMARY KEY AUTOINCREMENT,
+         amount INTEGER NOT NULL,
+         dt TEXT NOT NULL)""",
+    """CREATE TABLE IF NOT EXISTS finance_version(
+         id INTEGER PRIMARY KEY CHECK (id = 1),
+         v  INTEGER NOT NULL)""",
+    "INSERT OR IGNORE INTO finance_version(id, v) VALUES (1, 0)",
+    """CREATE TRIGGER IF NOT EXISTS trg_account_meta_pay_iso_ins
+       AFTER INSERT ON account_meta BEGIN
+         UPDATE account_meta
+            SET pay_until_iso = CASE WHEN {ok} THEN new.pay_until END
+          WHERE id = new.id;
+       END""".format(ok=_ISO_OK.format(v="new.pay_until")),
+    """CREATE TRIGGER IF NOT EXISTS trg_account_meta_pay_iso_upd
+       AFTER UPDATE OF pay_until ON account_meta BEGIN
+         UPDATE account_meta
+            SET pay_until_iso = CASE WHEN {ok} THEN new.pay_until END
+          WHERE id = new.id;
+       END""".format(ok=_ISO_OK.format(v="new.pay_until")),
+    "CREATE INDEX IF NOT EXISTS idx_account_meta_pay_iso ON account_meta(pay_until_iso, tariff_rub)",
+]
+for _table in ("account_meta", "expenses"):
+    for _op in ("INSERT", "UPDATE", "DELETE"):
+        _SCHEMA.append(
+            f"""CREATE TRIGGER IF NOT EXISTS trg_{_table}_finance_{_op.lower()}
+                AFTER {_op} ON {_table} BEGIN
+                  UPDATE finance_version SET v = v + 1 WHERE id = 1;
+                END"""
+        )
+
+
+def ensure_finance_schema(conn: sqlite3.Connection) -> None:
+    """Колонка pay_until_iso, индексы, триггеры, expenses. Идемпотентно."""
+    cols = {row[1] for row in conn.execute("PRAGMA table_info(account_meta)").fetchall()}
+    if not cols:
+        raise RuntimeError("account_meta is missing — call init_accounts_db() first")
+    if "pay_until_iso" not in cols:
+        conn.execute("ALTER TABLE account_meta ADD COLUMN pay_until_iso TEXT")
+    for stmt in _SCHEMA:
+        conn.execute(stmt)
+    # бэкфилл: строки, записанные до появления колонки/триггеров
+    conn.execute(
+        f"""UPDATE account_meta
+               SET pay_until_iso = CASE WHEN {_ISO_OK.format(v='pay_until')} THEN pay_until END
+             WHERE pay_until_iso IS NOT (CASE WHEN {_ISO_OK.format(v='pay_until')} THEN pay_until END)"""
+    )
+    conn.commit()
+
+
+def month_end_for(today: date) -> date:
+    return (today.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+
+def _strptime_left(rows, today: date, month_end: date) -> int:
+    left = 0
+    for pay_until, tariff in rows:
+        if not tariff:
+            continue
+        try:
+            if pay_until:
+                pu_date = datetime.strptime(pay_until, "%Y-%m-%d").date()
+                if today <= pu_date <= month_end:
+                    left += tariff
+        except ValueError:
+            pass
+    return left
+
+
+def compute_income(conn: sqlite3.Connection, today: date) -> Dict[str, Any]:
+    month_end = month_end_for(today)
+    total = conn.execute("SELECT COALESCE(SUM(tariff_rub), 0) FROM account_meta").fetchone()[0] or 0
+    left = conn.execute(
+        """SELECT COALESCE(SUM(tariff_rub), 0) FROM account_meta
+            WHERE pay_until_iso BETWEEN ? AND ? AND tariff_rub""",
+        (today.isoformat(), month_end.isoformat()),
+    ).fetchone()[0] or 0
+    # нестандартные, но, возможно, валидные для strptime даты (2025-6-1 и т.п.)
+    odd = conn.execute(
+        """SELECT pay_until, tariff_rub FROM account_meta
+            WHERE pay_until_iso IS NULL AND pay_until IS NOT NULL AND pay_until <> ''"""
+    ).fetchall()
+    left += _strptime_left([(r[0], r[1]) for r in odd], today, month_end)
+    exp = compute_expenses(conn)
+    return {"total": total - exp, "left": left}
+
+
+def compute_expenses(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT COALESCE(SUM(amount), 0) FROM expenses").fetchone()[0] or 0
+
+
+class FinanceTotals:
+    """Кеш доходов/расходов, сверяемый с finance_version и текущей датой."""
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection]):
+        self._connect = connect
+        self._lock = threading.Lock()
+        self._schema_ready = False
+        self._cache: Dict[str, Tuple[Tuple[int, str], Any]] = {}
+        self.computed = 0
+
+    def ensure_schema(self) -> None:
+        if self._schema_ready:
+            return
+        with self._lock:
+            if self._schema_ready:
+                return
+            conn = self._connect()
+            try:
+                ensure_finance_schema(conn)
+            finally:
+                conn.close()
+            self._schema_ready = True
+
+    def _cached(self, name: str, today: date, fn) -> Any:
+        self.ensure_schema()
+        conn = self._connect()
+        try:
+            version = conn.execute("SELECT v FROM finance_version WHERE id = 1").fetchone()[0]
+            key = (version, today.isoformat())
+            with self._lock:
+                hit = self._cache.get(name)
+                if hit and hit[0] == key:
+                    return hit[1]
+            value = fn(conn)
+            with self._lock:
+                self._cache[name] = (key, value)
+                self.computed += 1
+            return value
+        finally:
+            conn.close()
+
+    def version(self) -> int:
+        """Текущее finance_version: меняется при любой записи в account_meta/expenses."""
+        self.ensure_schema()
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT v FROM finance_version WHERE id = 1").fetchone()[0]
+        finally:
+            conn.close()
+
+    def income(self, today: Optional[date] = None) -> Dict[str, Any]:
+        today = today or date.today()
+        return dict(self._cached("income", today, lambda c: compute_income(c, today)))
+
+    def expenses(self) -> int:
+        return self._cached("expenses", date.today(), compute_expenses)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# ░░░  host_metrics.py  ░░░
+"""
+Фоновый сэмплер метрик хоста для /api/server/self_status.
+
+— Поток раз в HOST_METRICS_INTERVAL секунд снимает CPU (неблокирующая дельта
+  psutil.cpu_percent(None) между сэмплами), RAM, диск и наличие процессов
+  GnBots/dnplayer; хранит скользящее окно из HOST_METRICS_WINDOW замеров.
+— Запрос статуса только читает готовый снимок с min/avg/max по окну и больше
+  не ждёт cpu_percent(interval=0.5) и обход процессов.
+— Источник метрик подменяемый (cpu_percent/ram_percent/disk_percent/process_names):
+  тесты подставляют фейковый без Windows/LDPlayer.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+HOST_METRICS_INTERVAL = float(os.getenv("HOST_METRICS_INTERVAL", "5"))
+HOST_METRICS_WINDOW = int(os.getenv("HOST_METRICS_WINDOW", "60"))   # 60 × 5 с = 5 минут
+
+GN_PROCESS = "gnbots.exe"
+DN_PROCESS = "dnplayer.exe"
+
+
+# ─────────────────────────── Источники ───────────────────────────
+class PsutilHostSource:
+    """Реальные метрики через psutil; все вызовы неблокирующие."""
+
+    def __init__(self, disk_path: Optional[str] = None):
+        """disk_path — любой путь на томе, заполнение которого нужно отслеживать."""
+        import psutil
+
+        self.psutil = psutil
+        self.disk_path = disk_path or os.path.abspath(os.sep)
+        psutil.cpu_percent(interval=None)  # первый вызов задаёт точку отсчёта дельты
+
+    def cpu_percent(self) -> float:
+        return self.psutil.cpu_percent(interval=None)
+
+    def ram_percent(self) -> float:
+        return self.psutil.virtual_memory().percent
+
+    def disk_percent(self) -> float:
+        return self.psutil.disk_usage(self.disk_path).percent
+
+    def process_names(self) -> Iterable[str]:
+        for proc in self.psutil.process_iter(["name"]):
+            yield (proc.info.get("name") or "").lower()
+
+
+# ─────────────────────────── Сэмплер ───────────────────────────
+def _window_stats(values) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"min": None, "avg": None, "max": None}
+    return {
+        "min": round(min(values), 1),
+        "avg": round(sum(values) / len(values), 1),
+        "max": round(max(values), 1),
+    }
+
+
+class HostMetricsSampler:
+    """Скользящее окно метрик хоста и готовый снимок для статуса."""
+
+    def __init__(
+        self,
+        source=None,
+        server_name: str = "",
+        interval: float = HOST_METRICS_INTERVAL,
+        window: int = HOST_METRICS_WINDOW,
+    ):
+        self.source = source if source is not None else PsutilHostSource()
+        self.server_name = server_name
+        self.interval = interval
+        self._samples: deque = deque(maxlen=max(1, window))
+        self._lock = threading.Lock()
+        self._snapshot: Dict[str, Any] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self) -> Dict[str, Any]:
+        """Один замер: дельта CPU с прошлого сэмпла, RAM, диск, процессы."""
+        gn, dn_count = False, 0
+        for name in self.source.process_names():
+            if GN_PROCESS in name:
+                gn = True
+            if DN_PROCESS in name:
+                dn_count += 1
+        item = {
+            "ts": time.time(),
+            "cpu": self.source.cpu_percent(),
+            "ram": self.source.ram_percent(),
+            "disk": self.source.disk_percent(),
+            "gnOk": gn,
+            "dnCount": dn_count,
+        }
+        with self._lock:
+            self._samples.append(item)
+            self._snapshot = self._build_snapshot(item)
+        return item
+
+    def _build_snapshot(self, last: Dict[str, Any]) -> Dict[str, Any]:
+        samples = list(self._samples)
+        return {
+            "server": self.server_name,
+            "pingOk": True,
+            "gnOk": last["gnOk"],
+            "dnOk": last["dnCount"] > 0,
+            "dnCount": last["dnCount"],
+            "cpu": last["cpu"],
+            "ram": last["ram"],
+            "disk": last["disk"],
+            "window": {
+                "samples": len(samples),
+                "seconds": round(last["ts"] - samples[0]["ts"], 1),
+                "cpu": _window_stats([s["cpu"] for s in samples]),
+                "ram": _window_stats([s["ram"] for s in samples]),
+                "disk": _window_stats([s["disk"] for s in samples]),
+                "gnUp": round(sum(1 for s in samples if s["gnOk"]) / len(samples), 2),
+            },
+            "checked_at": datetime.utcfromtimestamp(last["ts"]).isoformat() + "Z",
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Готовый снимок; до первого замера делает его синхронно (без ожиданий)."""
+        with self._lock:
+            snap = self._snapshot
+        if not snap:
+            self.sample()
+            with self._lock:
+                snap = self._snapshot
+        return {**snap, "window": {**snap["window"]}}
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as exc:
+                print(f"[host_metrics] Ошибка замера: {exc}")
+            self._stop.wait(self.interval)
+
+    def start(self) -> "HostMetricsSampler":
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return self
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, daemon=True, name="host-metrics")
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
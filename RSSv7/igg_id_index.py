@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# ░░░  igg_id_index.py  ░░░
+"""
+Постоянный инкрементальный индекс IGG ID (List IDs) из логов GnBots для IGG_ID_PARSER.
+
+— Для каждого лога хранится, до какого байта он разобран, и его «личность»:
+  (st_dev, st_ino) и sha1 первых IGG_HEAD_BYTES байт (SQLite, igg_id_index.db).
+  Следующий запуск читает только дописанное; файл с прежними size/mtime не
+  открывается вовсе.
+— Ротация и усечение: файл короче сохранённой отметки, с другим inode или с
+  другой «головой» разбирается с нуля. Лог, переименованный при ротации
+  (тот же inode и голова под новым именем), продолжается с прежней отметки.
+— Найденные пары account_id → list_id сливаются в таблицу igg_ids в порядке
+  первого появления; удаление старых логов их не стирает. Ник подставляется
+  при выгрузке, поэтому правка профиля не требует перечитывать логи.
+— Дописанное читается буферами по IGG_SCAN_BUFFER байт; строки-кандидаты
+  ищутся bytes.find по «List IDs» в C, регэксп применяется только к ним.
+  Отметка ставится на конец последней полной строки: недописанная строка
+  разбирается, но будет прочитана ещё раз, когда её допишут.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import sqlite3
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+BUF_SIZE = int(os.getenv("IGG_SCAN_BUFFER", 1 << 20))
+HEAD_BYTES = int(os.getenv("IGG_HEAD_BYTES", 256))
+
+MARKER = b"List IDs"
+# та же регулярка, что в IGG_ID_PARSER, но по байтам одной строки; после «:» — пробелы без перевода строки
+LIST_ID_RE = re.compile(rb"\|([0-9a-f]{8,32})\|.*List IDs:.*:[^\S\n]*(\d+)", re.IGNORECASE)
+
+
+def find_list_ids(buf: bytes, start: int = 0, end: Optional[int] = None) -> List[Tuple[str, str]]:
+    """[(account_id, list_id)] из строк buf[start:end], содержащих «List IDs» (регистр как в исходном фильтре)."""
+    end = len(buf) if end is None else end
+    out = []
+    pos = buf.find(MARKER, start, end)
+    while pos != -1:
+        line_start = buf.rfind(b"\n", start, pos) + 1 or start
+        line_end = buf.find(b"\n", pos, end)
+        if line_end == -1:
+            line_end = end
+        m = LIST_ID_RE.search(buf, line_start, line_end)
+        if m:
+            out.append((m.group(1).decode("ascii").lower(), m.group(2).decode("ascii")))
+        pos = buf.find(MARKER, line_end, end)
+    return out
+
+
+class IggIdIndex:
+    """Пары account_id → list_id из логов с разбором только дописанных байт."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        # без db_path индекс живёт в памяти: каждый запуск — полный разбор, как раньше
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path or ":memory:")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS igg_files(
+              path      TEXT PRIMARY KEY,
+              dev       INTEGER,
+              ino       INTEGER,
+              head_len  INTEGER,
+              head_hash TEXT,
+              offset    INTEGER,
+              size      INTEGER,
+              mtime_ns  INTEGER);
+            CREATE TABLE IF NOT EXISTS igg_ids(
+              account_id TEXT NOT NULL,
+              list_id    TEXT NOT NULL,
+              first_seen TEXT,
+              source     TEXT,
+              PRIMARY KEY (account_id, list_id));
+        """)
+        # счётчики последнего update (для логов и бенчмарка)
+        self.stats = {"files": 0, "skipped": 0, "reset": 0, "moved": 0, "bytes": 0, "found": 0}
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # ─────────── личность файла ───────────
+    @staticmethod
+    def _head(f, length: int) -> Tuple[int, str]:
+        f.seek(0)
+        head = f.read(length)
+        return len(head), hashlib.sha1(head).hexdigest()
+
+    def _resume_offset(self, f, st: os.stat_result, old: Optional[tuple]) -> Tuple[int, bool]:
+        """Отметка, с которой продолжать (0 — разбирать заново), и признак «это ротация/усечение»."""
+        if old is None:
+            return 0, False
+        _, dev, ino, head_len, head_hash, offset, _, _ = old
+        if ino and st.st_ino and (dev, ino) != (st.st_dev, st.st_ino):
+            return 0, True
+        if st.st_size < offset or st.st_size < head_len or self._head(f, head_len)[1] != head_hash:
+            return 0, True
+        return offset, False
+
+    # ─────────── разбор ───────────
+    def _parse_from(self, f, offset: int, size: int) -> Tuple[int, List[Tuple[str, str]]]:
+        """Разбирает [offset, size); возвращает конец последней полной строки и найденные пары."""
+        found: List[Tuple[str, str]] = []
+        f.seek(offset)
+        pos, carry = offset, b""
+        while pos < size:
+            chunk = f.read(min(BUF_SIZE, size - pos))
+            if not chunk:
+                break
+            pos += len(chunk)
+            buf = carry + chunk if carry else chunk
+            cut = buf.rfind(b"\n") + 1
+            if cut:
+                found += find_list_ids(buf, 0, cut)
+                carry = buf[cut:]
+            else:
+                carry = buf
+        self.stats["bytes"] += pos - offset
+        if carry:
+            found += find_list_ids(carry)      # хвост без \n — в результат, но не в отметку
+        return pos - len(carry), found
+
+    def _update_file(self, path: str, known: Dict[str, tuple], by_ident: Dict[Tuple[int, int], tuple],
+                     now: str) -> None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        old = known.get(path)
+        if old is not None and (old[6], old[7]) == (st.st_size, st.st_mtime_ns) \
+                and (not old[2] or old[2] == st.st_ino):
+            self.stats["skipped"] += 1
+            return
+        moved = None
+        if (old is None or old[2] != st.st_ino) and st.st_ino:
+            moved = by_ident.get((st.st_dev, st.st_ino))
+            if moved is not None and moved[0] == path:
+                moved = None
+        self.stats["files"] += 1
+        try:
+            with open(path, "rb") as f:
+                offset, reset = self._resume_offset(f, st, moved if moved is not None else old)
+                if moved is not None and not reset:
+                    self.stats["moved"] += 1
+                elif reset:
+                    self.stats["reset"] += 1
+                end, found = self._parse_from(f, offset, st.st_size)
+                head_len, head_hash = self._head(f, HEAD_BYTES)
+        except OSError as exc:
+            print(f"[igg_id_index] Ошибка при чтении {path}: {exc}")
+            return
+        self.stats["found"] += len(found)
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO igg_ids(account_id, list_id, first_seen, source) VALUES (?, ?, ?, ?)",
+                [(acct, list_id, now, os.path.basename(path)) for acct, list_id in found],
+            )
+            row = (path, st.st_dev, st.st_ino, head_len, head_hash, end, st.st_size, st.st_mtime_ns)
+            self.conn.execute("INSERT OR REPLACE INTO igg_files VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row)
+        known[path] = row
+
+    def update(self, paths: Iterable[str]) -> None:
+        """Дочитывает paths (повторы игнорируются); записи пропавших файлов удаляются, пары остаются."""
+        self.stats = dict.fromkeys(self.stats, 0)
+        known = {row[0]: row for row in self.conn.execute("SELECT * FROM igg_files")}
+        by_ident = {(row[1], row[2]): row for row in known.values() if row[2]}
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        seen = set()
+        for path in paths:
+            if path in seen:
+                continue
+            seen.add(path)
+            self._update_file(path, known, by_ident, now)
+        gone = [(p,) for p in known if p not in seen]
+        if gone:
+            with self.conn:
+                self.conn.executemany("DELETE FROM igg_files WHERE path = ?", gone)
+
+    def pairs(self) -> List[Tuple[str, str]]:
+        """Все известные (account_id, list_id) в порядке первого появления."""
+        return self.conn.execute("SELECT account_id, list_id FROM igg_ids ORDER BY rowid").fetchall()
+
@@ -5,8 +5,14 @@
 THRESH_HOURS часов с момента last_updated. Пишет два JSON и шлёт Telegram.
 
 — Использует ту же БД (resources_web.db), что и RssCounterWeb.
-— Аккаунты с "Active": false (в PROFILE) игнорируются.
-— Дедупликация уведомлений: шлём только изменения состава списка.
+— Нарушители считаются одним SQL-запросом: resources ⋈ daily_baseline за
+  сегодня по первичному ключу, отбор по epoch(last_updated) через индекс по
+  выражению; в Python разбираются только найденные строки.
+— Аккаунты с "Active": false (в PROFILE) игнорируются; профиль читается через
+  общий ProfileCache и перечитывается только при изменении файла.
+— Дедупликация уведомлений: шлём только изменения состава списка. Кого слали
+  в прошлый раз — таблица inactive_alert_state в той же БД (прежний
+  inactive_state.json читается один раз при её создании).
 """
 
 from __future__ import annotations
@@ -17,12 +23,14 @@ import os
 import sqlite3
 import sys
 import time
-from datetime import datetime, timedelta, timezone
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Iterable, List, Optional, Set, Tuple
 
 import requests
 
+from profile_cache import ProfileCache
+
 # Общая загрузка /.env из корня репозитория (без перезаписи системных env).
 def _load_root_env() -> None:
     current_file = Path(__file__).resolve()
@@ -47,7 +55,8 @@ CONFIG_PATH  = BASE_DIR / "config.json"
 
 ALERT_SHORT = BASE_DIR / "inactive15.json"       # лёгкий список для фронта
 ALERT_FULL  = BASE_DIR / "inactive_alerts.json"  # подробности для админа
-STATE_FILE  = BASE_DIR / "inactive_state.json"   # кого слали в прошлый раз
+STATE_FILE  = BASE_DIR / "inactive_state.json"   # прежнее состояние, только для миграции
+STATE_TABLE = "inactive_alert_state"              # кого слали в прошлый раз
 
 TAG_TEXT = "0gain🍽️"
 
@@ -95,11 +104,14 @@ def _health_check() -> bool:
     return ok
 
 def _tz_aware_from_iso(s: str) -> datetime | None:
-    """Безопасный парс ISO-строки. Если tz отсутствует — считаем локальную зону."""
+    """
+    Безопасный парс ISO-строки. Если tz отсутствует — считаем локальную зону
+    со смещением на дату самой строки (через переход на летнее время тоже).
+    """
     try:
         dt = datetime.fromisoformat(s)
         if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=datetime.now().astimezone().tzinfo or timezone.utc)
+            dt = dt.astimezone()
         return dt
     except Exception:
         return None
@@ -114,42 +126,148 @@ def _telegram(text: str) -> None:
     except Exception as e:
         print("[telegram] error:", e, flush=True)
 
-def _load_active_ids_from_profile() -> set | None:
-    """Читаем PROFILE_PATH из config.json и набираем Id активных аккаунтов."""
+def _profile_path() -> str:
+    """PROFILE_PATH из config.json (пустая строка, если конфиг не читается)."""
     try:
         cfg = json.loads(CONFIG_PATH.read_text(encoding="utf-8"))
-        prof_path = Path(cfg.get("PROFILE_PATH", ""))
-        if not prof_path.is_file():
-            return None
-        prof = json.loads(prof_path.read_text(encoding="utf-8"))
-        return {x.get("Id") for x in prof if x and x.get("Active")}
+        return str(cfg.get("PROFILE_PATH", "") or "")
     except Exception:
+        return ""
+
+PROFILE_DOCUMENTS = ProfileCache(_profile_path)
+_ACTIVE_IDS: Tuple[Optional[list], Optional[set]] = (None, None)
+
+def _load_active_ids_from_profile() -> set | None:
+    """
+    Id активных аккаунтов из общего кеша профиля. Множество пересобирается
+    только при перечитывании файла; None — профиль ещё ни разу не прочитан.
+    """
+    global _ACTIVE_IDS
+    doc = PROFILE_DOCUMENTS.get()
+    if not doc.ok and not doc.accounts:
         return None
+    accounts, ids = _ACTIVE_IDS
+    if accounts is not doc.accounts:
+        ids = {x.get("Id") for x in doc.active if x}
+        _ACTIVE_IDS = (doc.accounts, ids)
+    return ids
 
 # ─────────────────────────── Работа с БД ───────────────────────────
-def _query_resources() -> List[Tuple[str, str, int, int, int, int, str]]:
+# Unix-время строки ISO; то же выражение лежит в индексе idx_resources_last_epoch,
+# поэтому отбор по диапазону идёт поиском по индексу, а не разбором каждой строки.
+_EPOCH_SQL = "((julianday({col}) - 2440587.5) * 86400.0)"
+# Строка с явным смещением (+03:00 / Z). Строки без зоны SQLite считает UTC,
+# а они записаны в локальном времени, смещение которого зависит от даты строки
+# (летнее/зимнее время). Такие строки редки: SQL отдаёт их с ts = NULL из окна,
+# расширенного на наибольшее смещение зоны, а точное время считает Python.
+_HAS_TZ_SQL = "(length({col}) > 19 AND (substr({col}, -6, 1) IN ('+', '-') OR substr({col}, -1) IN ('Z', 'z')))"
+_MAX_UTC_OFFSET = 14 * 3600
+
+_OFFENDERS_SQL = f"""
+    SELECT r.id, r.nickname, r.last_updated,
+           CASE WHEN {_HAS_TZ_SQL.format(col="r.last_updated")}
+                THEN {_EPOCH_SQL.format(col="r.last_updated")} END AS ts,
+           (r.food - b.food) + (r.wood - b.wood) + (r.stone - b.stone) + (r.gold - b.gold) AS day_gain
+    FROM resources AS r
+    LEFT JOIN daily_baseline AS b ON b.id = r.id AND b.baseline_date = :today
+    WHERE {_EPOCH_SQL.format(col="r.last_updated")} BETWEEN :oldest - :slack AND :newest + :slack
+      AND (ts IS NULL OR ts BETWEEN :oldest AND :newest)
+      AND (day_gain IS NULL OR day_gain = 0)
+"""
+
+_PREPARED_DBS: Set[str] = set()
+
+def _connect(db_path: Path = RESOURCES_DB) -> sqlite3.Connection:
+    """Одно соединение на проход; индекс и таблица состояния создаются один раз на процесс."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    key = str(db_path)
+    if key not in _PREPARED_DBS:
+        fresh = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (STATE_TABLE,)
+        ).fetchone() is None
+        with conn:
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_resources_last_epoch "
+                f"ON resources({_EPOCH_SQL.format(col='last_updated')})"
+            )
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {STATE_TABLE} (id TEXT PRIMARY KEY, since REAL NOT NULL)")
+            if fresh:
+                conn.executemany(
+                    f"INSERT OR IGNORE INTO {STATE_TABLE}(id, since) VALUES(?, ?)",
+                    [(pid, time.time()) for pid in _legacy_state_ids()],
+                )
+        _PREPARED_DBS.add(key)
+    return conn
+
+def _legacy_state_ids() -> List[str]:
+    """Id из прежнего inactive_state.json — переносятся в SQLite при создании таблицы."""
+    try:
+        if STATE_FILE.is_file():
+            return [str(x) for x in json.loads(STATE_FILE.read_text(encoding="utf-8")).get("ids", [])]
+    except Exception as e:
+        print("[state-migrate] error:", e)
+    return []
+
+def find_offenders(
+    conn: sqlite3.Connection,
+    threshold_hrs: float = THRESH_HOURS,
+    max_last_seen_hrs: float = MAX_LAST_SEEN_HOURS,
+    active_ids: Optional[set] = None,
+    now: Optional[float] = None,
+) -> List[dict]:
     """
-    SELECT id, nickname, food, wood, stone, gold, last_updated FROM resources
-    Возвращаем список кортежей.
+    Аккаунты с dayGain==0 (или без baseline за сегодня), у которых last_updated
+    в окне [now - max_last_seen_hrs; now - threshold_hrs].
     """
-    conn = sqlite3.connect(RESOURCES_DB)
-    rows = conn.execute(
-        "SELECT id, nickname, food, wood, stone, gold, last_updated FROM resources"
-    ).fetchall()
-    conn.close()
-    return rows
-
-def _load_today_baseline() -> Dict[str, Tuple[int, int, int, int]]:
-    """baseline за сегодня: id -> (bf, bw, bs, bg). gems не участвуют в dayGain."""
-    today = datetime.now().strftime("%Y-%m-%d")
-    conn = sqlite3.connect(RESOURCES_DB)
-    rows = conn.execute("""
-        SELECT id, food, wood, stone, gold
-        FROM daily_baseline
-        WHERE baseline_date=?
-    """, (today,)).fetchall()
-    conn.close()
-    return {rid: (bf, bw, bs, bg) for (rid, bf, bw, bs, bg) in rows}
+    # dayGain считается по food+wood+stone+gold. Если baseline за сегодня
+    # не успел создаться, всё равно не скрываем критичный простой: stale-last_updated
+    # важнее точной оценки дневного прироста.
+    now = time.time() if now is None else now
+    oldest = now - max_last_seen_hrs * 3600
+    newest = now - threshold_hrs * 3600
+    rows = conn.execute(_OFFENDERS_SQL, {
+        "today": datetime.fromtimestamp(now).strftime("%Y-%m-%d"),
+        "oldest": oldest,
+        "newest": newest,
+        "slack": _MAX_UTC_OFFSET,
+    }).fetchall()
+
+    offenders: List[dict] = []
+    for acc_id, nick, last, ts, day_gain in rows:
+        if active_ids is not None and acc_id not in active_ids:
+            continue
+        dt = _tz_aware_from_iso(last)
+        if not dt:
+            continue
+        ts = dt.timestamp()                 # точнее julianday; для строк без зоны — смещение их даты
+        if not oldest <= ts <= newest:
+            continue
+        offenders.append({
+            "id": acc_id,
+            "nickname": nick,
+            "last": dt.isoformat(),
+            "hours": round((now - ts) / 3600, 1),
+            "day_gain": day_gain,
+            "tag": TAG_TEXT if day_gain == 0 else "stale⏱️",
+        })
+    return offenders
+
+def _sync_alert_state(conn: sqlite3.Connection, offenders: Iterable[dict]) -> Tuple[List[dict], List[str]]:
+    """Сверяет состав списка с прошлым проходом и пишет в таблицу только разницу."""
+    prev = {row[0] for row in conn.execute(f"SELECT id FROM {STATE_TABLE}")}
+    offenders = list(offenders)
+    cur = {o["id"] for o in offenders}
+    diff_added = [o for o in offenders if o["id"] not in prev]
+    diff_removed = [pid for pid in prev if pid not in cur]
+    if diff_added or diff_removed:
+        now = time.time()
+        with conn:
+            conn.executemany(f"DELETE FROM {STATE_TABLE} WHERE id=?", [(pid,) for pid in diff_removed])
+            conn.executemany(
+                f"INSERT OR IGNORE INTO {STATE_TABLE}(id, since) VALUES(?, ?)",
+                [(o["id"], now) for o in diff_added],
+            )
+    return diff_added, diff_removed
 
 # ─────────────────────────── Основная логика ───────────────────────────
 def check_inactive_accounts(threshold_hrs: int = THRESH_HOURS) -> List[dict]:
@@ -157,48 +275,17 @@ def check_inactive_accounts(threshold_hrs: int = THRESH_HOURS) -> List[dict]:
     Ищем аккаунты, у которых dayGain==0 И last_updated старше threshold.
     Пишем файлы и шлём ТГ (с дедупликацией).
     """
-    threshold = timedelta(hours=threshold_hrs)
-    max_last_seen = timedelta(hours=MAX_LAST_SEEN_HOURS)
     active_ids = _load_active_ids_from_profile()
-    baseline = _load_today_baseline()
-    rows = _query_resources()
-
-    # фильтр по активным
-    if active_ids is not None:
-        rows = [r for r in rows if r[0] in active_ids]
-
-    now = datetime.now(timezone.utc)
-    offenders: List[dict] = []
-
-    for acc_id, nick, f, w, s, g, last in rows:
-        dt = _tz_aware_from_iso(last)
-        if not dt:
-            continue
-
-        # Считаем dayGain (по food+wood+stone+gold). Если baseline за сегодня
-        # не успел создаться, всё равно не скрываем критичный простой: stale-last_updated
-        # важнее точной оценки дневного прироста.
-        base_row = baseline.get(acc_id)
-        day_gain = None
-        if base_row:
-            bf, bw, bs, bg = base_row
-            day_gain = (f - bf) + (w - bw) + (s - bs) + (g - bg)
-
-        hours_inactive = (now - dt).total_seconds() / 3600
-        is_stale = now - dt >= threshold
-        not_too_old = now - dt <= max_last_seen
-        zero_gain_or_unknown = day_gain in (0, None)
-
-        if is_stale and not_too_old and zero_gain_or_unknown:
-            offenders.append({
-                "id": acc_id,
-                "nickname": nick,
-                "last": dt.isoformat(),
-                "hours": round(hours_inactive, 1),
-                "day_gain": day_gain,
-                "tag": TAG_TEXT if day_gain == 0 else "stale⏱️",
-            })
+    conn = _connect()
+    try:
+        offenders = find_offenders(conn, threshold_hrs, active_ids=active_ids)
+        _write_and_notify(conn, offenders, threshold_hrs)
+    finally:
+        conn.close()
+    return offenders
 
+def _write_and_notify(conn: sqlite3.Connection, offenders: List[dict], threshold_hrs: int) -> None:
+    """JSON для фронта/админа и Telegram только по изменениям состава."""
     # ── сохраняем json ────────────────────────────────────────────────
     try:
         ALERT_SHORT.write_text(
@@ -222,16 +309,8 @@ def check_inactive_accounts(threshold_hrs: int = THRESH_HOURS) -> List[dict]:
 
     # ── дедупликация и Telegram ───────────────────────────────────────
     try:
-        prev = set()
-        if STATE_FILE.is_file():
-            prev = set(json.loads(STATE_FILE.read_text(encoding="utf-8")).get("ids", []))
-
-        cur = set(o["id"] for o in offenders)
-        diff_added = [o for o in offenders if o["id"] not in prev]
-        diff_removed = [pid for pid in prev if pid not in cur]
-
-        # сохраняем текущее состояние для следующего запуска
-        STATE_FILE.write_text(json.dumps({"ids": list(cur)}, ensure_ascii=False, indent=2), encoding="utf-8")
+        # сохраняем текущее состояние для следующего запуска (только разница)
+        diff_added, diff_removed = _sync_alert_state(conn, offenders)
 
         # шлём только, если что-то изменилось
         if diff_added or diff_removed:
@@ -256,8 +335,6 @@ def check_inactive_accounts(threshold_hrs: int = THRESH_HOURS) -> List[dict]:
     except Exception as e:
         print("[notify] error:", e)
 
-    return offenders
-
 # ─────────────────────────── CLI ───────────────────────────
 if __name__ == "__main__":
     _load_root_env()
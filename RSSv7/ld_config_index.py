@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# ░░░  ld_config_index.py  ░░░
+"""
+Постоянный индекс leidianXX.config для LD_check.collect_crashed.
+
+— Для каждого конфига хранится (size, mtime_ns), sha256 содержимого и
+  извлечённый statusSettings.playerName (SQLite, ld_config_index.db).
+  Файл с прежними size/mtime не открывается; изменившийся читается, и если
+  sha256 тот же — JSON не разбирается заново.
+— Как в git, запись считается «сомнительной», если mtime файла ближе
+  LDCHECK_RACY_SEC к моменту проверки: такой файл перечитывается ещё раз,
+  чтобы запись в ту же секунду без смены размера не потерялась.
+— Листинги каталогов тоже кешируются: если mtime каталога не изменился
+  (не добавляли/удаляли/переименовывали файлы), повторный os.scandir не нужен.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+RACY_NS = int(float(os.getenv("LDCHECK_RACY_SEC", "2")) * 1_000_000_000)
+
+PLAYER_NAME_KEY = "statusSettings.playerName"
+
+
+def find_key_recursive(d, target_key):
+    """Ищет ключ target_key в глубине JSON-структуры (точное имя)."""
+    if isinstance(d, dict):
+        for k, v in d.items():
+            if k == target_key:
+                return v
+            if isinstance(v, (dict, list)):
+                res = find_key_recursive(v, target_key)
+                if res is not None:
+                    return res
+    elif isinstance(d, list):
+        for item in d:
+            res = find_key_recursive(item, target_key)
+            if res is not None:
+                return res
+    return None
+
+
+def player_name_of(raw: bytes) -> str:
+    """statusSettings.playerName из содержимого конфига (пустая строка, если нет)."""
+    cfg = json.loads(raw.decode("utf-8"))
+    return str(find_key_recursive(cfg, PLAYER_NAME_KEY) or "").strip()
+
+
+class LdConfigIndex:
+    """playerName конфигов LDPlayer с перечитыванием только изменившихся файлов."""
+
+    def __init__(self, config_folder: str, cache_path: Optional[str] = None):
+        self.config_folder = config_folder
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._dirs: Optional[Dict[str, dict]] = None
+        self._files: Dict[str, dict] = {}
+        # счётчики последнего scan (для логов и тестов)
+        self.stats = {"listed": 0, "stat": 0, "read": 0, "bytes": 0, "parsed": 0}
+
+    # ─────────── кеш на диске ───────────
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.cache_path)
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS ld_dirs(
+              path     TEXT PRIMARY KEY,
+              mtime_ns INTEGER,
+              entries  TEXT);
+            CREATE TABLE IF NOT EXISTS ld_configs(
+              path        TEXT PRIMARY KEY,
+              size        INTEGER,
+              mtime_ns    INTEGER,
+              checked_ns  INTEGER,
+              sha256      TEXT,
+              player_name TEXT);
+        """)
+        return conn
+
+    def _load(self) -> None:
+        self._dirs, self._files = {}, {}
+        if not self.cache_path:
+            return
+        try:
+            conn = self._connect()
+            try:
+                for path, mtime_ns, entries in conn.execute("SELECT path, mtime_ns, entries FROM ld_dirs"):
+                    self._dirs[path] = {"mtime_ns": mtime_ns, **json.loads(entries)}
+                for path, size, mtime_ns, checked_ns, sha, name in conn.execute(
+                        "SELECT path, size, mtime_ns, checked_ns, sha256, player_name FROM ld_configs"):
+                    self._files[path] = {"size": size, "mtime_ns": mtime_ns, "checked_ns": checked_ns,
+                                         "sha256": sha, "player_name": name}
+            finally:
+                conn.close()
+        except (sqlite3.Error, ValueError) as exc:
+            print(f"[ld_config_index] Кеш не прочитан, пересоберём: {exc}")
+            self._dirs, self._files = {}, {}
+
+    def _save(self, dirs: Dict[str, dict], files: Dict[str, dict], removed: List[str],
+              removed_dirs: List[str]) -> None:
+        if not self.cache_path:
+            return
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO ld_dirs VALUES (?, ?, ?)",
+                        [(p, d["mtime_ns"], json.dumps({"files": d["files"], "dirs": d["dirs"]}, ensure_ascii=False))
+                         for p, d in dirs.items()],
+                    )
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO ld_configs VALUES (?, ?, ?, ?, ?, ?)",
+                        [(p, e["size"], e["mtime_ns"], e["checked_ns"], e["sha256"], e["player_name"])
+                         for p, e in files.items()],
+                    )
+                    conn.executemany("DELETE FROM ld_configs WHERE path = ?", [(p,) for p in removed])
+                    conn.executemany("DELETE FROM ld_dirs WHERE path = ?", [(p,) for p in removed_dirs])
+            finally:
+                conn.close()
+        except sqlite3.Error as exc:
+            print(f"[ld_config_index] Не удалось сохранить кеш: {exc}")
+
+    # ─────────── обход ───────────
+    def _listing(self, path: str, changed_dirs: Dict[str, dict]) -> Optional[dict]:
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        cached = self._dirs.get(path)
+        if cached and cached["mtime_ns"] == mtime_ns:
+            return cached
+        files, dirs = [], []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    (dirs if entry.is_dir() else files).append(entry.name)
+        except OSError:
+            return None
+        self.stats["listed"] += 1
+        listing = {"mtime_ns": mtime_ns, "files": files, "dirs": dirs}
+        self._dirs[path] = changed_dirs[path] = listing
+        return listing
+
+    def _walk(self, changed_dirs: Dict[str, dict], visited: set):
+        """Как os.walk(config_folder) сверху вниз, но из кеша листингов."""
+        stack = [self.config_folder]
+        while stack:
+            root = stack.pop(0)
+            listing = self._listing(root, changed_dirs)
+            if listing is None:
+                continue
+            visited.add(root)
+            yield root, listing["files"]
+            stack[0:0] = [os.path.join(root, d) for d in listing["dirs"]]
+
+    def _player_name(self, fpath: str, now_ns: int, changed: Dict[str, dict]) -> str:
+        st = os.stat(fpath)
+        self.stats["stat"] += 1
+        old = self._files.get(fpath)
+        if (old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns
+                and st.st_mtime_ns < old["checked_ns"] - RACY_NS):
+            return old["player_name"]
+        with open(fpath, "rb") as f:
+            raw = f.read()
+        self.stats["read"] += 1
+        self.stats["bytes"] += len(raw)
+        digest = hashlib.sha256(raw).hexdigest()
+        if old and old["sha256"] == digest:
+            name = old["player_name"]
+        else:
+            name = player_name_of(raw)           # ошибки разбора — наверх, в collect_crashed
+            self.stats["parsed"] += 1
+        self._files[fpath] = changed[fpath] = {
+            "size": st.st_size, "mtime_ns": st.st_mtime_ns, "checked_ns": now_ns,
+            "sha256": digest, "player_name": name,
+        }
+        return name
+
+    def scan(self, accept: Callable[[str], bool]) -> List[Tuple[str, str, Optional[str], Optional[Exception]]]:
+        """
+        [(root, fname, playerName, ошибка)] для файлов, прошедших accept(fname),
+        в порядке os.walk. При ошибке чтения/разбора playerName = None.
+        """
+        with self._lock:
+            if self._dirs is None:
+                self._load()
+            self.stats = dict.fromkeys(self.stats, 0)
+            now_ns = time.time_ns()
+            changed_dirs: Dict[str, dict] = {}
+            changed: Dict[str, dict] = {}
+            seen = set()
+            visited: set = set()
+            out = []
+            for root, files in self._walk(changed_dirs, visited):
+                for fname in files:
+                    fpath = os.path.join(root, fname)
+                    seen.add(fpath)
+                    if not accept(fname):
+                        continue
+                    try:
+                        out.append((root, fname, self._player_name(fpath, now_ns, changed), None))
+                    except Exception as exc:
+                        out.append((root, fname, None, exc))
+            removed = [p for p in self._files if p not in seen]
+            for p in removed:
+                del self._files[p]
+            # каталоги удалённых эмуляторов тоже уходят из кеша
+            removed_dirs = [p for p in self._dirs if p not in visited]
+            for p in removed_dirs:
+                del self._dirs[p]
+            if changed_dirs or changed or removed or removed_dirs:
+                self._save(changed_dirs, changed, removed, removed_dirs)
+            return out
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# ░░░  log_fields.py  ░░░
+"""
+Разбор строк логов GnBots для просмотрщиков и поля, сохраняемые в cached_logs.
+
+— parse_human_log_line / _extract_log_level / _clean_log_message — прежний
+  разбор из RssCounterWebV7 (перенесён без изменений, импортируется оттуда).
+— stored_log_fields() считает при записи строки в cached_logs: флаг
+  debug-маркера (то, что раньше искали instr(upper(raw_line), ...)), уровень,
+  группу, код, нормализованный текст и отформатированное время события.
+— item_from_stored() собирает из этих колонок тот же объект, что
+  parse_human_log_line, без регулярных выражений на запрос.
+— PARSER_VERSION увеличивается при изменении разбора: строки со старой
+  версией пересчитывает logs_schema.migrate на следующем старте
+  (init_logs_db), а до этого они разбираются на лету.
+"""
+
+from __future__ import annotations
+
+import re
+import typing as t
+from datetime import datetime
+
+PARSER_VERSION = 1
+
+# колонки cached_logs, которые заполняет stored_log_fields (в этом порядке)
+STORED_COLUMNS = (
+    "debug_marker", "log_level", "event_level", "event_group", "event_code", "event_text",
+    "event_time", "event_at", "parsed_v",
+)
+
+
+_LOG_LEVEL_RE = re.compile(r"\[(DBG|INF|WRN|ERR)\]", re.IGNORECASE)
+_LOG_INFO_PREFIX_RE = re.compile(r"^(INFO|WARN|WARNING|ERROR|ERR|DEBUG)\|", re.IGNORECASE)
+_LOG_SESSION_PREFIX_RE = re.compile(r"^[0-9a-f]{8,64}\|", re.IGNORECASE)
+_LOG_SAWMILL_LEVEL_RE = re.compile(r"^Gather:\s*Sawmill\s+Level\s+(\d+)\s*$", re.IGNORECASE)
+_LOG_MARCHES_PROGRESS_RE = re.compile(r"^Marches:\s*(\d+)\s*/\s*(\d+)\s*$", re.IGNORECASE)
+_LOG_TIMESTAMP_PREFIX_RE = re.compile(
+    r"^\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:\s+[+-]\d{2}:\d{2})?\s*"
+)
+_HUMAN_LOG_EXACT_MAP = {
+    "Gather: Open Vip Menu": ("gather", "Сбор", "open_vip_menu", "Открыто VIP-меню"),
+    "Gather: Select Sawmill": ("gather", "Сбор", "select_sawmill", "Выбрана лесопилка"),
+    "March: Create March Troop": ("march", "Марш", "create_march_troop", "Собран марш"),
+    "March: Send Troops": ("march", "Марш", "send_troops", "Отряд отправлен"),
+    "Marches: Reached Maximum of Marches": (
+        "warning",
+        "Предупреждение",
+        "reached_max_marches",
+        "Достигнут лимит маршей",
+    ),
+    "gathervip Finished": ("finished", "Готово", "gathervip_finished", "Сценарий сбора завершён"),
+}
+
+
+def _format_log_time(dt_part: str) -> str:
+    """Возвращает время HH:MM:SS для строкового dt; при ошибке — исходное значение."""
+
+    value = (dt_part or "").strip()
+    if not value:
+        return ""
+
+    for fmt in ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return datetime.strptime(value, fmt).strftime("%H:%M:%S")
+        except Exception:
+            continue
+
+    hms_match = re.search(r"(\d{2}:\d{2}:\d{2})", value)
+    return hms_match.group(1) if hms_match else value
+
+
+def _format_log_event_at(dt_part: str) -> str:
+    """Возвращает полный ISO 8601 timestamp с исходным часовым поясом."""
+
+    value = (dt_part or "").strip()
+    if not value:
+        return ""
+
+    for fmt in (
+        "%Y-%m-%d %H:%M:%S.%f %z",
+        "%Y-%m-%d %H:%M:%S %z",
+        "%Y-%m-%d %H:%M:%S.%f",
+        "%Y-%m-%d %H:%M:%S",
+    ):
+        try:
+            parsed = datetime.strptime(value, fmt)
+            return parsed.isoformat(timespec="milliseconds")
+        except (TypeError, ValueError):
+            continue
+
+    return value
+
+
+def _extract_log_level(raw_line: str) -> str:
+    """Определяет уровень логирования, если он явно указан в raw_line."""
+
+    marker = _LOG_LEVEL_RE.search(raw_line or "")
+    level_map = {
+        "DBG": "debug",
+        "DEBUG": "debug",
+        "INF": "info",
+        "INFO": "info",
+        "WRN": "warning",
+        "WARN": "warning",
+        "WARNING": "warning",
+        "ERR": "error",
+        "ERROR": "error",
+    }
+    if marker:
+        return level_map.get(marker.group(1).upper(), "info")
+
+    without_timestamp = _LOG_TIMESTAMP_PREFIX_RE.sub("", raw_line or "", count=1).strip()
+    pipe_marker = _LOG_INFO_PREFIX_RE.match(without_timestamp)
+    return level_map.get(pipe_marker.group(1).upper(), "info") if pipe_marker else "info"
+
+
+def _is_debug_log(raw_line: str) -> bool:
+    """Проверяет, является ли строка debug-сообщением."""
+
+    return _extract_log_level(raw_line) == "debug"
+
+
+def _clean_log_message(raw_line: str, account_id: str = "") -> str:
+    """Убирает служебный префикс ([INF], INFO|session|...) и оставляет только текст события."""
+
+    if not raw_line:
+        return ""
+
+    text = (raw_line or "").strip()
+
+    if _LOG_TIMESTAMP_PREFIX_RE.match(text):
+        text = _LOG_TIMESTAMP_PREFIX_RE.sub("", text, count=1).strip()
+
+    text = _LOG_LEVEL_RE.sub("", text).strip()
+    text = _LOG_INFO_PREFIX_RE.sub("", text).strip()
+    normalized_account_id = str(account_id or "").strip()
+    if normalized_account_id and text.startswith(normalized_account_id + "|"):
+        text = text[len(normalized_account_id) + 1:].strip()
+    else:
+        text = _LOG_SESSION_PREFIX_RE.sub("", text).strip()
+    return text
+
+
+def parse_human_log_line(
+    dt_part: str,
+    raw_line: str,
+    account_name: t.Optional[str] = None,
+    include_debug: bool = False,
+    account_id: str = "",
+):
+    """Нормализует строку лога в человекочитаемый объект для UI/API."""
+
+    if not raw_line:
+        return None
+
+    level = _extract_log_level(raw_line)
+    if level == "debug" and not include_debug:
+        return None
+
+    cleaned = _clean_log_message(raw_line, account_id=account_id)
+    if not cleaned:
+        return None
+
+    item = {
+        "time": _format_log_time(dt_part),
+        "event_at": _format_log_event_at(dt_part),
+        "level": level,
+        "group": "system",
+        "group_label": "Система",
+        "event_code": "system_message",
+        "event_text": cleaned,
+        "raw_text": raw_line,
+    }
+    if account_name:
+        item["account_name"] = account_name
+
+    preset = _HUMAN_LOG_EXACT_MAP.get(cleaned)
+    if preset:
+        item["group"], item["group_label"], item["event_code"], item["event_text"] = preset
+        if item["group"] == "warning" and item["level"] == "info":
+            item["level"] = "warning"
+        return item
+
+    sawmill_match = _LOG_SAWMILL_LEVEL_RE.match(cleaned)
+    if sawmill_match:
+        level_num = sawmill_match.group(1)
+        item.update(
+            {
+                "group": "gather",
+                "group_label": "Сбор",
+                "event_code": "sawmill_level",
+                "event_text": f"Выбрана лесопилка уровня {level_num}",
+            }
+        )
+        return item
+
+    marches_match = _LOG_MARCHES_PROGRESS_RE.match(cleaned)
+    if marches_match:
+        used, total = marches_match.groups()
+        item.update(
+            {
+                "group": "march",
+                "group_label": "Марш",
+                "event_code": "marches_progress",
+                "event_text": f"Маршей занято: {used} из {total}",
+            }
+        )
+        return item
+
+    lower_cleaned = cleaned.lower()
+    if "finished" in lower_cleaned:
+        item.update(
+            {
+                "group": "finished",
+                "group_label": "Готово",
+                "event_code": "finished",
+                "event_text": "Сценарий завершён",
+            }
+        )
+    elif any(token in lower_cleaned for token in ("error", "exception", "failed", "traceback")):
+        item.update(
+            {
+                "group": "system",
+                "group_label": "Система",
+                "event_code": "error",
+                "level": "error",
+            }
+        )
+    elif "update the game" in lower_cleaned:
+        item.update(
+            {
+                "group": "warning",
+                "group_label": "Предупреждение",
+                "event_code": "update_game_required",
+                "event_text": "Требуется обновление игры",
+                "level": "warning",
+            }
+        )
+
+    return item
+
+
+# ─────────────────────────── Поля при записи ───────────────────────────
+_GROUP_LABELS = {
+    "system": "Система",
+    "gather": "Сбор",
+    "march": "Марш",
+    "warning": "Предупреждение",
+    "finished": "Готово",
+}
+
+
+def has_debug_marker(raw_line: str) -> bool:
+    """То же, что SQL-фильтр instr(upper(raw_line), '[DBG]' / 'DEBUG|')."""
+    upper = (raw_line or "").upper()
+    return "[DBG]" in upper or "DEBUG|" in upper
+
+
+def stored_log_fields(dt_part: str, raw_line: str, account_id: str = "") -> tuple:
+    """Значения STORED_COLUMNS для строки лога аккаунта account_id."""
+    raw_line = raw_line or ""
+    marker = int(has_debug_marker(raw_line))
+    item = parse_human_log_line(dt_part or "", raw_line, include_debug=True, account_id=account_id)
+    if item is None:      # пустая строка или пустое сообщение после очистки префиксов
+        base_level = _extract_log_level(raw_line) if raw_line else None
+        return (marker, base_level, None, None, None, None, None, None, PARSER_VERSION)
+    return (
+        marker, _extract_log_level(raw_line), item["level"], item["group"], item["event_code"],
+        item["event_text"], item["time"], item["event_at"], PARSER_VERSION,
+    )
+
+
+def item_from_stored(
+    dt_part: str,
+    raw_line: str,
+    row: t.Mapping[str, t.Any],
+    account_name: t.Optional[str] = None,
+    include_debug: bool = False,
+    account_id: str = "",
+):
+    """
+    Объект parse_human_log_line из сохранённых колонок; строки без полей или со
+    старой версией разбора разбираются как раньше.
+    """
+    if row["parsed_v"] != PARSER_VERSION:
+        return parse_human_log_line(dt_part, raw_line, account_name=account_name,
+                                    include_debug=include_debug, account_id=account_id)
+    if not raw_line or row["event_code"] is None:
+        return None
+    if row["log_level"] == "debug" and not include_debug:
+        return None
+    item = {
+        "time": row["event_time"],
+        "event_at": row["event_at"],
+        "level": row["event_level"],
+        "group": row["event_group"],
+        "group_label": _GROUP_LABELS.get(row["event_group"], row["event_group"]),
+        "event_code": row["event_code"],
+        "event_text": row["event_text"],
+        "raw_text": raw_line,
+    }
+    if account_name:
+        item["account_name"] = account_name
+    return item
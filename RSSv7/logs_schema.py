@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# ░░░  logs_schema.py  ░░░
+"""
+Версионированные миграции logs_cache.db (init_logs_db).
+
+— Применённые миграции записываются в таблицу schema_version; обычный старт на
+  уже мигрированной базе — это одно чтение MAX(version), без сканов cached_logs.
+— Тяжёлые миграции (дедупликация, backfill source_id) выполняются один раз,
+  пачками по LOGS_MIGRATION_BATCH строк с коммитом и выводом прогресса; прерванная
+  миграция безопасно продолжается при следующем старте (каждая идемпотентна).
+— Базы, мигрированные прежним init_logs_db (без schema_version), распознаются по
+  уже созданным уникальным индексам — повторная дедупликация не запускается.
+— Новая миграция = функция + строка в LOGS_MIGRATIONS со следующим номером.
+— Поля разбора cached_logs пересчитываются и без новой миграции: при смене
+  log_fields.PARSER_VERSION (версия последнего пересчёта — в parser_version).
+
+Применить миграции к базе вручную: python logs_schema.py --db logs_cache.db
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+import log_fields
+
+LOGS_MIGRATION_BATCH = int(os.getenv("LOGS_MIGRATION_BATCH", "50000"))
+
+Progress = Callable[[str], None]
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[sqlite3.Connection, Progress], None]
+
+
+# ─────────────────────────── helpers ───────────────────────────
+def _columns(conn: sqlite3.Connection, table: str) -> set:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+
+
+def _index_exists(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='index' AND name=?", (name,)
+    ).fetchone() is not None
+
+
+def _delete_ids_in_batches(conn: sqlite3.Connection, table: str, progress: Progress, what: str) -> int:
+    """Удаляет из table строки с id из temp.migrate_ids пачками с коммитом после каждой."""
+    total = conn.execute("SELECT COUNT(*) FROM temp.migrate_ids").fetchone()[0]
+    done = 0
+    for start in range(1, total + 1, LOGS_MIGRATION_BATCH):
+        with conn:
+            done += conn.execute(
+                f"""DELETE FROM {table} WHERE id IN (
+                        SELECT id FROM temp.migrate_ids WHERE rowid BETWEEN ? AND ?)""",
+                (start, start + LOGS_MIGRATION_BATCH - 1),
+            ).rowcount
+        progress(f"{what}: удалено {done}/{total}")
+    conn.execute("DROP TABLE IF EXISTS temp.migrate_ids")
+    return done
+
+
+def legacy_source_id(acc_id, dt, raw_line) -> str:
+    """source_id строк, сохранённых до привязки к смещению в файле."""
+    material = "\x1f".join(str(value or "") for value in (acc_id, dt, raw_line))
+    return "legacy:" + hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+# ─────────────────────────── миграции ───────────────────────────
+def _m1_base_tables(conn: sqlite3.Connection, progress: Progress) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS files_offset (
+            filename TEXT PRIMARY KEY,
+            last_pos INTEGER NOT NULL,
+            last_size INTEGER,
+            last_mtime REAL,
+            head_hash TEXT,
+            generation_id TEXT
+        )
+    """)
+    offset_columns = _columns(conn, "files_offset")
+    for column_name, column_ddl in (
+        ("last_size", "INTEGER"),
+        ("last_mtime", "REAL"),
+        ("head_hash", "TEXT"),
+        ("generation_id", "TEXT"),
+    ):
+        if column_name not in offset_columns:
+            conn.execute(f"ALTER TABLE files_offset ADD COLUMN {column_name} {column_ddl}")
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cached_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            acc_id TEXT,
+            nickname TEXT,
+            dt TEXT,         -- 'YYYY-MM-DD HH:MM:SS.mmm +HH:MM'
+            raw_line TEXT,
+            source_id TEXT,
+            source_file TEXT,
+            source_offset INTEGER
+        )
+    """)
+    log_columns = _columns(conn, "cached_logs")
+    for column_name, column_ddl in (
+        ("source_id", "TEXT"),
+        ("source_file", "TEXT"),
+        ("source_offset", "INTEGER"),
+    ):
+        if column_name not in log_columns:
+            conn.execute(f"ALTER TABLE cached_logs ADD COLUMN {column_name} {column_ddl}")
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS resource_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            acc_id TEXT NOT NULL,
+            dt TEXT NOT NULL,   -- 'YYYY-MM-DD HH:MM:SS.mmm +HH:MM'
+            food INTEGER,
+            wood INTEGER,
+            stone INTEGER,
+            gold INTEGER
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_rs_acc_dt ON resource_snapshots(acc_id, dt)")
+    conn.commit()
+
+
+def _m2_dedup_cached_logs(conn: sqlite3.Connection, progress: Progress) -> None:
+    # Старый hard refresh мог многократно сохранить одну и ту же строку. До включения
+    # уникального source_id оставляем одну запись (с минимальным id) каждого события.
+    if _index_exists(conn, "ux_cached_logs_event_fallback"):
+        return   # уникальный индекс уже гарантирует отсутствие дублей
+    progress("cached_logs: поиск дублей (acc_id, dt, raw_line)")
+    conn.execute("DROP TABLE IF EXISTS temp.migrate_ids")
+    conn.execute("""
+        CREATE TEMP TABLE migrate_ids AS
+        SELECT id FROM cached_logs
+        EXCEPT
+        SELECT MIN(id) FROM cached_logs GROUP BY acc_id, dt, raw_line
+    """)
+    _delete_ids_in_batches(conn, "cached_logs", progress, "cached_logs дубли")
+
+
+def _m3_backfill_source_id(conn: sqlite3.Connection, progress: Progress) -> None:
+    bounds = conn.execute("""
+        SELECT MIN(id), MAX(id), COUNT(*) FROM cached_logs
+        WHERE source_id IS NULL OR source_id = ''
+    """).fetchone()
+    lo, hi, total = bounds[0], bounds[1], bounds[2]
+    if not total:
+        return
+    conn.create_function("legacy_source_id", 3, legacy_source_id, deterministic=True)
+    done = 0
+    for start in range(lo, hi + 1, LOGS_MIGRATION_BATCH):
+        with conn:
+            done += conn.execute(
+                """UPDATE cached_logs SET source_id = legacy_source_id(acc_id, dt, raw_line)
+                   WHERE id BETWEEN ? AND ? AND (source_id IS NULL OR source_id = '')""",
+                (start, start + LOGS_MIGRATION_BATCH - 1),
+            ).rowcount
+        progress(f"cached_logs source_id: {done}/{total}")
+
+
+def _m4_cached_logs_indexes(conn: sqlite3.Connection, progress: Progress) -> None:
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cached_logs_acc ON cached_logs(acc_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cached_logs_id ON cached_logs(id DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cached_logs_acc_id ON cached_logs(acc_id, id)")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_cached_logs_source_id ON cached_logs(source_id)")
+    # Fallback защищает legacy-строки первого развёртывания: их source_id
+    # ещё не был привязан к file offset, но hard refresh не должен их удвоить.
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_cached_logs_event_fallback
+        ON cached_logs(acc_id, dt, raw_line)
+    """)
+    conn.commit()
+
+
+def _m5_resource_snapshots_unique(conn: sqlite3.Connection, progress: Progress) -> None:
+    # Дедупликация по (acc_id, dt) перед уникальным индексом: оставляем максимальный id
+    if _index_exists(conn, "ux_rs_acc_dt"):
+        return
+    conn.execute("DROP TABLE IF EXISTS temp.migrate_ids")
+    conn.execute("""
+        CREATE TEMP TABLE migrate_ids AS
+        SELECT id FROM resource_snapshots
+        EXCEPT
+        SELECT MAX(id) FROM resource_snapshots GROUP BY acc_id, dt
+    """)
+    _delete_ids_in_batches(conn, "resource_snapshots", progress, "resource_snapshots дубли")
+    # уникальный индекс по (acc_id, dt), чтобы не плодить дублей при перечтении логов
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_rs_acc_dt ON resource_snapshots(acc_id, dt)")
+    conn.commit()
+
+
+def _m6_cached_logs_parsed_fields(conn: sqlite3.Connection, progress: Progress) -> None:
+    # Поля разбора строки (log_fields.STORED_COLUMNS) считаются при записи; здесь —
+    # одноразовый backfill старых строк и индекс для фильтра debug без instr(upper()).
+    log_columns = _columns(conn, "cached_logs")
+    for column_name in log_fields.STORED_COLUMNS:
+        if column_name not in log_columns:
+            ddl = "INTEGER" if column_name in ("debug_marker", "parsed_v") else "TEXT"
+            conn.execute(f"ALTER TABLE cached_logs ADD COLUMN {column_name} {ddl}")
+    conn.commit()
+    backfill_parsed_fields(conn, progress)
+    _set_parser_version(conn, log_fields.PARSER_VERSION)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_cached_logs_acc_debug_id
+        ON cached_logs(acc_id, debug_marker, id)
+    """)
+    conn.commit()
+
+
+def backfill_parsed_fields(conn: sqlite3.Connection, progress: Progress) -> int:
+    """Заполняет поля разбора у строк без них или со старой PARSER_VERSION."""
+    version = log_fields.PARSER_VERSION
+    stale = "(parsed_v IS NULL OR parsed_v <> ?)"
+    bounds = conn.execute(
+        f"SELECT MIN(id), MAX(id), COUNT(*) FROM cached_logs WHERE {stale}", (version,)
+    ).fetchone()
+    lo, hi, total = bounds[0], bounds[1], bounds[2]
+    if not total:
+        return 0
+    assignments = ", ".join(f"{name} = ?" for name in log_fields.STORED_COLUMNS)
+    done = 0
+    for start in range(lo, hi + 1, LOGS_MIGRATION_BATCH):
+        rows = conn.execute(
+            f"""SELECT id, acc_id, dt, raw_line FROM cached_logs
+                WHERE id BETWEEN ? AND ? AND {stale}""",
+            (start, start + LOGS_MIGRATION_BATCH - 1, version),
+        ).fetchall()
+        with conn:
+            conn.executemany(
+                f"UPDATE cached_logs SET {assignments} WHERE id = ?",
+                [(*log_fields.stored_log_fields(dt, raw_line, str(acc_id or "")), row_id)
+                 for row_id, acc_id, dt, raw_line in rows],
+            )
+        done += len(rows)
+        progress(f"cached_logs parsed fields: {done}/{total}")
+    return done
+
+
+def _stored_parser_version(conn: sqlite3.Connection) -> Optional[int]:
+    conn.execute("CREATE TABLE IF NOT EXISTS parser_version (version INTEGER NOT NULL)")
+    return conn.execute("SELECT MAX(version) FROM parser_version").fetchone()[0]
+
+
+def _set_parser_version(conn: sqlite3.Connection, version: int) -> None:
+    _stored_parser_version(conn)
+    with conn:
+        conn.execute("DELETE FROM parser_version")
+        conn.execute("INSERT INTO parser_version(version) VALUES (?)", (version,))
+
+
+def refresh_parsed_fields(conn: sqlite3.Connection, progress: Progress) -> int:
+    """
+    Пересчитывает поля разбора после смены PARSER_VERSION. Версия последнего
+    backfill хранится в parser_version: обычный старт — одно её чтение.
+    """
+    version = log_fields.PARSER_VERSION
+    if _stored_parser_version(conn) == version:
+        return 0
+    progress(f"cached_logs parsed fields: PARSER_VERSION {version}")
+    done = backfill_parsed_fields(conn, progress)
+    _set_parser_version(conn, version)
+    return done
+
+
+LOGS_MIGRATIONS: List[Migration] = [
+    Migration(1, "base tables", _m1_base_tables),
+    Migration(2, "dedup cached_logs", _m2_dedup_cached_logs),
+    Migration(3, "backfill cached_logs.source_id", _m3_backfill_source_id),
+    Migration(4, "cached_logs indexes", _m4_cached_logs_indexes),
+    Migration(5, "unique resource_snapshots(acc_id, dt)", _m5_resource_snapshots_unique),
+    Migration(6, "cached_logs parsed fields", _m6_cached_logs_parsed_fields),
+]
+# после неё в cached_logs есть поля разбора — migrate следит за PARSER_VERSION
+PARSED_FIELDS_MIGRATION = 6
+
+
+# ─────────────────────────── раннер ───────────────────────────
+def current_version(conn: sqlite3.Connection) -> int:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version    INTEGER PRIMARY KEY,
+            name       TEXT,
+            applied_at TEXT
+        )
+    """)
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def migrate(
+    conn: sqlite3.Connection,
+    migrations: Optional[List[Migration]] = None,
+    progress: Progress = print,
+) -> List[int]:
+    """Применяет недостающие миграции по порядку; возвращает их номера."""
+    migrations = LOGS_MIGRATIONS if migrations is None else migrations
+    version = current_version(conn)
+    conn.commit()
+    applied = []
+    for migration in migrations:
+        if migration.version <= version:
+            continue
+        started = time.perf_counter()
+        progress(f"migration {migration.version}: {migration.name}")
+        migration.apply(conn, progress)
+        conn.execute(
+            "INSERT INTO schema_version(version, name, applied_at) VALUES (?, ?, ?)",
+            (migration.version, migration.name, datetime.now().isoformat(timespec="seconds")),
+        )
+        conn.commit()
+        progress(f"migration {migration.version}: done in {time.perf_counter() - started:.1f}s")
+        applied.append(migration.version)
+        version = migration.version
+    if version >= PARSED_FIELDS_MIGRATION:
+        refresh_parsed_fields(conn, progress)
+    return applied
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Миграции logs_cache.db")
+    parser.add_argument("--db", help="применить миграции к указанной базе")
+    args = parser.parse_args()
+    if args.db:
+        print(migrate(sqlite3.connect(args.db)))
+    else:
+        parser.print_help()
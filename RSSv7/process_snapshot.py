@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# ░░░  process_snapshot.py  ░░░
+"""
+Общий снимок таблицы процессов для MONITOR_onlyLD (HTTP-API и Qt-плашка).
+
+— Фоновый поток раз в PROC_SNAPSHOT_INTERVAL секунд один раз обходит
+  process_iter(name, exe, cmdline) и строит индекс: счётчик по имени процесса
+  и множество нормализованных «стемов» скриптов из name/exe/cmdline
+  (C:/x/RssCounterWebV7.py → rsscounterwebv7).
+— /api/scriptStatus, /api/dnCount, пакетный /api/scriptStatuses и refresh
+  плашки отвечают из индекса в памяти и больше не обходят процессы сами.
+— Поиск скрипта совместим с прежним is_script_running: сначала стем из
+  индекса, иначе подстрока в склеенной строке процесса; ответы кешируются
+  до следующего снимка.
+— Источник процессов подменяемый (source=…): тесты подставляют свой список
+  процессов и проверяются без Windows.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+PROC_SNAPSHOT_INTERVAL = float(os.getenv("PROC_SNAPSHOT_INTERVAL", "2"))
+
+ProcessRow = Tuple[str, str, Sequence[str]]      # (name, exe, cmdline)
+
+_SCRIPT_SUFFIXES = (".py", ".pyw", ".exe")
+
+
+def script_stem(token: str) -> str:
+    """Нормализованное имя скрипта: basename в нижнем регистре без .py/.pyw/.exe."""
+    base = token.replace("\\", "/").rstrip("/").rsplit("/", 1)[-1].strip('"').lower()
+    for suffix in _SCRIPT_SUFFIXES:
+        if base.endswith(suffix):
+            return base[: -len(suffix)]
+    return base
+
+
+def pattern_keys(pattern: str) -> set:
+    """Подстроки, которые искал прежний is_script_running."""
+    base = pattern.lower()
+    stem = script_stem(pattern)
+    return {base, stem, f"{stem}.py", f"{stem}.exe", f"{base}.py", f"{base}.exe"}
+
+
+# ─────────────────────────── Источники ───────────────────────────
+class PsutilProcessSource:
+    """Реальная таблица процессов через psutil."""
+
+    def __init__(self):
+        import psutil
+        self.psutil = psutil
+
+    def processes(self) -> Iterable[ProcessRow]:
+        for proc in self.psutil.process_iter(["name", "exe", "cmdline"]):
+            try:
+                info = proc.info
+                yield info.get("name") or "", info.get("exe") or "", info.get("cmdline") or ()
+            except (self.psutil.AccessDenied, self.psutil.ZombieProcess):
+                continue
+
+
+# ─────────────────────────── Индекс ───────────────────────────
+class ProcessIndex:
+    """Неизменяемый снимок: счётчик имён, стемы скриптов и строки для поиска подстрок."""
+
+    def __init__(self, rows: Iterable[ProcessRow], ts: Optional[float] = None):
+        self.ts = time.time() if ts is None else ts
+        self.names: Counter = Counter()
+        self.stems: set = set()
+        self._blobs: List[str] = []
+        self._memo: Dict[str, bool] = {}
+        self._memo_lock = threading.Lock()
+        for name, exe, cmdline in rows:
+            name_l = name.lower()
+            self.names[name_l] += 1
+            self.stems.add(script_stem(name))
+            if exe:
+                self.stems.add(script_stem(exe))
+            for arg in cmdline or ():
+                if arg:
+                    self.stems.add(script_stem(arg))
+            blob = " ".join(filter(None, [name, exe, " ".join(cmdline or ())]))
+            self._blobs.append(blob.lower().replace("\\", "/"))
+        self.total = len(self._blobs)
+
+    def count(self, name: str) -> int:
+        return self.names.get(name.lower(), 0)
+
+    def exe_running(self, name: str) -> bool:
+        return self.count(name) > 0
+
+    def script_running(self, pattern: str) -> bool:
+        with self._memo_lock:
+            hit = self._memo.get(pattern)
+        if hit is not None:
+            return hit
+        if script_stem(pattern) in self.stems:
+            found = True
+        else:
+            keys = pattern_keys(pattern)
+            found = any(k in blob for blob in self._blobs for k in keys)
+        with self._memo_lock:
+            self._memo[pattern] = found
+        return found
+
+
+# ─────────────────────────── Сэмплер ───────────────────────────
+class ProcessSnapshotSampler:
+    """Снимает таблицу процессов в фоне; читатели получают последний индекс."""
+
+    def __init__(self, source=None, interval: float = PROC_SNAPSHOT_INTERVAL):
+        self.source = source if source is not None else PsutilProcessSource()
+        self.interval = interval
+        self._index: Optional[ProcessIndex] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.samples = 0
+
+    def sample(self) -> ProcessIndex:
+        index = ProcessIndex(self.source.processes())
+        with self._lock:
+            self._index = index
+            self.samples += 1
+        return index
+
+    def snapshot(self) -> ProcessIndex:
+        """Последний индекс; без живого потока — пересъёмка, если он старше интервала."""
+        with self._lock:
+            index = self._index
+            running = self._thread is not None and self._thread.is_alive()
+        if index is None or (not running and time.time() - index.ts >= self.interval):
+            index = self.sample()
+        return index
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as exc:
+                print(f"[process_snapshot] Ошибка снимка: {exc}")
+            self._stop.wait(self.interval)
+
+    def start(self) -> "ProcessSnapshotSampler":
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return self
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, daemon=True, name="process-snapshot")
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
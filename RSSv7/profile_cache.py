@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# ░░░  profile_cache.py  ░░░
+"""
+Общий кеш profiles.json (GnBots) для всех читателей профиля в RssCounterWeb.
+
+— Файл перечитывается только при изменении (size, mtime_ns); иначе все вызовы
+  получают уже разобранный документ.
+— MenuData каждого аккаунта разбирается один раз при загрузке: Email/Password/
+  Custom из MenuData.Config лежат готовыми в `credentials`.
+— Документ общий и только для чтения: записывающий код читает файл сам
+  (под PROFILE_FILE_LOCK) и после записи вызывает invalidate().
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class ProfileDocument:
+    accounts: List[Dict[str, Any]]                 # весь profiles.json как есть
+    active: List[Dict[str, Any]]                   # только Active
+    credentials: Dict[str, Dict[str, str]]         # str(Id) → {email, passwd, igg}
+    stamp: Tuple[int, int] = (0, 0)                # (size, mtime_ns) прочитанного файла
+    ok: bool = True
+    by_id: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+
+EMPTY_DOCUMENT = ProfileDocument([], [], {}, ok=False)
+
+
+def _menu_credentials(raw_menu: Any) -> Dict[str, str]:
+    try:
+        md = json.loads(raw_menu or "{}") if isinstance(raw_menu, str) else (raw_menu or {})
+        cfg = md.get("Config", {}) or {}
+        return {
+            "email": cfg.get("Email", "") or "",
+            "passwd": cfg.get("Password", "") or "",
+            "igg": cfg.get("Custom", "") or "",
+        }
+    except Exception:
+        return {"email": "", "passwd": "", "igg": ""}
+
+
+def build_document(data: List[Dict[str, Any]], stamp: Tuple[int, int] = (0, 0)) -> ProfileDocument:
+    credentials: Dict[str, Dict[str, str]] = {}
+    by_id: Dict[str, Dict[str, Any]] = {}
+    for acc in data:
+        pid = acc.get("Id") if isinstance(acc, dict) else None
+        if pid is None:
+            continue
+        by_id[str(pid)] = acc
+        credentials[str(pid)] = _menu_credentials(acc.get("MenuData"))
+    return ProfileDocument(
+        accounts=data,
+        active=[a for a in data if isinstance(a, dict) and a.get("Active")],
+        credentials=credentials,
+        stamp=stamp,
+        by_id=by_id,
+    )
+
+
+class ProfileCache:
+    """
+    Кеш документа профиля. При ошибке чтения (нет файла, пустой/битый JSON)
+    отдаётся последний удачный документ с ok=False — как прежний PROFILE_CACHE.
+    """
+
+    def __init__(self, path_getter):
+        self._path_getter = path_getter if callable(path_getter) else (lambda: path_getter)
+        self._lock = threading.Lock()
+        self._doc: ProfileDocument = EMPTY_DOCUMENT
+        self._stamp: Optional[Tuple[str, int, int]] = None
+        self.loads = 0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._stamp = None
+
+    def _failed(self, message: str) -> ProfileDocument:
+        print(message)
+        self._stamp = None
+        return replace(self._doc, ok=False)
+
+    def get(self) -> ProfileDocument:
+        path = self._path_getter()
+        try:
+            st = os.stat(path)
+        except OSError:
+            with self._lock:
+                return self._failed(f"PROFILE not found: {path}")
+        stamp = (path, st.st_size, st.st_mtime_ns)
+
+        with self._lock:
+            if stamp == self._stamp:
+                return self._doc
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    raw = f.read().strip()
+            except OSError as exc:
+                return self._failed(f"PROFILE read failed: {exc}")
+            if not raw:
+                return self._failed(f"PROFILE is empty: {path}")
+            try:
+                data = json.loads(raw)
+            except json.JSONDecodeError as exc:
+                return self._failed(f"PROFILE has invalid JSON: {exc}")
+            if not isinstance(data, list):
+                return self._failed(f"PROFILE data is not a list: type={type(data)}")
+
+            self._doc = build_document(data, (st.st_size, st.st_mtime_ns))
+            self._stamp = stamp
+            self.loads += 1
+            return self._doc
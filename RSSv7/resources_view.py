@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# ░░░  resources_view.py  ░░░
+"""
+Документ /api/resources с кешем по поколению данных и ETag.
+
+— build_resources_payload собирает ответ за один проход: одно соединение,
+  account_meta читается один раз (раньше — на каждую строку resources).
+— IngestGeneration — монотонный счётчик, который увеличивают parse_logs и
+  запись profiles.json; вместе с версией account_meta (триггеры finance_version),
+  отметкой profiles.json и текущей датой он образует ключ кеша.
+— VersionedResponseCache хранит готовые байты ответа и их ETag: повторные
+  запросы до изменения данных не трогают БД, If-None-Match даёт 304.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class IngestGeneration:
+    """Монотонный счётчик изменений данных ресурсов."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def bump(self) -> int:
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+class VersionedResponseCache:
+    """Последний собранный ответ (байты + ETag) для ключа версии данных."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key: Optional[Hashable] = None
+        self._entry: Optional[Tuple[str, bytes]] = None
+        self.builds = 0
+
+    def get(self, key: Hashable, build: Callable[[], bytes]) -> Tuple[str, bytes]:
+        with self._lock:
+            if self._entry is not None and self._key == key:
+                return self._entry
+        body = build()
+        etag = hashlib.sha1(body).hexdigest()
+        with self._lock:
+            self._key, self._entry = key, (etag, body)
+            self.builds += 1
+        return etag, body
+
+    def clear(self) -> None:
+        with self._lock:
+            self._key, self._entry = None, None
+
+
+def _format_view(shorten: Callable[[int], str], cur_val: int, diff_val: int) -> str:
+    base = shorten(cur_val)
+    if diff_val == 0:
+        return base
+    sign = "+" if diff_val > 0 else "-"
+    return f"{base}<span class='gainValue'>{sign}{shorten(abs(diff_val))}</span>"
+
+
+def build_resources_payload(
+    profiles: List[Dict[str, Any]],
+    conn: sqlite3.Connection,
+    today_str: str,
+    shorten: Callable[[int], str],
+) -> Dict[str, Any]:
+    """Тело /api/resources: активные аккаунты, прирост за день, тарифы, итоги."""
+    active_ids = {a["Id"] for a in profiles}
+    inst_map = {a["Id"]: a.get("InstanceId", -1) for a in profiles}
+
+    rows = conn.execute(
+        "SELECT id,nickname,food,wood,stone,gold,gems,last_updated FROM resources"
+    ).fetchall()
+    base_map = {
+        br[0]: (br[1], br[2], br[3], br[4], br[5])
+        for br in conn.execute(
+            "SELECT id,food,wood,stone,gold,gems FROM daily_baseline WHERE baseline_date=?",
+            (today_str,),
+        ).fetchall()
+    }
+    meta_map = dict(
+        (r[0], r[1]) for r in conn.execute("SELECT id, tariff_rub FROM account_meta").fetchall()
+    )
+
+    totf = totw = tots = totg = totm = 0
+    accounts = []
+    for (acc_id, nick, f, w, s, g, m, lastupd) in rows:
+        if acc_id not in active_ids:
+            continue
+        totf += f; totw += w; tots += s; totg += g; totm += m
+        bf, bw, bs, bg, _bgems = base_map.get(acc_id, (0, 0, 0, 0, 0))
+        gf = f - bf; gw = w - bw; gs = s - bs; gg = g - bg
+
+        tariff = meta_map.get(acc_id, 0)
+        tariff_view = "0₽" if tariff is None else f"{tariff:,}₽".replace(",", " ")
+
+        accounts.append({
+            "id": acc_id,
+            "nickname": nick,
+            "instanceId": inst_map.get(acc_id, -1),
+
+            "food_raw": f,
+            "wood_raw": w,
+            "stone_raw": s,
+            "gold_raw": g,
+
+            "food_view": _format_view(shorten, f, gf),
+            "wood_view": _format_view(shorten, w, gw),
+            "stone_view": _format_view(shorten, s, gs),
+            "gold_view": _format_view(shorten, g, gg),
+            "tariff_raw": tariff,
+            "tariff_view": tariff_view,
+
+            "today_gain": shorten(gf + gw + gs + gg),
+            "last_updated": lastupd,
+        })
+
+    return {
+        "accounts": accounts,
+        "account_count": len(accounts),
+        "totals": {
+            "food": shorten(totf),
+            "wood": shorten(totw),
+            "stone": shorten(tots),
+            "gold": shorten(totg),
+            "gems": shorten(totm),
+        },
+    }
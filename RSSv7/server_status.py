@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# ░░░  server_status.py  ░░░
+"""
+Фоновый сбор self_status соседних серверов для /api/serverStatus.
+
+— Все соседи опрашиваются параллельно пулом потоков раз в SERVER_STATUS_INTERVAL
+  секунд; на каждого не больше одного запроса одновременно, так что зависший
+  хост не копит очередь и не задерживает остальных.
+— Эндпоинт отдаёт последний известный снимок (с возрастом `age_sec`) из памяти
+  и больше не ждёт 8 с × число недоступных серверов.
+— Функции списка серверов/опроса/локального статуса передаются снаружи, поэтому
+  модуль работает без Windows (тесты и бенчмарк с фейковыми серверами).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from typing import Any, Callable, Dict, List, Optional
+
+SERVER_STATUS_INTERVAL = float(os.getenv("SERVER_STATUS_INTERVAL", "15"))
+SERVER_STATUS_WORKERS = int(os.getenv("SERVER_STATUS_WORKERS", "8"))
+
+Fetch = Callable[[dict], Dict[str, Any]]
+
+
+class FleetStatusAggregator:
+    """Снимок статусов всех серверов, обновляемый фоновым потоком."""
+
+    def __init__(
+        self,
+        servers: Callable[[], List[dict]],
+        fetch_remote: Fetch,
+        local_name: str = "",
+        local_status: Optional[Callable[[], Dict[str, Any]]] = None,
+        interval: float = SERVER_STATUS_INTERVAL,
+        workers: int = SERVER_STATUS_WORKERS,
+    ):
+        self.servers = servers
+        self.fetch_remote = fetch_remote
+        self.local_name = local_name
+        self.local_status = local_status
+        self.interval = interval
+        self.workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._snapshot: Dict[str, Dict[str, Any]] = {}
+        self._updated_at: Dict[str, float] = {}
+        self._in_flight: Dict[str, float] = {}
+        self._known: set[str] = set()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    # ─────────── жизненный цикл ───────────
+    def start(self) -> "FleetStatusAggregator":
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return self
+            self._stop.clear()
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="server-status"
+            )
+            self._thread = threading.Thread(target=self._loop, daemon=True, name="server-status-loop")
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def refresh_now(self) -> None:
+        """Внеочередной опрос (например, после изменения списка серверов)."""
+        self._wake.set()
+
+    # ─────────── опрос ───────────
+    def _poll_one(self, srv: dict) -> None:
+        name = srv.get("name") or ""
+        try:
+            if name == self.local_name and self.local_status is not None:
+                data = self.local_status()
+            else:
+                data = self.fetch_remote(srv)
+        except Exception as exc:  # fetch_remote сам ловит сетевые ошибки, это страховка
+            data = {"server": name, "error": str(exc), "pingOk": False, "gnOk": False, "dnOk": False}
+        with self._lock:
+            self._in_flight.pop(name, None)
+            if name in self._known:
+                self._snapshot[name] = data
+                self._updated_at[name] = time.time()
+
+    def poll_once(self) -> int:
+        """Ставит в пул опрос всех серверов без активного запроса; возвращает их число."""
+        try:
+            servers = list(self.servers() or [])
+        except Exception as exc:
+            print(f"[server_status] Ошибка списка серверов: {exc}")
+            return 0
+
+        submitted = 0
+        with self._lock:
+            self._known = {s.get("name") for s in servers if s.get("name")}
+            for name in list(self._snapshot):
+                if name not in self._known:
+                    self._snapshot.pop(name, None)
+                    self._updated_at.pop(name, None)
+            for srv in servers:
+                name = srv.get("name")
+                if not name or name in self._in_flight:
+                    continue
+                self._in_flight[name] = time.time()
+                self._executor.submit(self._poll_one, srv)
+                submitted += 1
+        return submitted
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as exc:
+                print(f"[server_status] Ошибка опроса: {exc}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    # ─────────── чтение ───────────
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Последний известный статус каждого сервера + `age_sec` (сколько секунд назад
+        получен) и `pending` (запрос к серверу ещё идёт). Сервер, по которому ещё
+        нет ни одного ответа, отдаётся как недоступный с `pending: True`.
+        """
+        now = time.time()
+        out: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for name in sorted(self._known):
+                data = self._snapshot.get(name)
+                if data is None:
+                    item = {"server": name, "pingOk": False, "gnOk": False, "dnOk": False}
+                    item["age_sec"] = None
+                else:
+                    item = deepcopy(data)
+                    item["age_sec"] = round(now - self._updated_at[name], 1)
+                item["pending"] = name in self._in_flight
+                out[name] = item
+        return out
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# ░░░  task_state.py  ░░░
+"""
+Состояние задач Планировщика Windows для RssCounterWeb.
+
+— Один вызов `schtasks /Query /FO CSV /V` перечисляет ВСЕ задачи, вывод
+  разбирается один раз и кешируется на TASK_STATE_TTL секунд.
+— /api/taskState и /api/taskStates читают из памяти, а не порождают schtasks
+  на каждую задачу при каждом опросе CentralDASH.
+— Задачи переключает taskSTOP.py (отдельный процесс): новое состояние видно
+  после истечения TTL, не позже чем через TASK_STATE_TTL секунд.
+— Провайдер подменяемый: FakeTaskProvider работает без Windows (тесты, бенчмарк).
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import os
+import subprocess
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+TASK_STATE_TTL = float(os.getenv("TASK_STATE_TTL", "10"))
+
+_ENABLED_WORDS = {"enabled", "включено", "включена"}
+_DISABLED_WORDS = {"disabled", "отключено", "отключена"}
+_STATE_HEADERS = ("scheduled task state", "состояние назначенного задания", "состояние задачи")
+
+
+def normalize_task_name(name: str) -> str:
+    """'\\LD СЛЁТ' и 'LD слёт' — одна и та же задача."""
+    return (name or "").strip().lstrip("\\").lower()
+
+
+def _decode(raw: bytes) -> str:
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("cp866", errors="ignore")
+
+
+def _state_from_word(value: str) -> Optional[bool]:
+    value = (value or "").strip().lower()
+    if value in _ENABLED_WORDS:
+        return True
+    if value in _DISABLED_WORDS:
+        return False
+    return None
+
+
+def parse_schtasks_csv(text: str) -> Dict[str, Optional[bool]]:
+    """
+    Разбирает вывод `schtasks /Query /FO CSV /V` в {нормализованное имя: True/False/None}.
+
+    Колонка состояния ищется по заголовку (en/ru); если локаль неизвестна —
+    по значениям: берётся колонка, где встречаются только enabled/disabled.
+    Для задач из папок дополнительно регистрируется короткое имя без пути.
+    """
+    rows = [r for r in csv.reader(io.StringIO(text)) if r]
+    if not rows:
+        return {}
+    header = rows[0]
+    lowered = [h.strip().lower() for h in header]
+    body = [r for r in rows[1:] if r != header]
+
+    name_idx = next((i for i, h in enumerate(lowered) if h in ("taskname", "имя задачи")), 1)
+    state_idx = next(
+        (i for i, h in enumerate(lowered) if any(h.startswith(s) for s in _STATE_HEADERS)),
+        None,
+    )
+    if state_idx is None:
+        for i in range(len(header)):
+            values = {r[i].strip().lower() for r in body if i < len(r)}
+            if values and values <= (_ENABLED_WORDS | _DISABLED_WORDS):
+                state_idx = i
+                break
+
+    states: Dict[str, Optional[bool]] = {}
+    for row in body:
+        if len(row) <= name_idx:
+            continue
+        full = normalize_task_name(row[name_idx])
+        if not full:
+            continue
+        state = _state_from_word(row[state_idx]) if state_idx is not None and state_idx < len(row) else None
+        states[full] = state
+        leaf = full.rsplit("\\", 1)[-1]
+        states.setdefault(leaf, state)
+    return states
+
+
+# ─────────────────────────── Провайдеры ───────────────────────────
+class TaskProvider:
+    """Источник состояний задач: перечислить все разом."""
+
+    def enumerate(self) -> Dict[str, Optional[bool]]:
+        raise NotImplementedError
+
+
+class SchtasksProvider(TaskProvider):
+    def __init__(self, timeout: float = 15):
+        self.timeout = timeout
+
+    def enumerate(self) -> Dict[str, Optional[bool]]:
+        raw = subprocess.check_output(
+            ["schtasks", "/Query", "/FO", "CSV", "/V"],
+            stderr=subprocess.DEVNULL, timeout=self.timeout,
+        )
+        return parse_schtasks_csv(_decode(raw))
+
+
+class FakeTaskProvider(TaskProvider):
+    """Провайдер в памяти для Linux/тестов; считает «запуски schtasks»."""
+
+    def __init__(self, tasks: Optional[Dict[str, bool]] = None, delay: float = 0.0):
+        self.tasks = {normalize_task_name(k): v for k, v in (tasks or {}).items()}
+        self.delay = delay
+        self.calls = 0
+
+    def enumerate(self) -> Dict[str, Optional[bool]]:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return dict(self.tasks)
+
+
+def default_provider() -> TaskProvider:
+    if os.name == "nt":
+        return SchtasksProvider()
+    return FakeTaskProvider()
+
+
+# ─────────────────────────── Сервис ───────────────────────────
+class TaskStateService:
+    """
+    Кеш состояний задач с TTL. Обновление — под одной блокировкой, так что
+    одновременные запросы после истечения TTL дают один вызов провайдера.
+    При ошибке перечисления отдаётся прошлый снимок (или None для всех задач).
+    """
+
+    def __init__(self, provider: Optional[TaskProvider] = None, ttl: float = TASK_STATE_TTL):
+        self.provider = provider or default_provider()
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._states: Dict[str, Optional[bool]] = {}
+        self._loaded_at = 0.0
+        self._valid = False
+        self.refreshes = 0
+        self.last_error: Optional[str] = None
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._valid = False
+
+    def _snapshot(self) -> Dict[str, Optional[bool]]:
+        with self._lock:
+            if self._valid and time.monotonic() - self._loaded_at < self.ttl:
+                return self._states
+            try:
+                self._states = self.provider.enumerate()
+                self.last_error = None
+            except Exception as e:  # schtasks упал/завис — не роняем эндпоинт
+                self.last_error = str(e)
+                print("[task_state] enumerate failed:", e)
+            self._loaded_at = time.monotonic()
+            self._valid = True
+            self.refreshes += 1
+            return self._states
+
+    def all_states(self) -> Dict[str, Optional[bool]]:
+        return dict(self._snapshot())
+
+    def get(self, name: str) -> Optional[bool]:
+        return self._snapshot().get(normalize_task_name(name))
+
+    def get_many(self, names: Iterable[str]) -> Dict[str, Optional[bool]]:
+        states = self._snapshot()
+        return {n: states.get(normalize_task_name(n)) for n in names}
+
+
+if __name__ == "__main__":
+    for name, state in sorted(TaskStateService().all_states().items()):
+        print(name, state)
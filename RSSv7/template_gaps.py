@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# ░░░  template_gaps.py  ░░░
+"""
+Инкрементальная сверка шаблонов со схемой (collect_templates_schema_gaps).
+
+— Для каждого шаблона хранится его «форма»: ScriptId и список ключей Config
+  каждого шага. Формы лежат в SQLite (template_shapes_cache.db) с ключом
+  (size, mtime_ns) и sha256 содержимого; изменение одного шаблона — одна запись.
+— При сверке перечитываются только изменившиеся файлы; если mtime сменился, а
+  содержимое нет (тот же sha256), файл не разбирается заново.
+— Пропуски считаются по формам в памяти для любой схемы, так что изменение
+  schema_cache.json не требует перечитывать шаблоны; результат по шаблону
+  запоминается до смены его содержимого или отпечатка схемы.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+
+def template_shape(steps: Any) -> List[list]:
+    """[[ScriptId, [ключи Config...]], ...] — всё, что нужно для поиска пропусков."""
+    if not isinstance(steps, list):
+        return []
+    shape = []
+    for step in steps:
+        if not isinstance(step, dict):
+            continue
+        sid = step.get("ScriptId")
+        if not sid:
+            continue
+        cfg = step.get("Config") or {}
+        shape.append([sid, list(cfg) if isinstance(cfg, (dict, list)) else []])
+    return shape
+
+
+def schema_fingerprint(schema: dict) -> str:
+    """Отпечаток того, что влияет на пропуски: ScriptId и порядок их полей."""
+    material = json.dumps(
+        [[sid, list((spec or {}).get("fields") or {})] for sid, spec in sorted(schema.items())],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def shape_gaps(shape: List[list], schema: dict) -> List[Dict[str, Any]]:
+    """То же, что find_template_schema_gaps, но по сохранённой форме."""
+    gaps = []
+    for sid, keys in shape:
+        if sid not in schema:
+            continue
+        present = set(keys)
+        missing = [k for k in (schema[sid].get("fields") or {}) if k not in present]
+        if missing:
+            gaps.append({"script_id": sid, "keys": missing})
+    return gaps
+
+
+class TemplateShapeIndex:
+    """Формы шаблонов каталога с постоянным кешем на диске."""
+
+    def __init__(self, templates_dir: str, cache_path: Optional[str] = None):
+        self.templates_dir = templates_dir
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, dict]] = None
+        self._gaps: Dict[str, tuple] = {}   # name → (sha256, отпечаток схемы, пропуски)
+        self.parsed = 0          # сколько файлов разобрано (для тестов/логов)
+
+    # ─────────── кеш на диске ───────────
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.cache_path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS template_shapes(
+              name     TEXT PRIMARY KEY,
+              size     INTEGER,
+              mtime_ns INTEGER,
+              sha256   TEXT,
+              shape    TEXT)
+        """)
+        return conn
+
+    def _load(self) -> Dict[str, dict]:
+        if not self.cache_path:
+            return {}
+        try:
+            conn = self._connect()
+            try:
+                rows = conn.execute("SELECT name, size, mtime_ns, sha256, shape FROM template_shapes").fetchall()
+            finally:
+                conn.close()
+            return {
+                name: {"size": size, "mtime_ns": mtime_ns, "sha256": sha, "shape": json.loads(shape)}
+                for name, size, mtime_ns, sha, shape in rows
+            }
+        except (sqlite3.Error, ValueError) as exc:
+            print(f"[template_gaps] Кеш форм не прочитан, пересоберём: {exc}")
+            return {}
+
+    def _save(self, changed: Dict[str, dict], removed: List[str]) -> None:
+        if not self.cache_path:
+            return
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO template_shapes VALUES (?, ?, ?, ?, ?)",
+                        [(name, e["size"], e["mtime_ns"], e["sha256"], json.dumps(e["shape"], ensure_ascii=False))
+                         for name, e in changed.items()],
+                    )
+                    conn.executemany("DELETE FROM template_shapes WHERE name = ?", [(n,) for n in removed])
+            finally:
+                conn.close()
+        except sqlite3.Error as exc:
+            print(f"[template_gaps] Не удалось сохранить кеш форм: {exc}")
+
+    # ─────────── обход ───────────
+    def _refresh_entry(self, full: str, st: os.stat_result, old: Optional[dict]) -> dict:
+        with open(full, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        if old and old.get("sha256") == digest:
+            return {**old, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        try:
+            steps = json.loads(raw.decode("utf-8"))
+        except Exception:
+            steps = []      # как _json_read_or: нечитаемый шаблон — без пропусков
+        self.parsed += 1
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest, "shape": template_shape(steps)}
+
+    def scan(self) -> Dict[str, dict]:
+        """Актуальные формы всех *.json каталога; разбирает только изменившиеся."""
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            entries = self._entries
+            changed: Dict[str, dict] = {}
+            seen = set()
+            try:
+                names = sorted(os.listdir(self.templates_dir))
+            except FileNotFoundError:
+                names = []
+            for name in names:
+                if not name.lower().endswith(".json"):
+                    continue
+                full = os.path.join(self.templates_dir, name)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                if not os.path.isfile(full):
+                    continue
+                seen.add(name)
+                old = entries.get(name)
+                if old and old.get("size") == st.st_size and old.get("mtime_ns") == st.st_mtime_ns:
+                    continue
+                try:
+                    entries[name] = changed[name] = self._refresh_entry(full, st, old)
+                except OSError as exc:
+                    print(f"[template_gaps] {name}: {exc}")
+                    seen.discard(name)
+            removed = [n for n in entries if n not in seen]
+            for name in removed:
+                del entries[name]
+                self._gaps.pop(name, None)
+            if changed or removed:
+                self._save(changed, removed)
+            return {name: entries[name] for name in sorted(seen)}
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        with self._lock:
+            if self._entries is None:
+                return
+            if name is None:
+                self._entries = {}
+                self._gaps.clear()
+            else:
+                self._entries.pop(name, None)
+                self._gaps.pop(name, None)
+
+    def collect_gaps(self, schema: dict, alias_targets: Optional[Dict[str, List[str]]] = None) -> List[dict]:
+        """Отчёт в формате collect_templates_schema_gaps."""
+        alias_targets = alias_targets or {}
+        schema_fp = schema_fingerprint(schema)
+        results = []
+        for name, entry in self.scan().items():
+            memo = self._gaps.get(name)
+            if memo and memo[0] == entry["sha256"] and memo[1] == schema_fp:
+                gaps = memo[2]
+            else:
+                gaps = shape_gaps(entry.get("shape") or [], schema)
+                self._gaps[name] = (entry["sha256"], schema_fp, gaps)
+            gaps = [{"script_id": g["script_id"], "keys": list(g["keys"])} for g in gaps]
+            if not gaps:
+                continue
+            results.append({
+                "template": name,
+                "label": os.path.splitext(name)[0],
+                "aliases": alias_targets.get(name, []),
+                "gaps": gaps,
+            })
+        return results
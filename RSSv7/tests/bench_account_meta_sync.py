@@ -0,0 +1,74 @@
+"""Бенчмарк sync_account_meta: плейсхолдер на каждый Id против временной таблицы AccountMetaSync.
+
+Три сверки подряд: первая (пустая таблица), после замены доли --churn Id и
+без изменений. Для каждой — время, число запросов и наибольшее число
+параметров в одном запросе; у прежней схемы на больших фермах — ошибка
+«too many SQL variables».
+
+Запуск: `python RSSv7/tests/bench_account_meta_sync.py --ids 50000`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import rss_paths  # noqa: F401
+from account_meta_sync import AccountMetaSync
+from test_account_meta_sync import ACCOUNT_META_DDL, legacy_sync, synthetic_ids, traced_connect
+
+
+def run(name, base, changed, fn) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "res.db")
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(ACCOUNT_META_DDL)
+        conn.close()
+        state = {}
+        results = []
+        for label, ids in (("первая", base), ("изменение", changed), ("без изменений", changed)):
+            statements: list = []
+            t0 = time.perf_counter()
+            err = fn(path, ids, statements, state)
+            ms = (time.perf_counter() - t0) * 1000
+            most = max((n for _, n in statements), default=0)
+            stats = f"{ms:.0f} мс, запросов {len(statements)}, макс. параметров в запросе {most}"
+            results.append(f"{label}: {'ошибка ' + err if err else stats}")
+        print(f"{name:7}: " + "; ".join(results))
+
+
+def legacy(path, ids, statements, state):
+    conn = traced_connect(path, statements)
+    try:
+        legacy_sync(conn, ids)
+    except sqlite3.OperationalError as exc:   # too many SQL variables
+        return str(exc)
+    finally:
+        conn.close()
+
+
+def temp_table(path, ids, statements, state):
+    state["statements"] = statements
+    if "syncer" not in state:
+        state["syncer"] = AccountMetaSync(lambda: traced_connect(path, state["statements"]))
+    state["syncer"].sync(ids)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ids", type=int, default=50_000)
+    parser.add_argument("--churn", type=float, default=0.02, help="доля Id, меняющихся между сверками")
+    args = parser.parse_args()
+
+    base, changed = synthetic_ids(args.ids, args.churn)
+    print(f"{args.ids} Id, меняется {args.churn:.0%}; sqlite {sqlite3.sqlite_version}")
+    run("legacy", base, changed, legacy)
+    run("temp", base, changed, temp_table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Бенчмарк пакетной починки конфигов: удалить-и-скопировать каждый против copy_if_changed в пуле.
+
+Синтетическое дерево: N конфигов-источников и копия, в которой «плохой шаблон»
+испортил только долю --changed файлов.
+
+Запуск: `python RSSv7/tests/bench_config_repair.py --accounts 200 --size-kb 512 --changed 0.25`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import shutil
+import stat
+import tempfile
+import time
+from typing import List, Tuple
+
+import rss_paths  # noqa: F401
+from config_repair import CONFIG_REPAIR_WORKERS, RepairJobRunner, copy_if_changed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=512)
+    parser.add_argument("--changed", type=float, default=0.25, help="доля испорченных конфигов")
+    parser.add_argument("--workers", type=int, default=CONFIG_REPAIR_WORKERS)
+    args = parser.parse_args()
+    accounts, changed_ratio = args.accounts, args.changed
+
+    rnd = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        src_dir = os.path.join(tmp, "src", "config")
+        os.makedirs(src_dir)
+        payloads = {}
+        for i in range(accounts):
+            payloads[i] = rnd.randbytes(args.size_kb * 1024)
+            with open(os.path.join(src_dir, f"leidian{i}.config"), "wb") as fh:
+                fh.write(payloads[i])
+
+        def make_dst(name: str) -> str:
+            dst_dir = os.path.join(tmp, name, "config")
+            os.makedirs(dst_dir)
+            for i in range(accounts):
+                data = payloads[i]
+                if i < accounts * changed_ratio:
+                    data = data[:-16] + b"x" * 16
+                with open(os.path.join(dst_dir, f"leidian{i}.config"), "wb") as fh:
+                    fh.write(data)
+            return dst_dir
+
+        legacy_dst = make_dst("legacy")
+        t0 = time.perf_counter()
+        legacy_bytes = 0
+        for i in range(accounts):
+            src = os.path.join(src_dir, f"leidian{i}.config")
+            dst = os.path.join(legacy_dst, f"leidian{i}.config")
+            os.chmod(dst, stat.S_IWRITE)
+            os.remove(dst)
+            shutil.copy2(src, dst)
+            legacy_bytes += os.path.getsize(src)
+        legacy_time = time.perf_counter() - t0
+
+        new_dst = make_dst("new")
+
+        def repair(acc_id: str) -> Tuple[List[str], int]:
+            copied, written = copy_if_changed(
+                os.path.join(src_dir, f"leidian{acc_id}.config"),
+                os.path.join(new_dst, f"leidian{acc_id}.config"),
+            )
+            return [f"{acc_id}: {'copied' if copied else 'same'}"], written
+
+        runner = RepairJobRunner(args.workers)
+        t0 = time.perf_counter()
+        job = runner.submit([str(i) for i in range(accounts)], repair)
+        runner.wait(job)
+        new_time = time.perf_counter() - t0
+        status = job.status()
+
+    print(f"{accounts} аккаунтов × {args.size_kb} КБ, испорчено {changed_ratio:.0%}")
+    print(f"legacy : {legacy_time:.2f} с, записано {legacy_bytes / 1e6:.1f} МБ")
+    print(f"jobs   : {new_time:.2f} с, записано {status['bytes_written'] / 1e6:.1f} МБ "
+          f"({args.workers} потоков, {status['counts']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Бенчмарк поиска пустых папок: прежний обход против EmptyDirScanner.
+
+Дерево ~ эмуляторы / папки / подпапки / листья со ссылками-циклами на корень.
+Меряются пул потоков, отзывчивость «UI» во время фонового обхода и кеш
+отпечатков: холодный, тёплый и с 1% изменённых папок.
+
+Запуск: `python RSSv7/tests/bench_empty_dir_scanner.py --dirs 200000`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+import rss_paths  # noqa: F401
+from empty_dir_scanner import DIRCHECK_WORKERS, EmptyDirScanner, FingerprintCache
+from test_empty_dir_scanner import legacy_find_empty, make_tree
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dirs", type=int, default=200000)
+    parser.add_argument("--workers", type=int, default=DIRCHECK_WORKERS)
+    args = parser.parse_args()
+    workers = args.workers
+
+    # ветвление ~ эмуляторы / папки / подпапки / листья
+    fanout = [10, 20, 20, max(1, args.dirs // 4000)]
+    tmp = Path(tempfile.mkdtemp(prefix="emptydirs_"))
+    try:
+        root = tmp / "vms"
+        root.mkdir()
+        t0 = time.perf_counter()
+        made = make_tree(root, fanout)
+        print(f"дерево: {made} папок, ссылки-циклы в каждой папке верхнего уровня "
+              f"(создано за {time.perf_counter() - t0:.1f} с)")
+
+        t0 = time.perf_counter()
+        legacy = legacy_find_empty(root)
+        t_legacy = time.perf_counter() - t0
+        print(f"legacy        : {t_legacy:6.2f} с, пустых {len(legacy)}")
+
+        for w in sorted({1, workers}):
+            s = EmptyDirScanner(workers=w)
+            res = s.run(root)
+            assert set(res) == set(legacy)
+            print(f"пул {w:2d} потоков: {s.stats.elapsed:6.2f} с, пустых {len(res)}, scandir {s.stats.listed}")
+
+        # отзывчивость UI: главный поток «тикает» раз в 10 мс, пока идёт фоновый обход
+        first: List[float] = []
+        s = EmptyDirScanner(workers=workers,
+                            on_found=lambda batch: first or first.append(time.perf_counter()))
+        t0 = time.perf_counter()
+        th = threading.Thread(target=s.run, args=(root,))
+        th.start()
+        worst, last = 0.0, time.perf_counter()
+        while th.is_alive():
+            time.sleep(0.01)
+            now = time.perf_counter()
+            worst, last = max(worst, now - last - 0.01), now
+        th.join()
+        print(f"фоновый обход : первая пачка через {(first[0] - t0) * 1000:.0f} мс, "
+              f"макс. задержка тика UI {worst * 1000:.0f} мс (прежде — весь скан, {t_legacy:.1f} с)")
+
+        cache = FingerprintCache(tmp / "fp.db")
+        cold = EmptyDirScanner(workers=workers, cache=cache, racy_sec=0)
+        cold.run(root)
+        warm = EmptyDirScanner(workers=workers, cache=cache, racy_sec=0)
+        res = warm.run(root)
+        assert set(res) == set(legacy)
+        print(f"кеш холодный  : {cold.stats.elapsed:6.2f} с; тёплый: {warm.stats.elapsed:6.2f} с "
+              f"(scandir {warm.stats.listed}, из кеша {warm.stats.cached})")
+        leaves = [p for p in root.glob("d0_0/d1_*/d2_*/d3_*")][: max(1, made // 100)]
+        for p in leaves:
+            (p / "touched.txt").write_bytes(b"")
+        churn = EmptyDirScanner(workers=workers, cache=cache, racy_sec=0)
+        churn.run(root)
+        print(f"кеш, 1% папок изменено: {churn.stats.elapsed:6.2f} с (scandir {churn.stats.listed})")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
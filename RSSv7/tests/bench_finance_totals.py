@@ -0,0 +1,65 @@
+"""Бенчмарк /api/income: все строки account_meta в Python против SUM по индексу и кеша FinanceTotals.
+
+Запуск: `python RSSv7/tests/bench_finance_totals.py --accounts 10000`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date
+
+import rss_paths  # noqa: F401
+from finance_totals import FinanceTotals, compute_income
+from test_finance_totals import ACCOUNT_META_DDL, EXPENSES_DDL, fill, legacy_income
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=10_000)
+    parser.add_argument("--repeats", type=int, default=30)
+    args = parser.parse_args()
+
+    today = date.today()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "resources_web.db")
+        conn = sqlite3.connect(path)
+        conn.execute(ACCOUNT_META_DDL)
+        conn.execute(EXPENSES_DDL)
+        fill(conn, random.Random(1), args.accounts, today)
+
+        def legacy_call():
+            c = sqlite3.connect(path)
+            c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='expenses'").fetchone()
+            legacy_income(c, today)
+            c.close()
+
+        def timed(fn):
+            out = []
+            for _ in range(args.repeats):
+                t0 = time.perf_counter()
+                fn()
+                out.append((time.perf_counter() - t0) * 1000)
+            return out
+
+        legacy = timed(legacy_call)
+        totals = FinanceTotals(lambda: sqlite3.connect(path))
+        totals.ensure_schema()
+        uncached = timed(lambda: compute_income(sqlite3.connect(path), today))
+        totals.income(today)
+        cached = timed(lambda: totals.income(today))
+        conn.close()
+
+    print(f"{args.accounts} аккаунтов")
+    print(f"legacy  : median {statistics.median(legacy):.2f} мс")
+    print(f"SQL     : median {statistics.median(uncached):.2f} мс")
+    print(f"кеш     : median {statistics.median(cached):.3f} мс (проверка finance_version)")
+
+
+if __name__ == "__main__":
+    main()
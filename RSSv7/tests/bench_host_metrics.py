@@ -0,0 +1,57 @@
+"""Бенчмарк self_status: замер метрик на каждый запрос против снимка фонового сэмплера.
+
+Прежний обработчик ждал cpu_percent(interval=0.5) и обходил процессы при
+каждом запросе; HostMetricsSampler отдаёт готовый снимок. Метрики — настоящие (psutil).
+
+Запуск: `python RSSv7/tests/bench_host_metrics.py --calls 1000`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import Any, Dict
+
+import psutil
+
+import rss_paths  # noqa: F401
+from host_metrics import DN_PROCESS, GN_PROCESS, HostMetricsSampler
+
+
+def legacy_status() -> Dict[str, Any]:
+    gn, dn_count = False, 0
+    for proc in psutil.process_iter(["name"]):
+        name = (proc.info.get("name") or "").lower()
+        gn = gn or GN_PROCESS in name
+        dn_count += DN_PROCESS in name
+    return {"cpu": psutil.cpu_percent(interval=0.5), "ram": psutil.virtual_memory().percent,
+            "gnOk": gn, "dnCount": dn_count}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000)
+    args = parser.parse_args()
+
+    legacy = []
+    for _ in range(5):
+        t0 = time.perf_counter()
+        legacy_status()
+        legacy.append((time.perf_counter() - t0) * 1000)
+
+    sampler = HostMetricsSampler(server_name="bench", interval=0.2).start()
+    timings = []
+    for _ in range(args.calls):
+        t0 = time.perf_counter()
+        sampler.snapshot()
+        timings.append((time.perf_counter() - t0) * 1000)
+    sampler.stop()
+    timings.sort()
+    print(f"legacy (force refresh): median {statistics.median(legacy):.1f} мс")
+    print(f"sampler snapshot      : {args.calls} вызовов, median {statistics.median(timings):.4f} мс, "
+          f"p99 {timings[int(len(timings) * 0.99) - 1]:.4f} мс")
+
+
+if __name__ == "__main__":
+    main()
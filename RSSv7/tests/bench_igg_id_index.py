@@ -0,0 +1,70 @@
+"""Бенчмарк IGG_ID_PARSER: полный разбор логов против инкрементального IggIdIndex.
+
+Каждый замер индекса — новый запуск парсера (индекс читается с диска): первый
+запуск, без изменений и после дописки --append-mb МБ в логи.
+
+Запуск: `python RSSv7/tests/bench_igg_id_index.py --size-mb 2048 --files 8`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import rss_paths  # noqa: F401
+from igg_id_index import IggIdIndex
+from test_igg_id_index import append_log, legacy_scan
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--append-mb", type=float, nargs="*", default=[1, 10, 100])
+    args = parser.parse_args()
+    files = args.files
+
+    rnd = random.Random(3)
+    accounts = [f"{rnd.getrandbits(64):016x}" for _ in range(500)]
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, f"bot20250420_{i:02d}.txt") for i in range(files)]
+        for p in paths:
+            append_log(p, args.size_mb * 2**20 // files, rnd, accounts)
+        total = sum(os.path.getsize(p) for p in paths)
+        db = os.path.join(tmp, "igg_id_index.db")
+
+        def measure(fn):
+            t0, c0 = time.perf_counter(), time.process_time()
+            fn()
+            return time.perf_counter() - t0, time.process_time() - c0
+
+        def indexed():
+            index = IggIdIndex(db)            # новый запуск IGG_ID_PARSER — индекс с диска
+            index.update(paths)
+            index.pairs()
+            index.close()
+            return index.stats
+
+        print(f"{files} логов, {total / 2**20:.0f} МБ; строки List IDs ~1 на 5000")
+        wall, cpu = measure(lambda: legacy_scan(paths))
+        print(f"  {'legacy, полный разбор':34}: {wall:7.2f} с (CPU {cpu:6.2f} с), {total / 2**20 / wall:6.0f} МБ/с")
+        wall, cpu = measure(indexed)
+        print(f"  {'индекс, первый запуск':34}: {wall:7.2f} с (CPU {cpu:6.2f} с), {total / 2**20 / wall:6.0f} МБ/с")
+        for mb in [0.0] + args.append_mb:
+            grown = 0
+            for p in paths:
+                if mb:
+                    before = os.path.getsize(p)
+                    append_log(p, int(mb * 2**20 / files), rnd, accounts)
+                    grown += os.path.getsize(p) - before
+            stats = {}
+            wall, cpu = measure(lambda: stats.update(indexed()))
+            print(f"  {f'индекс, дописано {grown / 2**20:.1f} МБ':34}: {wall * 1000:7.1f} мс (CPU {cpu * 1000:6.1f} мс), "
+                  f"прочитано {stats['bytes'] / 2**20:7.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
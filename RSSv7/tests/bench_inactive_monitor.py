@@ -0,0 +1,81 @@
+"""Бенчмарк inactive_monitor: вся таблица в Python против одного SQL-запроса по индексу.
+
+Прежний проход читает профиль с диска и всю resources двумя соединениями;
+новый — ProfileCache и find_offenders. Отдельно сравнивается дедупликация
+уведомлений: inactive_state.json против таблицы inactive_alert_state.
+
+Запуск: `python RSSv7/tests/bench_inactive_monitor.py --accounts 20000`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+import rss_paths  # noqa: F401
+import inactive_monitor
+from inactive_monitor import MAX_LAST_SEEN_HOURS, THRESH_HOURS, _connect, _sync_alert_state, find_offenders
+from profile_cache import ProfileCache
+from test_inactive_monitor import legacy_offenders, make_fixture
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+    accounts, repeats = args.accounts, args.repeats
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        db_path, profile_path = make_fixture(tmp, accounts)
+        cache = ProfileCache(str(profile_path))
+
+        def legacy() -> int:
+            return len(legacy_offenders(db_path, profile_path, THRESH_HOURS, MAX_LAST_SEEN_HOURS))
+
+        def sql() -> int:
+            active = {x.get("Id") for x in cache.get().active}
+            conn = _connect(db_path)
+            try:
+                return len(find_offenders(conn, THRESH_HOURS, MAX_LAST_SEEN_HOURS, active_ids=active))
+            finally:
+                conn.close()
+
+        with mock.patch.object(inactive_monitor, "STATE_FILE", tmp / "inactive_state.json"):
+            sql()                               # индекс и таблица состояния создаются один раз
+        print(f"{accounts} аккаунтов, профиль {profile_path.stat().st_size / 1e6:.1f} МБ")
+        for label, fn in (("legacy", legacy), ("sql", sql)):
+            times = []
+            for _ in range(repeats):
+                t0 = time.perf_counter()
+                found = fn()
+                times.append((time.perf_counter() - t0) * 1000)
+            print(f"{label:6}: median {statistics.median(times):.1f} мс, min {min(times):.1f} мс, нарушителей {found}")
+
+        conn = _connect(db_path)
+        offenders = find_offenders(conn, THRESH_HOURS, MAX_LAST_SEEN_HOURS)
+        _sync_alert_state(conn, offenders)
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            _sync_alert_state(conn, offenders)
+        state_sql = (time.perf_counter() - t0) / repeats * 1000
+        conn.close()
+        state_json = tmp / "state.json"
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            prev = set(json.loads(state_json.read_text(encoding="utf-8")).get("ids", [])) if state_json.is_file() else set()
+            cur = {o["id"] for o in offenders}
+            _ = [o for o in offenders if o["id"] not in prev], [p for p in prev if p not in cur]
+            state_json.write_text(json.dumps({"ids": list(cur)}, ensure_ascii=False, indent=2), encoding="utf-8")
+        state_file = (time.perf_counter() - t0) / repeats * 1000
+        print(f"дедупликация ({len(offenders)} id, состав не менялся): JSON {state_file:.2f} мс, SQLite {state_sql:.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
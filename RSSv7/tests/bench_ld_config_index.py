@@ -0,0 +1,81 @@
+"""Бенчмарк LD_check.collect_crashed: os.walk и json.load всех конфигов против LdConfigIndex.
+
+Каждый замер индекса — новый запуск LD_check (индекс читается с диска):
+первый запуск, без изменений, с --churn и с 10×--churn изменённых конфигов.
+
+Запуск: `python RSSv7/tests/bench_ld_config_index.py --configs 1000 --churn 0.01`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import rss_paths  # noqa: F401
+from ld_config_index import LdConfigIndex
+from test_ld_config_index import accept, legacy_scan, new_stats, write_config
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--configs", type=int, default=1000)
+    parser.add_argument("--churn", type=float, default=0.01)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    configs = args.configs
+
+    rnd = random.Random(4)
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, "config")
+        os.makedirs(folder)
+        old = time.time() - 3600
+        for i in range(configs):
+            write_config(os.path.join(folder, f"leidian{i}.config"), i, f"farm{i}", old)
+        cache = os.path.join(tmp, "ld_config_index.db")
+
+        def measure(fn):
+            t0 = time.perf_counter()
+            stats = fn()
+            return (time.perf_counter() - t0) * 1000, stats
+
+        def legacy():
+            stats = new_stats()
+            legacy_scan(folder, accept, stats)
+            return stats
+
+        def indexed():
+            index = LdConfigIndex(folder, cache)     # новый запуск LD_check — индекс с диска
+            index.scan(accept)
+            return index.stats
+
+        def touch(fraction):
+            stamp = old + rnd.randint(1, 3000)
+            for i in rnd.sample(range(configs), max(1, int(configs * fraction))):
+                write_config(os.path.join(folder, f"leidian{i}.config"), i, f"farm{i}-{stamp}", stamp)
+
+        lines = []
+        ms, st = measure(legacy)
+        lines.append(("legacy", ms, st))
+        ms, st = measure(indexed)
+        lines.append(("индекс, первый запуск", ms, st))
+        for fraction in (0.0, args.churn, args.churn * 10):
+            samples = []
+            for _ in range(args.runs):
+                if fraction:
+                    touch(fraction)
+                samples.append(measure(indexed))
+            ms = statistics.median(s[0] for s in samples)
+            lines.append((f"индекс, изменено {fraction:.0%}", ms, samples[-1][1]))
+
+    print(f"{configs} конфигов, медиана по {args.runs} запускам")
+    for label, ms, st in lines:
+        print(f"{label:24}: {ms:7.1f} мс, прочитано файлов {st['read']:5}, байт {st['bytes']:9}, "
+              f"листингов каталогов {st['listed']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Бенчмарк страницы /api/logs: фильтр instr(upper(raw_line)) и разбор на запрос против сохранённых полей.
+
+Страница — 150 последних не-debug строк аккаунта; «после» — колонки
+log_fields.STORED_COLUMNS и индекс (acc_id, debug_marker, id).
+
+Запуск: `python RSSv7/tests/bench_log_fields.py --rows 2000000`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import rss_paths  # noqa: F401
+from test_log_fields import create_cached_logs, insert_rows, legacy_page, sample_line, stored_page
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--accounts", type=int, default=400)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    rnd = random.Random(8)
+    acc_ids = [f"{rnd.getrandbits(64):016x}" for _ in range(args.accounts)]
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "logs.db"))
+        conn.execute("PRAGMA journal_mode=WAL")
+        create_cached_logs(conn)
+
+        def gen():
+            for i in range(args.rows):
+                acc = acc_ids[i % args.accounts]
+                dt = f"2025-03-{1 + (i // 100000) % 28:02d} 12:{i % 60:02d}:{i % 59:02d}.{i % 1000:03d} +03:00"
+                # как у живой фермы: заметная доля debug-строк
+                raw = sample_line(rnd, acc, dt) if rnd.random() > 0.35 else f"{dt} [DBG] tick {i}"
+                yield acc, "farm", dt, raw
+
+        t0 = time.perf_counter()
+        insert_rows(conn, gen())
+        print(f"{args.rows} строк, {args.accounts} аккаунтов, сгенерировано за {time.perf_counter() - t0:.0f} с")
+        conn.row_factory = sqlite3.Row
+
+        def timed(page):
+            out = []
+            for i in range(args.requests):
+                t0 = time.perf_counter()
+                page(conn, acc_ids[i % args.accounts])
+                out.append((time.perf_counter() - t0) * 1000)
+            out.sort()
+            return statistics.median(out), out[int(len(out) * 0.95) - 1]
+
+        before = timed(legacy_page)
+        conn.execute("CREATE INDEX idx_cached_logs_acc_debug_id ON cached_logs(acc_id, debug_marker, id)")
+        after = timed(stored_page)
+        conn.close()
+
+    print(f"до    (instr(upper) + разбор): median {before[0]:.1f} мс, p95 {before[1]:.1f} мс")
+    print(f"после (колонки + индекс)     : median {after[0]:.1f} мс, p95 {after[1]:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Бенчмарк Gn_Ld_Check: весь кусок лога построчно со списком регэкспов против потокового scan_range.
+
+Замеры МБ/с и CPU: догон всего набора (после простоя или ротации) — прежний
+разбор, поток вперёд и поток назад от конца файла; обычный цикл — дописано
+--append-mb к каждому файлу.
+
+Запуск: `python RSSv7/tests/bench_log_scanner.py --size-mb 1024`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+import rss_paths  # noqa: F401
+from log_scanner import BACKWARD_MIN, LogMatcher, scan_range
+from test_log_scanner import IDLE, LIVE, legacy_scan, write_log
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--append-mb", type=float, default=2)
+    args = parser.parse_args()
+
+    rnd = random.Random(11)
+    matcher = LogMatcher(LIVE, IDLE)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths, t = [], datetime(2025, 1, 1, 0, 0, 0)
+        t_gen = time.perf_counter()
+        for i in range(args.files):
+            p = os.path.join(tmp, f"bot20250101_{i:03d}.txt")
+            t = write_log(p, (args.size_mb << 20) // args.files, t, rnd)
+            paths.append(p)
+        total = sum(os.path.getsize(p) for p in paths)
+        print(f"набор: {args.files} файлов, {total / 1e6:.0f} МБ (сгенерирован за {time.perf_counter() - t_gen:.0f} с)")
+
+        def cycle(fn, ranges):
+            w0, c0 = time.perf_counter(), time.process_time()
+            nbytes = 0
+            for p, (a, b) in zip(paths, ranges):
+                fn(p, a, b)
+                nbytes += b - a
+            return time.perf_counter() - w0, time.process_time() - c0, nbytes
+
+        def legacy(p, a, b):
+            legacy_scan(p, a, b, time.time())
+
+        def stream(p, a, b, backward_min=BACKWARD_MIN):
+            scan_range(p, a, b, matcher, time.time(), backward_min=backward_min)
+
+        def forward_only(p, a, b):
+            stream(p, a, b, backward_min=1 << 62)
+
+        def report(label, wall, cpu, nbytes):
+            print(f"{label:28}: {wall:7.2f} с, CPU {cpu:7.2f} с, {nbytes / 1e6 / max(wall, 1e-9):8.1f} МБ/с")
+
+        full = [(0, os.path.getsize(p)) for p in paths]
+        print("догон всего набора (после простоя/ротации):")
+        report("legacy", *cycle(legacy, full))
+        report("поток вперёд", *cycle(forward_only, full))
+        report("поток назад от EOF", *cycle(stream, full))
+
+        # обычный цикл: к каждому файлу дописано append_mb
+        step = int(args.append_mb * (1 << 20))
+        tails = [(max(0, b - step), b) for _, b in full]
+        samples = {"legacy": [], "поток": []}
+        for _ in range(5):
+            samples["legacy"].append(cycle(legacy, tails))
+            samples["поток"].append(cycle(stream, tails))
+        print(f"обычный цикл (+{args.append_mb:g} МБ на файл), медиана из 5:")
+        for label, vals in samples.items():
+            report(label, statistics.median(v[0] for v in vals), statistics.median(v[1] for v in vals), vals[0][2])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Бенчмарк старта logs_cache.db: прежний init_logs_db на каждый старт против версионированных миграций.
+
+Сравниваются только шаги, которые делал прежний init_logs_db (миграции 1–5):
+первый старт на «старой» базе с дублями, следующий старт и однократный
+переход базы, уже обработанной прежним кодом.
+
+Запуск: `python RSSv7/tests/bench_logs_schema.py --rows 5000000`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+import rss_paths  # noqa: F401
+from logs_schema import LOGS_MIGRATIONS, migrate
+from test_logs_schema import QUIET, legacy_init, make_legacy_db
+
+
+def timed(path: str, fn) -> float:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    t0 = time.perf_counter()
+    fn(conn)
+    elapsed = time.perf_counter() - t0
+    conn.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--dups", type=float, default=0.05, help="доля дублей в cached_logs")
+    args = parser.parse_args()
+
+    legacy_steps = [m for m in LOGS_MIGRATIONS if m.version <= 5]
+    with tempfile.TemporaryDirectory() as tmp:
+        base = os.path.join(tmp, "base.db")
+        t0 = time.perf_counter()
+        make_legacy_db(base, args.rows, args.dups)
+        print(f"{args.rows} строк cached_logs (дублей {args.dups:.0%}), "
+              f"{os.path.getsize(base) / 1e6:.0f} МБ, сгенерировано за {time.perf_counter() - t0:.0f} с")
+
+        legacy = os.path.join(tmp, "legacy.db")
+        shutil.copy(base, legacy)
+        first = timed(legacy, legacy_init)
+        again = timed(legacy, legacy_init)
+        print(f"legacy   : первый старт {first:.1f} с, следующий старт {again:.1f} с")
+
+        new = os.path.join(tmp, "new.db")
+        shutil.copy(base, new)
+        first = timed(new, lambda c: migrate(c, legacy_steps, progress=QUIET))
+        again = timed(new, lambda c: migrate(c, legacy_steps, progress=QUIET))
+        print(f"migrate  : первый старт {first:.1f} с, следующий старт {again * 1000:.2f} мс")
+
+        # база, уже мигрированная прежним кодом, без schema_version
+        upgraded = timed(legacy, lambda c: migrate(c, legacy_steps, progress=QUIET))
+        print(f"переход с прежнего init_logs_db: {upgraded:.2f} с (один раз)")
+
+
+if __name__ == "__main__":
+    main()
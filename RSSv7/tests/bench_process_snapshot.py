@@ -0,0 +1,90 @@
+"""Бенчмарк тика CentralDASH к MONITOR_onlyLD: обход процессов на каждый запрос против общего снимка.
+
+legacy — /api/scriptStatus на каждый скрипт и /api/dnCount, каждый со своим
+обходом таблицы процессов; batch — один /api/scriptStatuses из индекса
+ProcessSnapshotSampler. В конце — цена реального process_iter на этом хосте.
+
+Запуск: `python RSSv7/tests/bench_process_snapshot.py --processes 500`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+from flask import Flask, jsonify, request
+
+import rss_paths  # noqa: F401
+from process_snapshot import PROC_SNAPSHOT_INTERVAL, ProcessSnapshotSampler, PsutilProcessSource
+from test_process_snapshot import FakeProcessSource, fake_rows, legacy_script_running
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=500)
+    parser.add_argument("--ticks", type=int, default=200)
+    args = parser.parse_args()
+
+    source = FakeProcessSource(fake_rows(args.processes))
+    scripts = ["RssCounterWebV7", "clo.exe"]                 # monitor_scripts по умолчанию CentralDASH
+    sampler = ProcessSnapshotSampler(source, interval=2)
+    app = Flask("process-snapshot-bench")
+
+    @app.route("/legacy/scriptStatus")
+    def legacy_status():
+        return jsonify({"running": legacy_script_running(source, request.args.get("script", ""))})
+
+    @app.route("/legacy/dnCount")
+    def legacy_dn():
+        return jsonify({"dnCount": sum(1 for n, _e, _c in source.processes() if n.lower() == "dnplayer.exe")})
+
+    @app.route("/scriptStatuses")
+    def batch():
+        idx = sampler.snapshot()
+        names = [s for s in request.args.get("scripts", "").split(",") if s]
+        return jsonify({"scripts": {s: idx.script_running(s) for s in names},
+                        "dnCount": idx.count("dnplayer.exe")})
+
+    client = app.test_client()
+
+    def tick_legacy():
+        for s in scripts:
+            client.get(f"/legacy/scriptStatus?script={s}")
+        client.get("/legacy/dnCount")
+
+    def tick_batch():
+        client.get(f"/scriptStatuses?scripts={','.join(scripts)}")
+
+    def run(fn, label):
+        source.calls = 0
+        wall, cpu = [], []
+        for _ in range(args.ticks):
+            w0, c0 = time.perf_counter(), time.process_time()
+            fn()
+            wall.append((time.perf_counter() - w0) * 1000)
+            cpu.append((time.process_time() - c0) * 1000)
+        print(f"{label:7}: тик median {statistics.median(wall):.2f} мс, CPU {statistics.median(cpu):.2f} мс, "
+              f"обходов процессов {source.calls / args.ticks:.2f} на тик")
+
+    print(f"{args.processes} процессов, {len(scripts)} скрипта + dnCount на тик CentralDASH")
+    run(tick_legacy, "legacy")
+    sampler.sample()
+    run(tick_batch, "batch")
+    t0, c0 = time.perf_counter(), time.process_time()
+    for _ in range(20):
+        sampler.sample()
+    print(f"фоновый снимок: {(time.perf_counter() - t0) / 20 * 1000:.2f} мс, "
+          f"CPU {(time.process_time() - c0) / 20 * 1000:.2f} мс раз в {PROC_SNAPSHOT_INTERVAL:g} с")
+    try:
+        real = PsutilProcessSource()
+    except ImportError:
+        return
+    t0 = time.perf_counter()
+    rows = sum(1 for _ in real.processes())
+    print(f"реальный process_iter(name, exe, cmdline) на этом хосте: {rows} процессов, "
+          f"{(time.perf_counter() - t0) * 1000:.1f} мс — столько стоил каждый прежний запрос")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Бенчмарк load_accounts_meta_full: разбор profiles.json на каждый вызов против ProfileCache.
+
+cold — первый вызов нового кеша (чтение и разбор файла), warm — повторный вызов
+без изменения файла (stat и сборка ответа).
+
+Запуск: `python RSSv7/tests/bench_profile_cache.py --accounts 1000`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+import rss_paths  # noqa: F401
+from profile_cache import ProfileCache
+from test_profile_cache import cached_meta_full, legacy_meta_full, make_profile
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "profiles.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(make_profile(args.accounts), f)
+        size_mb = os.path.getsize(path) / 1e6
+
+        def timed(fn) -> List[float]:
+            res = []
+            for _ in range(args.repeats):
+                t0 = time.perf_counter()
+                fn()
+                res.append((time.perf_counter() - t0) * 1000)
+            return res
+
+        legacy = timed(lambda: legacy_meta_full(path))
+        cold = []
+        for _ in range(args.repeats):
+            cache = ProfileCache(path)
+            t0 = time.perf_counter()
+            cached_meta_full(cache)
+            cold.append((time.perf_counter() - t0) * 1000)
+        cache = ProfileCache(path)
+        cached_meta_full(cache)
+        warm = timed(lambda: cached_meta_full(cache))
+
+    print(f"Профиль {args.accounts} аккаунтов, {size_mb:.1f} МБ")
+    print(f"legacy: median {statistics.median(legacy):.1f} мс")
+    print(f"cold  : median {statistics.median(cold):.1f} мс")
+    print(f"warm  : median {statistics.median(warm):.2f} мс (stat + сборка ответа)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Бенчмарк тика доступности CentralDASH: system ping на каждый сервер против параллельных TCP-проб.
+
+Серверы — локальные слушающие порты и «чёрные дыры» (--offline штук). Если
+ping в системе нет, прежняя схема имитируется порождением процесса, который
+ждёт таймаут у недоступного сервера.
+
+Запуск: `python RSSv7/tests/bench_reachability.py --servers 50`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import rss_paths  # noqa: F401
+from reachability import DOWN, PROBE_TIMEOUT, ReachabilityProber
+from test_reachability import LocalPorts
+
+
+def legacy_ping(ip: str, online: bool, timeout: float) -> bool:
+    """Прежний ping(): system ping на каждый сервер (или имитация, если ping нет)."""
+    if shutil.which("ping"):
+        param = "-n" if os.name == "nt" else "-c"
+        wait = ["-w", str(int(timeout * 1000))] if os.name == "nt" else ["-W", str(max(1, round(timeout)))]
+        cmd = ["ping", param, "1", *wait, ip if online else "192.0.2.1"]
+    else:   # порождение процесса + ожидание ответа/таймаута, как у ping
+        cmd = [sys.executable, "-c", f"import time; time.sleep({0 if online else timeout})"]
+    return subprocess.call(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0 and online
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--servers", type=int, default=50)
+    parser.add_argument("--offline", type=int, default=10, help="сколько из них не отвечает")
+    parser.add_argument("--ticks", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=PROBE_TIMEOUT)
+    args = parser.parse_args()
+
+    ports = LocalPorts()
+    try:
+        names = [f"srv{i:02d}" for i in range(args.servers)]
+        targets = {n: (ports.blackhole() if i < args.offline else ports.listening()) for i, n in enumerate(names)}
+        online = {n: i >= args.offline for i, n in enumerate(names)}
+
+        def timed(fn):
+            out = []
+            for _ in range(args.ticks):
+                t0 = time.perf_counter()
+                fn()
+                out.append((time.perf_counter() - t0) * 1000)
+            return out
+
+        def legacy_tick():
+            with ThreadPoolExecutor(max_workers=min(16, args.servers)) as ex:   # MAX_WORKERS collect_all
+                list(ex.map(lambda n: legacy_ping("127.0.0.1", online[n], args.timeout), names))
+
+        prober = ReachabilityProber(timeout=args.timeout, retry_base=3600, retry_max=3600)
+        legacy = timed(legacy_tick)
+        tcp = timed(lambda: prober.check_all(targets))
+        down = sum(1 for s in prober.snapshot().values() if s["state"] == DOWN)
+    finally:
+        ports.close()
+
+    how = "system ping" if shutil.which("ping") else "ping не найден — порождение процесса с ожиданием таймаута"
+    print(f"{args.servers} серверов, из них offline {args.offline} (down: {down}); "
+          f"таймаут {args.timeout * 1000:.0f} мс; legacy: {how}")
+    for label, vals in (("legacy", legacy), ("tcp", tcp)):
+        print(f"{label:7}: тик первый {vals[0]:.0f} мс, медиана {statistics.median(vals):.1f} мс, "
+              f"макс {max(vals):.0f} мс")
+    print(f"tcp, down-серверы в фоне: тики 3+ медиана {statistics.median(tcp[2:] or tcp):.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Бенчмарк /api/resources: прежняя сборка на каждый запрос против кеша по поколению данных и ETag.
+
+Замеры p50/p99: legacy, cold (каждый запрос после parse_logs), warm (готовые
+байты из памяти) и 304 по If-None-Match.
+
+Запуск: `python RSSv7/tests/bench_resources_view.py --accounts 1000`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import date
+
+import rss_paths  # noqa: F401
+from resources_view import IngestGeneration, VersionedResponseCache
+from test_resources_view import make_app, make_resources_db
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+
+    today = date.today().isoformat()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "resources_web.db")
+        profiles = make_resources_db(path, args.accounts, today)
+        generation = IngestGeneration()
+        client = make_app(profiles, path, today, generation, VersionedResponseCache()).test_client()
+
+        def timed(url, before=None, headers=None):
+            out = []
+            for _ in range(args.requests):
+                if before:
+                    before()
+                t0 = time.perf_counter()
+                resp = client.get(url, headers=headers or {})
+                out.append((time.perf_counter() - t0) * 1000)
+                assert resp.status_code in (200, 304)
+            out.sort()
+            return statistics.median(out), out[max(0, int(len(out) * 0.99) - 1)]
+
+        legacy_stats = timed("/legacy")
+        cold_stats = timed("/cached", before=generation.bump)
+        warm_stats = timed("/cached")
+        etag = client.get("/cached").headers["ETag"]
+        not_modified = timed("/cached", headers={"If-None-Match": etag})
+
+    print(f"{args.accounts} аккаунтов, {args.requests} запросов")
+    for label, (p50, p99) in (("legacy", legacy_stats), ("cold", cold_stats),
+                              ("warm", warm_stats), ("304", not_modified)):
+        print(f"{label:7}: p50 {p50:.2f} мс, p99 {p99:.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Бенчмарк /api/serverStatus при зависших соседях: последовательный опрос против фонового снимка.
+
+Соседи — локальные фейковые self_status, часть из них держит запрос до таймаута.
+Прежняя схема опрашивает всех по очереди на каждый запрос эндпоинта;
+FleetStatusAggregator отвечает из снимка, опрос идёт в фоне.
+
+Запуск: `python RSSv7/tests/bench_server_status.py --peers 12 --hanging 6`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+import requests
+
+import rss_paths  # noqa: F401
+from server_status import FleetStatusAggregator
+from test_server_status import make_fetch, percentile, serve_endpoint, start_fake_peer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--peers", type=int, default=12)
+    parser.add_argument("--hanging", type=int, default=6)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--timeout", type=float, default=8.0)
+    args = parser.parse_args()
+
+    fakes = [start_fake_peer(hang=i < args.hanging) for i in range(args.peers)]
+    servers = [
+        {"name": f"peer{i}", "url": f"http://127.0.0.1:{srv.server_address[1]}"}
+        for i, (srv, _) in enumerate(fakes)
+    ]
+    fetch = make_fetch(args.timeout)
+
+    print(f"Соседей {args.peers}, зависших {args.hanging}, timeout {args.timeout:g} с")
+    legacy_started = time.perf_counter()
+    for srv in servers:
+        fetch(srv)
+    print(f"legacy    : один /api/serverStatus ≈ {time.perf_counter() - legacy_started:.2f} с")
+
+    aggregator = FleetStatusAggregator(lambda: servers, fetch, interval=1.0, workers=8).start()
+    http, url = serve_endpoint(aggregator, servers)
+
+    session = requests.Session()
+    latencies = []
+    for _ in range(args.requests):
+        t0 = time.perf_counter()
+        session.get(url, timeout=30).raise_for_status()
+        latencies.append((time.perf_counter() - t0) * 1000)
+        time.sleep(0.01)
+    latencies.sort()
+    healthy = sum(1 for v in aggregator.snapshot().values() if v.get("pingOk"))
+    print(
+        f"aggregator: {args.requests} запросов, median {statistics.median(latencies):.1f} мс, "
+        f"p99 {percentile(latencies, 0.99):.1f} мс, max {latencies[-1]:.1f} мс; "
+        f"в снимке здоровых {healthy}/{args.peers}"
+    )
+
+    http.shutdown()
+    aggregator.stop()
+    for srv, release in fakes:
+        release.set()
+        srv.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Бенчмарк состояний задач: schtasks на каждую задачу против одного кешированного перечисления.
+
+schtasks на Linux нет, поэтому «запуск schtasks» — это запуск интерпретатора
+Python: прежняя схема порождает процесс на каждую задачу при каждом опросе,
+TaskStateService — один на TTL.
+
+Запуск: `python RSSv7/tests/bench_task_state.py --polls 100 --tasks 3`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+import time
+from typing import List
+
+import rss_paths  # noqa: F401
+from task_state import TASK_STATE_TTL, FakeTaskProvider, TaskStateService
+
+_FAKE_LIST_OUTPUT = "HostName: BENCH\nTaskName: {name}\nScheduled Task State: Enabled\nStatus: Ready"
+
+
+def _legacy_poll(names: List[str]) -> int:
+    """Прежняя схема: отдельный процесс schtasks /Query /TN на каждую задачу."""
+    spawned = 0
+    for name in names:
+        subprocess.check_output(
+            [sys.executable, "-c", f"print({_FAKE_LIST_OUTPUT.format(name=name)!r})"],
+            stderr=subprocess.STDOUT, timeout=10,
+        )
+        spawned += 1
+    return spawned
+
+
+class _SpawningProvider(FakeTaskProvider):
+    def __init__(self, tasks):
+        super().__init__(tasks)
+        self.enum_cost = 0.0
+
+    def enumerate(self):
+        started = time.perf_counter()
+        subprocess.check_output([sys.executable, "-c", "pass"], timeout=10)
+        self.enum_cost += time.perf_counter() - started
+        return super().enumerate()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--polls", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=3)
+    parser.add_argument("--interval", type=float, default=0.0, help="пауза между опросами, с")
+    args = parser.parse_args()
+
+    names = [f"\\Bench Task {i}" for i in range(args.tasks)]
+
+    started = time.perf_counter()
+    legacy_spawned = sum(_legacy_poll(names) for _ in range(args.polls))
+    legacy_ms = (time.perf_counter() - started) * 1000
+
+    provider = _SpawningProvider({n: True for n in names})
+    service = TaskStateService(provider, ttl=TASK_STATE_TTL)
+    latencies = []
+    for _ in range(args.polls):
+        t0 = time.perf_counter()
+        service.get_many(names)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        if args.interval:
+            time.sleep(args.interval)
+    latencies.sort()
+
+    print(f"legacy : {args.polls} опросов × {args.tasks} задач → процессов {legacy_spawned}, "
+          f"{legacy_ms / args.polls:.1f} мс на опрос")
+    print(f"service: {args.polls} опросов × {args.tasks} задач → процессов {provider.calls}, "
+          f"median {latencies[len(latencies) // 2]:.3f} мс, max {latencies[-1]:.1f} мс на опрос "
+          f"(TTL {service.ttl:g} с)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Бенчмарк сверки шаблонов со схемой: json.load всех шаблонов против TemplateShapeIndex.
+
+Замеры: прежний обход, первый запуск без кеша, старт с кешем форм на диске,
+повторная сверка без изменений и с одним изменённым шаблоном.
+
+Запуск: `python RSSv7/tests/bench_template_gaps.py --templates 500`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import rss_paths  # noqa: F401
+from template_gaps import TemplateShapeIndex
+from test_template_gaps import drop_first_key, legacy_collect, make_schema, make_tree
+
+
+def timed(fn, repeats: int = 5) -> float:
+    out = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(out)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--templates", type=int, default=500)
+    parser.add_argument("--steps", type=int, default=40)
+    parser.add_argument("--keys", type=int, default=25)
+    args = parser.parse_args()
+
+    rnd = random.Random(9)
+    schema = make_schema(args.keys)
+    with tempfile.TemporaryDirectory() as tmp:
+        tdir = os.path.join(tmp, "templates")
+        make_tree(tdir, rnd, args.templates, args.steps, args.keys)
+        size_mb = sum(os.path.getsize(os.path.join(tdir, n)) for n in os.listdir(tdir)) / 1e6
+        cache = os.path.join(tmp, "template_shapes_cache.db")
+
+        legacy = timed(lambda: legacy_collect(tdir, schema))
+        t0 = time.perf_counter()
+        TemplateShapeIndex(tdir, cache).collect_gaps(schema)
+        cold = (time.perf_counter() - t0) * 1000
+
+        # «рестарт»: новый процесс с кешем форм на диске
+        restart_ms = timed(lambda: TemplateShapeIndex(tdir, cache).collect_gaps(schema))
+
+        index = TemplateShapeIndex(tdir, cache)
+        index.collect_gaps(schema)
+        unchanged = timed(lambda: index.collect_gaps(schema))
+
+        one_changed = []
+        for _ in range(5):
+            drop_first_key(os.path.join(tdir, f"T{rnd.randrange(args.templates)}.json"))
+            t0 = time.perf_counter()
+            index.collect_gaps(schema)
+            one_changed.append((time.perf_counter() - t0) * 1000)
+
+    print(f"{args.templates} шаблонов × {args.steps} шагов × {args.keys} ключей, {size_mb:.0f} МБ")
+    print(f"legacy (каждый раз)      : {legacy:.0f} мс")
+    print(f"первый запуск (без кеша) : {cold:.0f} мс")
+    print(f"старт с кешем на диске   : {restart_ms:.1f} мс")
+    print(f"0 изменённых             : {unchanged:.1f} мс")
+    print(f"1 изменённый             : {statistics.median(one_changed):.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
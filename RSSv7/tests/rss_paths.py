@@ -0,0 +1,11 @@
+"""Папки RSSv7 в sys.path: модули — отдельные скрипты без пакета и импортируют соседей по имени."""
+
+import os
+import sys
+
+RSS_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for _sub in ("", "CentralDASH", "Gn_LD_Check", "LdUPD", "LD_Symbolic_move", "dir_checker"):
+    _path = os.path.join(RSS_ROOT, _sub)
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
@@ -0,0 +1,135 @@
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+
+import rss_paths  # noqa: F401
+from account_meta_sync import AccountMetaSync, reconcile
+
+ACCOUNT_META_DDL = """
+    CREATE TABLE IF NOT EXISTS account_meta(
+      id TEXT PRIMARY KEY, email TEXT, passwd TEXT, igg TEXT,
+      pay_until TEXT, tariff_rub INTEGER DEFAULT 0, server TEXT, tg_tag TEXT)
+"""
+
+
+class CountingConnection(sqlite3.Connection):
+    """Считает вызовы execute/executemany (каждый — один подготовленный запрос) и их параметры."""
+    statements: list
+
+    def execute(self, sql, params=()):
+        self.statements.append((sql, len(params)))
+        return super().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        self.statements.append((sql, 1))
+        return super().executemany(sql, seq)
+
+
+def traced_connect(path: str, statements: list) -> CountingConnection:
+    conn = sqlite3.connect(path, factory=CountingConnection)
+    conn.statements = statements
+    return conn
+
+
+def legacy_sync(conn: sqlite3.Connection, active_ids) -> None:
+    """Прежний sync_account_meta: по плейсхолдеру на каждый Id."""
+    if active_ids:
+        marks = ",".join("?" * len(active_ids))
+        conn.execute(f"DELETE FROM account_meta WHERE id NOT IN ({marks})", tuple(active_ids))
+        placeholders = ",".join("(?, '', '', '', '', NULL, '', '')" for _ in active_ids)
+        conn.execute(f"""
+            INSERT OR IGNORE INTO account_meta
+            (id,email,passwd,igg,pay_until,tariff_rub,server,tg_tag)
+            VALUES {placeholders}
+        """, tuple(active_ids))
+    else:
+        conn.execute("DELETE FROM account_meta")
+    conn.commit()
+
+
+def synthetic_ids(count: int, churn: float, seed: int = 5):
+    """count случайных Id и следующее множество, где доля churn заменена новыми."""
+    rnd = random.Random(seed)
+    base = [f"{rnd.getrandbits(64):016x}-{i}" for i in range(count)]
+    changed = set(base[int(count * churn):]) | {f"new-{i}" for i in range(int(count * churn))}
+    return set(base), changed
+
+
+class AccountMetaSyncTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "res.db")
+        self.conn = sqlite3.connect(self.path)
+        self.addCleanup(self.conn.close)
+        self.conn.execute(ACCOUNT_META_DDL)
+        self.conn.commit()
+        self.statements = []
+        self.syncer = AccountMetaSync(lambda: traced_connect(self.path, self.statements))
+
+    def _ids(self):
+        return {r[0] for r in self.conn.execute("SELECT id FROM account_meta")}
+
+    def test_50k_ids_with_constant_statements_and_one_parameter_each(self):
+        base, changed = synthetic_ids(50_000, churn=0.02)
+
+        self.assertEqual(self.syncer.sync(base), (0, 50_000))
+        first = list(self.statements)
+        self.statements.clear()
+        self.assertEqual(self.syncer.sync(changed), (1000, 1000))
+
+        self.assertEqual(self._ids(), changed)
+        self.assertEqual(len(self.statements), len(first))          # число запросов не зависит от Id
+        self.assertLessEqual(max(n for _, n in first + self.statements), 1)
+
+        self.statements.clear()
+        self.assertIsNone(self.syncer.sync(changed))                 # то же множество — только COUNT(*)
+        self.assertEqual(len(self.statements), 1)
+
+    def test_random_sets_keep_row_data_and_recover_from_outside_deletes(self):
+        rnd = random.Random(3)
+        pool = [f"id-{i}" for i in range(500)]
+        for step in range(30):
+            before = self._ids()
+            ids = set(rnd.sample(pool, rnd.randint(0, 300)))
+            self.conn.execute("UPDATE account_meta SET email = 'kept@mail'")
+            self.conn.commit()
+            with self.subTest(step=step):
+                self.syncer.sync(ids)
+                self.assertEqual(self._ids(), ids)
+                kept = {r[0] for r in self.conn.execute("SELECT id FROM account_meta WHERE email = 'kept@mail'")}
+                self.assertEqual(kept, before & ids)             # данные оставшихся строк не трогаются
+                self.assertIsNone(self.syncer.sync(ids))
+                if ids:
+                    victim = next(iter(ids))                     # удалили строку в обход sync
+                    self.conn.execute("DELETE FROM account_meta WHERE id = ?", (victim,))
+                    self.conn.commit()
+                    self.assertEqual(self.syncer.sync(ids), (0, 1))
+
+    def test_invalidate_forces_reconcile(self):
+        self.syncer.sync({"a"})
+        self.syncer.invalidate()
+        self.assertEqual(self.syncer.sync({"a"}), (0, 0))
+        self.assertEqual((self.syncer.runs, self.syncer.skips), (2, 0))
+
+
+class ReconcileTests(unittest.TestCase):
+    def test_failed_insert_rolls_back_the_delete(self):
+        conn = sqlite3.connect(":memory:")
+        self.addCleanup(conn.close)
+        conn.execute(ACCOUNT_META_DDL)
+        conn.execute("INSERT INTO account_meta(id) VALUES ('old')")
+        conn.execute("""CREATE TRIGGER no_new BEFORE INSERT ON account_meta
+                        WHEN new.id = 'bad' BEGIN SELECT RAISE(ABORT, 'rejected'); END""")
+        conn.commit()
+
+        with self.assertRaises(sqlite3.IntegrityError):
+            reconcile(conn, ["bad"])
+
+        self.assertEqual(conn.execute("SELECT id FROM account_meta").fetchall(), [("old",)])
+
+
+if __name__ == "__main__":
+    unittest.main()
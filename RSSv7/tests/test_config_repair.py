@@ -0,0 +1,126 @@
+import os
+import stat
+import tempfile
+import threading
+import time
+import unittest
+
+import rss_paths  # noqa: F401
+from config_repair import RepairJobRunner, copy_if_changed
+
+
+class CopyIfChangedTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.src = os.path.join(self.tmp.name, "src.config")
+        self.dst = os.path.join(self.tmp.name, "vms", "config", "leidian1.config")
+        with open(self.src, "wb") as fh:
+            fh.write(b"a" * 5000 + b"tail")
+
+    def _write_dst(self, data: bytes) -> None:
+        os.makedirs(os.path.dirname(self.dst), exist_ok=True)
+        with open(self.dst, "wb") as fh:
+            fh.write(data)
+
+    def test_creates_missing_destination_with_parent_dirs(self):
+        self.assertEqual(copy_if_changed(self.src, self.dst), (True, 5004))
+        with open(self.dst, "rb") as fh:
+            self.assertEqual(fh.read(), b"a" * 5000 + b"tail")
+
+    def test_identical_file_is_not_rewritten(self):
+        self._write_dst(b"a" * 5000 + b"tail")
+        os.utime(self.dst, ns=(1, 1))
+
+        self.assertEqual(copy_if_changed(self.src, self.dst), (False, 0))
+        self.assertEqual(os.stat(self.dst).st_mtime_ns, 1)
+
+    def test_same_size_different_bytes_is_replaced_even_if_read_only(self):
+        self._write_dst(b"a" * 5000 + b"TAIL")
+        os.chmod(self.dst, stat.S_IREAD)
+
+        self.assertEqual(copy_if_changed(self.src, self.dst), (True, 5004))
+        with open(self.dst, "rb") as fh:
+            self.assertTrue(fh.read().endswith(b"tail"))
+        self.assertEqual(os.listdir(os.path.dirname(self.dst)), ["leidian1.config"])   # без tmp-хвостов
+
+
+class RepairJobRunnerTests(unittest.TestCase):
+    def test_runs_accounts_in_parallel_but_within_worker_limit(self):
+        running, peak = [0], [0]
+        lock = threading.Lock()
+
+        def repair(acc_id):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return [f"{acc_id}: ok"], 10
+
+        runner = RepairJobRunner(workers=3)
+        job = runner.submit([str(i) for i in range(12)] + ["0", "1"], repair)
+
+        self.assertTrue(runner.wait(job, timeout=10))
+        status = job.status()
+        self.assertEqual(status["total"], 12)                # повторные id не чинятся дважды
+        self.assertEqual(status["counts"], {"done": 12})
+        self.assertEqual(status["bytes_written"], 120)
+        self.assertEqual(peak[0], 3)
+        self.assertEqual(job.logs_in_order(), [f"{i}: ok" for i in range(12)])
+
+    def test_failed_account_is_reported_without_stopping_the_batch(self):
+        def repair(acc_id):
+            if acc_id == "2":
+                raise OSError("disk full")
+            return [f"{acc_id}: ok"], 1
+
+        runner = RepairJobRunner(workers=2)
+        job = runner.submit(["1", "2", "3"], repair)
+        runner.wait(job, timeout=10)
+
+        status = job.status()
+        self.assertEqual(status["accounts"], {"1": "done", "2": "error", "3": "done"})
+        self.assertIn("❗ 2: disk full", job.logs_in_order())
+
+    def test_cancel_marks_not_started_accounts(self):
+        gate = threading.Event()
+
+        def repair(acc_id):
+            gate.wait(5)
+            return [acc_id], 0
+
+        runner = RepairJobRunner(workers=1)
+        job = runner.submit(["1", "2", "3"], repair)
+        deadline = time.monotonic() + 5
+        while job.status()["accounts"]["1"] != "running":
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+        self.assertTrue(runner.cancel(job.id))
+        gate.set()
+        runner.wait(job, timeout=10)
+
+        status = job.status()
+        self.assertTrue(status["done"] and status["cancelled"])
+        self.assertEqual(status["accounts"], {"1": "done", "2": "cancelled", "3": "cancelled"})
+        self.assertFalse(runner.cancel("no-such-job"))
+
+    def test_status_pages_log_lines(self):
+        runner = RepairJobRunner(workers=1)
+        job = runner.submit(["a", "b"], lambda acc_id: ([f"{acc_id}1", f"{acc_id}2"], 0))
+        runner.wait(job, timeout=10)
+
+        first = job.status()
+        self.assertEqual(first["next"], 4)
+        self.assertEqual(job.status(since=first["next"] - 1)["logs"], ["b2"])
+        self.assertIs(runner.get(job.id), job)
+
+    def test_empty_batch_finishes_immediately(self):
+        job = RepairJobRunner().submit([], lambda acc_id: ([], 0))
+        self.assertTrue(job.done)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+import os
+import random
+import tempfile
+import unittest
+from typing import List
+
+import rss_paths  # noqa: F401
+from copy_engine import JOURNAL_NAME, CopyEngine, CopyError, _hash_file, plan_tree
+
+MB = 1024 * 1024
+
+
+def legacy_copy(src: str, dst: str, chunk: int = 2 * MB) -> int:
+    """Прежний _move_and_launch (без rmtree): os.walk ради размера, второй os.walk и чанки по 2 МБ."""
+    total = sum(os.path.getsize(os.path.join(r, f)) for r, _, fs in os.walk(src) for f in fs)
+    transferred = 0
+    os.makedirs(dst, exist_ok=True)
+    for root, _, files in os.walk(src):
+        for f in files:
+            sp = os.path.join(root, f)
+            dp = os.path.join(dst, os.path.relpath(sp, src))
+            os.makedirs(os.path.dirname(dp), exist_ok=True)
+            with open(sp, "rb") as rf, open(dp, "wb") as wf:
+                while True:
+                    buf = rf.read(chunk)
+                    if not buf:
+                        break
+                    wf.write(buf)
+                    transferred += len(buf)
+                    _ = transferred / max(total, 1) * 100      # progress_set
+    return transferred
+
+
+def make_small_tree(root: str, files: int, seed: int = 1) -> int:
+    rnd = random.Random(seed)
+    total = 0
+    for i in range(files):
+        d = os.path.join(root, f"data/app{i % 50}/cache{i % 7}")
+        os.makedirs(d, exist_ok=True)
+        size = rnd.choice((512, 4096, 16384, 65536, 262144))
+        with open(os.path.join(d, f"f{i}.bin"), "wb") as f:
+            f.write(os.urandom(size))
+        total += size
+    os.makedirs(os.path.join(root, "empty/dir"), exist_ok=True)
+    return total
+
+
+def make_huge_tree(root: str, images: int, mb: int) -> int:
+    os.makedirs(root, exist_ok=True)
+    block = os.urandom(4 * MB)
+    for i in range(images):
+        with open(os.path.join(root, "data.vmdk" if i == 0 else f"sdcard{i}.vmdk"), "wb") as f:
+            for _ in range(mb // 4):
+                f.write(block)
+    with open(os.path.join(root, "leidian.config"), "w") as f:
+        f.write("{}")
+    return images * (mb // 4) * len(block)
+
+
+def trees_equal(a: str, b: str) -> bool:
+    pa, pb = plan_tree(a), plan_tree(b)
+    if sorted((f.rel, f.size) for f in pa.files) != sorted((f.rel, f.size) for f in pb.files if f.rel != JOURNAL_NAME):
+        return False
+    return all(_hash_file(os.path.join(a, f.rel)).digest() == _hash_file(os.path.join(b, f.rel)).digest()
+               for f in pa.files)
+
+
+class CopyEngineTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.src = os.path.join(cls._tmp.name, "leidian7")
+        make_small_tree(cls.src, 300)
+        make_huge_tree(os.path.join(cls.src, "img"), 2, 12)
+        cls.plan = plan_tree(cls.src)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def test_plan_keeps_empty_dirs(self):
+        self.assertIn("empty/dir", {d.replace(os.sep, "/") for d in self.plan.dirs})
+
+    def test_copies_tree_like_legacy_copy_for_every_verify_mode(self):
+        legacy_dst = os.path.join(self.tmp, "dst_legacy")
+        self.assertEqual(legacy_copy(self.src, legacy_dst), self.plan.total)
+        for verify, zero in (("hash", True), ("size", True), ("none", False)):
+            with self.subTest(verify=verify):
+                dst = os.path.join(self.tmp, f"dst_{verify}")
+                ticks: List[int] = []
+                stats = CopyEngine(workers=4, small_max=MB, verify=verify, zero_copy=zero,
+                                   progress=lambda d, t, r: ticks.append(d), progress_interval=0).copy_tree(self.src, dst)
+
+                self.assertTrue(trees_equal(self.src, dst))
+                self.assertTrue(trees_equal(legacy_dst, dst))
+                self.assertFalse(os.path.exists(os.path.join(dst, JOURNAL_NAME)))
+                self.assertEqual(stats.bytes, self.plan.total)
+                self.assertEqual(ticks[-1], self.plan.total)
+                self.assertEqual(ticks, sorted(ticks))
+                self.assertTrue(os.path.isdir(os.path.join(dst, "empty", "dir")))
+                self.assertEqual(stats.zero_copy_files > 0, verify == "size" and CopyEngine(verify="size").zero_copy)
+
+    def test_interrupted_copy_resumes_from_checkpoint(self):
+        # прерывание посреди большого файла → докачка с отметки, готовые мелкие не копируются заново
+        dst = os.path.join(self.tmp, "dst_resume")
+        engine = CopyEngine(workers=2, small_max=MB, checkpoint=4 * MB, progress_interval=0)
+        vmdk = os.path.join(dst, "img", "data.vmdk")
+        engine.progress = lambda d, t, r: engine.cancel() if (
+            r.endswith("data.vmdk") and os.path.getsize(vmdk) > 5 * MB) else None
+        with self.assertRaises(CopyError):
+            engine.copy_tree(self.src, dst)
+        self.assertTrue(os.path.exists(os.path.join(dst, JOURNAL_NAME)))
+
+        stats = CopyEngine(workers=2, small_max=MB, checkpoint=4 * MB).copy_tree(self.src, dst)
+
+        self.assertTrue(trees_equal(self.src, dst))
+        self.assertGreaterEqual(stats.resumed_bytes, 4 * MB, stats)
+        self.assertEqual(stats.bytes + stats.skipped_bytes, self.plan.total)
+
+    def test_cancel_before_first_finished_file_leaves_journal_and_resumes(self):
+        src = os.path.join(self.tmp, "leidian9")
+        make_huge_tree(src, 1, 20)
+        dst = os.path.join(self.tmp, "dst_early")
+        engine = CopyEngine(workers=1, small_max=MB, progress_interval=0)
+        engine.progress = lambda d, t, r: engine.cancel()      # первый же тик прогресса
+
+        with self.assertRaises(CopyError):
+            engine.copy_tree(src, dst)
+
+        self.assertLess(os.path.getsize(os.path.join(dst, "data.vmdk")), 20 * MB)
+        # ld_emul_symbolic_fix считает dst без журнала уже перенесённым
+        self.assertTrue(os.path.exists(os.path.join(dst, JOURNAL_NAME)))
+        stats = CopyEngine(workers=1, small_max=MB).copy_tree(src, dst)
+        self.assertTrue(trees_equal(src, dst))
+        self.assertEqual(stats.bytes, plan_tree(src).total)
+        self.assertFalse(os.path.exists(os.path.join(dst, JOURNAL_NAME)))
+
+    def test_corrupted_copy_fails_hash_check(self):
+        dst = os.path.join(self.tmp, "dst_bad")
+
+        def corrupt(d, t, r):
+            path = os.path.join(dst, "img", "data.vmdk")
+            if os.path.exists(path) and os.path.getsize(path) > MB:
+                with open(path, "r+b") as f:
+                    f.write(b"\0" * 16)
+
+        bad = CopyEngine(workers=2, small_max=MB, progress=corrupt, progress_interval=0)
+        with self.assertRaisesRegex(CopyError, "хеш"):
+            bad.copy_tree(self.src, dst)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from typing import List, Tuple
+
+import rss_paths  # noqa: F401
+from empty_dir_scanner import EmptyDirScanner, FingerprintCache
+
+
+def legacy_find_empty(root: Path) -> List[Path]:
+    """Прежний find_empty_dirs_following_symlinks: realpath на каждый узел и повторный scandir кандидата."""
+    def really_empty(p: Path) -> bool:
+        try:
+            if not p.exists() or not p.is_dir():
+                return False
+            with os.scandir(p) as it:
+                for _ in it:
+                    return False
+            return True
+        except (PermissionError, FileNotFoundError):
+            return False
+
+    empty: List[Path] = []
+    stack: List[Tuple[Path, bool]] = [(root, False)]
+    seen_real: set = set()
+    while stack:
+        node, visited = stack.pop()
+        try:
+            real = os.path.realpath(node)
+        except Exception:
+            real = str(node)
+        if not visited:
+            if real in seen_real:
+                continue
+            seen_real.add(real)
+            stack.append((node, True))
+            try:
+                with os.scandir(node) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=True):
+                                stack.append((Path(entry.path), False))
+                        except PermissionError:
+                            continue
+            except (PermissionError, FileNotFoundError):
+                continue
+        elif really_empty(node):
+            empty.append(node)
+    empty.sort(key=lambda p: len(p.as_posix()), reverse=True)
+    return empty
+
+
+def make_tree(root: Path, fanout: List[int], files_every: int = 2) -> int:
+    """Дерево папок с заданным ветвлением; в каждом `files_every`-м листе — файл; ссылки-циклы на корень."""
+    made = 0
+    level = [root]
+    for depth, width in enumerate(fanout):
+        nxt = []
+        for parent in level:
+            for i in range(width):
+                d = parent / f"d{depth}_{i}"
+                d.mkdir()
+                nxt.append(d)
+                made += 1
+        level = nxt
+    for i, leaf in enumerate(level):
+        if i % files_every == 0:
+            (leaf / "data.vmdk").write_bytes(b"")
+    for top in root.iterdir():
+        if top.is_dir():
+            os.symlink(root, top / "loop_to_root", target_is_directory=True)     # цикл
+    return made
+
+
+class EmptyDirScannerTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp = Path(tmp.name)
+        self.root = root = tmp / "root"
+        outside = tmp / "outside"
+        for d in ("a/empty1", "a/full", "a/parent_of_empty/inner", "b/deep/er/est", "shared_empty", "c"):
+            (root / d).mkdir(parents=True)
+        (root / "a/full/file.txt").write_text("x")
+        (outside / "ext_empty").mkdir(parents=True)
+        (outside / "ext_full").mkdir()
+        (outside / "ext_full/f").write_text("x")
+        try:
+            os.symlink(outside / "ext_empty", root / "c/link_empty", target_is_directory=True)
+        except OSError:
+            self.skipTest("нет прав на симлинки")
+        os.symlink(outside / "ext_full", root / "c/link_full", target_is_directory=True)
+        os.symlink(root / "a", root / "b/deep/loop", target_is_directory=True)          # цикл
+        os.symlink(root / "shared_empty", root / "a/alias", target_is_directory=True)   # та же папка по ссылке
+        os.symlink(tmp / "nowhere", root / "c/broken", target_is_directory=True)
+        self.expected = {root / "a/empty1", root / "a/parent_of_empty/inner", root / "b/deep/er/est",
+                         root / "shared_empty", root / "c/link_empty"}
+
+    def _legacy(self) -> set:
+        # прежний обход отдавал ту из двух дорог к shared_empty, до которой дошёл первым
+        shared, alias = self.root / "shared_empty", self.root / "a/alias"
+        return {shared if p == alias else p for p in legacy_find_empty(self.root)}
+
+    def test_finds_same_folders_as_legacy_walk_and_streams_them(self):
+        found: List[Path] = []
+        scanner = EmptyDirScanner(workers=4, on_found=found.extend, batch=2)
+
+        result = scanner.run(self.root)
+
+        self.assertEqual(set(result), self.expected)
+        self.assertEqual(self._legacy(), self.expected)
+        self.assertEqual(set(found), self.expected)                # всё пришло потоком
+        self.assertEqual(len(found), len(result))
+        lengths = [len(p.as_posix()) for p in result]
+        self.assertEqual(lengths, sorted(lengths, reverse=True))   # дочерние раньше родительских
+        self.assertEqual(EmptyDirScanner(workers=1).run(self.root), result)
+
+    def test_fingerprint_cache_rereads_only_changed_folders(self):
+        result = EmptyDirScanner(workers=4).run(self.root)
+        cache = FingerprintCache(self.tmp / "fp.db")
+        cold = EmptyDirScanner(workers=4, cache=cache, racy_sec=0)
+        self.assertEqual(cold.run(self.root), result)
+        self.assertEqual(cold.stats.cached, 0)
+
+        warm = EmptyDirScanner(workers=4, cache=cache, racy_sec=0)
+        self.assertEqual(warm.run(self.root), result)
+        # из кеша — всё под корнем; цели ссылок вне корня (ext_empty, ext_full) читаются заново
+        self.assertEqual(warm.stats.listed, 2, warm.stats)
+        self.assertEqual(warm.stats.cached, warm.stats.dirs - 2, warm.stats)
+
+        (self.root / "a/empty1/new.txt").write_text("x")            # изменился только a/empty1
+        (self.root / "b/deep/er/est2").mkdir()
+        os.utime(self.root / "a/empty1", ns=(1, 1))                 # mtime в прошлом — всё равно новый
+        changed = EmptyDirScanner(workers=4, cache=cache, racy_sec=0)
+        res2 = changed.run(self.root)
+
+        self.assertNotIn(self.root / "a/empty1", res2)
+        self.assertIn(self.root / "b/deep/er/est2", res2)
+        self.assertEqual(set(res2), self._legacy())
+        self.assertEqual(changed.stats.listed, 5, changed.stats)    # a/empty1, b/deep/er, est2 + две цели ссылок
+
+        racy = EmptyDirScanner(workers=4, cache=cache)              # свежие mtime — перечитываются
+        self.assertEqual(racy.run(self.root), res2)
+        self.assertGreaterEqual(racy.stats.listed, 3)
+
+    def test_cancelled_scan_returns_nothing(self):
+        stop = EmptyDirScanner(workers=2)
+        stop.cancel()
+        self.assertEqual(stop.run(self.root), [])
+        self.assertTrue(stop.stats.cancelled)
+
+    def test_missing_root(self):
+        self.assertEqual(EmptyDirScanner().run(self.tmp / "nowhere"), [])
+
+    def test_generated_tree_with_root_loops(self):
+        root = self.tmp / "vms"
+        root.mkdir()
+        make_tree(root, [3, 4, 5])
+
+        result = EmptyDirScanner(workers=4).run(root)
+
+        self.assertEqual(set(result), set(legacy_find_empty(root)))
+        self.assertEqual(len(result), 3 * 4 * 5 // 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import random
+import sqlite3
+import unittest
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+
+import rss_paths  # noqa: F401
+from finance_totals import FinanceTotals, compute_income, ensure_finance_schema, month_end_for
+
+ACCOUNT_META_DDL = """
+    CREATE TABLE account_meta(
+      id TEXT PRIMARY KEY, email TEXT, passwd TEXT, igg TEXT,
+      pay_until TEXT, tariff_rub INTEGER DEFAULT 0, server TEXT, tg_tag TEXT)
+"""
+EXPENSES_DDL = "CREATE TABLE expenses(id INTEGER PRIMARY KEY AUTOINCREMENT, amount INTEGER NOT NULL, dt TEXT NOT NULL)"
+
+
+def legacy_income(conn: sqlite3.Connection, today: date) -> Dict[str, Any]:
+    """Прежний api_income: все строки в Python + strptime."""
+    rows = conn.execute("SELECT pay_until, tariff_rub FROM account_meta").fetchall()
+    exp = conn.execute("SELECT COALESCE(SUM(amount),0) FROM expenses").fetchone()[0] or 0
+    month_end = month_end_for(today)
+    left = 0
+    for pay_until, tariff in rows:
+        if not tariff:
+            continue
+        try:
+            if pay_until:
+                pu_date = datetime.strptime(pay_until, "%Y-%m-%d").date()
+                if today <= pu_date <= month_end:
+                    left += tariff
+        except ValueError:
+            pass
+    total = sum((r[1] or 0) for r in rows)
+    return {"total": total - exp, "left": left}
+
+
+def random_pay_until(rnd: random.Random, today: date) -> Optional[str]:
+    d = today + timedelta(days=rnd.randint(-60, 60))
+    kind = rnd.random()
+    if kind < 0.70:
+        return d.isoformat()
+    if kind < 0.75:
+        return f"{d.year}-{d.month}-{d.day}"          # без ведущих нулей — strptime примет
+    if kind < 0.80:
+        return d.strftime("%d.%m.%Y")                  # другой формат — игнорируется
+    if kind < 0.83:
+        return f"{d.year}-02-30"                       # несуществующая дата
+    if kind < 0.86:
+        return " " + d.isoformat()
+    if kind < 0.93:
+        return ""
+    return None
+
+
+def fill(conn: sqlite3.Connection, rnd: random.Random, accounts: int, today: date) -> None:
+    rows = []
+    for i in range(accounts):
+        tariff = rnd.choice([None, 0, 300, 500, 750, 1000, rnd.randint(1, 5000)])
+        rows.append((f"acc-{i}", random_pay_until(rnd, today), tariff))
+    conn.executemany("INSERT INTO account_meta(id, pay_until, tariff_rub) VALUES (?, ?, ?)", rows)
+    conn.executemany(
+        "INSERT INTO expenses(amount, dt) VALUES (?, ?)",
+        [(rnd.randint(1, 10000), today.isoformat()) for _ in range(rnd.randint(0, 20))],
+    )
+    conn.commit()
+
+
+class ComputeIncomeParityTests(unittest.TestCase):
+    def test_matches_legacy_income_on_random_data(self):
+        for seed in range(100):
+            rnd = random.Random(seed)
+            conn = sqlite3.connect(":memory:")
+            conn.execute(ACCOUNT_META_DDL)
+            ensure_finance_schema(conn)
+            today = date(2025, 1, 1) + timedelta(days=rnd.randint(0, 700))
+            fill(conn, rnd, rnd.randint(0, 400), today)
+            # часть строк правим уже после вставки — проверяем триггер UPDATE
+            for row_id, in conn.execute("SELECT id FROM account_meta ORDER BY random() LIMIT 30").fetchall():
+                conn.execute("UPDATE account_meta SET pay_until=? WHERE id=?", (random_pay_until(rnd, today), row_id))
+            conn.commit()
+            for probe in (today, month_end_for(today), today.replace(day=1)):
+                with self.subTest(seed=seed, today=probe):
+                    self.assertEqual(compute_income(conn, probe), legacy_income(conn, probe))
+            conn.close()
+
+    def test_rows_written_before_schema_are_backfilled(self):
+        conn = sqlite3.connect(":memory:")
+        self.addCleanup(conn.close)
+        conn.execute(ACCOUNT_META_DDL)
+        conn.execute(EXPENSES_DDL)
+        conn.executemany("INSERT INTO account_meta(id, pay_until, tariff_rub) VALUES (?, ?, ?)",
+                         [("a", "2025-03-20", 500), ("b", "2025-3-25", 300), ("c", "20.03.2025", 700)])
+
+        ensure_finance_schema(conn)
+        ensure_finance_schema(conn)
+
+        iso = dict(conn.execute("SELECT id, pay_until_iso FROM account_meta").fetchall())
+        self.assertEqual(iso, {"a": "2025-03-20", "b": None, "c": None})
+        self.assertEqual(compute_income(conn, date(2025, 3, 10)), {"total": 1500, "left": 800})
+
+    def test_schema_requires_account_meta(self):
+        with self.assertRaises(RuntimeError):
+            ensure_finance_schema(sqlite3.connect(":memory:"))
+
+
+class FinanceTotalsCacheTests(unittest.TestCase):
+    def setUp(self):
+        # общая in-memory база на все соединения FinanceTotals
+        uri = f"file:finance_{id(self)}?mode=memory&cache=shared"
+        self.keeper = sqlite3.connect(uri, uri=True)
+        self.addCleanup(self.keeper.close)
+        self.keeper.execute(ACCOUNT_META_DDL)
+        self.keeper.execute("INSERT INTO account_meta(id, pay_until, tariff_rub) VALUES ('a', '2025-03-20', 500)")
+        self.keeper.commit()
+        self.totals = FinanceTotals(lambda: sqlite3.connect(uri, uri=True))
+        self.today = date(2025, 3, 10)
+
+    def test_repeated_calls_are_served_from_cache(self):
+        self.assertEqual(self.totals.income(self.today), {"total": 500, "left": 500})
+        self.totals.income(self.today)
+        self.assertEqual(self.totals.computed, 1)
+
+    def test_writes_to_account_meta_or_expenses_invalidate(self):
+        self.totals.income(self.today)
+        self.keeper.execute("UPDATE account_meta SET tariff_rub = 800 WHERE id = 'a'")
+        self.keeper.commit()
+        self.assertEqual(self.totals.income(self.today), {"total": 800, "left": 800})
+
+        self.keeper.execute("INSERT INTO expenses(amount, dt) VALUES (100, '2025-03-10')")
+        self.keeper.commit()
+        self.assertEqual(self.totals.income(self.today), {"total": 700, "left": 800})
+        self.assertEqual(self.totals.expenses(), 100)
+        self.assertEqual(self.totals.computed, 4)
+
+    def test_new_day_recomputes_left(self):
+        self.assertEqual(self.totals.income(self.today)["left"], 500)
+        self.assertEqual(self.totals.income(date(2025, 3, 21))["left"], 0)
+        self.assertEqual(self.totals.computed, 2)
+
+    def test_cached_result_is_a_copy(self):
+        self.totals.income(self.today)["left"] = -1
+        self.assertEqual(self.totals.income(self.today)["left"], 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
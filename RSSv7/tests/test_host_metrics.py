@@ -0,0 +1,99 @@
+import time
+import unittest
+from typing import Iterable
+
+import rss_paths  # noqa: F401
+from host_metrics import HostMetricsSampler
+
+
+class FakeHostSource:
+    """Источник без Windows/LDPlayer: значения по кругу, считает замеры CPU."""
+
+    def __init__(self, cpu=(10.0,), ram=(50.0,), disk=(70.0,), processes=()):
+        self._cpu, self._ram, self._disk = list(cpu), list(ram), list(disk)
+        self.processes = [p.lower() for p in processes]
+        self.calls = 0
+
+    def _next(self, values: list) -> float:
+        return values[(self.calls - 1) % len(values)]
+
+    def cpu_percent(self) -> float:
+        self.calls += 1
+        return self._next(self._cpu)
+
+    def ram_percent(self) -> float:
+        return self._next(self._ram)
+
+    def disk_percent(self) -> float:
+        return self._next(self._disk)
+
+    def process_names(self) -> Iterable[str]:
+        return list(self.processes)
+
+
+class HostMetricsSamplerTests(unittest.TestCase):
+    def _sampler(self, **kwargs):
+        source = FakeHostSource(
+            cpu=(10, 30, 20), ram=(40, 60, 50), disk=(70,),
+            processes=("GnBots.exe", "dnplayer.exe", "dnplayer.exe", "explorer.exe"),
+        )
+        return source, HostMetricsSampler(source, server_name="fake", **kwargs)
+
+    def test_window_keeps_last_samples_with_min_avg_max(self):
+        source, sampler = self._sampler(window=3)
+        for _ in range(4):                        # четвёртый замер вытесняет первый из окна
+            sampler.sample()
+
+        snap = sampler.snapshot()
+
+        self.assertTrue(snap["gnOk"])
+        self.assertTrue(snap["dnOk"])
+        self.assertEqual(snap["dnCount"], 2)
+        self.assertEqual(snap["cpu"], 10)
+        self.assertEqual(snap["window"]["samples"], 3)
+        self.assertEqual(snap["window"]["cpu"], {"min": 10, "avg": 20.0, "max": 30})
+        self.assertEqual(snap["window"]["ram"], {"min": 40, "avg": 50.0, "max": 60})
+
+    def test_gn_uptime_share_and_lost_processes(self):
+        source, sampler = self._sampler(window=3)
+        sampler.sample()
+        sampler.sample()
+        source.processes = []
+        sampler.sample()
+
+        snap = sampler.snapshot()
+
+        self.assertFalse(snap["gnOk"])
+        self.assertFalse(snap["dnOk"])
+        self.assertEqual(snap["window"]["gnUp"], 0.67)
+
+    def test_snapshot_reads_cached_sample_without_touching_the_source(self):
+        source, sampler = self._sampler()
+        first = sampler.snapshot()                # до первого замера — один синхронный
+        self.assertEqual(source.calls, 1)
+
+        for _ in range(100):
+            sampler.snapshot()
+        self.assertEqual(source.calls, 1)
+
+        first["window"]["samples"] = -1           # вызывающий получает копию
+        self.assertEqual(sampler.snapshot()["window"]["samples"], 1)
+
+    def test_background_thread_keeps_sampling(self):
+        source, sampler = self._sampler(interval=0.01)
+        sampler.start()
+        self.addCleanup(sampler.stop)
+
+        deadline = time.monotonic() + 5
+        while source.calls < 5:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        sampler.stop()
+        calls = source.calls
+        time.sleep(0.05)
+        self.assertEqual(source.calls, calls)
+        self.assertGreaterEqual(sampler.snapshot()["window"]["samples"], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
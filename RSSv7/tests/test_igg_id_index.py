@@ -0,0 +1,155 @@
+import os
+import random
+import re
+import tempfile
+import unittest
+from typing import Iterable, List, Tuple
+
+import rss_paths  # noqa: F401
+from igg_id_index import IggIdIndex, find_list_ids
+
+LEGACY_RE = re.compile(r"\|([0-9a-f]{8,32})\|.*List IDs:.*:\s*(\d+)", re.IGNORECASE)
+
+NOISE = [
+    "|{acct}| [Gather] March sent to tile {n}",
+    "|{acct}| [Bot] Task Harvest finished in {n} ms",
+    "|{acct}| [Screen] Template match score 0.{n}",
+    "[Core] Heartbeat ok, queue {n}",
+    "|{acct}| [Кузница] Улучшение {n} завершено",
+]
+
+
+def legacy_scan(paths: Iterable[str]) -> List[Tuple[str, str]]:
+    """Прежний scan_file: построчное чтение всего файла в текстовом режиме."""
+    out, seen = [], set()
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                if "List IDs" not in line:
+                    continue
+                m = LEGACY_RE.search(line)
+                if not m:
+                    continue
+                key = (m.group(1).lower(), m.group(2))
+                if key not in seen:
+                    seen.add(key)
+                    out.append(key)
+    return out
+
+
+def log_lines(rnd, accounts: List[str], count: int, id_every: int) -> str:
+    lines = []
+    for i in range(count):
+        acct = rnd.choice(accounts)
+        if rnd.randrange(id_every) == 0:
+            msg = f"|{acct}| [Kingdom] List IDs: IGG : {int(acct[:8], 16) % 900_000_000 + 100_000_000}"
+        else:
+            msg = rnd.choice(NOISE).format(acct=acct, n=rnd.randint(0, 99999))
+        lines.append(f"2025-04-20 12:{i // 60000 % 60:02d}:{i // 1000 % 60:02d}.{i % 1000:03d} +03:00 [INFO] {msg}\r\n")
+    return "".join(lines)
+
+
+def append_log(path: str, size_bytes: int, rnd, accounts: List[str], id_every: int = 5000) -> None:
+    written = 0
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        while written < size_bytes:
+            block = log_lines(rnd, accounts, min(5000, (size_bytes - written) // 90 + 1), id_every)
+            f.write(block)
+            written += len(block.encode("utf-8"))
+
+
+def write_line(path: str, acct: str, list_id: str, mode: str = "w") -> None:
+    with open(path, mode, encoding="utf-8", newline="") as f:
+        f.write(f"2025-04-21 00:00:00.000 +03:00 [INFO] |{acct}| List IDs: IGG : {list_id}\r\n")
+
+
+class FindListIdsTests(unittest.TestCase):
+    def test_matches_legacy_regex_line_by_line(self):
+        rnd = random.Random(1)
+        accounts = [f"{rnd.getrandbits(64):016x}" for _ in range(20)]
+        buf = log_lines(rnd, accounts, 2000, 20).encode("utf-8")
+        expected = [(m.group(1).lower(), m.group(2)) for line in buf.decode().splitlines()
+                    if (m := LEGACY_RE.search(line))]
+        self.assertTrue(expected)
+        self.assertEqual(find_list_ids(buf), expected)
+
+
+class IggIdIndexTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.rnd = random.Random(7)
+        self.accounts = [f"{self.rnd.getrandbits(64):016x}" for _ in range(50)]
+        self.db = os.path.join(tmp.name, "idx.db")
+        self.paths = [os.path.join(tmp.name, f"bot2025042{i}.txt") for i in range(3)]
+        for p in self.paths:
+            append_log(p, 200_000, self.rnd, self.accounts, id_every=50)
+        first = IggIdIndex(self.db)
+        first.update(self.paths)
+        self.full = first.stats["bytes"]
+        self.first_pairs = first.pairs()
+        first.close()
+        self.idx = IggIdIndex(self.db)             # новый запуск IGG_ID_PARSER
+        self.addCleanup(self.idx.close)
+
+    def test_first_run_matches_legacy_scan(self):
+        self.assertTrue(self.first_pairs)
+        self.assertEqual(self.first_pairs, legacy_scan(self.paths))
+
+    def test_unchanged_logs_are_not_opened(self):
+        self.idx.update(self.paths)
+        self.assertEqual(self.idx.stats["bytes"], 0, self.idx.stats)
+        self.assertEqual(self.idx.stats["skipped"], 3, self.idx.stats)
+
+    def test_append_reads_only_tail_and_rereads_incomplete_line(self):
+        with open(self.paths[0], "a", encoding="utf-8", newline="") as f:
+            f.write(log_lines(self.rnd, self.accounts, 300, 10))
+            f.write(f"2025-04-20 13:00:00.000 +03:00 [INFO] |{'ab' * 6}| List IDs: IGG : 4242")
+        self.idx.update(self.paths)
+        self.assertEqual(self.idx.stats["files"], 1, self.idx.stats)
+        self.assertLess(self.idx.stats["bytes"], self.full // 10, self.idx.stats)
+        self.assertIn(("ab" * 6, "4242"), self.idx.pairs())
+
+        with open(self.paths[0], "a", encoding="utf-8", newline="") as f:
+            f.write("42\r\n")                                   # строку дописали: list_id 424242
+        self.idx.update(self.paths)
+
+        self.assertIn(("ab" * 6, "424242"), self.idx.pairs())
+        self.assertLessEqual(set(legacy_scan(self.paths)), set(self.idx.pairs()))
+
+    def test_truncated_log_is_rescanned_and_old_pairs_are_kept(self):
+        write_line(self.paths[1], "cd" * 6, "777")              # переписан короче отметки
+        self.idx.update(self.paths)
+
+        self.assertEqual(self.idx.stats["reset"], 1, self.idx.stats)
+        self.assertIn(("cd" * 6, "777"), self.idx.pairs())
+        self.assertLessEqual(set(self.first_pairs), set(self.idx.pairs()))
+
+    def test_renamed_log_continues_and_new_one_starts_from_zero(self):
+        rotated = self.paths[2] + ".1"
+        os.replace(self.paths[2], rotated)
+        write_line(self.paths[2], "ef" * 6, "888")
+
+        self.idx.update(self.paths + [rotated])
+
+        self.assertEqual(self.idx.stats["moved"], 1, self.idx.stats)
+        self.assertEqual(self.idx.stats["reset"], 1, self.idx.stats)
+        self.assertLess(self.idx.stats["bytes"], 1000, self.idx.stats)
+        self.assertIn(("ef" * 6, "888"), self.idx.pairs())
+        self.assertLessEqual(set(legacy_scan(self.paths + [rotated])), set(self.idx.pairs()))
+
+    def test_same_size_rewrite_with_other_head_is_rescanned(self):
+        size = os.path.getsize(self.paths[1])
+        with open(self.paths[1], "r+b") as f:
+            f.write(b"X")
+        os.utime(self.paths[1], ns=(0, 0))
+        self.assertEqual(os.path.getsize(self.paths[1]), size)
+
+        self.idx.update(self.paths)
+
+        self.assertEqual(self.idx.stats["reset"], 1, self.idx.stats)
+        self.assertLessEqual(set(legacy_scan(self.paths)), set(self.idx.pairs()))
+
+
+if __name__ == "__main__":
+    unittest.main()
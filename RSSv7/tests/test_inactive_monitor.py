@@ -0,0 +1,239 @@
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+from unittest import mock
+
+import rss_paths  # noqa: F401
+import inactive_monitor
+from inactive_monitor import (
+    TAG_TEXT,
+    _OFFENDERS_SQL,
+    _connect,
+    _sync_alert_state,
+    _tz_aware_from_iso,
+    find_offenders,
+)
+from profile_cache import ProfileCache
+
+# Центральная Европа: 30.03.2025 в 02:00 CET часы переводятся на 03:00 CEST.
+CET = "CET-1CEST,M3.5.0,M10.5.0/3"
+
+
+def set_tz(test: unittest.TestCase, tz: str) -> None:
+    """Локальная зона процесса на время теста (строки без зоны читаются в ней)."""
+    if not hasattr(time, "tzset"):
+        test.skipTest("time.tzset недоступен")
+    old = os.environ.get("TZ")
+
+    def restore():
+        if old is None:
+            os.environ.pop("TZ", None)
+        else:
+            os.environ["TZ"] = old
+        time.tzset()
+
+    os.environ["TZ"] = tz
+    time.tzset()
+    test.addCleanup(restore)
+
+
+def legacy_offenders(db_path: Path, profile_path: Path, threshold_hrs: int, max_last_seen_hrs: int,
+                     now: Optional[float] = None) -> List[dict]:
+    """Прежний проход: два соединения, вся таблица в Python, профиль с диска, разбор ISO на строку."""
+    now = time.time() if now is None else now
+    prof = json.loads(profile_path.read_text(encoding="utf-8"))
+    active_ids = {x.get("Id") for x in prof if x and x.get("Active")}
+    today = datetime.fromtimestamp(now).strftime("%Y-%m-%d")
+    conn = sqlite3.connect(db_path)
+    baseline = {rid: (bf, bw, bs, bg) for (rid, bf, bw, bs, bg) in conn.execute(
+        "SELECT id, food, wood, stone, gold FROM daily_baseline WHERE baseline_date=?", (today,))}
+    conn.close()
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT id, nickname, food, wood, stone, gold, last_updated FROM resources").fetchall()
+    conn.close()
+    rows = [r for r in rows if r[0] in active_ids]
+
+    threshold = timedelta(hours=threshold_hrs)
+    max_last_seen = timedelta(hours=max_last_seen_hrs)
+    now_dt = datetime.fromtimestamp(now, timezone.utc)
+    offenders: List[dict] = []
+    for acc_id, nick, f, w, s, g, last in rows:
+        dt = _tz_aware_from_iso(last)
+        if not dt:
+            continue
+        base_row = baseline.get(acc_id)
+        day_gain = None
+        if base_row:
+            bf, bw, bs, bg = base_row
+            day_gain = (f - bf) + (w - bw) + (s - bs) + (g - bg)
+        if threshold <= now_dt - dt <= max_last_seen and day_gain in (0, None):
+            offenders.append({
+                "id": acc_id, "nickname": nick, "last": dt.isoformat(),
+                "hours": round((now_dt - dt).total_seconds() / 3600, 1), "day_gain": day_gain,
+                "tag": TAG_TEXT if day_gain == 0 else "stale⏱️",
+            })
+    return offenders
+
+
+def create_tables(db_path: Path) -> None:
+    conn = sqlite3.connect(db_path)
+    conn.execute("""CREATE TABLE resources (id TEXT PRIMARY KEY, nickname TEXT, food INTEGER, wood INTEGER,
+                    stone INTEGER, gold INTEGER, gems INTEGER, last_updated TEXT)""")
+    conn.execute("""CREATE TABLE daily_baseline (id TEXT, nickname TEXT, food INTEGER, wood INTEGER, stone INTEGER,
+                    gold INTEGER, gems INTEGER, baseline_date TEXT, PRIMARY KEY(id, baseline_date))""")
+    conn.commit()
+    conn.close()
+
+
+def make_fixture(tmp: Path, accounts: int, seed: int = 7, now: Optional[float] = None) -> Tuple[Path, Path]:
+    """Синтетические resources/daily_baseline и profiles.json на `accounts` аккаунтов."""
+    rnd = random.Random(seed)
+    now = time.time() if now is None else now
+    db_path, profile_path = tmp / "resources_web.db", tmp / "profiles.json"
+    create_tables(db_path)
+    today = datetime.fromtimestamp(now).strftime("%Y-%m-%d")
+    yesterday = datetime.fromtimestamp(now - 86400).strftime("%Y-%m-%d")
+    zones = [timezone.utc, timezone(timedelta(hours=3)), timezone(timedelta(hours=-5, minutes=-30))]
+    resources, baseline, profile = [], [], []
+    for i in range(accounts):
+        acc_id = f"acc-{i:06d}"
+        # 60% обновлялись недавно, 30% простаивают 15–72 ч, 10% старше окна
+        roll = rnd.random()
+        age_h = rnd.uniform(0, 14.5) if roll < 0.6 else rnd.uniform(15.5, 71.5) if roll < 0.9 else rnd.uniform(73, 500)
+        dt = datetime.fromtimestamp(now - age_h * 3600, rnd.choice(zones))
+        if i % 4 == 0:
+            dt = dt.replace(microsecond=0)
+        last = dt.isoformat() if i % 50 else dt.astimezone().replace(tzinfo=None).isoformat()  # 2% без зоны
+        res = [rnd.randrange(10**6, 10**9) for _ in range(4)]
+        resources.append((acc_id, f"farm{i}", *res, 0, last))
+        kind = i % 5
+        if kind in (0, 1):        # прироста нет
+            baseline.append((acc_id, f"farm{i}", *res, 0, today))
+        elif kind in (2, 3):      # есть прирост
+            baseline.append((acc_id, f"farm{i}", res[0] - 1000, *res[1:], 0, today))
+        baseline.append((acc_id, f"farm{i}", *res, 0, yesterday))
+        profile.append({"Id": acc_id, "Name": f"farm{i}", "Active": i % 10 != 9,
+                        "MenuData": json.dumps({"Config": {"Email": f"u{i}@mail.test", "Extra": ["x" * 40] * 30}})})
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO resources VALUES(?,?,?,?,?,?,?,?)", resources)
+    conn.executemany("INSERT INTO daily_baseline VALUES(?,?,?,?,?,?,?,?)", baseline)
+    conn.commit()
+    conn.close()
+    profile_path.write_text(json.dumps(profile), encoding="utf-8")
+    return db_path, profile_path
+
+
+def by_id(offenders: List[dict]) -> List[dict]:
+    return sorted(offenders, key=lambda o: o["id"])
+
+
+class FindOffendersTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        patcher = mock.patch.object(inactive_monitor, "STATE_FILE", self.tmp / "inactive_state.json")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _parity(self, tz: str, now: float) -> List[dict]:
+        set_tz(self, tz)
+        db_path, profile_path = make_fixture(self.tmp, 3000, now=now)
+        active = {x.get("Id") for x in ProfileCache(str(profile_path)).get().active}
+        conn = _connect(db_path)
+        self.addCleanup(conn.close)
+
+        new = find_offenders(conn, 15, 72, active_ids=active, now=now)
+
+        self.assertEqual(by_id(new), by_id(legacy_offenders(db_path, profile_path, 15, 72, now=now)))
+        self.assertTrue(any(o["day_gain"] is None for o in new))
+        self.assertTrue(any(o["day_gain"] == 0 for o in new))
+        self.assertTrue(all(o["id"] in active for o in new) and len(active) < 3000)
+        return new
+
+    def test_matches_legacy_pass_with_fixed_offset_zone(self):
+        self._parity("MSK-3", time.time())
+
+    def test_matches_legacy_pass_across_dst_change(self):
+        # окно 15–72 ч захватывает переход на зимнее время 26.10.2025
+        new = self._parity(CET, datetime(2025, 10, 27, 12, tzinfo=timezone.utc).timestamp())
+        # строки без зоны получают смещение своей даты: и летнее, и зимнее
+        self.assertEqual({o["last"][-6:] for o in new} & {"+01:00", "+02:00"}, {"+01:00", "+02:00"})
+
+    def test_query_uses_expression_index_and_baseline_key(self):
+        db_path, _ = make_fixture(self.tmp, 10)
+        conn = _connect(db_path)
+        self.addCleanup(conn.close)
+        plan = " ".join(r[-1] for r in conn.execute("EXPLAIN QUERY PLAN " + _OFFENDERS_SQL, {
+            "today": "", "oldest": 0, "newest": 0, "slack": 0}))
+        self.assertIn("idx_resources_last_epoch", plan)
+        self.assertIn("sqlite_autoindex_daily_baseline", plan)
+
+    def test_naive_rows_use_offset_of_their_own_date(self):
+        set_tz(self, CET)
+        db_path = self.tmp / "resources_web.db"
+        create_tables(db_path)
+        rows = [
+            ("dst-edge", "2025-03-30T01:30:00"),        # CET: 00:30 UTC, 14.5 ч — ещё не простой
+            ("naive", "2025-03-29T23:30:00"),           # CET: 22:30 UTC, 16.5 ч
+            ("aware", "2025-03-29T22:00:00+00:00"),     # 17 ч
+            ("far-edge", "2025-03-27T16:30:00"),        # CET: 15:30 UTC, 71.5 ч — ещё в окне
+            ("too-old", "2025-03-27T15:30:00"),         # CET: 14:30 UTC, 72.5 ч
+        ]
+        conn = sqlite3.connect(db_path)
+        conn.executemany("INSERT INTO resources VALUES(?, ?, 1, 1, 1, 1, 0, ?)",
+                         [(acc_id, acc_id, last) for acc_id, last in rows])
+        conn.commit()
+        conn.close()
+        now = datetime(2025, 3, 30, 15, tzinfo=timezone.utc).timestamp()   # 17:00 CEST
+        conn = _connect(db_path)
+        self.addCleanup(conn.close)
+
+        hours = {o["id"]: o["hours"] for o in find_offenders(conn, 15, 72, now=now)}
+
+        self.assertEqual(hours, {"naive": 16.5, "aware": 17.0, "far-edge": 71.5})
+
+
+class AlertStateTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.state_file = self.tmp / "inactive_state.json"
+        patcher = mock.patch.object(inactive_monitor, "STATE_FILE", self.state_file)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_previous_json_state_is_migrated_once_and_only_changes_are_reported(self):
+        self.state_file.write_text(json.dumps({"ids": ["acc-000000", "gone-1"]}), encoding="utf-8")
+        db_path, _ = make_fixture(self.tmp, 500)
+        conn = _connect(db_path)
+        self.addCleanup(conn.close)
+        offenders = find_offenders(conn, 15, 72)
+        ids = {o["id"] for o in offenders}
+
+        added, removed = _sync_alert_state(conn, offenders)
+
+        self.assertEqual(set(removed), {"acc-000000", "gone-1"} - ids)
+        self.assertIn("gone-1", removed)
+        self.assertEqual({o["id"] for o in added}, ids - {"acc-000000"})
+        self.assertEqual(_sync_alert_state(conn, offenders), ([], []))
+        self.assertEqual(_sync_alert_state(conn, offenders[1:]), ([], [offenders[0]["id"]]))
+
+        # таблица уже есть: JSON больше не читается
+        self.state_file.write_text(json.dumps({"ids": ["late-1"]}), encoding="utf-8")
+        inactive_monitor._PREPARED_DBS.discard(str(db_path))
+        again = _connect(db_path)
+        self.addCleanup(again.close)
+        self.assertNotIn("late-1", {r[0] for r in again.execute(f"SELECT id FROM {inactive_monitor.STATE_TABLE}")})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+from typing import Callable, List, Tuple
+
+import rss_paths  # noqa: F401
+from ld_config_index import PLAYER_NAME_KEY, LdConfigIndex, find_key_recursive
+
+
+def legacy_scan(folder: str, accept: Callable[[str], bool], stats: dict) -> List[Tuple[str, str]]:
+    """Прежний collect_crashed: os.walk и json.load каждого подходящего конфига."""
+    out = []
+    for root, _, files in os.walk(folder):
+        stats["listed"] += 1
+        for fname in files:
+            if not accept(fname):
+                continue
+            fpath = os.path.join(root, fname)
+            with open(fpath, "r", encoding="utf-8") as f:
+                text = f.read()
+            stats["read"] += 1
+            stats["bytes"] += len(text.encode("utf-8"))
+            cfg = json.loads(text)
+            out.append((fname, str(find_key_recursive(cfg, PLAYER_NAME_KEY) or "").strip()))
+    return out
+
+
+def write_config(path: str, idx: int, name: str, mtime: float) -> None:
+    """leidianXX.config примерно реального размера с заданным playerName и mtime."""
+    cfg = {
+        "propertySettings.phoneIMEI": f"86{idx:013d}",
+        "propertySettings.phoneModel": "SM-G9880",
+        "statusSettings.playerName": name,
+        "basicSettings.rootMode": True,
+        "advancedSettings.resolution": {"width": 960, "height": 540},
+        "hotkeySettings": {f"key{k}": {"modifiers": k, "key": k * 7} for k in range(60)},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cfg, f, ensure_ascii=False, indent=4)
+    os.utime(path, (mtime, mtime))
+
+
+def accept(fname: str) -> bool:
+    """Фильтр collect_crashed: конфиги эмуляторов без общего leidians.config."""
+    return fname.endswith(".config") and fname.lower() != "leidians.config"
+
+
+def new_stats() -> dict:
+    return dict.fromkeys(("listed", "read", "bytes"), 0)
+
+
+class LdConfigIndexTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.folder = os.path.join(tmp.name, "config")
+        os.makedirs(os.path.join(self.folder, "sub"))
+        self.old = time.time() - 3600
+        for i in range(20):
+            write_config(self._path(i), i, "LDPlayer" if i % 7 == 0 else f"farm{i}", self.old)
+        write_config(os.path.join(self.folder, "sub", "leidian99.config"), 99, "", self.old)
+        with open(os.path.join(self.folder, "leidians.config"), "w") as f:
+            f.write("{}")
+        with open(os.path.join(self.folder, "leidian50.config"), "w") as f:
+            f.write("{broken")
+        self.cache = os.path.join(tmp.name, "ld_config_index.db")
+        self.index = LdConfigIndex(self.folder, self.cache)
+
+    def _path(self, i: int) -> str:
+        return os.path.join(self.folder, f"leidian{i}.config")
+
+    def _names(self, index=None) -> dict:
+        return {fname: name for _, fname, name, err in (index or self.index).scan(accept) if err is None}
+
+    def test_matches_legacy_walk_and_reports_broken_config(self):
+        expected = legacy_scan(self.folder, lambda n: accept(n) and n != "leidian50.config", new_stats())
+
+        result = self.index.scan(accept)
+
+        self.assertEqual(sorted((f, n) for _, f, n, err in result if err is None), sorted(expected))
+        errors = [(fname, name) for _, fname, name, err in result if err is not None]
+        self.assertEqual(errors, [("leidian50.config", None)])
+
+    def test_unchanged_tree_reads_only_the_broken_file(self):
+        self.index.scan(accept)
+        self.index.scan(accept)
+
+        self.assertEqual(self.index.stats["read"], 1)          # битый файл не кешируется
+        self.assertEqual(self.index.stats["listed"], 0)
+
+    def test_new_process_loads_the_index_from_disk(self):
+        expected = self._names()
+
+        restarted = LdConfigIndex(self.folder, self.cache)
+
+        self.assertEqual(self._names(restarted), expected)
+        self.assertEqual(restarted.stats["read"], 1)
+        self.assertEqual(restarted.stats["listed"], 0)
+
+    def test_racy_write_with_same_size_and_mtime_is_seen(self):
+        self._names()
+        write_config(self._path(3), 3, "farm3", time.time())
+        self.assertEqual(self._names()["leidian3.config"], "farm3")
+
+        write_config(self._path(3), 3, "farmX", os.stat(self._path(3)).st_mtime)   # тот же размер и mtime
+
+        self.assertEqual(self._names()["leidian3.config"], "farmX")
+
+    def test_same_content_with_new_mtime_is_read_but_not_parsed(self):
+        self._names()
+        write_config(self._path(4), 4, "farm4", self.old + 10)
+
+        self._names()
+
+        self.assertEqual(self.index.stats["read"], 2)
+        self.assertEqual(self.index.stats["parsed"], 0)
+
+    def test_added_and_removed_configs_relist_only_their_directory(self):
+        self._names()
+        os.remove(self._path(5))
+        write_config(self._path(77), 77, "farm77", self.old)
+
+        names = self._names()
+
+        self.assertNotIn("leidian5.config", names)
+        self.assertEqual(names["leidian77.config"], "farm77")
+        self.assertEqual(self.index.stats["listed"], 1)        # перечитан только корень
+        restarted = LdConfigIndex(self.folder, self.cache)
+        self.assertEqual(self._names(restarted), names)
+
+    def test_removed_directory_leaves_the_cache(self):
+        sub = os.path.join(self.folder, "sub")
+        self._names()
+        shutil.rmtree(sub)
+
+        self.assertNotIn("leidian99.config", self._names())
+
+        self.assertNotIn(sub, self.index._dirs)
+        with sqlite3.connect(self.cache) as conn:
+            dirs = {row[0] for row in conn.execute("SELECT path FROM ld_dirs")}
+        self.assertEqual(dirs, {self.folder})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import random
+import sqlite3
+import unittest
+
+import rss_paths  # noqa: F401
+from log_fields import (
+    PARSER_VERSION, STORED_COLUMNS, _extract_log_level, item_from_stored, parse_human_log_line, stored_log_fields,
+)
+
+SAMPLE_MESSAGES = [
+    "Gather: Open Vip Menu", "Gather: Select Sawmill", "March: Create March Troop", "March: Send Troops",
+    "Marches: Reached Maximum of Marches", "gathervip Finished", "Gather: Sawmill Level 7", "Marches: 3 / 5",
+    "Script finished", "Unhandled exception in worker", "Please update the game", "CityResourcesAmount: Food 1.2M",
+    "Gather: cannot find tile", "", "   ", "random text", "Login failed, retry",
+]
+
+
+def sample_line(rnd: random.Random, acc_id: str, dt: str) -> str:
+    """Строка лога GnBots в одном из встречающихся форматов префикса."""
+    msg = rnd.choice(SAMPLE_MESSAGES)
+    style = rnd.randrange(6)
+    if style == 0:
+        return f"{dt} [{rnd.choice(['INF', 'DBG', 'WRN', 'ERR', 'inf'])}] {msg}"
+    if style == 1:
+        return f"{dt} {rnd.choice(['INFO', 'DEBUG', 'WARN', 'ERROR', 'debug'])}|{acc_id}|{msg}"
+    if style == 2:
+        return f"{dt} INFO|{rnd.getrandbits(64):016x}|{msg}"
+    if style == 3:
+        return f"{dt} [INF] {msg} DEBUG|trailer"
+    if style == 4:
+        return f"{dt} {acc_id}|{msg}"
+    return msg
+
+
+def create_cached_logs(conn: sqlite3.Connection) -> None:
+    conn.execute(f"""
+        CREATE TABLE cached_logs(
+          id INTEGER PRIMARY KEY AUTOINCREMENT, acc_id TEXT, nickname TEXT, dt TEXT, raw_line TEXT,
+          {", ".join(f"{c} {'INTEGER' if c in ('debug_marker', 'parsed_v') else 'TEXT'}" for c in STORED_COLUMNS)})
+    """)
+    conn.execute("CREATE INDEX idx_cached_logs_acc_id ON cached_logs(acc_id, id)")
+
+
+def insert_rows(conn: sqlite3.Connection, rows) -> None:
+    """rows — (acc_id, nickname, dt, raw_line); поля разбора считаются как при записи."""
+    marks = ",".join("?" * (4 + len(STORED_COLUMNS)))
+    conn.executemany(
+        f"INSERT INTO cached_logs(acc_id, nickname, dt, raw_line, {', '.join(STORED_COLUMNS)}) VALUES ({marks})",
+        ((acc, nick, dt, raw, *stored_log_fields(dt, raw, acc)) for acc, nick, dt, raw in rows),
+    )
+    conn.commit()
+
+
+def legacy_page(conn: sqlite3.Connection, acc_id: str):
+    """Прежний /api/logs: фильтр debug через instr(upper(raw_line)) и разбор каждой строки."""
+    rows = conn.execute("""
+        SELECT dt, raw_line FROM cached_logs
+        WHERE acc_id=? AND instr(upper(raw_line), '[DBG]') = 0 AND instr(upper(raw_line), 'DEBUG|') = 0
+        ORDER BY id DESC LIMIT 150
+    """, (acc_id,)).fetchall()
+    return [parse_human_log_line(r["dt"], r["raw_line"], account_name="farm", account_id=acc_id) for r in rows]
+
+
+def stored_page(conn: sqlite3.Connection, acc_id: str):
+    rows = conn.execute(f"""
+        SELECT dt, raw_line, {", ".join(STORED_COLUMNS)} FROM cached_logs
+        WHERE acc_id=? AND debug_marker = 0
+        ORDER BY id DESC LIMIT 150
+    """, (acc_id,)).fetchall()
+    return [item_from_stored(r["dt"], r["raw_line"], r, account_name="farm", account_id=acc_id) for r in rows]
+
+
+class StoredLogFieldsTests(unittest.TestCase):
+    def test_stored_fields_rebuild_the_parsed_item(self):
+        rnd = random.Random(4)
+        for i in range(5000):
+            acc_id = f"{rnd.getrandbits(32):08x}"
+            dt = f"2025-03-{1 + i % 28:02d} 1{i % 10}:0{i % 6}:1{i % 10}.{i % 1000:03d} +03:00"
+            if i % 7 == 0:
+                dt = rnd.choice(["", "2025-03-01 10:00:00", "bad-dt"])
+            raw = sample_line(rnd, acc_id, dt)
+            row = dict(zip(STORED_COLUMNS, stored_log_fields(dt, raw, acc_id)))
+            with self.subTest(raw=raw):
+                for include_debug in (False, True):
+                    for name in (None, "farm"):
+                        expected = parse_human_log_line(dt, raw, account_name=name,
+                                                        include_debug=include_debug, account_id=acc_id)
+                        got = item_from_stored(dt, raw, row, account_name=name,
+                                               include_debug=include_debug, account_id=acc_id)
+                        self.assertEqual(got, expected)
+                self.assertEqual(bool(row["debug_marker"]), "[DBG]" in raw.upper() or "DEBUG|" in raw.upper())
+                # строка, прошедшая SQL-фильтр, не может оказаться debug по разбору
+                if not row["debug_marker"]:
+                    self.assertNotEqual(_extract_log_level(raw), "debug")
+
+    def test_row_with_old_parser_version_is_parsed_on_the_fly(self):
+        dt = "2025-03-01 10:00:00.000 +03:00"
+        raw = f"{dt} [INF] Gather: Open Vip Menu"
+        row = dict(zip(STORED_COLUMNS, (None,) * len(STORED_COLUMNS)))
+        self.assertEqual(item_from_stored(dt, raw, row), parse_human_log_line(dt, raw))
+
+        row["parsed_v"] = PARSER_VERSION - 1
+        self.assertEqual(item_from_stored(dt, raw, row), parse_human_log_line(dt, raw))
+
+
+class StoredLogsPageTests(unittest.TestCase):
+    def test_debug_marker_index_page_matches_instr_filter(self):
+        rnd = random.Random(8)
+        acc_ids = [f"{rnd.getrandbits(64):016x}" for _ in range(5)]
+        conn = sqlite3.connect(":memory:")
+        self.addCleanup(conn.close)
+        conn.row_factory = sqlite3.Row
+        create_cached_logs(conn)
+        insert_rows(conn, [
+            (acc_ids[i % 5], "farm", dt, sample_line(rnd, acc_ids[i % 5], dt) if i % 3 else f"{dt} [DBG] tick {i}")
+            for i in range(3000)
+            for dt in [f"2025-03-01 12:{i % 60:02d}:{i % 59:02d}.{i % 1000:03d} +03:00"]
+        ])
+        conn.execute("CREATE INDEX idx_cached_logs_acc_debug_id ON cached_logs(acc_id, debug_marker, id)")
+
+        for acc_id in acc_ids:
+            with self.subTest(acc_id=acc_id):
+                self.assertEqual(stored_page(conn, acc_id), legacy_page(conn, acc_id))
+
+
+if __name__ == "__main__":
+    unittest.main()
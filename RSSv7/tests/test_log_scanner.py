@@ -0,0 +1,167 @@
+import os
+import random
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+import rss_paths  # noqa: F401
+from log_scanner import (
+    LogMatcher, _scan_text, _TimestampCache, compile_regex_list, normalize_line, parse_line_timestamp_epoch,
+    required_literals, scan_range,
+)
+
+LIVE = [
+    r"\|[0-9a-f]{16}\|",
+    r"\b(getMap|Refreshing Image|pulse)\b",
+    r"\b(Marches:|Reached Maximum of Marches)\b",
+    r"\b(Found world)\b",
+]
+IDLE = [
+    r"\bAnySessionsBootingAsync\b",
+    r"\bHandleErrorsAsync: Scanning for error windows\b",
+    r"\bCurrent Error Counters:\b",
+]
+
+NOISE = [
+    "[Tesseract] Ocr result for region 12: 'Лагерь варваров'",
+    "[Emu 17] Tap at 512,384 (swipe=false)",
+    "Waiting for window handle 0x000A1B2C",
+    "[Scheduler] next run in 00:04:59",
+    "Запуск задачи: Сбор ресурсов",
+]
+LIVE_LINES = [
+    "[Farm 7] |0123456789abcdef| step done",
+    "[Farm 3] Refreshing Image",
+    "[Farm 9] Marches: 3/5",
+]
+IDLE_LINES = [
+    "AnySessionsBootingAsync started",
+    "HandleErrorsAsync: Scanning for error windows",
+]
+
+
+def legacy_scan(path: str, start: int, end: int, cur_ts: float) -> Tuple[Optional[float], Optional[float], int]:
+    """Прежний scan_logs_incremental для одного файла: весь кусок, построчно, список регэкспов."""
+    live_re = compile_regex_list(LIVE)
+    idle_re = compile_regex_list(IDLE)
+    live_ts_candidate = idle_ts_candidate = None
+    with open(path, "rb") as f:
+        f.seek(start, os.SEEK_SET)
+        chunk = f.read(end - start)
+    text = chunk.decode("utf-8", errors="ignore")
+    for raw_line in text.splitlines():
+        if not raw_line.strip():
+            continue
+        line_ts = parse_line_timestamp_epoch(raw_line) or cur_ts
+        body = normalize_line(raw_line)
+        if any(r.search(body) for r in live_re):
+            if (live_ts_candidate is None) or (line_ts > live_ts_candidate):
+                live_ts_candidate = line_ts
+            continue
+        if any(r.search(body) for r in idle_re):
+            if (idle_ts_candidate is None) or (line_ts > idle_ts_candidate):
+                idle_ts_candidate = line_ts
+            continue
+    return live_ts_candidate, idle_ts_candidate, len(chunk)
+
+
+def write_log(path: str, size_bytes: int, t0: datetime, rnd: random.Random, live_every: int = 40) -> datetime:
+    """Синтетический лог GnBots с растущими метками; ~1 из live_every строк — живая."""
+    lines, written, t = [], 0, t0
+    with open(path, "w", encoding="utf-8", newline="\r\n") as f:
+        while written < size_bytes:
+            t += timedelta(milliseconds=rnd.randint(1, 40))
+            r = rnd.random() * live_every
+            if r < 1:
+                msg = rnd.choice(LIVE_LINES)
+            elif r < 2:
+                msg = rnd.choice(IDLE_LINES)
+            else:
+                msg = rnd.choice(NOISE)
+            line = f"{t:%Y-%m-%d %H:%M:%S}.{t.microsecond // 1000:03d} +03:00 [INFO] {msg}\n"
+            lines.append(line)
+            written += len(line.encode("utf-8")) + 1
+            if len(lines) >= 5000:
+                f.write("".join(lines))
+                lines = []
+        f.write("".join(lines))
+    return t
+
+
+def same_ts(a: Optional[float], b: Optional[float]) -> bool:
+    return (a is None and b is None) or (a is not None and b is not None and abs(a - b) < 1e-3)
+
+
+class PrefilterTests(unittest.TestCase):
+    def test_required_literals(self):
+        self.assertEqual(required_literals(LIVE[1]), {"getmap", "refreshing image", "pulse"})
+        self.assertIsNone(required_literals(r"(?:ab|cd)x?"))
+        self.assertEqual(required_literals(r"Found\s+world"), {"found"})
+
+    def test_only_patterns_without_literals_stay_regexes(self):
+        prefilter = LogMatcher(LIVE, IDLE).prefilter
+        self.assertTrue(prefilter.ok)
+        self.assertEqual(len(prefilter.regexes), 1)          # только \|hex16\|
+
+    def test_unsafe_patterns_disable_the_prefilter(self):
+        for pattern in (r"^\w+$", r"\d+(?!\s)", r"(?<=x)\w", r"(a)\1"):
+            with self.subTest(pattern=pattern):
+                self.assertFalse(LogMatcher([pattern], []).prefilter.ok)
+
+    def test_anchored_pattern_matches_the_body_after_the_timestamp(self):
+        matcher = LogMatcher([r"^pulse"], [])
+        self.assertEqual(matcher.classify("2025-01-01 10:00:00.000 +03:00 [INFO] pulse"), "live")
+
+    def test_ignorecase_folding_beyond_ascii(self):
+        best = {"live": None, "idle": None}                  # K (Kelvin) совпадает с k при IGNORECASE
+        _scan_text("noise\n\u212aick off\n", LogMatcher([r"\bkick\b"], []), 5.0, _TimestampCache(), best)
+        self.assertEqual(best["live"], 5.0)
+
+
+class ScanRangeTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "bot20250101.txt")
+        write_log(self.path, 3 << 20, datetime(2025, 1, 1, 10, 0, 0), random.Random(7))
+        with open(self.path, "ab") as f:                     # строки без метки и последняя неполная
+            f.write(b"   \r\nplain pulse line without ts\r\n"
+                    b"2025-01-01 23:59:59.999 +03:00 [INFO] Current Error Counters: 0")
+        self.size = os.path.getsize(self.path)
+        self.matcher = LogMatcher(LIVE, IDLE)
+
+    def test_forward_and_backward_scans_match_legacy(self):
+        for start in (0, 1, self.size // 3, self.size - 65536, self.size - 10):
+            legacy = legacy_scan(self.path, start, self.size, 1e12)
+            for buf in (4096, 65536):
+                fwd = scan_range(self.path, start, self.size, self.matcher, 1e12, buf_size=buf, backward_min=1 << 40)
+                bwd = scan_range(self.path, start, self.size, self.matcher, 1e12, buf_size=buf, backward_min=0)
+                with self.subTest(start=start, buf=buf):
+                    for got in (fwd, bwd):
+                        self.assertTrue(same_ts(got.live_ts, legacy[0]), (got, legacy))
+                        self.assertTrue(same_ts(got.idle_ts, legacy[1]), (got, legacy))
+                    self.assertFalse(fwd.backward)
+                    self.assertEqual(fwd.bytes_read, self.size - start)
+
+    def test_backward_scan_stops_after_last_live_and_idle(self):
+        result = scan_range(self.path, 0, self.size, self.matcher, 1e12, buf_size=65536, backward_min=0)
+
+        self.assertTrue(result.backward)
+        self.assertLess(result.bytes_read, 1 << 20)
+
+    def test_empty_range_reads_nothing(self):
+        self.assertEqual(tuple(scan_range(self.path, 10, 10, self.matcher, 1e12)), (None, None, 0, False))
+
+
+class TimestampCacheTests(unittest.TestCase):
+    def test_matches_full_timestamp_parse(self):
+        ts_of = _TimestampCache()
+        for line in ("2025-03-30 02:30:00.123 +03:00 [INFO] x", "2025-03-30 02:30:00.12345 +03:00 [INFO] x",
+                     "2025-03-30 02:30:00.999 +03:00 [INFO] x", "2025-13-30 02:30:00.123 +03:00 [INFO] x", "no ts"):
+            with self.subTest(line=line):
+                self.assertTrue(same_ts(ts_of(line), parse_line_timestamp_epoch(line)))
+
+
+if __name__ == "__main__":
+    unittest.main()
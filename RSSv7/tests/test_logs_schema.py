@@ -0,0 +1,205 @@
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import rss_paths  # noqa: F401
+import log_fields
+import logs_schema
+from logs_schema import LOGS_MIGRATIONS, current_version, legacy_source_id, migrate
+
+QUIET = lambda _msg: None  # noqa: E731
+
+
+def legacy_init(conn: sqlite3.Connection) -> None:
+    """Прежний init_logs_db (шаги над cached_logs и resource_snapshots) на каждый старт."""
+    c = conn.cursor()
+    logs_schema._m1_base_tables(conn, QUIET)
+    c.execute("""
+        DELETE FROM cached_logs
+        WHERE id NOT IN (
+            SELECT MIN(id)
+            FROM cached_logs
+            GROUP BY acc_id, dt, raw_line
+        )
+    """)
+    legacy_rows = c.execute("""
+        SELECT id, acc_id, dt, raw_line
+        FROM cached_logs
+        WHERE source_id IS NULL OR source_id = ''
+    """).fetchall()
+    for row in legacy_rows:
+        c.execute("UPDATE cached_logs SET source_id=? WHERE id=?", (legacy_source_id(*row[1:]), row[0]))
+    logs_schema._m4_cached_logs_indexes(conn, QUIET)
+    c.execute("""
+        DELETE FROM resource_snapshots
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM resource_snapshots
+            GROUP BY acc_id, dt
+        )
+    """)
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_rs_acc_dt ON resource_snapshots(acc_id, dt)")
+    conn.commit()
+
+
+def make_legacy_db(path: str, rows: int, dup_ratio: float) -> None:
+    """База «до миграций»: cached_logs без source_id и с дублями, без уникальных индексов."""
+    rnd = random.Random(11)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("""
+        CREATE TABLE cached_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            acc_id TEXT, nickname TEXT, dt TEXT, raw_line TEXT)
+    """)
+    conn.execute("""
+        CREATE TABLE resource_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, acc_id TEXT NOT NULL, dt TEXT NOT NULL,
+            food INTEGER, wood INTEGER, stone INTEGER, gold INTEGER)
+    """)
+    unique = int(rows * (1 - dup_ratio))
+
+    def gen():
+        for i in range(rows):
+            n = i if i < unique else rnd.randrange(unique)
+            acc = f"acc-{n % 1000}"
+            dt = f"2025-{1 + n % 12:02d}-{1 + n % 28:02d} 12:{n % 60:02d}:{n % 59:02d}.{n % 1000:03d} +03:00"
+            yield acc, f"farm{n % 1000}", dt, f"[{dt}] [farm{n % 1000}] Gathering done, food +{n}"
+
+    conn.executemany("INSERT INTO cached_logs(acc_id, nickname, dt, raw_line) VALUES (?,?,?,?)", gen())
+    conn.executemany(
+        "INSERT INTO resource_snapshots(acc_id, dt, food, wood, stone, gold) VALUES (?,?,?,?,?,?)",
+        ((f"acc-{i % 1000}", f"2025-01-{1 + (i // 1000) % 28:02d}", i, i, i, i) for i in range(rows // 50)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def table_state(conn: sqlite3.Connection):
+    logs = conn.execute("SELECT id, acc_id, dt, raw_line, source_id FROM cached_logs ORDER BY id").fetchall()
+    snaps = conn.execute("SELECT id, acc_id, dt FROM resource_snapshots ORDER BY id").fetchall()
+    return logs, snaps
+
+
+class MigrateTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.path = os.path.join(self.tmp, "logs_cache.db")
+        make_legacy_db(self.path, rows=4000, dup_ratio=0.1)
+        patcher = mock.patch.object(logs_schema, "LOGS_MIGRATION_BATCH", 500)   # несколько пачек
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _connect(self, path=None) -> sqlite3.Connection:
+        conn = sqlite3.connect(path or self.path)
+        self.addCleanup(conn.close)
+        return conn
+
+    def test_first_start_matches_legacy_init(self):
+        legacy_path = os.path.join(self.tmp, "legacy.db")
+        make_legacy_db(legacy_path, rows=4000, dup_ratio=0.1)
+        legacy = self._connect(legacy_path)
+        legacy_init(legacy)
+
+        conn = self._connect()
+        self.assertEqual(migrate(conn, progress=QUIET), [m.version for m in LOGS_MIGRATIONS])
+
+        self.assertEqual(table_state(conn), table_state(legacy))
+        logs, _ = table_state(conn)
+        self.assertEqual(len({row[4] for row in logs}), len(logs))
+
+    def test_next_start_only_reads_the_version(self):
+        conn = self._connect()
+        migrate(conn, progress=QUIET)
+
+        statements = []
+        conn.set_trace_callback(statements.append)
+        self.assertEqual(migrate(conn, progress=QUIET), [])
+        conn.set_trace_callback(None)
+
+        self.assertFalse([sql for sql in statements if "cached_logs" in sql or "resource_snapshots" in sql])
+
+    def test_db_migrated_by_old_init_is_not_deduplicated_again(self):
+        conn = self._connect()
+        legacy_init(conn)
+        before = table_state(conn)
+
+        messages = []
+        migrate(conn, progress=messages.append)
+
+        self.assertEqual(table_state(conn), before)
+        self.assertFalse([m for m in messages if "дубли" in m])
+        self.assertEqual(current_version(conn), LOGS_MIGRATIONS[-1].version)
+
+    def test_interrupted_backfill_resumes_on_next_start(self):
+        conn = self._connect()
+
+        def crash_mid_backfill(msg):
+            if msg.startswith("cached_logs source_id: 1000/"):
+                raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            migrate(conn, progress=crash_mid_backfill)
+        self.assertEqual(current_version(conn), 2)
+        filled = conn.execute("SELECT COUNT(*) FROM cached_logs WHERE source_id IS NOT NULL").fetchone()[0]
+        self.assertEqual(filled, 1000)
+
+        migrate(conn, progress=QUIET)
+
+        self.assertEqual(current_version(conn), LOGS_MIGRATIONS[-1].version)
+        missing = conn.execute("SELECT COUNT(*) FROM cached_logs WHERE source_id IS NULL").fetchone()[0]
+        self.assertEqual(missing, 0)
+
+    def test_parsed_fields_are_backfilled(self):
+        conn = self._connect()
+        migrate(conn, progress=QUIET)
+
+        stale = conn.execute(
+            "SELECT COUNT(*) FROM cached_logs WHERE parsed_v IS NULL OR parsed_v <> ?",
+            (log_fields.PARSER_VERSION,),
+        ).fetchone()[0]
+        self.assertEqual(stale, 0)
+
+    def test_parser_version_bump_rewrites_stored_fields(self):
+        conn = self._connect()
+        migrate(conn, progress=QUIET)
+        version = log_fields.PARSER_VERSION
+
+        with mock.patch.object(log_fields, "PARSER_VERSION", version + 1):
+            messages = []
+            self.assertEqual(migrate(conn, progress=messages.append), [])
+
+            self.assertTrue([m for m in messages if "parsed fields" in m])
+            stale = conn.execute("SELECT COUNT(*) FROM cached_logs WHERE parsed_v <> ?", (version + 1,)).fetchone()[0]
+            self.assertEqual(stale, 0)
+
+            # пересчитано один раз: следующий старт снова только читает версии
+            statements = []
+            conn.set_trace_callback(statements.append)
+            migrate(conn, progress=QUIET)
+            conn.set_trace_callback(None)
+            self.assertFalse([sql for sql in statements if "cached_logs" in sql])
+
+    def test_db_migrated_before_parser_version_table_is_checked_once(self):
+        conn = self._connect()
+        migrate(conn, progress=QUIET)
+        conn.execute("DROP TABLE parser_version")
+        conn.execute("UPDATE cached_logs SET parsed_v = NULL WHERE id % 7 = 0")
+        conn.commit()
+
+        migrate(conn, progress=QUIET)
+
+        stale = conn.execute(
+            "SELECT COUNT(*) FROM cached_logs WHERE parsed_v IS NULL OR parsed_v <> ?",
+            (log_fields.PARSER_VERSION,),
+        ).fetchone()[0]
+        self.assertEqual(stale, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
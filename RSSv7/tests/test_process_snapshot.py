@@ -0,0 +1,134 @@
+import time
+import unittest
+from typing import Iterable, List
+from unittest import mock
+
+import rss_paths  # noqa: F401
+from process_snapshot import ProcessIndex, ProcessRow, ProcessSnapshotSampler, pattern_keys, script_stem
+
+
+class FakeProcessSource:
+    """Источник процессов для тестов: заранее заданный список (name, exe, cmdline)."""
+
+    def __init__(self, processes: Iterable[ProcessRow] = ()):
+        self.rows: List[ProcessRow] = list(processes)
+        self.calls = 0
+
+    def processes(self) -> Iterable[ProcessRow]:
+        self.calls += 1
+        return list(self.rows)
+
+
+def legacy_script_running(source, pattern: str) -> bool:
+    """Прежний is_script_running: обход всех процессов на каждый вызов."""
+    keys = pattern_keys(pattern)
+    for name, exe, cmdline in source.processes():
+        blob = " ".join(filter(None, [name, exe, " ".join(cmdline or ())])).lower().replace("\\", "/")
+        if any(k in blob for k in keys):
+            return True
+    return False
+
+
+def fake_rows(count: int) -> List[ProcessRow]:
+    """RssCounterWebV7 под python, clo.exe, каждый пятый — dnplayer.exe, остальное — службы."""
+    rows: List[ProcessRow] = [
+        ("python.exe", r"C:\Python313\python.exe", ["python", r"C:\LDPlayer\RSSv7\RssCounterWebV7.py"]),
+        ("clo.exe", r"C:\clo\clo.exe", [r"C:\clo\clo.exe", "--silent"]),
+    ]
+    for i in range(count - len(rows)):
+        if i % 5 == 0:
+            rows.append(("dnplayer.exe", r"C:\LDPlayer\LDPlayer9\dnplayer.exe",
+                         [r"C:\LDPlayer\LDPlayer9\dnplayer.exe", f"index={i}"]))
+        else:
+            rows.append((f"svc{i}.exe", rf"C:\Windows\System32\svc{i}.exe",
+                         [rf"C:\Windows\System32\svc{i}.exe", "-k", f"group{i % 7}"]))
+    return rows
+
+
+class ProcessIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.source = FakeProcessSource(fake_rows(50))
+        self.index = ProcessIndex(self.source.processes())
+
+    def test_script_lookup_matches_legacy_scan(self):
+        for pattern in ("RssCounterWebV7", "rsscounterwebv7.py", "clo.exe", "CLO", "LDPlayer9",
+                        "missing_script", "svc12", "group3", "", r"RSSv7\RssCounterWebV7.py"):
+            with self.subTest(pattern=pattern):
+                self.assertEqual(self.index.script_running(pattern),
+                                 legacy_script_running(self.source, pattern))
+                self.assertEqual(self.index.script_running(pattern),
+                                 legacy_script_running(self.source, pattern))   # из memo
+
+    def test_counts_by_name_ignore_case(self):
+        self.assertEqual(self.index.count("dnplayer.exe"), 10)
+        self.assertEqual(self.index.count("DNPLAYER.EXE"), 10)
+        self.assertTrue(self.index.exe_running("clo.exe"))
+        self.assertFalse(self.index.exe_running("gnbots.exe"))
+        self.assertEqual(self.index.total, 50)
+
+    def test_script_stem(self):
+        self.assertEqual(script_stem(r"C:\LDPlayer\RSSv7\RssCounterWebV7.py"), "rsscounterwebv7")
+        self.assertEqual(script_stem('"C:/x/Tool.PYW"'), "tool")
+        self.assertEqual(script_stem("clo.exe"), "clo")
+        self.assertEqual(script_stem("dir/"), "dir")
+
+
+class ProcessSnapshotSamplerTests(unittest.TestCase):
+    def setUp(self):
+        self.source = FakeProcessSource(fake_rows(50))
+
+    def test_fresh_snapshot_is_not_resampled(self):
+        sampler = ProcessSnapshotSampler(self.source, interval=60)
+        index = sampler.snapshot()
+
+        self.assertIs(sampler.snapshot(), index)
+        self.assertEqual(self.source.calls, 1)
+
+    def test_stale_snapshot_is_resampled_and_old_one_stays_unchanged(self):
+        sampler = ProcessSnapshotSampler(self.source, interval=60)
+        old = sampler.snapshot()
+
+        self.source.rows = self.source.rows[2:]          # RssCounter и clo завершились
+        sampler.interval = 0
+        new = sampler.snapshot()
+
+        self.assertIsNot(new, old)
+        self.assertFalse(new.script_running("RssCounterWebV7"))
+        self.assertTrue(old.script_running("RssCounterWebV7"))
+
+    def test_background_thread_serves_readers_without_scanning(self):
+        sampler = ProcessSnapshotSampler(self.source, interval=0.05).start()
+        self.addCleanup(sampler.stop)
+        deadline = time.monotonic() + 3
+        while sampler.samples < 3:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+        calls = self.source.calls
+        for _ in range(100):
+            sampler.snapshot().script_running("clo.exe")
+
+        self.assertLessEqual(self.source.calls - calls, 2)   # только фоновые снимки
+
+    def test_failed_sample_keeps_the_loop_running(self):
+        class Flaky(FakeProcessSource):
+            def processes(self):
+                if self.calls == 0:
+                    self.calls += 1
+                    raise OSError("access denied")
+                return super().processes()
+
+        source = Flaky(fake_rows(10))
+        sampler = ProcessSnapshotSampler(source, interval=0.02)
+        with mock.patch("builtins.print"):
+            sampler.start()
+            self.addCleanup(sampler.stop)
+            deadline = time.monotonic() + 3
+            while sampler.samples < 1:
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.01)
+        self.assertEqual(sampler.snapshot().count("dnplayer.exe"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
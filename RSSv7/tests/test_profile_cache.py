@@ -0,0 +1,126 @@
+import json
+import os
+import tempfile
+import unittest
+import uuid
+from typing import Any, Dict, List
+from unittest import mock
+
+import rss_paths  # noqa: F401
+from profile_cache import ProfileCache, build_document
+
+
+def make_profile(accounts: int) -> List[Dict[str, Any]]:
+    """Синтетический profiles.json: каждый десятый аккаунт выключен, MenuData — строка JSON."""
+    profile = []
+    for i in range(accounts):
+        menu = {"Config": {"Email": f"user{i}@mail.test", "Password": f"pw{i}", "Custom": str(10**9 + i),
+                           "Extra": ["x" * 40] * 30}}
+        profile.append({
+            "Id": str(uuid.uuid4()), "Name": f"farm{i}", "Active": i % 10 != 0, "InstanceId": i,
+            "MenuData": json.dumps(menu), "Data": json.dumps([{"ScriptId": "s", "Config": {"k": "v" * 200}}] * 20),
+        })
+    return profile
+
+
+def legacy_meta_full(path: str) -> List[Dict[str, Any]]:
+    """Прежний разбор load_accounts_meta_full: json.load + json.loads(MenuData) на каждый вызов."""
+    out = []
+    with open(path, "r", encoding="utf-8") as f:
+        for a in json.load(f):
+            if not a.get("Active") or a.get("Id") is None:
+                continue
+            md = json.loads(a.get("MenuData", "{}"))
+            cfg = md.get("Config", {})
+            out.append({"id": str(a["Id"]), "name": a.get("Name", ""),
+                        "email": cfg.get("Email", ""), "passwd": cfg.get("Password", ""),
+                        "igg": cfg.get("Custom", "")})
+    return out
+
+
+def cached_meta_full(cache: ProfileCache) -> List[Dict[str, Any]]:
+    doc = cache.get()
+    return [
+        {"id": str(a["Id"]), "name": a.get("Name", ""), **doc.credentials[str(a["Id"])]}
+        for a in doc.active if a.get("Id") is not None
+    ]
+
+
+class ProfileCacheTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "profiles.json")
+        self.cache = ProfileCache(lambda: self.path)
+        patcher = mock.patch("builtins.print")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _write(self, data, mtime_ns=None) -> None:
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(data if isinstance(data, str) else json.dumps(data))
+        if mtime_ns is not None:
+            os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_meta_full_matches_legacy_parse(self):
+        self._write(make_profile(50))
+        self.assertEqual(cached_meta_full(self.cache), legacy_meta_full(self.path))
+
+    def test_unchanged_file_is_parsed_once(self):
+        self._write(make_profile(5))
+        first = self.cache.get()
+        self.assertIs(self.cache.get(), first)
+        self.assertEqual(self.cache.loads, 1)
+
+    def test_changed_size_or_mtime_reloads(self):
+        self._write([{"Id": 1, "Active": True}], mtime_ns=10**18)
+        self.cache.get()
+        self._write([{"Id": 2, "Active": True}], mtime_ns=2 * 10**18)   # тот же размер, другой mtime
+        self.assertEqual(list(self.cache.get().by_id), ["2"])
+        self.assertEqual(self.cache.loads, 2)
+
+    def test_invalidate_forces_reload(self):
+        self._write(make_profile(3))
+        self.cache.get()
+        self.cache.invalidate()
+        self.cache.get()
+        self.assertEqual(self.cache.loads, 2)
+
+    def test_broken_file_keeps_last_document_with_ok_false(self):
+        self._write([{"Id": 7, "Active": True}])
+        self.assertTrue(self.cache.get().ok)
+
+        for broken in ("", "{not json", '{"Id": 7}'):
+            with self.subTest(broken=broken):
+                self._write(broken)
+                doc = self.cache.get()
+                self.assertFalse(doc.ok)
+                self.assertEqual(list(doc.by_id), ["7"])
+
+        os.remove(self.path)
+        self.assertFalse(self.cache.get().ok)
+
+    def test_missing_file_before_first_load_is_empty(self):
+        doc = self.cache.get()
+        self.assertFalse(doc.ok)
+        self.assertEqual(doc.accounts, [])
+
+
+class BuildDocumentTests(unittest.TestCase):
+    def test_credentials_from_string_dict_or_broken_menu(self):
+        doc = build_document([
+            {"Id": 1, "Active": True, "MenuData": '{"Config": {"Email": "a@b", "Password": "p", "Custom": "42"}}'},
+            {"Id": 2, "Active": False, "MenuData": {"Config": {"Email": "c@d"}}},
+            {"Id": 3, "MenuData": "{broken"},
+            {"Name": "без Id"},
+        ])
+
+        self.assertEqual(doc.credentials["1"], {"email": "a@b", "passwd": "p", "igg": "42"})
+        self.assertEqual(doc.credentials["2"], {"email": "c@d", "passwd": "", "igg": ""})
+        self.assertEqual(doc.credentials["3"], {"email": "", "passwd": "", "igg": ""})
+        self.assertEqual([a["Id"] for a in doc.active], [1])
+        self.assertEqual(sorted(doc.by_id), ["1", "2", "3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
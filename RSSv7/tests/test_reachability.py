@@ -0,0 +1,141 @@
+import socket
+import threading
+import time
+import unittest
+
+import rss_paths  # noqa: F401
+from reachability import DOWN, SUSPECT, UP, ReachabilityProber, Target, probe_tcp
+
+
+class LocalPorts:
+    """Локальные слушающие порты и «чёрные дыры» (очередь accept заполнена — SYN без ответа)."""
+
+    def __init__(self):
+        self._socks = []
+
+    def listening(self) -> Target:
+        s = socket.socket()
+        s.bind(("127.0.0.1", 0))
+        s.listen(128)
+        self._socks.append(s)
+        return s.getsockname()
+
+    def blackhole(self) -> Target:
+        s = socket.socket()
+        s.bind(("127.0.0.1", 0))
+        s.listen(0)
+        filler = socket.create_connection(s.getsockname())
+        self._socks += [s, filler]
+        return s.getsockname()
+
+    def close(self) -> None:
+        for s in self._socks:
+            s.close()
+        self._socks.clear()
+
+
+class RecordingProbe:
+    """probe для ReachabilityProber: настоящий probe_tcp, но адреса из revived «поднялись»."""
+
+    def __init__(self):
+        self.revived = set()
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, host, port, timeout):
+        with self._lock:
+            self.calls.append(((host, port), time.monotonic()))
+        if (host, port) in self.revived:
+            return 1.0
+        return probe_tcp(host, port, timeout)
+
+    def calls_to(self, target: Target) -> list:
+        with self._lock:
+            return [at for t, at in self.calls if t == target]
+
+
+def wait_for(predicate, timeout: float = 3.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+class ReachabilityProberTests(unittest.TestCase):
+    def setUp(self):
+        ports = LocalPorts()
+        self.addCleanup(ports.close)
+        self.up, self.hole = ports.listening(), ports.blackhole()
+        self.targets = {"up": self.up, "hole": self.hole}
+        self.probe = RecordingProbe()
+        self.recovered = []
+
+    def _prober(self, **kwargs) -> ReachabilityProber:
+        options = dict(timeout=0.2, down_after=2, retry_base=0.05, retry_max=0.2)
+        options.update(kwargs)
+        return ReachabilityProber(probe=self.probe, on_recover=self.recovered.append, **options)
+
+    def test_listening_port_is_up_and_blackhole_goes_down_after_two_failures(self):
+        prober = self._prober(retry_base=3600, retry_max=3600)
+
+        self.assertEqual(prober.check_all(self.targets), {"up": True, "hole": False})
+        self.assertEqual(prober.state("hole")["state"], SUSPECT)
+        self.assertEqual(prober.state("up")["state"], UP)
+        self.assertIsNotNone(prober.state("up")["rtt_ms"])
+
+        prober.check_all(self.targets)
+        self.assertEqual(prober.state("hole")["state"], DOWN)
+        self.assertEqual(prober.state("hole")["fails"], 2)
+
+    def test_down_server_is_not_probed_in_the_tick(self):
+        prober = self._prober(retry_base=3600, retry_max=3600)
+        prober.check_all(self.targets)
+        prober.check_all(self.targets)
+
+        t0 = time.perf_counter()
+        self.assertEqual(prober.check_all(self.targets), {"up": True, "hole": False})
+
+        self.assertLess(time.perf_counter() - t0, 0.15)
+        self.assertEqual(len(self.probe.calls_to(self.hole)), 2)
+
+    def test_background_retry_backs_off_and_reports_recovery(self):
+        prober = self._prober()
+        prober.check_all(self.targets)
+        prober.check_all(self.targets)
+        prober.check_all(self.targets)           # down уже вне тика: перепроверяет фоновый поток
+        self.assertTrue(wait_for(lambda: len(self.probe.calls_to(self.hole)) >= 6), "no background retries")
+
+        at = self.probe.calls_to(self.hole)[1:6]
+        gaps = [b - a for a, b in zip(at, at[1:])]
+        # пауза после пробы: 0.05 → 0.1 → 0.2 → 0.2 (+ таймаут самой пробы 0.2)
+        self.assertGreater(gaps[2], gaps[0] + 0.08, gaps)
+        self.assertLess(gaps[-1], 0.2 + 0.2 + 0.3, gaps)
+
+        self.probe.revived.add(self.hole)        # тот же адрес теперь отвечает
+        self.assertTrue(wait_for(lambda: self.recovered == ["hole"]), self.recovered)
+        self.assertEqual(prober.state("hole")["state"], UP)
+        self.assertEqual(prober.check_all(self.targets), {"up": True, "hole": True})
+
+    def test_removed_server_is_forgotten(self):
+        prober = self._prober(retry_base=3600, retry_max=3600)
+        prober.check_all(self.targets)
+
+        prober.retain(["up"])
+
+        self.assertIsNone(prober.state("hole"))
+        self.assertEqual(list(prober.snapshot()), ["up"])
+
+    def test_new_address_resets_health(self):
+        prober = self._prober(retry_base=3600, retry_max=3600)
+        prober.check_all(self.targets)
+        prober.check_all(self.targets)
+        self.assertEqual(prober.state("hole")["state"], DOWN)
+
+        self.assertEqual(prober.check_all({"hole": self.up}), {"hole": True})
+        self.assertEqual(prober.state("hole")["state"], UP)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import unittest
+import uuid
+from datetime import date
+from typing import Any, Dict
+
+from flask import Flask, Response, request
+
+import rss_paths  # noqa: F401
+from resources_view import IngestGeneration, VersionedResponseCache, _format_view, build_resources_payload
+
+
+def shorten_number(num):
+    """Копия shorten_number из RssCounterWebV7."""
+    if num == 0:
+        return "0"
+    sign = ""
+    if num < 0:
+        sign = "-"
+        num = abs(num)
+    if num < 1000:
+        return f"{sign}{num}"
+    elif num < 1_000_000:
+        return f"{sign}{num // 1000}k"
+    elif num < 1_000_000_000:
+        return f"{sign}{num // 1_000_000}m"
+    else:
+        b = num / 1_000_000_000
+        return f"{sign}{b:.1f}b"
+
+
+def legacy_payload(profiles, path: str, today_str: str) -> Dict[str, Any]:
+    """Прежний api_resources: два соединения и SELECT account_meta на каждую строку."""
+    active_ids = {a["Id"] for a in profiles}
+    inst_map = {a["Id"]: a.get("InstanceId", -1) for a in profiles}
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT id,nickname,food,wood,stone,gold,gems,last_updated FROM resources").fetchall()
+    conn.close()
+    conn = sqlite3.connect(path)
+    base_map = {br[0]: br[1:] for br in conn.execute(
+        "SELECT id,food,wood,stone,gold,gems FROM daily_baseline WHERE baseline_date=?", (today_str,)).fetchall()}
+    conn.close()
+    totf = totw = tots = totg = totm = 0
+    accounts = []
+    for (acc_id, nick, f, w, s, g, m, lastupd) in rows:
+        if acc_id not in active_ids:
+            continue
+        totf += f; totw += w; tots += s; totg += g; totm += m
+        bf, bw, bs, bg, _ = base_map.get(acc_id, (0, 0, 0, 0, 0))
+        gf = f - bf; gw = w - bw; gs = s - bs; gg = g - bg
+        conn_t = sqlite3.connect(path)        # 'meta_map' not in globals() — всегда True
+        meta_map = dict(conn_t.execute("SELECT id, tariff_rub FROM account_meta").fetchall())
+        conn_t.close()
+        tariff = meta_map.get(acc_id, 0)
+        accounts.append({
+            "id": acc_id, "nickname": nick, "instanceId": inst_map.get(acc_id, -1),
+            "food_raw": f, "wood_raw": w, "stone_raw": s, "gold_raw": g,
+            "food_view": _format_view(shorten_number, f, gf), "wood_view": _format_view(shorten_number, w, gw),
+            "stone_view": _format_view(shorten_number, s, gs), "gold_view": _format_view(shorten_number, g, gg),
+            "tariff_raw": tariff, "tariff_view": "0₽" if tariff is None else f"{tariff:,}₽".replace(",", " "),
+            "today_gain": shorten_number(gf + gw + gs + gg), "last_updated": lastupd,
+        })
+    return {"accounts": accounts, "account_count": len(accounts), "totals": {
+        "food": shorten_number(totf), "wood": shorten_number(totw), "stone": shorten_number(tots),
+        "gold": shorten_number(totg), "gems": shorten_number(totm)}}
+
+
+def make_resources_db(path: str, accounts: int, today: str, seed: int = 2):
+    """resources_web.db с accounts аккаунтами; возвращает профили активных (каждый десятый выключен)."""
+    rnd = random.Random(seed)
+    profiles = [{"Id": str(uuid.UUID(int=rnd.getrandbits(128))), "Name": f"farm{i}", "InstanceId": i}
+                for i in range(accounts)]
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript("""
+        CREATE TABLE resources(id TEXT PRIMARY KEY, nickname TEXT, food INTEGER, wood INTEGER,
+                               stone INTEGER, gold INTEGER, gems INTEGER, last_updated TEXT);
+        CREATE TABLE daily_baseline(id TEXT, nickname TEXT, food INTEGER, wood INTEGER, stone INTEGER,
+                                    gold INTEGER, gems INTEGER, baseline_date TEXT,
+                                    PRIMARY KEY(id, baseline_date));
+        CREATE TABLE account_meta(id TEXT PRIMARY KEY, tariff_rub INTEGER);
+    """)
+    for i, p in enumerate(profiles):
+        vals = [rnd.randint(0, 3_000_000_000) for _ in range(5)]
+        conn.execute("INSERT INTO resources VALUES (?,?,?,?,?,?,?,?)", (p["Id"], p["Name"], *vals, today))
+        if i % 7:                                   # у части аккаунтов нет базы на сегодня
+            conn.execute("INSERT INTO daily_baseline VALUES (?,?,?,?,?,?,?,?)",
+                         (p["Id"], p["Name"], *[v - rnd.randint(-1000, 10_000_000) for v in vals], today))
+        if i % 5:                                   # и строки account_meta
+            conn.execute("INSERT INTO account_meta VALUES (?,?)", (p["Id"], rnd.choice([None, 500, 1000, 1500])))
+    conn.commit()
+    conn.close()
+    return [p for i, p in enumerate(profiles) if i % 10]
+
+
+def make_app(profiles, path: str, today: str, generation: IngestGeneration, cache: VersionedResponseCache):
+    """/legacy — прежний api_resources, /cached — как в RssCounterWebV7 (кеш по поколению + ETag)."""
+    app = Flask("resources-test")
+
+    def dumps(payload) -> bytes:
+        return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+    @app.route("/legacy")
+    def legacy():
+        return Response(dumps(legacy_payload(profiles, path, today)), mimetype="application/json")
+
+    @app.route("/cached")
+    def cached():
+        def build() -> bytes:
+            c = sqlite3.connect(path)
+            try:
+                return dumps(build_resources_payload(profiles, c, today, shorten_number))
+            finally:
+                c.close()
+        etag, body = cache.get((generation.value, today), build)
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers={"ETag": f'"{etag}"'})
+        return Response(body, mimetype="application/json", headers={"ETag": f'"{etag}"'})
+
+    return app
+
+
+class ResourcesPayloadTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "resources_web.db")
+        self.today = date(2025, 3, 10).isoformat()
+        self.profiles = make_resources_db(self.path, 200, self.today)
+        self.generation = IngestGeneration()
+        self.cache = VersionedResponseCache()
+        self.client = make_app(self.profiles, self.path, self.today, self.generation, self.cache).test_client()
+
+    def test_payload_matches_legacy(self):
+        conn = sqlite3.connect(self.path)
+        self.addCleanup(conn.close)
+        payload = build_resources_payload(self.profiles, conn, self.today, shorten_number)
+        self.assertEqual(payload, legacy_payload(self.profiles, self.path, self.today))
+        self.assertEqual(payload["account_count"], 180)
+
+    def test_repeated_requests_reuse_the_built_body(self):
+        first = self.client.get("/cached")
+        second = self.client.get("/cached")
+
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first.headers["ETag"], second.headers["ETag"])
+        self.assertEqual(json.loads(first.data), json.loads(self.client.get("/legacy").data))
+        self.assertEqual(self.cache.builds, 1)
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get("/cached").headers["ETag"]
+
+        resp = self.client.get("/cached", headers={"If-None-Match": etag})
+
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.data, b"")
+
+    def test_generation_bump_rebuilds_with_new_data(self):
+        etag = self.client.get("/cached").headers["ETag"]
+        conn = sqlite3.connect(self.path)
+        conn.execute("UPDATE resources SET food = food + 5000000 WHERE id = ?", (self.profiles[0]["Id"],))
+        conn.commit()
+        conn.close()
+
+        self.assertEqual(self.client.get("/cached", headers={"If-None-Match": etag}).status_code, 304)
+        self.generation.bump()
+        resp = self.client.get("/cached", headers={"If-None-Match": etag})
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(json.loads(resp.data), json.loads(self.client.get("/legacy").data))
+        self.assertEqual(self.cache.builds, 2)
+
+
+class IngestGenerationTests(unittest.TestCase):
+    def test_concurrent_bumps_are_not_lost(self):
+        generation = IngestGeneration()
+        threads = [threading.Thread(target=lambda: [generation.bump() for _ in range(1000)]) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(generation.value, 8000)
+
+
+if __name__ == "__main__":
+    unittest.main()
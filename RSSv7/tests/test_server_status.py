@@ -0,0 +1,179 @@
+import json
+import logging
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict
+
+import requests
+from flask import Flask, jsonify
+from werkzeug.serving import make_server
+
+import rss_paths  # noqa: F401
+from server_status import FleetStatusAggregator
+
+
+def start_fake_peer(hang: bool):
+    """Локальный /api/server/self_status; зависший держит запрос, пока не отпустят release."""
+    release = threading.Event()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if hang:
+                release.wait(60)
+            body = json.dumps({"pingOk": True, "gnOk": True, "dnOk": True, "dnCount": 3}).encode()
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except OSError:  # клиент уже ушёл по таймауту
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    return server, release
+
+
+def make_fetch(timeout: float):
+    """Та же семантика, что fetch_remote_server в RssCounterWebV7."""
+
+    def fetch(server: dict) -> Dict[str, Any]:
+        try:
+            resp = requests.get(server["url"] + "/api/server/self_status", timeout=timeout)
+            resp.raise_for_status()
+            data = resp.json()
+            data.setdefault("server", server["name"])
+            return data
+        except Exception as exc:
+            return {"server": server["name"], "error": str(exc), "pingOk": False, "gnOk": False, "dnOk": False}
+
+    return fetch
+
+
+def serve_endpoint(aggregator: FleetStatusAggregator, servers: list):
+    """/api/serverStatus, как в RssCounterWebV7: ответ из снимка агрегатора."""
+    app = Flask("server-status-test")
+
+    @app.route("/api/serverStatus")
+    def api_server_status():
+        return jsonify({"servers": servers, "status": aggregator.snapshot()})
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    http = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=http.serve_forever, daemon=True).start()
+    return http, f"http://127.0.0.1:{http.server_port}/api/serverStatus"
+
+
+def percentile(sorted_values, share: float) -> float:
+    return sorted_values[max(0, int(len(sorted_values) * share) - 1)]
+
+
+class FleetStatusEndpointTests(unittest.TestCase):
+    def _fleet(self, peers: int, hanging: int, workers: int, timeout: float = 30, interval: float = 0.2):
+        self.fakes = [start_fake_peer(hang=i < hanging) for i in range(peers)]
+        self.servers = [
+            {"name": f"peer{i}", "url": f"http://127.0.0.1:{srv.server_address[1]}"}
+            for i, (srv, _) in enumerate(self.fakes)
+        ]
+        self.aggregator = FleetStatusAggregator(
+            lambda: self.servers, make_fetch(timeout), interval=interval, workers=workers
+        ).start()
+        self.http, self.url = serve_endpoint(self.aggregator, self.servers)
+        self.addCleanup(self._shutdown)
+
+    def _shutdown(self):
+        self.http.shutdown()
+        self.aggregator.stop()
+        for srv, release in self.fakes:
+            release.set()
+            srv.shutdown()
+
+    def _wait(self, predicate, what: str) -> Dict[str, dict]:
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            snap = self.aggregator.snapshot()
+            if predicate(snap):
+                return snap
+            time.sleep(0.02)
+        self.fail(what)
+
+    def _latencies(self, count: int) -> list:
+        session = requests.Session()
+        latencies = []
+        for _ in range(count):
+            t0 = time.perf_counter()
+            resp = session.get(self.url, timeout=5)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            self.assertEqual(resp.status_code, 200)
+        return sorted(latencies)
+
+    def test_p99_stays_under_50ms_when_most_peers_hang(self):
+        # зависших больше, чем потоков пула: все опросы заняты, эндпоинт всё равно отвечает из памяти
+        self._fleet(peers=12, hanging=10, workers=4)
+        self._wait(lambda snap: sum(v["pending"] for v in snap.values()) >= 4, "poll never started")
+
+        latencies = self._latencies(200)
+
+        self.assertLess(percentile(latencies, 0.99), 50.0, latencies[-5:])
+
+    def test_snapshot_keeps_healthy_peers_fresh_beside_hanging_ones(self):
+        self._fleet(peers=8, hanging=5, workers=8)
+        snap = self._wait(lambda s: sum(1 for v in s.values() if v.get("pingOk")) == 3, "healthy peers missing")
+
+        self.assertLess(percentile(self._latencies(100), 0.99), 50.0)
+        for i in range(8):
+            item = snap[f"peer{i}"]
+            if i < 5:                             # ответа ещё не было: недоступен и «в полёте»
+                self.assertFalse(item["pingOk"])
+                self.assertTrue(item["pending"])
+                self.assertIsNone(item["age_sec"])
+            else:
+                self.assertTrue(item["pingOk"])
+                self.assertIsNotNone(item["age_sec"])
+
+    def test_hanging_peer_is_not_requested_again_while_in_flight(self):
+        self._fleet(peers=4, hanging=2, workers=8, interval=60)   # фоновый цикл — только первый опрос
+        self._wait(lambda s: sum(1 for v in s.values() if v.get("pingOk")) == 2, "healthy peers missing")
+        self._wait(lambda s: not s["peer2"]["pending"] and not s["peer3"]["pending"], "healthy still pending")
+
+        self.assertEqual(self.aggregator.poll_once(), 2)   # в очередь встают только здоровые
+
+        self.fakes[0][1].set()                    # зависший ответил
+        self._wait(lambda s: s["peer0"]["pingOk"], "released peer never answered")
+
+
+class FleetStatusSnapshotTests(unittest.TestCase):
+    def test_removed_server_leaves_the_snapshot(self):
+        servers = [{"name": "a"}, {"name": "b"}]
+        done = threading.Event()
+
+        def fetch(srv):
+            if srv["name"] == "b":
+                done.set()
+            return {"server": srv["name"], "pingOk": True}
+
+        aggregator = FleetStatusAggregator(lambda: servers, fetch, local_name="a",
+                                           local_status=lambda: {"server": "a", "local": True},
+                                           interval=60).start()
+        self.addCleanup(aggregator.stop)
+        self.assertTrue(done.wait(5))
+        deadline = time.monotonic() + 5
+        while any(v["pending"] for v in aggregator.snapshot().values()):
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        self.assertTrue(aggregator.snapshot()["a"]["local"])
+
+        servers.pop()
+        aggregator.poll_once()
+        self.assertEqual(list(aggregator.snapshot()), ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
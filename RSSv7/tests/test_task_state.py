@@ -0,0 +1,166 @@
+import threading
+import unittest
+from unittest import mock
+
+import rss_paths  # noqa: F401
+import task_state
+from task_state import FakeTaskProvider, TaskStateService, parse_schtasks_csv
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _FailingProvider(FakeTaskProvider):
+    def __init__(self, tasks):
+        super().__init__(tasks)
+        self.fail = False
+
+    def enumerate(self):
+        if self.fail:
+            self.calls += 1
+            raise TimeoutError("schtasks timed out")
+        return super().enumerate()
+
+
+class TaskStateServiceTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        patcher = mock.patch.object(task_state.time, "monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_enumerates_once_per_ttl(self):
+        provider = FakeTaskProvider({r"\LD СЛЁТ": True, r"\LD РАЗЛОГ": False})
+        service = TaskStateService(provider, ttl=10)
+
+        self.assertTrue(service.get(r"\LD СЛЁТ"))
+        self.assertFalse(service.get("ld разлог"))
+        self.clock.now += 9.9
+        self.assertTrue(service.get("LD слёт"))
+        self.assertEqual(provider.calls, 1)
+
+        provider.tasks["ld слёт"] = False
+        self.clock.now += 0.2
+        self.assertFalse(service.get(r"\LD СЛЁТ"))
+        self.assertEqual(provider.calls, 2)
+
+    def test_invalidate_forces_refresh(self):
+        provider = FakeTaskProvider({r"\A": True})
+        service = TaskStateService(provider, ttl=10)
+        service.get(r"\A")
+        service.invalidate()
+        service.get(r"\A")
+        self.assertEqual(provider.calls, 2)
+
+    def test_get_many_answers_all_names_from_one_enumeration(self):
+        provider = FakeTaskProvider({r"\LD СЛЁТ": True, r"\LD РАЗЛОГ": False})
+        service = TaskStateService(provider, ttl=10)
+
+        states = service.get_many([r"\LD СЛЁТ", r"\LD РАЗЛОГ", r"\Нет такой"])
+
+        self.assertEqual(states, {r"\LD СЛЁТ": True, r"\LD РАЗЛОГ": False, r"\Нет такой": None})
+        self.assertEqual(provider.calls, 1)
+
+    def test_failed_enumeration_keeps_previous_snapshot(self):
+        provider = _FailingProvider({r"\A": True})
+        service = TaskStateService(provider, ttl=10)
+        self.assertTrue(service.get(r"\A"))
+
+        provider.fail = True
+        self.clock.now += 11
+        with mock.patch("builtins.print"):
+            self.assertTrue(service.get(r"\A"))
+        self.assertIn("timed out", service.last_error)
+
+        # ошибка тоже кешируется на TTL: зависший schtasks не дёргается на каждый запрос
+        service.get(r"\A")
+        self.assertEqual(provider.calls, 2)
+
+        provider.fail = False
+        self.clock.now += 11
+        service.get(r"\A")
+        self.assertIsNone(service.last_error)
+
+    def test_concurrent_requests_after_expiry_share_one_enumeration(self):
+        provider = FakeTaskProvider({r"\A": True}, delay=0.05)
+        service = TaskStateService(provider, ttl=10)
+        service.get(r"\A")
+        self.clock.now += 11
+
+        threads = [threading.Thread(target=service.get, args=(r"\A",)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(provider.calls, 2)
+
+
+class ParseSchtasksCsvTests(unittest.TestCase):
+    def test_english_headers_and_folder_leaf_names(self):
+        text = (
+            '"HostName","TaskName","Next Run Time","Status","Scheduled Task State"\r\n'
+            '"SRV","\\LD СЛЁТ","N/A","Ready","Enabled"\r\n'
+            '"SRV","\\Farm\\LD РАЗЛОГ","N/A","Ready","Disabled"\r\n'
+            '"HostName","TaskName","Next Run Time","Status","Scheduled Task State"\r\n'
+        )
+        states = parse_schtasks_csv(text)
+        self.assertIs(states["ld слёт"], True)
+        self.assertIs(states["farm\\ld разлог"], False)
+        self.assertIs(states["ld разлог"], False)
+
+    def test_russian_headers(self):
+        text = (
+            '"Имя узла","Имя задачи","Состояние","Состояние назначенного задания"\r\n'
+            '"SRV","\\LD GN ПРОВЕРКА","Готово","Отключено"\r\n'
+        )
+        self.assertEqual(parse_schtasks_csv(text), {"ld gn проверка": False})
+
+    def test_unknown_locale_falls_back_to_state_values(self):
+        text = (
+            '"Host","Aufgabe","Status","Zustand"\r\n'
+            '"SRV","\\A","Bereit","Enabled"\r\n'
+            '"SRV","\\B","Bereit","Disabled"\r\n'
+        )
+        self.assertEqual(parse_schtasks_csv(text), {"a": True, "b": False})
+
+
+class CentralDashTaskStatesTests(unittest.TestCase):
+    def setUp(self):
+        import central_dashboard
+
+        self.cd = central_dashboard
+        self.srv = mock.Mock(url="http://srv:5001")
+        patcher = mock.patch.object(central_dashboard, "TASKS", [r"\LD СЛЁТ", r"\LD РАЗЛОГ"])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_batch_endpoint_answers_all_tasks_in_one_request(self):
+        answers = {"tasks": {r"\LD СЛЁТ": True, r"\LD РАЗЛОГ": None}}
+        with mock.patch.object(self.cd, "http_json", return_value=answers) as http_json:
+            states = self.cd.fetch_task_states(self.srv)
+
+        self.assertEqual(states, {r"\LD СЛЁТ": True, r"\LD РАЗЛОГ": None})
+        self.assertEqual(http_json.call_count, 1)
+        self.assertIn("/api/taskStates?names=", http_json.call_args[0][0])
+
+    def test_old_server_without_batch_endpoint_falls_back_per_task(self):
+        def http_json(url):
+            if "/api/taskStates" in url:
+                return None                       # 404 у старого RSSv7
+            return {"enabled": "%D0%A0%D0%90%D0%97" not in url}
+
+        with mock.patch.object(self.cd, "http_json", side_effect=http_json) as patched:
+            states = self.cd.fetch_task_states(self.srv)
+
+        self.assertEqual(states, {r"\LD СЛЁТ": True, r"\LD РАЗЛОГ": False})
+        self.assertEqual(patched.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+from typing import List
+from unittest import mock
+
+import rss_paths  # noqa: F401
+from template_gaps import TemplateShapeIndex
+
+
+def legacy_collect(templates_dir: str, schema: dict) -> List[dict]:
+    """Прежний обход: json.load каждого шаблона на каждую сверку."""
+    results = []
+    for name in sorted(os.listdir(templates_dir)):
+        if not name.lower().endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(templates_dir, name), "r", encoding="utf-8") as f:
+                steps = json.load(f)
+        except Exception:
+            steps = []
+        if not isinstance(steps, list):
+            continue
+        gaps = []
+        for step in steps:
+            sid = step.get("ScriptId")
+            cfg = step.get("Config") or {}
+            if not sid or sid not in schema:
+                continue
+            missing = [k for k in (schema[sid].get("fields") or {}) if k not in cfg]
+            if missing:
+                gaps.append({"script_id": sid, "keys": missing})
+        if gaps:
+            results.append({"template": name, "label": os.path.splitext(name)[0], "aliases": [], "gaps": gaps})
+    return results
+
+
+def make_schema(keys: int, scripts: int = 60) -> dict:
+    return {f"script.{i}": {"fields": {f"key{k}": {"type": "number"} for k in range(keys)}} for i in range(scripts)}
+
+
+def make_tree(tdir: str, rnd: random.Random, templates: int, steps: int, keys: int, scripts: int = 60) -> None:
+    """Шаблоны T<i>.json: шаги по кругу ScriptId, ~1% ключей Config пропущено."""
+    os.makedirs(tdir, exist_ok=True)
+    for i in range(templates):
+        out = []
+        for s in range(steps):
+            cfg = {f"key{k}": {"value": "On", "options": ["On", "Off"] * 4} for k in range(keys)
+                   if rnd.random() > 0.01}
+            out.append({"ScriptId": f"script.{(i + s) % scripts}", "Id": s, "Config": cfg})
+        write_template(os.path.join(tdir, f"T{i}.json"), out)
+
+
+def write_template(path: str, data) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def drop_first_key(path: str) -> None:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    data[0]["Config"].pop(next(iter(data[0]["Config"])), None)
+    write_template(path, data)
+
+
+class TemplateShapeIndexTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tdir = os.path.join(tmp.name, "templates")
+        self.cache = os.path.join(tmp.name, "template_shapes_cache.db")
+        self.schema = make_schema(keys=10, scripts=8)
+        make_tree(self.tdir, random.Random(9), templates=30, steps=6, keys=10, scripts=8)
+        self.index = TemplateShapeIndex(self.tdir, self.cache)
+
+    def test_matches_legacy_collect(self):
+        self.assertEqual(self.index.collect_gaps(self.schema), legacy_collect(self.tdir, self.schema))
+        self.assertEqual(self.index.parsed, 30)
+
+    def test_only_changed_template_is_parsed_again(self):
+        self.index.collect_gaps(self.schema)
+
+        drop_first_key(os.path.join(self.tdir, "T3.json"))
+        report = self.index.collect_gaps(self.schema)
+
+        self.assertEqual(self.index.parsed, 31)
+        self.assertEqual(report, legacy_collect(self.tdir, self.schema))
+
+    def test_new_mtime_with_same_content_is_not_parsed(self):
+        self.index.collect_gaps(self.schema)
+        path = os.path.join(self.tdir, "T0.json")
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+        self.index.collect_gaps(self.schema)
+
+        self.assertEqual(self.index.parsed, 30)
+
+    def test_restart_reads_shapes_from_disk_cache(self):
+        expected = self.index.collect_gaps(self.schema)
+
+        restarted = TemplateShapeIndex(self.tdir, self.cache)
+
+        self.assertEqual(restarted.collect_gaps(self.schema), expected)
+        self.assertEqual(restarted.parsed, 0)
+
+    def test_schema_change_needs_no_reparse(self):
+        self.index.collect_gaps(self.schema)
+        schema = make_schema(keys=12, scripts=8)
+
+        report = self.index.collect_gaps(schema)
+
+        self.assertEqual(report, legacy_collect(self.tdir, schema))
+        self.assertEqual(self.index.parsed, 30)
+
+    def test_removed_and_broken_templates(self):
+        self.index.collect_gaps(self.schema)
+        os.remove(os.path.join(self.tdir, "T1.json"))
+        with open(os.path.join(self.tdir, "T2.json"), "w", encoding="utf-8") as f:
+            f.write("{broken")
+
+        report = self.index.collect_gaps(self.schema)
+
+        self.assertEqual(report, legacy_collect(self.tdir, self.schema))
+        self.assertNotIn("T2.json", [r["template"] for r in report])
+        restarted = TemplateShapeIndex(self.tdir, self.cache)
+        self.assertNotIn("T1.json", restarted.scan())
+        self.assertEqual(restarted.parsed, 0)
+
+    def test_unreadable_disk_cache_is_rebuilt(self):
+        with open(self.cache, "w") as f:
+            f.write("not a database")
+        with mock.patch("builtins.print"):
+            report = self.index.collect_gaps(self.schema)
+        self.assertEqual(report, legacy_collect(self.tdir, self.schema))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+import os
+import tempfile
+import threading
+import time
+import types
+import unittest
+from typing import Callable, Dict, List
+from unittest import mock
+
+import rss_paths  # noqa: F401
+from update_scheduler import (
+    FAILED,
+    RUNNING,
+    UpdateJob,
+    UpdateQueue,
+    UpdateScheduler,
+    dry_run_command,
+    run_command,
+)
+
+
+class FakeRunner:
+    """Установка без процессов: длительность и неудачи по имени эмулятора."""
+
+    def __init__(self, durations: Dict[str, float], fail_first: set = frozenset(), always_fail: set = frozenset()):
+        self.durations, self.fail_first, self.always_fail = durations, set(fail_first), set(always_fail)
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, job: UpdateJob, on_line, timeout: float) -> int:
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.durations.get(job.name, 0.01))
+            on_line("Success")
+        finally:
+            with self._lock:
+                self.active -= 1
+        if job.name in self.always_fail or (job.name in self.fail_first and job.attempts == 1):
+            return 1
+        return 0
+
+
+class FakePressureSource:
+    """Нагрузка растёт с числом идущих установок."""
+
+    def __init__(self, cpu_per_job: float = 0.0, io_per_job: float = 0.0, base_cpu: float = 5.0):
+        self.cpu_per_job, self.io_per_job, self.base_cpu = cpu_per_job, io_per_job, base_cpu
+        self.running: Callable[[], int] = lambda: 0
+
+    def sample(self) -> Dict[str, float]:
+        n = self.running()
+        return {"cpu": self.base_cpu + n * self.cpu_per_job, "io_mbps": n * self.io_per_job}
+
+
+NAMES = [f"Farm{i}" for i in range(12)]
+
+
+class UpdateSchedulerTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "queue.json")
+
+    def test_parallel_run_with_retries_is_saved_to_queue_file(self):
+        runner = FakeRunner({n: 0.05 for n in NAMES}, fail_first={"Farm3"}, always_fail={"Farm7"})
+        events: List[tuple] = []
+        queue = UpdateQueue.create(self.path, [UpdateJob(n, ["ldconsole", n]) for n in NAMES])
+        sched = UpdateScheduler(queue, concurrency=4, runner=runner, pressure=None, retries=2,
+                                retry_base=0.01, on_event=lambda k, j, t: events.append((k, j and j.name)),
+                                poll=0.01)
+
+        summary = sched.run()
+
+        self.assertEqual((summary["done"], summary["failed"], summary["retries"]), (11, 1, 1 + 2), summary)
+        self.assertEqual((runner.peak, sched.peak), (4, 4))
+        self.assertIn(("retry", "Farm3"), events)
+        self.assertIn(("failed", "Farm7"), events)
+        saved = UpdateQueue.load(self.path)
+        self.assertEqual({j.name: j.state for j in saved.jobs}["Farm7"], FAILED)
+        self.assertEqual(saved.unfinished(), [])
+        self.assertTrue(all(j.duration is not None and j.history for j in saved.jobs))
+
+    def test_interrupted_queue_resumes_running_jobs(self):
+        queue = UpdateQueue.create(self.path, [UpdateJob(n, []) for n in NAMES])
+        UpdateScheduler(queue, concurrency=4, runner=FakeRunner({}), pressure=None, poll=0.01).run()
+        saved = UpdateQueue.load(self.path)
+        # «упали» посреди установки: running → pending, done не трогаем
+        for j in saved.jobs[:3]:
+            j.state = RUNNING
+        saved.save()
+
+        resumed = UpdateQueue.load(self.path)
+
+        self.assertEqual([j.name for j in resumed.unfinished()], NAMES[:3])
+        runner = FakeRunner({})
+        summary = UpdateScheduler(resumed, concurrency=2, runner=runner, pressure=None, poll=0.01).run()
+        self.assertEqual(summary["done"], 12)
+        self.assertLessEqual(runner.peak, 2)
+
+    def test_load_pressure_limits_parallel_installs(self):
+        # по 30% CPU на установку при пороге 85% — больше трёх сразу не пойдёт
+        pressure = FakePressureSource(cpu_per_job=30)
+        queue = UpdateQueue.create(None, [UpdateJob(n, []) for n in NAMES])
+        runner = FakeRunner({n: 0.05 for n in NAMES})
+        sched = UpdateScheduler(queue, concurrency=8, runner=runner, pressure=pressure, max_cpu=85, poll=0.01)
+        pressure.running = lambda: sched.running
+
+        summary = sched.run()
+
+        self.assertEqual(summary["done"], 12)
+        self.assertEqual(runner.peak, 3)
+        self.assertGreater(summary["throttled"], 0)
+
+
+class RunCommandTests(unittest.TestCase):
+    def test_dry_run_console_prints_progress(self):
+        lines: List[str] = []
+        self.assertEqual(run_command(UpdateJob("Dry", dry_run_command("Dry", 0.05)), lines.append, timeout=10), 0)
+        self.assertEqual(lines[-1], "Success")
+        self.assertTrue(any("100%" in line for line in lines))
+
+    def test_hung_command_is_killed_by_timeout(self):
+        slow = UpdateJob("Slow", dry_run_command("Slow", 5))
+        t0 = time.monotonic()
+        self.assertEqual(run_command(slow, lambda _l: None, timeout=0.3), -9)
+        self.assertLess(time.monotonic() - t0, 3)
+
+
+class InstallerQueueGuardTests(unittest.TestCase):
+    """LdUPD / LD_UPD_sPlit: Install во время установки не трогает её очередь."""
+
+    def setUp(self):
+        try:
+            import LD_UPD_sPlit
+            import LdUPD
+        except ImportError as exc:                # нет tkinter
+            self.skipTest(str(exc))
+        self.modules = (LdUPD, LD_UPD_sPlit)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.queue_path = os.path.join(tmp.name, "update_queue.json")
+
+    def _app(self, module, scheduler):
+        app = types.SimpleNamespace(scheduler=scheduler, dry_run=mock.Mock(**{"get.return_value": True}), ran=[])
+        for name in ("_do_install", "_busy"):
+            setattr(app, name, types.MethodType(getattr(module.App, name), app))
+        app._run_queue = app.ran.append
+        return app
+
+    def test_busy_installer_keeps_running_queue_file(self):
+        for module in self.modules:
+            with self.subTest(module.__name__):
+                running = UpdateQueue.create(self.queue_path, [UpdateJob("Farm1", [], state=RUNNING)])
+                with open(self.queue_path, "rb") as f:
+                    before = f.read()
+                app = self._app(module, scheduler=mock.Mock())
+                with mock.patch.object(module, "QUEUE_PATH", self.queue_path), \
+                        mock.patch.object(module.messagebox, "showwarning") as warn:
+                    app._do_install(["Farm2", "Farm3"])
+
+                warn.assert_called_once()
+                self.assertEqual(app.ran, [])
+                with open(self.queue_path, "rb") as f:
+                    self.assertEqual(f.read(), before)
+                self.assertEqual([j.name for j in running.jobs], ["Farm1"])
+
+    def test_idle_installer_writes_new_queue(self):
+        for module in self.modules:
+            with self.subTest(module.__name__):
+                app = self._app(module, scheduler=None)
+                with mock.patch.object(module, "QUEUE_PATH", self.queue_path):
+                    app._do_install(["Farm2", "Farm3"])
+
+                self.assertEqual(len(app.ran), 1)
+                self.assertEqual([j.name for j in UpdateQueue.load(self.queue_path).jobs], ["Farm2", "Farm3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -59,7 +59,7 @@ from UsersDash.services.farmdata_backup_restore import (
     preview_farmdata_backup,
 )
 from UsersDash.services import client_config_visibility
-from UsersDash.services.audit import log_settings_action, settings_audit_context
+from UsersDash.services.audit import flush_audit_buffer, log_settings_action, settings_audit_context
 from UsersDash.services.remote_api import (
     _resolve_remote_account,
     fetch_account_settings,
@@ -95,7 +95,10 @@ from UsersDash.services.info_message import (
     set_global_info_message_text,
 )
 from UsersDash.services.notifications import send_notification
-from UsersDash.services.farm_log_collector import queue_farm_log_sync
+from UsersDash.services.farm_log_collector import (
+    farm_log_collector_metrics,
+    queue_farm_log_sync,
+)
 from UsersDash.services.farm_logs import (
     build_account_logs_payload,
     query_farm_log_filter_accounts,
@@ -1428,6 +1431,7 @@ def api_farm_log_sync_status():
         .all()
     )
     states = {state.server_id: state for state in FarmLogSyncState.query.all()}
+    collector_metrics = farm_log_collector_metrics()
     servers = Server.query.order_by(Server.name.asc()).all()
     return jsonify(
         {
@@ -1446,6 +1450,7 @@ def api_farm_log_sync_status():
                     ),
                     "pending_count": int(pending_counts.get(server.id, 0)),
                     "last_error": states[server.id].last_error if server.id in states else None,
+                    "collector": collector_metrics.get(server.id),
                 }
                 for server in servers
             ],
@@ -4257,6 +4262,7 @@ def settings_log():
     search_term = request.args.get("search")
     sort_dir = request.args.get("sort", "desc")
 
+    flush_audit_buffer()
     query = SettingsAuditLog.query.options(
         joinedload(SettingsAuditLog.user),
         joinedload(SettingsAuditLog.actor),
@@ -4308,6 +4314,7 @@ def settings_log():
 def settings_log_diff(log_id: int):
     admin_required()
 
+    flush_audit_buffer()
     log_entry = SettingsAuditLog.query.get_or_404(log_id)
     old_raw = log_entry.old_value
     new_raw = log_entry.new_value
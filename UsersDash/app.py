@@ -716,7 +716,11 @@ def _run_midnight_backup(app: Flask):
             with app.app_context():
                 db_path = sqlite_uri_to_path(app.config["SQLALCHEMY_DATABASE_URI"])
                 backup_dir = db_path.parent / "backups"
-                path = ensure_daily_backup(db_file=db_path, backup_dir=backup_dir)
+                path = ensure_daily_backup(
+                    db_file=db_path,
+                    backup_dir=backup_dir,
+                    incremental=bool(app.config.get("DB_BACKUP_INCREMENTAL")),
+                )
                 if path is None:
                     print(f"[backup] Daily-бэкап уже есть, причина проверки: {reason}")
                 else:
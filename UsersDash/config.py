@@ -85,9 +85,21 @@ class Config:
     TELEGRAM_REMINDER_DAYS = _get_int_env("TELEGRAM_REMINDER_DAYS", 3)
     TELEGRAM_REMINDER_HOUR = _get_int_env("TELEGRAM_REMINDER_HOUR", 10)
 
+    # Ежедневный бэкап: 1 — постраничные инкременты (data/backups/incremental) вместо полной копии
+    DB_BACKUP_INCREMENTAL = _get_int_env("DB_BACKUP_INCREMENTAL", 0)
+
+    # Аудит настроек: 1 — запись фоновым writer-ом пачками из ограниченной очереди
+    AUDIT_BUFFER_ENABLED = _get_int_env("AUDIT_BUFFER_ENABLED", 0)
+    AUDIT_QUEUE_MAXSIZE = _get_int_env("AUDIT_QUEUE_MAXSIZE", 10000)
+
     # Централизованные логи ферм
     FARM_LOG_SYNC_INTERVAL_SECONDS = _get_int_env("FARM_LOG_SYNC_INTERVAL_SECONDS", 60)
+    FARM_LOG_COLLECTOR_WORKERS = _get_int_env("FARM_LOG_COLLECTOR_WORKERS", 8)
+    FARM_LOG_MAX_BACKOFF_SECONDS = _get_int_env("FARM_LOG_MAX_BACKOFF_SECONDS", 900)
     FARM_LOG_RETENTION_DAYS = _get_int_env("FARM_LOG_RETENTION_DAYS", 90)
+    FARM_LOG_RETENTION_BATCH_SIZE = _get_int_env("FARM_LOG_RETENTION_BATCH_SIZE", 2000)
+    FARM_LOG_RETENTION_PAUSE_MS = _get_int_env("FARM_LOG_RETENTION_PAUSE_MS", 50)
+    FARM_LOG_RETENTION_MAX_SECONDS = _get_int_env("FARM_LOG_RETENTION_MAX_SECONDS", 30)
     FARM_LOG_PAGE_SIZE = _get_int_env("FARM_LOG_PAGE_SIZE", 200)
 
 
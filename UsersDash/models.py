@@ -237,6 +237,20 @@ class FarmLogSyncState(db.Model):
     server = db.relationship("Server")
 
 
+class FarmLogRetentionState(db.Model):
+    """Прогресс порционной retention-очистки логов ферм для продолжения после обрыва."""
+
+    __tablename__ = "farm_log_retention_state"
+
+    id = db.Column(db.Integer, primary_key=True)
+    cutoff = db.Column(db.DateTime, nullable=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    deleted_total = db.Column(db.Integer, nullable=False, default=0)
+    batches_total = db.Column(db.Integer, nullable=False, default=0)
+
+
 class FarmLogPendingEvent(db.Model):
     """Событие RSS, для которого пока не найден локальный Account."""
 
@@ -3,22 +3,31 @@
 
 - log_settings_action: нормализует и сохраняет событие в БД
 - settings_audit_context: контекстный менеджер для безопасной записи
+- при AUDIT_BUFFER_ENABLED события пишет фоновый writer пачками из ограниченной очереди
+- пороги алертов считаются по скользящим окнам в памяти, без COUNT на каждое событие
 """
 
 from __future__ import annotations
 
+import atexit
 import json
+import queue
+import threading
+from collections import deque
 from contextlib import contextmanager
 from datetime import datetime, timedelta
 from typing import Any, Iterable, Mapping
 
-from flask import current_app, request
+from flask import Flask, current_app, request
+from sqlalchemy import insert
 
 from UsersDash.models import Account, SettingsAuditLog, User, db
 
 
 SENSITIVE_KEYS = {"password", "token", "secret", "api_key", "access_token"}
-AUDIT_BUFFER: list[SettingsAuditLog] = []
+_WRITER_EXTENSION_KEY = "usersdash_audit_writer"
+_ALERTS_EXTENSION_KEY = "usersdash_audit_alerts"
+_EXTENSIONS_GUARD = threading.Lock()
 
 
 def _mask_value(value: Any, force_mask: bool = False) -> Any:
@@ -75,17 +84,152 @@ def _buffer_enabled() -> bool:
     return bool(current_app and current_app.config.get("AUDIT_BUFFER_ENABLED"))
 
 
-def _flush_buffer_if_needed(force: bool = False):
-    threshold = current_app.config.get("AUDIT_BUFFER_THRESHOLD", 20) if current_app else 20
-    if not force and len(AUDIT_BUFFER) < threshold:
-        return
+class _AuditWriter:
+    """Фоновый писатель аудита: забирает события из ограниченной очереди и вставляет пачками."""
+
+    def __init__(self, app: Flask, maxsize: int, batch_size: int, flush_interval: float):
+        self.app = app
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.05, flush_interval)
+        self.queue: queue.Queue[dict[str, Any]] = queue.Queue(maxsize=max(1, maxsize))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            daemon=True,
+            name="usersdash-audit-writer",
+        )
+        self._thread.start()
+
+    def submit(self, row: dict[str, Any], timeout: float = 0.5) -> bool:
+        """Ставит событие в очередь; False, если очередь переполнена дольше timeout."""
+
+        if self._stop.is_set():
+            return False
+        try:
+            self.queue.put(row, timeout=timeout)
+        except queue.Full:
+            return False
+        return True
+
+    def flush(self) -> None:
+        """Блокирует, пока все поставленные события не будут записаны."""
+
+        if self._thread.is_alive():
+            self.queue.join()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self.queue.empty()):
+            try:
+                batch = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with self.app.app_context():
+                    try:
+                        db.session.execute(insert(SettingsAuditLog), batch)
+                        db.session.commit()
+                    except Exception as exc:
+                        db.session.rollback()
+                        self.app.logger.error("[audit] batch insert failed (%s rows): %s", len(batch), exc)
+                    finally:
+                        db.session.remove()
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+
+def _get_writer() -> _AuditWriter:
+    app = current_app._get_current_object()
+    with _EXTENSIONS_GUARD:
+        writer = app.extensions.get(_WRITER_EXTENSION_KEY)
+        if writer is None:
+            writer = _AuditWriter(
+                app,
+                maxsize=int(app.config.get("AUDIT_QUEUE_MAXSIZE", 10000)),
+                batch_size=int(app.config.get("AUDIT_BUFFER_THRESHOLD", 20)),
+                flush_interval=float(app.config.get("AUDIT_FLUSH_INTERVAL_SECONDS", 1.0)),
+            )
+            app.extensions[_WRITER_EXTENSION_KEY] = writer
+            # Flush при остановке процесса: daemon-поток иначе потерял бы хвост очереди.
+            atexit.register(writer.stop)
+    return writer
 
-    if not AUDIT_BUFFER:
-        return
 
-    db.session.bulk_save_objects(list(AUDIT_BUFFER))
-    AUDIT_BUFFER.clear()
-    db.session.commit()
+def _flush_buffer_if_needed(force: bool = False):
+    if not current_app:
+        return
+    writer = current_app.extensions.get(_WRITER_EXTENSION_KEY)
+    if writer is not None and (force or writer.queue.qsize() >= writer.batch_size):
+        writer.flush()
+
+
+class _AlertWindows:
+    """Скользящие окна алертов: по пользователю (все события) и по (пользователь, критичное поле)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.windows: dict[tuple[int, str | None], deque[datetime]] = {}
+        self.seeded_users: set[int] = set()
+
+    def _seed(self, user_id: int, window_start: datetime, critical_fields: set[str]) -> None:
+        """Однократно подтягивает события пользователя из БД, чтобы окно пережило рестарт."""
+
+        rows = (
+            db.session.query(SettingsAuditLog.created_at, SettingsAuditLog.field_name)
+            .filter(
+                SettingsAuditLog.user_id == user_id,
+                SettingsAuditLog.created_at >= window_start,
+            )
+            .order_by(SettingsAuditLog.created_at.asc())
+            .all()
+        )
+        for created_at, field_name in rows:
+            self.windows.setdefault((user_id, None), deque()).append(created_at)
+            if field_name and field_name.lower() in critical_fields:
+                self.windows.setdefault((user_id, field_name), deque()).append(created_at)
+        self.seeded_users.add(user_id)
+
+    def register(
+        self,
+        user_id: int,
+        field_name: str | None,
+        event_time: datetime,
+        window_start: datetime,
+        critical_fields: set[str],
+    ) -> int:
+        """Добавляет событие и возвращает число событий в окне (как прежний COUNT)."""
+
+        is_critical = bool(field_name and field_name.lower() in critical_fields)
+        with self.lock:
+            if user_id not in self.seeded_users:
+                self._seed(user_id, window_start, critical_fields)
+            self.windows.setdefault((user_id, None), deque()).append(event_time)
+            if is_critical:
+                self.windows.setdefault((user_id, field_name), deque()).append(event_time)
+
+            window = self.windows[(user_id, field_name if is_critical else None)]
+            while window and window[0] < window_start:
+                window.popleft()
+            return len(window)
+
+
+def _get_alert_windows() -> _AlertWindows:
+    app = current_app._get_current_object()
+    with _EXTENSIONS_GUARD:
+        windows = app.extensions.get(_ALERTS_EXTENSION_KEY)
+        if windows is None:
+            windows = _AlertWindows()
+            app.extensions[_ALERTS_EXTENSION_KEY] = windows
+    return windows
 
 
 def _maybe_trigger_alert(user_id: int | None, field_name: str | None, action_type: str, event_time: datetime):
@@ -94,21 +238,21 @@ def _maybe_trigger_alert(user_id: int | None, field_name: str | None, action_typ
 
     window_minutes = current_app.config.get("AUDIT_ALERT_WINDOW_MINUTES", 10)
     threshold = current_app.config.get("AUDIT_ALERT_THRESHOLD", 20)
-    critical_fields = set(current_app.config.get("AUDIT_CRITICAL_FIELDS", ["password", "api_token", "token"]))
+    critical_fields = {
+        f.lower() for f in current_app.config.get("AUDIT_CRITICAL_FIELDS", ["password", "api_token", "token"])
+    }
 
     if not user_id:
         return
 
-    window_start = event_time - timedelta(minutes=window_minutes)
-    q = SettingsAuditLog.query.filter(
-        SettingsAuditLog.user_id == user_id,
-        SettingsAuditLog.created_at >= window_start,
+    recent_count = _get_alert_windows().register(
+        user_id,
+        field_name,
+        event_time,
+        event_time - timedelta(minutes=window_minutes),
+        critical_fields,
     )
 
-    if field_name and field_name.lower() in {f.lower() for f in critical_fields}:
-        q = q.filter(SettingsAuditLog.field_name == field_name)
-
-    recent_count = q.count()
     if recent_count >= threshold:
         current_app.logger.warning(
             "[audit] threshold exceeded: user=%s field=%s action=%s count=%s",
@@ -129,27 +273,36 @@ def log_settings_action(
     account: Account | None = ctx.get("account")
     account_id = ctx.get("account_id") or (account.id if account else None)
 
-    log_entry = SettingsAuditLog(
-        user_id=user.id if user else None,
-        actor_id=actor.id if actor else None,
-        account_id=account_id,
-        action_type=action,
-        field_name=ctx.get("field") or ctx.get("field_name"),
-        old_value=_serialize(ctx.get("old_value")),
-        new_value=_serialize(ctx.get("new_value")),
-        extra_json=_serialize({k: v for k, v in ctx.items() if k not in {"field", "field_name", "old_value", "new_value", "account", "account_id"}}),
-        ip_address=ctx.get("ip") or _get_ip_from_request(),
-        user_agent=ctx.get("user_agent") or _get_user_agent(),
-    )
+    event_time = datetime.utcnow()
+    row = {
+        "created_at": event_time,
+        "user_id": user.id if user else None,
+        "actor_id": actor.id if actor else None,
+        "account_id": account_id,
+        "action_type": action,
+        "field_name": ctx.get("field") or ctx.get("field_name"),
+        "old_value": _serialize(ctx.get("old_value")),
+        "new_value": _serialize(ctx.get("new_value")),
+        "extra_json": _serialize({k: v for k, v in ctx.items() if k not in {"field", "field_name", "old_value", "new_value", "account", "account_id"}}),
+        "ip_address": ctx.get("ip") or _get_ip_from_request(),
+        "user_agent": ctx.get("user_agent") or _get_user_agent(),
+    }
+    log_entry = SettingsAuditLog(**row)
+
+    # Окно считается до записи: текущее событие добавляется в память, а не читается из БД.
+    _maybe_trigger_alert(row["user_id"], row["field_name"], action, event_time)
 
     if _buffer_enabled():
-        AUDIT_BUFFER.append(log_entry)
-        _flush_buffer_if_needed()
+        # Запрос не ждёт записи: событие уходит в очередь writer-а.
+        # При переполненной очереди пишем синхронно, чтобы не терять аудит.
+        if not _get_writer().submit(row):
+            current_app.logger.warning("[audit] queue is full, writing synchronously")
+            db.session.execute(insert(SettingsAuditLog), [row])
+            db.session.commit()
     else:
         db.session.add(log_entry)
         db.session.commit()
 
-    _maybe_trigger_alert(log_entry.user_id, log_entry.field_name, action, log_entry.created_at)
     return log_entry
 
 
@@ -168,4 +321,6 @@ def settings_audit_context(
 
 
 def flush_audit_buffer():
+    """Дожидается записи всех событий из очереди (перед чтением журнала и в тестах)."""
+
     _flush_buffer_if_needed(force=True)
@@ -3,10 +3,14 @@
 """
 from __future__ import annotations
 
+import hashlib
+import json
 import os
 import sqlite3
+import struct
 import time
 from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import date, datetime
 from pathlib import Path
 from typing import Iterator, Optional
@@ -16,6 +20,15 @@ from UsersDash.config import Config
 DB_FILE = Path(Config.DATA_DIR) / "app.db"
 BACKUP_DIR = Path(Config.DATA_DIR) / "backups"
 LOCK_FILE = BACKUP_DIR / ".daily_backup.lock"
+INCREMENTAL_DIRNAME = "incremental"
+
+# Шаг backup API: копируем по BACKUP_STEP_PAGES страниц и отдаём SQLite паузу между шагами,
+# чтобы писатели (веб-запросы, сборщик логов) не ждали окончания полного копирования.
+BACKUP_STEP_PAGES = 1024
+BACKUP_STEP_SLEEP = 0.005
+
+_PAGES_MAGIC = b"USERSDASH-PAGES\x01"
+_PAGE_DIGEST_SIZE = 16
 
 
 def sqlite_uri_to_path(uri: str) -> Path:
@@ -80,14 +93,57 @@ def ensure_backup_dir() -> Path:
     return BACKUP_DIR
 
 
-def _sqlite_backup(src: Path, dest: Path) -> None:
-    """Создаёт консистентный снимок SQLite через backup API вместо прямого copy2."""
+class _BackupRestarted(Exception):
+    """Пошаговое копирование слишком часто перезапускается из-за чужих записей."""
+
+
+def _restart_guard(max_restarts: int):
+    """progress-callback backup API: считает перезапуски (рост remaining) и прерывает копию."""
+
+    state = {"remaining": None, "restarts": 0}
+
+    def progress(_status: int, remaining: int, _total: int) -> None:
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > max_restarts:
+                raise _BackupRestarted()
+        state["remaining"] = remaining
+
+    return progress
+
+
+def _sqlite_backup(
+    src: Path,
+    dest: Path,
+    *,
+    step_pages: int = BACKUP_STEP_PAGES,
+    step_sleep: float = BACKUP_STEP_SLEEP,
+    max_restarts: int = 3,
+) -> None:
+    """Создаёт консистентный снимок SQLite через backup API вместо прямого copy2.
+
+    В WAL-режиме источник держит read-транзакцию, поэтому шаги копируют один снимок и не
+    мешают писателям. В rollback-journal каждая чужая запись перезапускает копирование;
+    если это случилось больше `max_restarts` раз, снимок доделывается одним шагом.
+    """
 
     source = sqlite3.connect(f"file:{src}?mode=ro", uri=True)
     try:
+        journal_mode = str(source.execute("PRAGMA journal_mode").fetchone()[0]).lower()
+        if journal_mode == "wal":
+            source.execute("BEGIN")
+            source.execute("SELECT count(*) FROM sqlite_master").fetchone()
         target = sqlite3.connect(dest)
         try:
-            source.backup(target)
+            try:
+                source.backup(
+                    target,
+                    pages=step_pages,
+                    sleep=step_sleep,
+                    progress=_restart_guard(max_restarts),
+                )
+            except _BackupRestarted:
+                source.backup(target)
         finally:
             target.close()
     finally:
@@ -139,15 +195,33 @@ def daily_backup_exists(day: date | None = None, backup_dir: Path | None = None)
     )
 
 
+def incremental_backup_exists(day: date | None = None, backup_dir: Path | None = None) -> bool:
+    """Проверяет, есть ли база или delta инкрементальной цепочки за указанную дату."""
+
+    stamp = (day or date.today()).strftime("%Y%m%d")
+    return any(
+        path.stem.split("__")[-1].removeprefix("base_").startswith(stamp)
+        for path in list_incremental_backups(backup_dir)
+    )
+
+
 def ensure_daily_backup(
     day: date | None = None,
     db_file: Path | None = None,
     backup_dir: Path | None = None,
+    incremental: bool = False,
 ) -> Path | None:
-    """Создаёт daily-бэкап один раз в день и возвращает путь или None, если он уже есть."""
+    """Создаёт daily-бэкап один раз в день и возвращает путь или None, если он уже есть.
+
+    При `incremental=True` вместо полной копии пишется точка инкрементальной цепочки.
+    """
 
     target_dir = backup_dir or BACKUP_DIR
     with _backup_lock(target_dir / LOCK_FILE.name):
+        if incremental:
+            if incremental_backup_exists(day, target_dir):
+                return None
+            return backup_database_incremental(db_file=db_file, backup_dir=target_dir).path
         if daily_backup_exists(day, target_dir):
             return None
         return backup_database("daily", db_file=db_file, backup_dir=target_dir)
@@ -164,3 +238,294 @@ def list_backups(limit: int = 10) -> list[Path]:
         reverse=True,
     )
     return backups[:limit]
+
+
+@dataclass(slots=True)
+class IncrementalBackupResult:
+    """Итог одного инкрементального прогона."""
+
+    path: Path
+    kind: str
+    page_count: int
+    changed_pages: int
+    bytes_written: int
+    duration_seconds: float
+
+
+def _incremental_dir(backup_dir: Path | None = None) -> Path:
+    return (backup_dir or BACKUP_DIR) / INCREMENTAL_DIRNAME
+
+
+def _backup_stamp() -> str:
+    return datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+
+
+def _read_page_size(db_path: Path) -> int:
+    """Читает размер страницы из заголовка SQLite-файла (значение 1 означает 65536)."""
+
+    with open(db_path, "rb") as handle:
+        header = handle.read(100)
+    if len(header) < 100 or not header.startswith(b"SQLite format 3\0"):
+        raise ValueError(f"Файл не похож на SQLite-БД: {db_path}")
+    page_size = struct.unpack(">H", header[16:18])[0]
+    return 65536 if page_size == 1 else page_size
+
+
+def _iter_pages(db_path: Path, page_size: int) -> Iterator[bytes]:
+    with open(db_path, "rb") as handle:
+        while True:
+            page = handle.read(page_size)
+            if not page:
+                return
+            yield page
+
+
+def _copy_file(src: Path, dest: Path, chunk_size: int = 1024 * 1024) -> None:
+    with open(src, "rb") as source, open(dest, "wb") as target:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            target.write(chunk)
+
+
+def _page_digest(page: bytes) -> bytes:
+    return hashlib.blake2b(page, digest_size=_PAGE_DIGEST_SIZE).digest()
+
+
+def _write_pages_file(path: Path, header: dict, pages: list[tuple[int, bytes]]) -> int:
+    """Атомарно пишет delta: magic, JSON-заголовок и записи (номер страницы, байты)."""
+
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as handle:
+        handle.write(_PAGES_MAGIC)
+        handle.write(struct.pack(">I", len(header_bytes)))
+        handle.write(header_bytes)
+        for page_no, page in pages:
+            handle.write(struct.pack(">I", page_no))
+            handle.write(page)
+    os.replace(tmp_path, path)
+    return path.stat().st_size
+
+
+def _read_pages_file(path: Path) -> tuple[dict, Iterator[tuple[int, bytes]]]:
+    handle = open(path, "rb")
+    if handle.read(len(_PAGES_MAGIC)) != _PAGES_MAGIC:
+        handle.close()
+        raise ValueError(f"Неизвестный формат инкрементального бэкапа: {path}")
+    (header_len,) = struct.unpack(">I", handle.read(4))
+    header = json.loads(handle.read(header_len).decode("utf-8"))
+    page_size = int(header["page_size"])
+
+    def records() -> Iterator[tuple[int, bytes]]:
+        try:
+            while True:
+                raw_no = handle.read(4)
+                if not raw_no:
+                    return
+                (page_no,) = struct.unpack(">I", raw_no)
+                yield page_no, handle.read(page_size)
+        finally:
+            handle.close()
+
+    return header, records()
+
+
+def _latest_base(inc_dir: Path) -> Path | None:
+    bases = sorted(inc_dir.glob("base_*.db")) if inc_dir.exists() else []
+    return bases[-1] if bases else None
+
+
+def _deltas_for_base(inc_dir: Path, base: Path) -> list[Path]:
+    stamp = base.stem.removeprefix("base_")
+    return sorted(inc_dir.glob(f"delta_{stamp}__*.pages"))
+
+
+def _promote_base(
+    inc_dir: Path,
+    snapshot: Path,
+    *,
+    digests: bytearray,
+    keep_chains: int,
+) -> Path:
+    """Делает снимок новой базой цепочки и удаляет самые старые цепочки сверх keep_chains."""
+
+    stamp = _backup_stamp()
+    base = inc_dir / f"base_{stamp}.db"
+    os.replace(snapshot, base)
+    (inc_dir / f"base_{stamp}.hashes").write_bytes(bytes(digests))
+
+    bases = sorted(inc_dir.glob("base_*.db"))
+    for old_base in bases[: max(0, len(bases) - max(1, keep_chains))]:
+        for delta in _deltas_for_base(inc_dir, old_base):
+            delta.unlink(missing_ok=True)
+        old_base.with_suffix(".hashes").unlink(missing_ok=True)
+        old_base.unlink(missing_ok=True)
+    return base
+
+
+def backup_database_incremental(
+    db_file: Path | None = None,
+    backup_dir: Path | None = None,
+    *,
+    max_delta_ratio: float = 0.5,
+    max_deltas: int = 30,
+    keep_chains: int = 2,
+    step_pages: int = BACKUP_STEP_PAGES,
+    step_sleep: float = BACKUP_STEP_SLEEP,
+) -> IncrementalBackupResult:
+    """
+    Делает постраничный инкрементальный бэкап в data/backups/incremental.
+
+    Снимок снимается throttled backup API во временный файл, затем его страницы
+    сравниваются по blake2b-хешам с последней базой, и в `delta_<base>__<stamp>.pages`
+    сохраняются только изменившиеся страницы. Если delta превысила `max_delta_ratio`
+    от базы или цепочка длиннее `max_deltas`, снимок становится новой базой (compaction).
+
+    :raises FileNotFoundError: если исходный файл БД не найден.
+    """
+    source_db = db_file or DB_FILE
+    if not source_db.exists():
+        raise FileNotFoundError(f"DB file not found: {source_db}")
+
+    started = time.perf_counter()
+    inc_dir = _incremental_dir(backup_dir)
+    inc_dir.mkdir(parents=True, exist_ok=True)
+    snapshot = inc_dir / ".snapshot.db"
+    snapshot.unlink(missing_ok=True)
+
+    try:
+        _sqlite_backup(source_db, snapshot, step_pages=step_pages, step_sleep=step_sleep)
+        page_size = _read_page_size(snapshot)
+        base = _latest_base(inc_dir)
+        base_digests = base.with_suffix(".hashes").read_bytes() if base else b""
+        if base and _read_page_size(base) != page_size:
+            base, base_digests = None, b""
+
+        digests = bytearray()
+        changed: list[tuple[int, bytes]] = []
+        full_hash = hashlib.sha256()
+        for page_no, page in enumerate(_iter_pages(snapshot, page_size)):
+            digest = _page_digest(page)
+            digests += digest
+            full_hash.update(page)
+            offset = page_no * _PAGE_DIGEST_SIZE
+            if base_digests[offset : offset + _PAGE_DIGEST_SIZE] != digest:
+                changed.append((page_no, page))
+        page_count = len(digests) // _PAGE_DIGEST_SIZE
+
+        needs_new_base = (
+            base is None
+            or len(changed) > page_count * max_delta_ratio
+            or len(_deltas_for_base(inc_dir, base)) >= max_deltas
+        )
+        if needs_new_base:
+            new_base = _promote_base(
+                inc_dir,
+                snapshot,
+                digests=digests,
+                keep_chains=keep_chains,
+            )
+            return IncrementalBackupResult(
+                path=new_base,
+                kind="base",
+                page_count=page_count,
+                changed_pages=page_count,
+                bytes_written=new_base.stat().st_size + len(digests),
+                duration_seconds=time.perf_counter() - started,
+            )
+
+        base_stamp = base.stem.removeprefix("base_")
+        delta = inc_dir / f"delta_{base_stamp}__{_backup_stamp()}.pages"
+        header = {
+            "base": base.name,
+            "page_size": page_size,
+            "page_count": page_count,
+            "sha256": full_hash.hexdigest(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        written = _write_pages_file(delta, header, changed)
+        return IncrementalBackupResult(
+            path=delta,
+            kind="delta",
+            page_count=page_count,
+            changed_pages=len(changed),
+            bytes_written=written,
+            duration_seconds=time.perf_counter() - started,
+        )
+    finally:
+        snapshot.unlink(missing_ok=True)
+
+
+def list_incremental_backups(backup_dir: Path | None = None) -> list[Path]:
+    """Возвращает базы и delta всех цепочек в хронологическом порядке."""
+
+    inc_dir = _incremental_dir(backup_dir)
+    if not inc_dir.exists():
+        return []
+    return sorted(
+        [*inc_dir.glob("base_*.db"), *inc_dir.glob("delta_*.pages")],
+        key=lambda path: path.stem.split("__")[-1].removeprefix("base_"),
+    )
+
+
+def restore_incremental_backup(
+    dest: Path,
+    delta_path: Path | None = None,
+    backup_dir: Path | None = None,
+) -> Path:
+    """
+    Собирает точную копию БД из базы и delta (по умолчанию — последней точки цепочки).
+
+    :raises FileNotFoundError: если инкрементальных бэкапов нет.
+    :raises ValueError: если собранный файл не совпал с sha256 исходного снимка.
+    """
+    inc_dir = _incremental_dir(backup_dir)
+    if delta_path is None:
+        base = _latest_base(inc_dir)
+        if base is None:
+            raise FileNotFoundError(f"Нет инкрементальных бэкапов в {inc_dir}")
+        deltas = _deltas_for_base(inc_dir, base)
+        delta_path = deltas[-1] if deltas else None
+    else:
+        base = None
+
+    tmp_dest = dest.with_name(dest.name + ".restoring")
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if delta_path is None:
+        _copy_file(base, tmp_dest)
+        os.replace(tmp_dest, dest)
+        return dest
+
+    header, records = _read_pages_file(delta_path)
+    base = inc_dir / header["base"]
+    page_size = int(header["page_size"])
+    _copy_file(base, tmp_dest)
+    with open(tmp_dest, "r+b") as handle:
+        for page_no, page in records:
+            handle.seek(page_no * page_size)
+            handle.write(page)
+        handle.truncate(int(header["page_count"]) * page_size)
+
+    restored_hash = hashlib.sha256()
+    for page in _iter_pages(tmp_dest, page_size):
+        restored_hash.update(page)
+    if restored_hash.hexdigest() != header["sha256"]:
+        tmp_dest.unlink(missing_ok=True)
+        raise ValueError(f"Восстановленная копия не совпала с исходным снимком: {delta_path}")
+    os.replace(tmp_dest, dest)
+    return dest
+
+
+def compact_incremental_backups(backup_dir: Path | None = None, keep_chains: int = 1) -> Path:
+    """Сворачивает базу и последнюю delta в новую базу без обращения к рабочей БД."""
+
+    inc_dir = _incremental_dir(backup_dir)
+    snapshot = inc_dir / ".snapshot.db"
+    restore_incremental_backup(snapshot, backup_dir=backup_dir)
+    page_size = _read_page_size(snapshot)
+    digests = bytearray()
+    for page in _iter_pages(snapshot, page_size):
+        digests += _page_digest(page)
+    return _promote_base(inc_dir, snapshot, digests=digests, keep_chains=keep_chains)
@@ -5,9 +5,12 @@ from __future__ import annotations
 import hashlib
 import json
 import threading
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import date, datetime, timedelta, timezone
-from typing import Iterable
+from typing import Any, Iterable
 
 from flask import Flask
 
@@ -15,8 +18,9 @@ from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from UsersDash.models import Account, FarmLogPendingEvent, FarmLogSyncState, Server, db
 from UsersDash.services.farm_logs import (
+    FARM_LOG_WRITE_LOCK,
     _parse_event_time,
-    delete_expired_logs,
+    purge_expired_logs,
     save_log_items,
 )
 from UsersDash.services.remote_api import fetch_server_logs_v2
@@ -29,6 +33,24 @@ _REQUESTED_SERVER_IDS: set[int] = set()
 _SERVER_LOCKS: dict[int, threading.Lock] = {}
 _SERVER_LOCKS_GUARD = threading.Lock()
 _LAST_CLEANUP_DATE: date | None = None
+_RETENTION_RUNNING = threading.Event()
+_SCHEDULER_TICK_SECONDS = 1.0
+
+
+@dataclass
+class _ServerRuntime:
+    """In-memory расписание и метрики сбора одного сервера."""
+
+    next_due_at: float = 0.0
+    in_flight_since: float | None = None
+    consecutive_failures: int = 0
+    last_success_at: float | None = None
+    last_finished_at: float | None = None
+    last_duration: float | None = None
+    last_error: str = ""
+
+
+_SERVER_RUNTIME: dict[int, _ServerRuntime] = {}
 
 
 def _utcnow() -> datetime:
@@ -45,9 +67,10 @@ def _server_lock(server_id: int) -> threading.Lock:
 def _sync_state(server_id: int) -> FarmLogSyncState:
     state = db.session.get(FarmLogSyncState, server_id)
     if state is None:
-        state = FarmLogSyncState(server_id=server_id, cursor=0, status="idle")
-        db.session.add(state)
-        db.session.commit()
+        with FARM_LOG_WRITE_LOCK:
+            state = FarmLogSyncState(server_id=server_id, cursor=0, status="idle")
+            db.session.add(state)
+            db.session.commit()
     return state
 
 
@@ -123,8 +146,9 @@ def _save_pending_events(server_id: int, items: list[dict]) -> None:
             "last_seen_at": statement.excluded.last_seen_at,
         },
     )
-    db.session.execute(statement)
-    db.session.commit()
+    with FARM_LOG_WRITE_LOCK:
+        db.session.execute(statement)
+        db.session.commit()
 
 
 def _replay_pending_events(
@@ -155,10 +179,11 @@ def _replay_pending_events(
 
     added = save_log_items(mapped_items)
     if resolved_ids:
-        FarmLogPendingEvent.query.filter(FarmLogPendingEvent.id.in_(resolved_ids)).delete(
-            synchronize_session=False
-        )
-        db.session.commit()
+        with FARM_LOG_WRITE_LOCK:
+            FarmLogPendingEvent.query.filter(FarmLogPendingEvent.id.in_(resolved_ids)).delete(
+                synchronize_session=False
+            )
+            db.session.commit()
     return added, len(resolved_ids)
 
 
@@ -171,10 +196,11 @@ def collect_server_logs(server_id: int) -> dict[str, int | str]:
             return {"added": 0, "skipped": 0, "error": "server not found"}
 
         state = _sync_state(server_id)
-        state.status = "running"
-        state.last_started_at = _utcnow()
-        state.last_error = None
-        db.session.commit()
+        with FARM_LOG_WRITE_LOCK:
+            state.status = "running"
+            state.last_started_at = _utcnow()
+            state.last_error = None
+            db.session.commit()
 
         cursor = int(state.cursor or 0)
         total_added = 0
@@ -203,8 +229,9 @@ def collect_server_logs(server_id: int) -> dict[str, int | str]:
                     if cursor == 0:
                         raise RuntimeError("RSS-сервер повторно запросил сброс нулевого cursor")
                     cursor = 0
-                    state.cursor = 0
-                    db.session.commit()
+                    with FARM_LOG_WRITE_LOCK:
+                        state.cursor = 0
+                        db.session.commit()
                     first_page = False
                     continue
 
@@ -235,11 +262,12 @@ def collect_server_logs(server_id: int) -> dict[str, int | str]:
                     raise RuntimeError(f"RSS-сервер не продвинул cursor {cursor}")
 
                 cursor = next_cursor
-                db.session.refresh(state)
-                state.cursor = max(int(state.cursor or 0), cursor)
-                cursor = int(state.cursor)
-                state.last_event_at = last_event_at
-                db.session.commit()
+                with FARM_LOG_WRITE_LOCK:
+                    db.session.refresh(state)
+                    state.cursor = max(int(state.cursor or 0), cursor)
+                    cursor = int(state.cursor)
+                    state.last_event_at = last_event_at
+                    db.session.commit()
                 page_count += 1
 
                 if not payload.get("has_more"):
@@ -247,21 +275,23 @@ def collect_server_logs(server_id: int) -> dict[str, int | str]:
                 if page_count >= 100:
                     raise RuntimeError("Превышен лимит 100 cursor-страниц за один сбор")
 
-            state.status = "warning" if total_skipped else "success"
-            state.last_success_at = _utcnow()
-            state.last_error = (
-                f"Не сопоставлено событий: {total_skipped}" if total_skipped else None
-            )
-            state.collected_total = int(state.collected_total or 0) + total_added
-            state.skipped_total = int(state.skipped_total or 0) + total_skipped
-            db.session.commit()
+            with FARM_LOG_WRITE_LOCK:
+                state.status = "warning" if total_skipped else "success"
+                state.last_success_at = _utcnow()
+                state.last_error = (
+                    f"Не сопоставлено событий: {total_skipped}" if total_skipped else None
+                )
+                state.collected_total = int(state.collected_total or 0) + total_added
+                state.skipped_total = int(state.skipped_total or 0) + total_skipped
+                db.session.commit()
             return {"added": total_added, "skipped": total_skipped, "error": ""}
         except Exception as exc:
             db.session.rollback()
             state = _sync_state(server_id)
-            state.status = "error"
-            state.last_error = str(exc)
-            db.session.commit()
+            with FARM_LOG_WRITE_LOCK:
+                state.status = "error"
+                state.last_error = str(exc)
+                db.session.commit()
             return {"added": total_added, "skipped": total_skipped, "error": str(exc)}
 
 
@@ -276,41 +306,176 @@ def _active_server_ids() -> list[int]:
     return [row.id for row in Server.query.filter(Server.is_active.is_(True)).all()]
 
 
-def _run_retention_if_due(retention_days: int) -> None:
+def _run_retention_if_due(
+    retention_days: int,
+    *,
+    batch_size: int = 2000,
+    pause_seconds: float = 0.05,
+    max_seconds: float | None = None,
+) -> None:
     global _LAST_CLEANUP_DATE
 
     today = datetime.now(timezone.utc).date()
     if _LAST_CLEANUP_DATE == today:
         return
     pending_cutoff = _utcnow() - timedelta(days=max(1, retention_days))
-    FarmLogPendingEvent.query.filter(
-        FarmLogPendingEvent.first_seen_at < pending_cutoff
-    ).delete(synchronize_session=False)
-    db.session.commit()
-    delete_expired_logs(retention_days)
-    _LAST_CLEANUP_DATE = today
+    with FARM_LOG_WRITE_LOCK:
+        FarmLogPendingEvent.query.filter(
+            FarmLogPendingEvent.first_seen_at < pending_cutoff
+        ).delete(synchronize_session=False)
+        db.session.commit()
+    result = purge_expired_logs(
+        retention_days,
+        batch_size=batch_size,
+        pause_seconds=pause_seconds,
+        max_seconds=max_seconds,
+    )
+    if result["deleted"]:
+        print(
+            "[farm-logs] Retention: удалено {deleted} (всего за прогон {deleted_total}), "
+            "{rows_per_second} строк/с, максимальная блокировка {max_lock_ms} мс".format(**result)
+        )
+    # Незавершённый прогон продолжится в следующем цикле, а не завтра.
+    if result["completed"]:
+        _LAST_CLEANUP_DATE = today
+
+
+def _retention_job(app: Flask, retention_days: int, options: dict[str, Any]) -> None:
+    with app.app_context():
+        try:
+            _run_retention_if_due(retention_days, **options)
+        except Exception as exc:
+            db.session.rollback()
+            print(f"[farm-logs] Ошибка retention-очистки: {exc}")
+            traceback.print_exc()
+        finally:
+            db.session.remove()
+            _RETENTION_RUNNING.clear()
+
+
+def _collect_server_job(app: Flask, server_id: int, interval: float, max_backoff: float) -> None:
+    """Выполняет сбор одного сервера в пуле и планирует его следующий запуск."""
+
+    started = time.monotonic()
+    error = ""
+    with app.app_context():
+        try:
+            error = str(collect_server_logs(server_id).get("error") or "")
+        except Exception as exc:
+            db.session.rollback()
+            error = str(exc)
+            traceback.print_exc()
+        finally:
+            db.session.remove()
+    if error:
+        print(f"[farm-logs] Сервер {server_id}: {error}")
+
+    finished = time.monotonic()
+    with _COLLECTOR_QUEUE_LOCK:
+        runtime = _SERVER_RUNTIME.setdefault(server_id, _ServerRuntime())
+        runtime.in_flight_since = None
+        runtime.last_finished_at = finished
+        runtime.last_duration = finished - started
+        runtime.last_error = error
+        if error:
+            runtime.consecutive_failures += 1
+            delay = min(max_backoff, interval * 2 ** (runtime.consecutive_failures - 1))
+        else:
+            runtime.consecutive_failures = 0
+            runtime.last_success_at = finished
+            delay = interval
+        runtime.next_due_at = finished + delay
+
+
+def _dispatch_due_servers(
+    app: Flask,
+    executor: ThreadPoolExecutor,
+    server_ids: Iterable[int],
+    *,
+    interval: float,
+    max_backoff: float,
+) -> list[int]:
+    """Ставит в пул серверы, чей срок подошёл; у каждого не больше одного сбора в полёте."""
+
+    now = time.monotonic()
+    requested_ids = _consume_requested_server_ids()
+    dispatched: list[int] = []
+    with _COLLECTOR_QUEUE_LOCK:
+        for server_id in sorted(set(server_ids) | requested_ids):
+            runtime = _SERVER_RUNTIME.setdefault(server_id, _ServerRuntime())
+            if runtime.in_flight_since is not None:
+                if server_id in requested_ids:
+                    # Ручной запрос не теряется: повторим сразу после текущего сбора.
+                    _REQUESTED_SERVER_IDS.add(server_id)
+                continue
+            if server_id not in requested_ids and now < runtime.next_due_at:
+                continue
+            runtime.in_flight_since = now
+            dispatched.append(server_id)
+    for server_id in dispatched:
+        executor.submit(_collect_server_job, app, server_id, interval, max_backoff)
+    return dispatched
+
+
+def farm_log_collector_metrics() -> dict[int, dict[str, Any]]:
+    """Возвращает per-server lag и состояние планировщика для мониторинга."""
+
+    now = time.monotonic()
+    with _COLLECTOR_QUEUE_LOCK:
+        return {
+            server_id: {
+                "in_flight": runtime.in_flight_since is not None,
+                "in_flight_seconds": (
+                    round(now - runtime.in_flight_since, 1)
+                    if runtime.in_flight_since is not None
+                    else None
+                ),
+                "lag_seconds": (
+                    round(now - runtime.last_success_at, 1)
+                    if runtime.last_success_at is not None
+                    else None
+                ),
+                "consecutive_failures": runtime.consecutive_failures,
+                "next_attempt_in": round(max(0.0, runtime.next_due_at - now), 1),
+                "last_duration": (
+                    round(runtime.last_duration, 3) if runtime.last_duration is not None else None
+                ),
+                "last_error": runtime.last_error,
+            }
+            for server_id, runtime in _SERVER_RUNTIME.items()
+        }
 
 
 def _collector_worker(app: Flask) -> None:
     interval = max(15, int(app.config.get("FARM_LOG_SYNC_INTERVAL_SECONDS", 60)))
+    max_backoff = max(interval, int(app.config.get("FARM_LOG_MAX_BACKOFF_SECONDS", 900)))
+    workers = max(1, int(app.config.get("FARM_LOG_COLLECTOR_WORKERS", 8)))
     retention_days = max(1, int(app.config.get("FARM_LOG_RETENTION_DAYS", 90)))
-    first_run = True
+    retention_options = {
+        "batch_size": max(1, int(app.config.get("FARM_LOG_RETENTION_BATCH_SIZE", 2000))),
+        "pause_seconds": max(0, int(app.config.get("FARM_LOG_RETENTION_PAUSE_MS", 50))) / 1000,
+        "max_seconds": max(1, int(app.config.get("FARM_LOG_RETENTION_MAX_SECONDS", 30))),
+    }
+    # +1 поток под retention, чтобы очистка не занимала слот сбора.
+    executor = ThreadPoolExecutor(
+        max_workers=workers + 1,
+        thread_name_prefix="usersdash-farm-log",
+    )
 
     while True:
-        if not first_run:
-            _COLLECTOR_EVENT.wait(timeout=interval)
-        first_run = False
-        _COLLECTOR_EVENT.clear()
-
         with app.app_context():
             try:
-                requested_ids = _consume_requested_server_ids()
-                server_ids: Iterable[int] = requested_ids or _active_server_ids()
-                for server_id in server_ids:
-                    result = collect_server_logs(int(server_id))
-                    if result.get("error"):
-                        print(f"[farm-logs] Сервер {server_id}: {result['error']}")
-                _run_retention_if_due(retention_days)
+                _dispatch_due_servers(
+                    app,
+                    executor,
+                    _active_server_ids(),
+                    interval=interval,
+                    max_backoff=max_backoff,
+                )
+                retention_due = _LAST_CLEANUP_DATE != datetime.now(timezone.utc).date()
+                if retention_due and not _RETENTION_RUNNING.is_set():
+                    _RETENTION_RUNNING.set()
+                    executor.submit(_retention_job, app, retention_days, retention_options)
             except Exception as exc:
                 db.session.rollback()
                 print(f"[farm-logs] Ошибка фонового цикла: {exc}")
@@ -318,9 +483,12 @@ def _collector_worker(app: Flask) -> None:
             finally:
                 db.session.remove()
 
+        _COLLECTOR_EVENT.wait(timeout=_SCHEDULER_TICK_SECONDS)
+        _COLLECTOR_EVENT.clear()
+
 
 def start_farm_log_collector(app: Flask) -> threading.Thread:
-    """Идемпотентно запускает периодический daemon-поток сбора."""
+    """Идемпотентно запускает daemon-планировщик, раздающий сборы в пул по серверам."""
 
     global _COLLECTOR_THREAD
     with _COLLECTOR_QUEUE_LOCK:
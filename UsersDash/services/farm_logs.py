@@ -3,14 +3,26 @@
 from __future__ import annotations
 
 import hashlib
+import threading
+import time
 from datetime import date, datetime, timedelta, timezone
 from typing import Any, Iterable
 
-from sqlalchemy import and_, or_
+from sqlalchemy import Integer, and_, column, or_, select, text
 from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import joinedload
 
-from UsersDash.models import Account, FarmLogEntry, Server, db
+from UsersDash.models import Account, FarmLogEntry, FarmLogRetentionState, Server, db
+from UsersDash.services.farm_logs_migration import FTS_TABLE
+
+
+# Единственный писатель farm_log_*: параллельные сборщики серверов и retention
+# по очереди берут этот lock на время своих коротких записывающих транзакций,
+# поэтому SQLite не ловит конкурирующих writer'ов и `database is locked`.
+FARM_LOG_WRITE_LOCK = threading.RLock()
+
+# Пачка multi-row INSERT: ~20 колонок * 500 строк укладывается в лимит переменных SQLite.
+_INSERT_CHUNK_SIZE = 500
 
 
 def _utcnow() -> datetime:
@@ -189,6 +201,11 @@ def save_log_items(mapped_items: Iterable[tuple[Account, dict[str, Any]]]) -> in
     if not prepared_rows:
         return 0
 
+    with FARM_LOG_WRITE_LOCK:
+        return _save_prepared_rows(prepared_rows)
+
+
+def _save_prepared_rows(prepared_rows: list[tuple[dict[str, Any], str]]) -> int:
     # Старая версия хранила время без даты и не имела source_id. При первом v2-сборе
     # обогащаем такую строку на месте, а не создаём рядом дубль.
     by_legacy_hash: dict[str, list[int]] = {}
@@ -258,7 +275,7 @@ def save_log_items(mapped_items: Iterable[tuple[Account, dict[str, Any]]]) -> in
         db.session.commit()
         return upgraded_count
 
-    dialect_name = db.session.bind.dialect.name if db.session.bind else ""
+    dialect_name = db.session.get_bind().dialect.name
     if dialect_name != "sqlite":
         # Проект штатно использует SQLite. Для другого backend сохраняем корректность,
         # а не SQLite-специфичный upsert.
@@ -272,11 +289,18 @@ def save_log_items(mapped_items: Iterable[tuple[Account, dict[str, Any]]]) -> in
         db.session.commit()
         return upgraded_count + added
 
-    statement = sqlite_insert(FarmLogEntry).values(rows).on_conflict_do_nothing()
     try:
-        result = db.session.execute(statement)
+        added = 0
+        for start in range(0, len(rows), _INSERT_CHUNK_SIZE):
+            statement = (
+                sqlite_insert(FarmLogEntry)
+                .values(rows[start : start + _INSERT_CHUNK_SIZE])
+                .on_conflict_do_nothing()
+            )
+            result = db.session.execute(statement)
+            added += max(0, int(result.rowcount or 0))
         db.session.commit()
-        return upgraded_count + max(0, int(result.rowcount or 0))
+        return upgraded_count + added
     except Exception:
         db.session.rollback()
         raise
@@ -297,6 +321,47 @@ def save_account_logs(account: Account, payload: dict[str, Any]) -> int:
     return save_log_items(normalized_items)
 
 
+def _fts_search_available() -> bool:
+    """Проверяет, что FTS5-индекс логов создан миграцией в текущей БД."""
+
+    if db.session.get_bind().dialect.name != "sqlite":
+        return False
+    row = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"),
+        {"name": FTS_TABLE},
+    ).first()
+    return row is not None
+
+
+def _build_fts_query(search: str) -> str | None:
+    """Готовит phrase-запрос для trigram-индекса; короче 3 символов индекс не поможет."""
+
+    normalized = search.strip()
+    if len(normalized) < 3:
+        return None
+    return '"' + normalized.replace('"', '""') + '"'
+
+
+def _search_filter(search: str):
+    """Возвращает условие поиска: через FTS5 по rowid, иначе прежний ILIKE-скан."""
+
+    fts_query = _build_fts_query(search)
+    if fts_query and _fts_search_available():
+        matched_ids = (
+            text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :fts_query")
+            .bindparams(fts_query=fts_query)
+            .columns(column("rowid", Integer))
+        )
+        return FarmLogEntry.id.in_(matched_ids)
+
+    pattern = f"%{search.strip()}%"
+    return or_(
+        FarmLogEntry.event_text.ilike(pattern),
+        FarmLogEntry.raw_text.ilike(pattern),
+        FarmLogEntry.remote_acc_id.ilike(pattern),
+    )
+
+
 def query_logs_page(
     *,
     account_id: int | None,
@@ -326,15 +391,8 @@ def query_logs_page(
         query = query.filter(FarmLogEntry.level == level)
     if event_code:
         query = query.filter(FarmLogEntry.event_code == event_code)
-    if search:
-        pattern = f"%{search.strip()}%"
-        query = query.filter(
-            or_(
-                FarmLogEntry.event_text.ilike(pattern),
-                FarmLogEntry.raw_text.ilike(pattern),
-                FarmLogEntry.remote_acc_id.ilike(pattern),
-            )
-        )
+    if search and search.strip():
+        query = query.filter(_search_filter(search))
     if before_id:
         anchor = db.session.get(FarmLogEntry, before_id)
         if anchor and anchor.event_time:
@@ -474,17 +532,113 @@ def build_account_logs_payload(
     }
 
 
-def delete_expired_logs(retention_days: int) -> int:
-    """Удаляет события старше retention, включая legacy-строки без event_time."""
+def _retention_state() -> FarmLogRetentionState:
+    state = db.session.get(FarmLogRetentionState, 1)
+    if state is None:
+        state = FarmLogRetentionState(id=1)
+        db.session.add(state)
+        db.session.flush()
+    return state
+
+
+def purge_expired_logs(
+    retention_days: int,
+    *,
+    batch_size: int = 2000,
+    pause_seconds: float = 0.05,
+    max_seconds: float | None = None,
+) -> dict[str, Any]:
+    """Порционно удаляет события старше retention короткими транзакциями.
+
+    Каждая пачка выбирается по индексу event_time (legacy-строки без него — по
+    collected_at), удаляется и фиксируется вместе с прогрессом в
+    FarmLogRetentionState, после чего write-lock отпускается на `pause_seconds`,
+    чтобы сборщик и веб-запросы успевали писать. При исчерпании `max_seconds`
+    прогон прерывается с `completed=False`; следующий вызов продолжит тот же прогон.
+    """
 
     safe_days = max(1, int(retention_days or 90))
+    safe_batch = max(1, int(batch_size or 2000))
     cutoff = _utcnow() - timedelta(days=safe_days)
-    query = FarmLogEntry.query.filter(
-        or_(
-            FarmLogEntry.event_time < cutoff,
+
+    with FARM_LOG_WRITE_LOCK:
+        state = _retention_state()
+        if state.started_at is None or state.finished_at is not None:
+            state.started_at = _utcnow()
+            state.finished_at = None
+            state.deleted_total = 0
+            state.batches_total = 0
+        state.cutoff = cutoff
+        db.session.commit()
+
+    run_started = time.monotonic()
+    deleted = 0
+    batches = 0
+    max_lock_ms = 0.0
+    completed = True
+    expired_scopes = (
+        (FarmLogEntry.event_time < cutoff, FarmLogEntry.event_time),
+        (
             and_(FarmLogEntry.event_time.is_(None), FarmLogEntry.collected_at < cutoff),
-        )
+            FarmLogEntry.collected_at,
+        ),
     )
-    deleted = query.delete(synchronize_session=False)
-    db.session.commit()
-    return int(deleted or 0)
+    for condition, order_column in expired_scopes:
+        while True:
+            batch_ids = (
+                select(FarmLogEntry.id)
+                .where(condition)
+                .order_by(order_column)
+                .limit(safe_batch)
+            )
+            with FARM_LOG_WRITE_LOCK:
+                batch_started = time.perf_counter()
+                removed = int(
+                    FarmLogEntry.query.filter(FarmLogEntry.id.in_(batch_ids)).delete(
+                        synchronize_session=False
+                    )
+                    or 0
+                )
+                state = _retention_state()
+                state.deleted_total = int(state.deleted_total or 0) + removed
+                state.batches_total = int(state.batches_total or 0) + 1
+                state.updated_at = _utcnow()
+                db.session.commit()
+                lock_ms = (time.perf_counter() - batch_started) * 1000
+
+            deleted += removed
+            batches += 1
+            max_lock_ms = max(max_lock_ms, lock_ms)
+            if removed < safe_batch:
+                break
+            if max_seconds is not None and time.monotonic() - run_started >= max_seconds:
+                completed = False
+                break
+            if pause_seconds > 0:
+                time.sleep(pause_seconds)
+        if not completed:
+            break
+
+    state = _retention_state()
+    deleted_total = int(state.deleted_total or 0)
+    if completed:
+        with FARM_LOG_WRITE_LOCK:
+            state.finished_at = _utcnow()
+            db.session.commit()
+
+    elapsed = time.monotonic() - run_started
+    return {
+        "deleted": deleted,
+        "deleted_total": deleted_total,
+        "batches": batches,
+        "completed": completed,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(deleted / elapsed, 1) if elapsed > 0 else 0.0,
+        "max_lock_ms": round(max_lock_ms, 2),
+    }
+
+
+def delete_expired_logs(retention_days: int) -> int:
+    """Удаляет события старше retention, включая legacy-строки без event_time."""
+
+    return int(purge_expired_logs(retention_days)["deleted"])
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
 
 from UsersDash.models import db
 
@@ -30,6 +31,31 @@ _INDEXES: tuple[str, ...] = (
     "ON farm_log_entries (server_id, source_cursor)",
 )
 
+FTS_TABLE = "farm_log_entries_fts"
+
+# External-content FTS5: текст хранится только в farm_log_entries, индекс держат триггеры.
+# Trigram-токенизатор сохраняет семантику прежнего ILIKE `%q%` (поиск подстроки).
+_FTS_CREATE = (
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    "event_text, raw_text, remote_acc_id, "
+    "content='farm_log_entries', content_rowid='id', tokenize='trigram')"
+)
+
+_FTS_TRIGGERS: tuple[str, ...] = (
+    "CREATE TRIGGER IF NOT EXISTS farm_log_entries_fts_ai AFTER INSERT ON farm_log_entries "
+    f"BEGIN INSERT INTO {FTS_TABLE}(rowid, event_text, raw_text, remote_acc_id) "
+    "VALUES (new.id, new.event_text, new.raw_text, new.remote_acc_id); END",
+    "CREATE TRIGGER IF NOT EXISTS farm_log_entries_fts_ad AFTER DELETE ON farm_log_entries "
+    f"BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, event_text, raw_text, remote_acc_id) "
+    "VALUES ('delete', old.id, old.event_text, old.raw_text, old.remote_acc_id); END",
+    "CREATE TRIGGER IF NOT EXISTS farm_log_entries_fts_au "
+    "AFTER UPDATE OF event_text, raw_text, remote_acc_id ON farm_log_entries "
+    f"BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, event_text, raw_text, remote_acc_id) "
+    "VALUES ('delete', old.id, old.event_text, old.raw_text, old.remote_acc_id); "
+    f"INSERT INTO {FTS_TABLE}(rowid, event_text, raw_text, remote_acc_id) "
+    "VALUES (new.id, new.event_text, new.raw_text, new.remote_acc_id); END",
+)
+
 
 def ensure_farm_logs_schema() -> None:
     """Добавляет новые колонки и индексы без удаления старых записей."""
@@ -59,3 +85,34 @@ def ensure_farm_logs_schema() -> None:
         connection.execute(
             text("UPDATE farm_log_entries SET parser_version=1 WHERE parser_version IS NULL")
         )
+
+    ensure_farm_logs_fts()
+
+
+def ensure_farm_logs_fts() -> bool:
+    """Создаёт FTS5-индекс поиска логов и однократно заполняет его существующими строками.
+
+    Возвращает False, если backend не SQLite или сборка SQLite без FTS5/trigram —
+    тогда поиск продолжает работать через ILIKE.
+    """
+
+    engine = db.engine
+    if engine.dialect.name != "sqlite":
+        return False
+
+    with engine.begin() as connection:
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"),
+            {"name": FTS_TABLE},
+        ).first()
+        if exists is None:
+            try:
+                connection.execute(text(_FTS_CREATE))
+            except OperationalError as exc:
+                print(f"[farm-logs] FTS5 недоступен, поиск останется на ILIKE: {exc}")
+                return False
+            # Backfill: rebuild перечитывает content-таблицу целиком один раз.
+            connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        for statement in _FTS_TRIGGERS:
+            connection.execute(text(statement))
+    return True
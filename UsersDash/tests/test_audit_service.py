@@ -5,7 +5,7 @@ from tempfile import TemporaryDirectory
 from UsersDash import app as app_module
 from UsersDash.config import Config
 from UsersDash.models import Account, SettingsAuditLog, User, db
-from UsersDash.services.audit import log_settings_action
+from UsersDash.services.audit import flush_audit_buffer, log_settings_action
 
 
 class AuditServiceTestCase(unittest.TestCase):
@@ -28,6 +28,9 @@ class AuditServiceTestCase(unittest.TestCase):
         db.session.commit()
 
     def tearDown(self):
+        writer = self.app.extensions.get("usersdash_audit_writer")
+        if writer is not None:
+            writer.stop()
         db.session.remove()
         self.ctx.pop()
         self.tmp.cleanup()
@@ -52,6 +55,48 @@ class AuditServiceTestCase(unittest.TestCase):
         self.assertIn("keep", entry.old_value)
         self.assertIn("ok", entry.new_value)
 
+    def test_buffered_writer_persists_after_flush(self):
+        self.app.config.update(AUDIT_BUFFER_ENABLED=1, AUDIT_BUFFER_THRESHOLD=7)
+
+        for index in range(25):
+            log_settings_action(
+                self.user,
+                self.admin,
+                "config_update",
+                {"account": self.account, "field": f"field:{index}", "new_value": index},
+            )
+        flush_audit_buffer()
+        db.session.expire_all()
+
+        entries = SettingsAuditLog.query.order_by(SettingsAuditLog.id).all()
+        self.assertEqual(len(entries), 25)
+        self.assertEqual(entries[0].field_name, "field:0")
+        self.assertEqual(entries[-1].account_id, self.account.id)
+        self.assertIsNotNone(entries[-1].created_at)
+
+    def test_alert_threshold_counts_existing_rows_and_critical_fields(self):
+        self.app.config.update(AUDIT_ALERT_THRESHOLD=5, AUDIT_ALERT_WINDOW_MINUTES=10)
+        for index in range(3):
+            db.session.add(
+                SettingsAuditLog(user_id=self.user.id, action_type="config_update", field_name=f"old:{index}")
+            )
+        db.session.commit()
+
+        with self.assertNoLogs(self.app.logger, level="WARNING"):
+            log_settings_action(self.user, self.admin, "config_update", {"field": "a"})
+        with self.assertLogs(self.app.logger, level="WARNING") as captured:
+            log_settings_action(self.user, self.admin, "config_update", {"field": "b"})
+        self.assertIn("count=5", captured.output[0])
+
+        # Критичное поле считается отдельно, только по своим событиям.
+        with self.assertNoLogs(self.app.logger, level="WARNING"):
+            for _ in range(4):
+                log_settings_action(self.user, self.admin, "config_update", {"field": "Password"})
+        with self.assertLogs(self.app.logger, level="WARNING") as captured:
+            log_settings_action(self.user, self.admin, "config_update", {"field": "Password"})
+        self.assertIn("field=Password", captured.output[0])
+        self.assertIn("count=5", captured.output[0])
+
 
 if __name__ == "__main__":
     unittest.main()
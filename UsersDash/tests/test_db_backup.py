@@ -39,6 +39,55 @@ class DbBackupTests(unittest.TestCase):
             rows = conn.execute("SELECT name FROM sample").fetchall()
         self.assertEqual(rows, [("ok",)])
 
+    def _write_rows(self, start: int, count: int) -> None:
+        with sqlite3.connect(self.db_file) as conn:
+            conn.executemany(
+                "INSERT INTO sample (name) VALUES (?)",
+                [(f"row-{index}-" + "x" * 200,) for index in range(start, start + count)],
+            )
+
+    def test_incremental_restore_is_byte_identical_to_full_copy(self):
+        self._write_rows(0, 5000)
+        base = db_backup.backup_database_incremental()
+        self.assertEqual(base.kind, "base")
+
+        self._write_rows(5000, 50)
+        first_delta = db_backup.backup_database_incremental()
+        first_full = db_backup.backup_database("check_first")
+        self._write_rows(5050, 50)
+        second_delta = db_backup.backup_database_incremental()
+        second_full = db_backup.backup_database("check_second")
+
+        self.assertEqual(first_delta.kind, "delta")
+        self.assertEqual(second_delta.kind, "delta")
+        self.assertLess(second_delta.changed_pages, second_delta.page_count / 10)
+        self.assertLess(second_delta.bytes_written, second_full.stat().st_size / 10)
+
+        latest = db_backup.restore_incremental_backup(self.root / "restored_latest.db")
+        earlier = db_backup.restore_incremental_backup(
+            self.root / "restored_first.db", delta_path=first_delta.path
+        )
+        self.assertEqual(latest.read_bytes(), second_full.read_bytes())
+        self.assertEqual(earlier.read_bytes(), first_full.read_bytes())
+
+    def test_large_change_and_manual_compaction_start_new_base(self):
+        self._write_rows(0, 1000)
+        db_backup.backup_database_incremental(max_delta_ratio=0.5)
+        self._write_rows(1000, 5000)
+        promoted = db_backup.backup_database_incremental(max_delta_ratio=0.5)
+        self.assertEqual(promoted.kind, "base")
+
+        self._write_rows(6000, 10)
+        db_backup.backup_database_incremental()
+        expected = db_backup.backup_database("check")
+        compacted = db_backup.compact_incremental_backups()
+
+        chain = db_backup.list_incremental_backups()
+        self.assertEqual(chain, [compacted])
+        self.assertEqual(compacted.read_bytes(), expected.read_bytes())
+        restored = db_backup.restore_incremental_backup(self.root / "restored.db")
+        self.assertEqual(restored.read_bytes(), expected.read_bytes())
+
     def test_ensure_daily_backup_runs_only_once_per_day(self):
         first = db_backup.ensure_daily_backup(date.today())
         second = db_backup.ensure_daily_backup(date.today())
@@ -48,6 +97,14 @@ class DbBackupTests(unittest.TestCase):
         daily_backups = sorted(self.backup_dir.glob("app_*_daily.db"))
         self.assertEqual(len(daily_backups), 1)
 
+    def test_ensure_daily_incremental_backup_runs_only_once_per_day(self):
+        first = db_backup.ensure_daily_backup(date.today(), incremental=True)
+        second = db_backup.ensure_daily_backup(date.today(), incremental=True)
+
+        self.assertIsNotNone(first)
+        self.assertIsNone(second)
+        self.assertEqual(list(self.backup_dir.glob("app_*_daily.db")), [])
+
 
 if __name__ == "__main__":
     unittest.main()
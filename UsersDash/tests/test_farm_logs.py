@@ -1,4 +1,11 @@
+import json
+import sqlite3
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from tempfile import TemporaryDirectory
 from types import SimpleNamespace
@@ -12,20 +19,25 @@ from UsersDash.models import (
     Account,
     FarmLogEntry,
     FarmLogPendingEvent,
+    FarmLogRetentionState,
     FarmLogSyncState,
     Server,
     User,
     db,
 )
+from UsersDash.services import farm_log_collector
 from UsersDash.services.farm_log_collector import (
     _build_account_index,
+    _dispatch_due_servers,
     _resolve_account,
     collect_server_logs,
+    farm_log_collector_metrics,
 )
 from UsersDash.services.farm_logs import (
     _build_legacy_event_hash,
     _parse_event_timestamp,
     build_account_logs_payload,
+    purge_expired_logs,
     query_farm_log_filter_accounts,
     query_farm_log_filter_servers,
     query_logs_page,
@@ -253,6 +265,61 @@ class FarmLogsTestCase(unittest.TestCase):
         self.assertEqual(payload["summary"]["total"], 3)
         self.assertTrue(payload["items"][-1]["event_at"].endswith("+03:00"))
 
+    def test_fts_search_backfills_existing_rows_and_keeps_keyset(self):
+        old_event = self._event("fts-old", "2026-07-19T12:00:01+03:00", 1)
+        old_event["event_text"] = "Сбор ресурсов: Gold mine"
+        self.assertEqual(save_log_items([(self.account, old_event)]), 1)
+
+        ensure_farm_logs_schema()
+        fts_rows = db.session.execute(text("SELECT count(*) FROM farm_log_entries_fts")).scalar()
+        self.assertEqual(fts_rows, 1)
+
+        new_events = []
+        for index in range(2, 5):
+            event = self._event(f"fts-new-{index}", f"2026-07-19T12:00:0{index}+03:00", index)
+            event["event_text"] = f"Сбор ресурсов: gold mine #{index}"
+            new_events.append(event)
+        other = self._event("fts-other", "2026-07-19T12:00:09+03:00", 9)
+        other["event_text"] = "Отряд вернулся"
+        new_events.append(other)
+        self.assertEqual(save_log_items([(self.account, event) for event in new_events]), 4)
+
+        first_page, next_cursor = query_logs_page(
+            account_id=None,
+            server_id=self.server.id,
+            day=None,
+            search="GOLD MINE",
+            limit=3,
+        )
+        self.assertEqual(
+            [row.source_id for row in first_page],
+            ["fts-new-4", "fts-new-3", "fts-new-2"],
+        )
+        second_page, final_cursor = query_logs_page(
+            account_id=None,
+            server_id=self.server.id,
+            day=None,
+            search="GOLD MINE",
+            before_id=next_cursor,
+            limit=3,
+        )
+        self.assertEqual([row.source_id for row in second_page], ["fts-old"])
+        self.assertIsNone(final_cursor)
+
+        short_rows, _ = query_logs_page(
+            account_id=None, server_id=None, day=None, search="#3", limit=10
+        )
+        self.assertEqual([row.source_id for row in short_rows], ["fts-new-3"])
+
+        FarmLogEntry.query.filter(FarmLogEntry.source_id == "fts-old").delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+        remaining, _ = query_logs_page(
+            account_id=None, server_id=None, day=None, search="gold mine", limit=10
+        )
+        self.assertEqual(len(remaining), 3)
+
     @patch("UsersDash.services.farm_log_collector.fetch_server_logs_v2")
     def test_collector_advances_checkpoint_and_is_idempotent(self, fetch_mock):
         event = self._event("stream-source-7", "2026-07-19T13:00:00+03:00", 7)
@@ -325,6 +392,240 @@ class FarmLogsTestCase(unittest.TestCase):
         self.assertEqual(FarmLogEntry.query.one().remote_acc_id, "new-remote-id")
 
 
+class FarmLogsRetentionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.db_path = Path(self.tmp.name) / "farm-logs-retention.db"
+        self.app = Flask(__name__)
+        self.app.config.update(
+            TESTING=True,
+            SQLALCHEMY_DATABASE_URI=f"sqlite:///{self.db_path}",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        )
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        owner = User(username="retention-owner", password_hash="x", role="client")
+        server = Server(name="RSS-retention", host="127.0.0.1", is_active=True)
+        db.session.add_all([owner, server])
+        db.session.flush()
+        account = Account(name="Retention farm", owner_id=owner.id, server_id=server.id)
+        db.session.add(account)
+        db.session.commit()
+        self.account_id = account.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.ctx.pop()
+        self.tmp.cleanup()
+
+    def _insert_rows(self, connection, prefix: str, count: int, event_time: datetime | None):
+        collected_at = event_time or datetime.utcnow() - timedelta(days=400)
+        connection.executemany(
+            "INSERT INTO farm_log_entries (account_id, event_time, event_text, event_hash, "
+            "collected_at, level, parser_version) VALUES (?, ?, 'x', ?, ?, 'info', 1)",
+            [
+                (self.account_id, event_time, f"{prefix}-{index}", collected_at)
+                for index in range(count)
+            ],
+        )
+        connection.commit()
+
+    def test_interrupted_purge_resumes_and_keeps_fresh_rows(self):
+        expired_at = datetime.utcnow() - timedelta(days=200)
+        with sqlite3.connect(self.db_path) as connection:
+            self._insert_rows(connection, "expired", 250, expired_at)
+            self._insert_rows(connection, "legacy", 30, None)
+            self._insert_rows(connection, "fresh", 20, datetime.utcnow())
+
+        first = purge_expired_logs(90, batch_size=100, pause_seconds=0, max_seconds=0)
+        self.assertFalse(first["completed"])
+        self.assertEqual(first["deleted"], 100)
+        self.assertIsNone(db.session.get(FarmLogRetentionState, 1).finished_at)
+
+        second = purge_expired_logs(90, batch_size=100, pause_seconds=0)
+        self.assertTrue(second["completed"])
+        self.assertEqual(second["deleted"], 180)
+        self.assertEqual(second["deleted_total"], 280)
+        self.assertEqual(FarmLogEntry.query.count(), 20)
+        self.assertIsNotNone(db.session.get(FarmLogRetentionState, 1).finished_at)
+
+    def test_concurrent_inserts_progress_during_purge(self):
+        with sqlite3.connect(self.db_path) as connection:
+            self._insert_rows(
+                connection, "expired", 40_000, datetime.utcnow() - timedelta(days=200)
+            )
+
+        stop = threading.Event()
+        insert_latencies: list[float] = []
+
+        def writer():
+            connection = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                index = 0
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    self._insert_rows(connection, f"live-{index}", 1, datetime.utcnow())
+                    insert_latencies.append(time.perf_counter() - started)
+                    index += 1
+                    time.sleep(0.002)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            result = purge_expired_logs(90, batch_size=500, pause_seconds=0.005)
+        finally:
+            stop.set()
+            thread.join()
+
+        self.assertTrue(result["completed"])
+        self.assertEqual(result["deleted"], 40_000)
+        self.assertGreaterEqual(result["batches"], 80)
+        self.assertGreater(result["rows_per_second"], 0)
+        self.assertGreater(result["max_lock_ms"], 0)
+        self.assertGreaterEqual(len(insert_latencies), 10)
+        self.assertLess(max(insert_latencies), 5)
+        self.assertEqual(FarmLogEntry.query.count(), len(insert_latencies))
+
+
+def _start_fake_rss_server(acc_id: str, hang: threading.Event | None = None):
+    """Поднимает локальный RSSv7 с `/api/v2/logs`, отдающим по событию на запрос."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, payload: dict) -> None:
+            if hang is not None:
+                hang.wait(timeout=30)
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            self._reply({"ok": True})
+
+        def do_GET(self):
+            after_id = int(self.path.split("after_id=", 1)[1].split("&", 1)[0])
+            next_id = after_id + 1
+            self._reply(
+                {
+                    "ok": True,
+                    "items": [
+                        {
+                            "acc_id": acc_id,
+                            "source_id": f"{acc_id}-{next_id}",
+                            "source_cursor": next_id,
+                            "event_at": datetime.now().astimezone().isoformat(),
+                            "event_text": f"Событие {next_id}",
+                        }
+                    ],
+                    "next_cursor": next_id,
+                    "max_id": next_id,
+                    "has_more": False,
+                    "reset_required": False,
+                }
+            )
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class FarmLogCollectorPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config.update(
+            TESTING=True,
+            SQLALCHEMY_DATABASE_URI=f"sqlite:///{Path(self.tmp.name) / 'collector.db'}",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        )
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        farm_log_collector._SERVER_RUNTIME.clear()
+
+        self.release = threading.Event()
+        self.http_servers = []
+        owner = User(username="pool-owner", password_hash="x", role="client")
+        db.session.add(owner)
+        db.session.flush()
+        self.server_ids = []
+        for index in range(3):
+            acc_id = f"pool-acc-{index}"
+            fake = _start_fake_rss_server(acc_id, self.release if index == 0 else None)
+            self.http_servers.append(fake)
+            server = Server(
+                name=f"RSS-pool-{index}",
+                host="127.0.0.1",
+                api_base_url=f"http://127.0.0.1:{fake.server_address[1]}/api",
+                is_active=True,
+            )
+            db.session.add(server)
+            db.session.flush()
+            db.session.add(
+                Account(
+                    name=f"Pool farm {index}",
+                    internal_id=acc_id,
+                    owner_id=owner.id,
+                    server_id=server.id,
+                )
+            )
+            self.server_ids.append(server.id)
+        db.session.commit()
+        self.hung_server_id = self.server_ids[0]
+
+    def tearDown(self):
+        self.release.set()
+        for fake in self.http_servers:
+            fake.shutdown()
+            fake.server_close()
+        farm_log_collector._SERVER_RUNTIME.clear()
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.ctx.pop()
+        self.tmp.cleanup()
+
+    def test_hung_server_does_not_delay_other_servers(self):
+        freshness_sla = 1.0
+        executor = ThreadPoolExecutor(max_workers=3)
+        try:
+            deadline = time.monotonic() + 3
+            while time.monotonic() < deadline:
+                _dispatch_due_servers(
+                    self.app, executor, self.server_ids, interval=0.3, max_backoff=1
+                )
+                time.sleep(0.05)
+            metrics = farm_log_collector_metrics()
+        finally:
+            self.release.set()
+            executor.shutdown(wait=True)
+
+        self.assertTrue(metrics[self.hung_server_id]["in_flight"])
+        self.assertIsNone(metrics[self.hung_server_id]["lag_seconds"])
+        for server_id in self.server_ids[1:]:
+            self.assertEqual(metrics[server_id]["consecutive_failures"], 0)
+            self.assertLess(metrics[server_id]["lag_seconds"], freshness_sla)
+            collected = FarmLogEntry.query.filter(FarmLogEntry.server_id == server_id).count()
+            self.assertGreaterEqual(collected, 4)
+            self.assertEqual(
+                db.session.get(FarmLogSyncState, server_id).cursor,
+                collected,
+            )
+
+
 class FarmLogsMigrationTestCase(unittest.TestCase):
     def test_legacy_table_gets_v2_columns_and_indexes(self):
         app = Flask("farm-log-migration-test")
@@ -0,0 +1,113 @@
+"""Бенчмарк аудита настроек: синхронный commit + COUNT против фонового writer-а.
+
+Для каждого режима создаёт временную SQLite-БД, прогоняет N правок настроек
+(по умолчанию 10 000) через `log_settings_action` и печатает задержку вызова
+(median/p99), число SQL-запросов на событие и общее время до полной записи.
+
+Запуск: `python -m UsersDash.tools.bench_audit --events 10000`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from datetime import timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from flask import Flask
+from sqlalchemy import event
+
+from UsersDash.models import SettingsAuditLog, User, db
+from UsersDash.services import audit
+
+
+def _legacy_alert_count(user_id, field_name, action_type, event_time):
+    """Прежняя проверка порога: COUNT по окну на каждое событие."""
+
+    window_start = event_time - timedelta(minutes=10)
+    q = SettingsAuditLog.query.filter(
+        SettingsAuditLog.user_id == user_id,
+        SettingsAuditLog.created_at >= window_start,
+    )
+    if field_name and field_name.lower() in {"password", "api_token", "token"}:
+        q = q.filter(SettingsAuditLog.field_name == field_name)
+    q.count()
+
+
+def _run(mode: str, events: int) -> None:
+    with TemporaryDirectory() as tmp:
+        app = Flask(f"audit-bench-{mode}")
+        app.config.update(
+            SQLALCHEMY_DATABASE_URI=f"sqlite:///{Path(tmp) / 'bench.db'}",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            AUDIT_BUFFER_ENABLED=mode == "buffered",
+            AUDIT_ALERT_THRESHOLD=10**9,
+        )
+        db.init_app(app)
+        with app.test_request_context("/"):
+            db.create_all()
+            users = [User(username=f"bench-{i}", password_hash="x", role="client") for i in range(20)]
+            db.session.add_all(users)
+            db.session.commit()
+
+            statements = 0
+
+            def _count(*_args, **_kwargs):
+                nonlocal statements
+                statements += 1
+
+            event.listen(db.engine, "before_cursor_execute", _count)
+            latencies: list[float] = []
+            started = time.perf_counter()
+            legacy = patch.object(audit, "_maybe_trigger_alert", _legacy_alert_count)
+            if mode == "legacy":
+                legacy.start()
+            try:
+                for index in range(events):
+                    user = users[index % len(users)]
+                    field = "password" if index % 50 == 0 else f"step:{index % 7}"
+                    call_started = time.perf_counter()
+                    audit.log_settings_action(
+                        user,
+                        user,
+                        "config_update",
+                        {"field": field, "old_value": index - 1, "new_value": index},
+                    )
+                    latencies.append((time.perf_counter() - call_started) * 1000)
+                audit.flush_audit_buffer()
+            finally:
+                if mode == "legacy":
+                    legacy.stop()
+            total = time.perf_counter() - started
+            event.remove(db.engine, "before_cursor_execute", _count)
+
+            stored = db.session.query(SettingsAuditLog).count()
+            writer = app.extensions.get("usersdash_audit_writer")
+            if writer is not None:
+                writer.stop()
+            db.session.remove()
+            db.engine.dispose()
+
+    latencies.sort()
+    print(
+        f"{mode:>8}: записано {stored}/{events} за {total:.2f} с | вызов median "
+        f"{statistics.median(latencies):.3f} мс, p99 {latencies[int(len(latencies) * 0.99) - 1]:.3f} мс | "
+        f"SQL на событие {statements / events:.2f}"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=10_000)
+    args = parser.parse_args()
+
+    for mode in ("legacy", "buffered"):
+        _run(mode, args.events)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
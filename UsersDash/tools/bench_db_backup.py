@@ -0,0 +1,123 @@
+"""Бенчмарк бэкапов SQLite: полная копия против постраничного инкремента.
+
+Создаёт синтетическую БД заданного размера, снимает базу, меняет небольшую долю
+строк и сравнивает размер и время полной копии с delta-бэкапом. Параллельно
+писатель измеряет задержку коротких транзакций, чтобы видеть влияние throttling
+(с `--wal` шаги копируют один снимок и писатели не ждут).
+
+Запуск: `python -m UsersDash.tools.bench_db_backup --size-mb 500 --churn 0.01 [--wal]`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from UsersDash.services import db_backup
+
+_ROW_BYTES = 400
+
+
+def _fill(db_path: Path, size_mb: int, wal: bool) -> int:
+    rows = size_mb * 1024 * 1024 // _ROW_BYTES
+    with sqlite3.connect(db_path) as conn:
+        if wal:
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE payload (id INTEGER PRIMARY KEY, body BLOB)")
+        for start in range(0, rows, 50_000):
+            conn.executemany(
+                "INSERT INTO payload (body) VALUES (?)",
+                [(os.urandom(_ROW_BYTES),) for _ in range(min(50_000, rows - start))],
+            )
+            conn.commit()
+    return rows
+
+
+def _churn(db_path: Path, rows: int, share: float) -> None:
+    rnd = random.Random(7)
+    ids = [(os.urandom(_ROW_BYTES), rnd.randint(1, rows)) for _ in range(int(rows * share))]
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("UPDATE payload SET body = ? WHERE id = ?", ids)
+
+
+def _timed(label: str, db_path: Path, action):
+    stop = threading.Event()
+    latencies: list[float] = []
+
+    def writer() -> None:
+        conn = sqlite3.connect(db_path, timeout=60)
+        conn.execute("CREATE TABLE IF NOT EXISTS heartbeat (ts REAL)")
+        while not stop.is_set():
+            started = time.perf_counter()
+            conn.execute("INSERT INTO heartbeat (ts) VALUES (?)", (started,))
+            conn.commit()
+            latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.01)
+        conn.close()
+
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    started = time.perf_counter()
+    result = action()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    thread.join()
+    print(
+        f"{label:>28}: {elapsed:7.2f} с, max задержка писателя "
+        f"{max(latencies, default=0):7.1f} мс ({len(latencies)} транзакций)"
+    )
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=200)
+    parser.add_argument("--churn", type=float, default=0.01)
+    parser.add_argument("--wal", action="store_true", help="перевести БД в WAL-режим")
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        db_path = root / "app.db"
+        backup_dir = root / "backups"
+        rows = _fill(db_path, args.size_mb, args.wal)
+        _timed(
+            "базовый снимок",
+            db_path,
+            lambda: db_backup.backup_database_incremental(db_path, backup_dir),
+        )
+        _churn(db_path, rows, args.churn)
+
+        _timed(
+            "полная копия без throttling",
+            db_path,
+            lambda: db_backup._sqlite_backup(
+                db_path, root / "full_unthrottled.db", step_pages=-1, step_sleep=0
+            ),
+        )
+        full = _timed(
+            "полная копия",
+            db_path,
+            lambda: db_backup.backup_database("full", db_path, backup_dir),
+        )
+        delta = _timed(
+            "инкремент",
+            db_path,
+            lambda: db_backup.backup_database_incremental(db_path, backup_dir),
+        )
+        print(
+            f"Размер: полная копия {full.stat().st_size / 2**20:.1f} МБ, "
+            f"delta {delta.bytes_written / 2**20:.2f} МБ "
+            f"({delta.changed_pages} из {delta.page_count} страниц)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,143 @@
+"""Бенчмарк retention-очистки логов ферм: один большой DELETE против порционной.
+
+Для каждого режима создаёт временную SQLite-БД с просроченными событиями
+(по умолчанию 2 000 000), параллельно запускает писателя, имитирующего сборщик,
+и печатает скорость удаления, самую длинную блокировку и задержки вставок.
+
+Запуск: `python -m UsersDash.tools.bench_farm_log_retention --rows 2000000`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from flask import Flask
+from sqlalchemy import and_, or_
+
+from UsersDash.models import Account, FarmLogEntry, Server, User, db
+from UsersDash.services.farm_logs import purge_expired_logs
+
+_INSERT_SQL = (
+    "INSERT INTO farm_log_entries (account_id, event_time, event_text, event_hash, "
+    "collected_at, level, parser_version) VALUES (?, ?, 'bench', ?, ?, 'info', 1)"
+)
+
+
+def _prepare(db_path: Path, rows: int) -> int:
+    owner = User(username="bench", password_hash="x", role="client")
+    server = Server(name="RSS-bench", host="127.0.0.1", is_active=True)
+    db.session.add_all([owner, server])
+    db.session.flush()
+    account = Account(name="Bench", owner_id=owner.id, server_id=server.id)
+    db.session.add(account)
+    db.session.commit()
+    account_id = account.id
+    db.session.remove()
+
+    expired_at = datetime.utcnow() - timedelta(days=200)
+    with sqlite3.connect(db_path) as connection:
+        for start in range(0, rows, 50_000):
+            connection.executemany(
+                _INSERT_SQL,
+                [
+                    (account_id, expired_at + timedelta(seconds=index), f"old-{index}", expired_at)
+                    for index in range(start, min(rows, start + 50_000))
+                ],
+            )
+            connection.commit()
+    return account_id
+
+
+def _single_delete() -> dict:
+    cutoff = datetime.utcnow() - timedelta(days=90)
+    started = time.perf_counter()
+    deleted = FarmLogEntry.query.filter(
+        or_(
+            FarmLogEntry.event_time < cutoff,
+            and_(FarmLogEntry.event_time.is_(None), FarmLogEntry.collected_at < cutoff),
+        )
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    elapsed = time.perf_counter() - started
+    return {
+        "deleted": deleted,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(deleted / elapsed, 1),
+        "max_lock_ms": round(elapsed * 1000, 2),
+    }
+
+
+def _run(mode: str, rows: int, batch_size: int, pause_ms: int) -> None:
+    with TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        app = Flask(f"farm-log-retention-bench-{mode}")
+        app.config.update(
+            SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path}",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        )
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            account_id = _prepare(db_path, rows)
+
+            stop = threading.Event()
+            latencies: list[float] = []
+
+            def writer() -> None:
+                connection = sqlite3.connect(db_path, timeout=600)
+                index = 0
+                while not stop.is_set():
+                    now = datetime.utcnow()
+                    started = time.perf_counter()
+                    connection.execute(_INSERT_SQL, (account_id, now, f"live-{index}", now))
+                    connection.commit()
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    index += 1
+                    time.sleep(0.01)
+                connection.close()
+
+            thread = threading.Thread(target=writer, daemon=True)
+            thread.start()
+            if mode == "single":
+                result = _single_delete()
+            else:
+                result = purge_expired_logs(
+                    90, batch_size=batch_size, pause_seconds=pause_ms / 1000
+                )
+            stop.set()
+            thread.join()
+            db.session.remove()
+            db.engine.dispose()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0
+    print(
+        f"{mode:>8}: удалено {result['deleted']} за {result['elapsed_seconds']} с, "
+        f"{result['rows_per_second']} строк/с, max lock {result['max_lock_ms']} мс | "
+        f"вставок писателя {len(latencies)}, median "
+        f"{statistics.median(latencies) if latencies else 0:.1f} мс, p99 {p99:.1f} мс, "
+        f"max {max(latencies, default=0):.1f} мс"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--pause-ms", type=int, default=50)
+    args = parser.parse_args()
+
+    for mode in ("single", "chunked"):
+        _run(mode, args.rows, args.batch_size, args.pause_ms)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
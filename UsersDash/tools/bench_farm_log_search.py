@@ -0,0 +1,139 @@
+"""Бенчмарк поиска по логам ферм: прежний ILIKE-скан против FTS5-индекса.
+
+Создаёт временную SQLite-БД с синтетическими событиями (по умолчанию 1 000 000),
+затем замеряет `query_logs_page(search=...)` для редких и частых запросов.
+
+Запуск: `python -m UsersDash.tools.bench_farm_log_search --rows 1000000`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from flask import Flask
+
+from UsersDash.models import Account, Server, User, db
+from UsersDash.services import farm_logs
+from UsersDash.services.farm_logs_migration import ensure_farm_logs_schema
+
+_WORDS = (
+    "Отряд отправлен",
+    "Сбор ресурсов",
+    "Gold mine",
+    "Reached maximum of marches",
+    "Щит активирован",
+    "Помощь союзу",
+    "Обновление игры",
+    "Stone quarry",
+)
+
+_INSERT_SQL = (
+    "INSERT INTO farm_log_entries (account_id, server_id, owner_id, remote_acc_id, source_id, "
+    "event_time, event_date, event_text, raw_text, event_hash, collected_at, level, "
+    "parser_version) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'info', 2)"
+)
+
+
+def _fill(rows: int, account_id: int, server_id: int, owner_id: int) -> None:
+    """Вставляет синтетические события пачками через сырой sqlite3-курсор."""
+
+    rnd = random.Random(42)
+    base_time = datetime(2026, 7, 1)
+    raw = db.engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        batch: list[tuple] = []
+        for index in range(rows):
+            event_time = base_time + timedelta(seconds=index * 3)
+            text_value = f"{rnd.choice(_WORDS)} #{index} lvl{rnd.randint(1, 30)}"
+            if index % 100_000 == 0:
+                text_value += " needle-rare"
+            batch.append(
+                (
+                    account_id,
+                    server_id,
+                    owner_id,
+                    "acc-bench",
+                    f"bench-{index}",
+                    event_time.isoformat(sep=" "),
+                    event_time.date().isoformat(),
+                    text_value,
+                    f"[{event_time:%H:%M:%S}] {text_value}",
+                    f"{index:064x}",
+                    event_time.isoformat(sep=" "),
+                )
+            )
+            if len(batch) >= 20_000:
+                cursor.executemany(_INSERT_SQL, batch)
+                raw.commit()
+                batch.clear()
+        if batch:
+            cursor.executemany(_INSERT_SQL, batch)
+            raw.commit()
+    finally:
+        raw.close()
+
+
+def _measure(server_id: int, search: str, repeats: int) -> list[float]:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        farm_logs.query_logs_page(
+            account_id=None, server_id=server_id, day=None, search=search, limit=200
+        )
+        timings.append((time.perf_counter() - started) * 1000)
+        db.session.remove()
+    return timings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as tmp:
+        app = Flask("farm-log-search-bench")
+        app.config.update(
+            SQLALCHEMY_DATABASE_URI=f"sqlite:///{Path(tmp) / 'bench.db'}",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        )
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            ensure_farm_logs_schema()
+            owner = User(username="bench", password_hash="x", role="client")
+            server = Server(name="RSS-bench", host="127.0.0.1", is_active=True)
+            db.session.add_all([owner, server])
+            db.session.flush()
+            account = Account(name="Bench", owner_id=owner.id, server_id=server.id)
+            db.session.add(account)
+            db.session.commit()
+            ids = (account.id, server.id, owner.id)
+            db.session.remove()
+
+            started = time.perf_counter()
+            _fill(args.rows, *ids)
+            print(f"Вставлено {args.rows} строк за {time.perf_counter() - started:.1f} с")
+
+            for search in ("needle-rare", "Gold mine", "#4242"):
+                fts = _measure(ids[1], search, args.repeats)
+                with patch.object(farm_logs, "_fts_search_available", return_value=False):
+                    ilike = _measure(ids[1], search, args.repeats)
+                print(
+                    f"{search!r:>16}: ILIKE median {statistics.median(ilike):8.1f} ms | "
+                    f"FTS median {statistics.median(fts):8.1f} ms"
+                )
+            db.engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())